@@ -0,0 +1,106 @@
+"""
+Per-session agent identity and state.
+
+Each MCP session acts as one agent. The agent id lives in a context variable
+(`current_agent`), set by the SSE handler before the session's message loop
+starts. Every tool call of that session inherits it, including calls
+dispatched to worker threads (asyncio.to_thread copies the context). Where
+the id comes from:
+
+- the `X-MCP-Agent-Id` header on /sse: a named agent. Its location
+  (Agent)-[:LOCATED_AT] and its project/workflow survive reconnects;
+- no header (and stdio): DEFAULT_AGENT_ID (MCP_AGENT_ID, else yuri_agent),
+  persistent like any named agent;
+- `X-MCP-Agent-Id: ephemeral` (opt-in): an ephemeral agent `session-<hex>`
+  for this connection only. Its state is dropped when the connection closes.
+
+Project and workflow are kept per agent in `AgentStateStore`
+(.graphmcp/agents.json). The store replaces the process-wide
+ACTIVE_PROJECT_ID / ACTIVE_WORKFLOW globals and the .active_project_state
+file. The legacy file only seeds the state of agents seen for the first time.
+"""
+import contextvars
+import json
+import os
+import re
+import sys
+import threading
+import uuid
+from typing import Dict, Optional, Tuple
+
+DEFAULT_AGENT_ID = os.environ.get("MCP_AGENT_ID", "yuri_agent")
+AGENT_ID_PATTERN = re.compile(r"^[A-Za-z0-9_.:-]{1,64}$")
+EPHEMERAL_PREFIX = "session-"
+# Header value that asks for a per-connection agent
+EPHEMERAL_REQUEST = "ephemeral"
+WORKFLOWS = ("Architect", "Builder", "Auditor")
+
+current_agent: contextvars.ContextVar[str] = contextvars.ContextVar("current_agent", default=DEFAULT_AGENT_ID)
+
+
+def resolve_agent_id(header_value: Optional[str]) -> Tuple[str, bool]:
+    """(agent_id, ephemeral) for a new SSE session. Raises ValueError on a malformed header."""
+    if header_value is None or not header_value.strip():
+        return DEFAULT_AGENT_ID, False
+    agent_id = header_value.strip()
+    if agent_id == EPHEMERAL_REQUEST:
+        return f"{EPHEMERAL_PREFIX}{uuid.uuid4().hex[:12]}", True
+    if not AGENT_ID_PATTERN.match(agent_id) or agent_id.startswith(EPHEMERAL_PREFIX):
+        raise ValueError(f"Invalid agent id '{agent_id}' (1-64 of A-Z a-z 0-9 _ . : -, no '{EPHEMERAL_PREFIX}' prefix)")
+    return agent_id, False
+
+
+def is_ephemeral(agent_id: str) -> bool:
+    return agent_id.startswith(EPHEMERAL_PREFIX)
+
+
+class AgentStateStore:
+    """
+    {agent_id: {"id": project_id, "root": project_root, "workflow": mode}}.
+    States are replaced, never mutated in place, so a reader never sees a half-applied switch.
+    Named agents are persisted (atomic write); ephemeral ones stay in memory.
+    """
+
+    def __init__(self, path: str, default: Dict[str, str], legacy_path: Optional[str] = None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.template = dict(default)
+        self.states: Dict[str, Dict[str, str]] = {}
+        try:
+            if legacy_path and os.path.exists(legacy_path):
+                with open(legacy_path, "r", encoding="utf-8") as f:
+                    self.template.update(json.load(f))
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    self.states = json.load(f).get("agents", {})
+        except Exception as e:
+            print(f"⚠️ Failed to load agent state: {e}", file=sys.stderr)
+
+    def _save(self):
+        persisted = {agent_id: state for agent_id, state in self.states.items() if not is_ephemeral(agent_id)}
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"agents": persisted}, f, indent=2)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f"⚠️ Failed to save agent state: {e}", file=sys.stderr)
+
+    def get(self, agent_id: str) -> Dict[str, str]:
+        state = self.states.get(agent_id)
+        return dict(state if state is not None else self.template)
+
+    def update(self, agent_id: str, **changes) -> Dict[str, str]:
+        if "workflow" in changes and changes["workflow"] not in WORKFLOWS:
+            raise ValueError(f"Invalid workflow mode: {changes['workflow']}")
+        with self.lock:
+            state = {**self.get(agent_id), **changes}
+            self.states[agent_id] = state
+            if not is_ephemeral(agent_id):
+                self._save()
+        return dict(state)
+
+    def forget(self, agent_id: str):
+        with self.lock:
+            self.states.pop(agent_id, None)
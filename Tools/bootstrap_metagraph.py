@@ -19,6 +19,11 @@ import sys
 import os
 from neo4j import GraphDatabase
 
+try:
+    from graph_version import bump as bump_graph_version
+except ImportError:
+    from Tools.graph_version import bump as bump_graph_version
+
 # --- CONFIG ---
 NEO4J_URI = os.getenv("NEO4J_URI", "bolt://neo4j-db:7687")
 NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
@@ -49,6 +54,11 @@ CREATE (:Action {uid: 'ACT-get_full_context', tool_name: 'get_full_context', sco
 CREATE (:Action {uid: 'ACT-sync_graph', tool_name: 'sync_graph', scope: 'global'});
 CREATE (:Action {uid: 'ACT-refresh_knowledge', tool_name: 'refresh_knowledge', scope: 'global', description: 'Recalculates semantic embeddings for ALL nodes. Useful after manual edits or imports.'});
 CREATE (:Action {uid: 'ACT-find_orphans', tool_name: 'find_orphans', scope: 'global'});
+CREATE (:Action {uid: 'ACT-analyze_impact', tool_name: 'analyze_impact', scope: 'global'});
+CREATE (:Action {uid: 'ACT-find_path', tool_name: 'find_path', scope: 'global'});
+CREATE (:Action {uid: 'ACT-set_embedding_model', tool_name: 'set_embedding_model', scope: 'global'});
+CREATE (:Action {uid: 'ACT-job_status', tool_name: 'job_status', scope: 'global'});
+CREATE (:Action {uid: 'ACT-job_cancel', tool_name: 'job_cancel', scope: 'global'});
 CREATE (:Action {uid: 'ACT-switch_project', tool_name: 'switch_project', scope: 'global'});
 CREATE (:Action {uid: 'ACT-map_codebase', tool_name: 'map_codebase', scope: 'global'});
 CREATE (:Action {uid: 'ACT-set_workflow', tool_name: 'set_workflow', scope: 'global'});
@@ -511,6 +521,8 @@ def main():
     if not bootstrap_metagraph(driver):
         driver.close()
         return 1
+    # Мета-Граф глобальный: кэш ответов всех проектов устарел
+    bump_graph_version(driver, [None])
     
     # Проверка
     if not verify_metagraph(driver):
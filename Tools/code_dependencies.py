@@ -0,0 +1,261 @@
+"""
+Dependency extraction for CodebaseMapper (DEPENDS_ON edges).
+
+Parser workers collect raw, JSON-friendly facts from the tree they already
+parsed for the File/Class/Function nodes:
+    imports:  [[level, module, [names]], ...]      (JS: [[0, spec, []], ...])
+    bindings: {local_name: [level, module, name | None]}
+    calls:    {function_uid: [[kind, a, b], ...]}
+        kind "name": a()         -> local function / class, or an imported name
+        kind "self": self.b()    -> method b of class a
+        kind "attr": a.b()       -> function b of the module bound to a
+
+The raw facts are kept in the code manifest and resolved in the parent
+process by DependencyResolver once all parses are done (a file may import
+one that is parsed later). Resolution yields:
+    File     -[:DEPENDS_ON]-> File      (import of a mapped module)
+    File     -[:DEPENDS_ON]-> Module    (import of an external package)
+    Function -[:DEPENDS_ON]-> Function  (resolvable call target)
+"""
+import ast
+import os
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+PY_EXTS = ('.py',)
+JS_EXTS = ('.js', '.ts', '.jsx', '.tsx')
+
+JS_IMPORT_PATTERNS = [
+    re.compile(r'''(?:import|export)\s[^'";]*?\bfrom\s*['"]([^'"]+)['"]'''),
+    re.compile(r'''\bimport\s*['"]([^'"]+)['"]'''),
+    re.compile(r'''\brequire\(\s*['"]([^'"]+)['"]\s*\)'''),
+    re.compile(r'''\bimport\(\s*['"]([^'"]+)['"]\s*\)'''),
+]
+
+
+# --- Extraction (runs inside parser workers) ---
+
+def python_imports(tree: ast.AST) -> Tuple[List, Dict]:
+    """Imports anywhere in the module (incl. function-local) and the names they bind."""
+    imports = []
+    bindings = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                imports.append([0, alias.name, []])
+                if alias.asname:
+                    bindings[alias.asname] = [0, alias.name, None]
+                else:
+                    top = alias.name.split('.')[0]
+                    bindings[top] = [0, top, None]
+        elif isinstance(node, ast.ImportFrom):
+            module = node.module or ""
+            names = [alias.name for alias in node.names if alias.name != '*']
+            imports.append([node.level, module, names])
+            for alias in node.names:
+                if alias.name != '*':
+                    bindings[alias.asname or alias.name] = [node.level, module, alias.name]
+    return imports, bindings
+
+
+def python_calls(func: ast.AST, cls_name: Optional[str] = None) -> List[List]:
+    """Call sites of one function body that have a chance to resolve statically."""
+    calls = set()
+    for node in ast.walk(func):
+        if not isinstance(node, ast.Call):
+            continue
+        target = node.func
+        if isinstance(target, ast.Name):
+            calls.add(("name", target.id, None))
+        elif isinstance(target, ast.Attribute) and isinstance(target.value, ast.Name):
+            owner = target.value.id
+            if owner in ("self", "cls") and cls_name:
+                calls.add(("self", cls_name, target.attr))
+            else:
+                calls.add(("attr", owner, target.attr))
+    return [list(call) for call in sorted(calls, key=lambda c: (c[0], c[1], c[2] or ""))]
+
+
+def js_imports(content: str) -> List[List]:
+    """ES module imports/re-exports, require() and dynamic import() specifiers."""
+    specs = []
+    seen = set()
+    for pattern in JS_IMPORT_PATTERNS:
+        for match in pattern.finditer(content):
+            spec = match.group(1)
+            if spec not in seen:
+                seen.add(spec)
+                specs.append([0, spec, []])
+    return specs
+
+
+# --- Resolution (runs in the parent process) ---
+
+def python_module_name(rel_path: str) -> str:
+    parts = os.path.splitext(rel_path)[0].split(os.sep)
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+    return ".".join(parts)
+
+
+def external_module_name(spec: str) -> str:
+    """Top-level package of an unresolved import (`@scope/pkg` kept whole for JS)."""
+    if spec.startswith('@'):
+        return "/".join(spec.split('/')[:2])
+    return re.split(r'[./]', spec)[0]
+
+
+class DependencyResolver:
+    """
+    Resolves raw dependency facts of one file against the set of mapped files.
+
+    children_of(rel_path) returns the Class/Function uids mapped for that file
+    (the code manifest), so call targets are only linked if they exist.
+    External packages become Module nodes of the project (MODULE-{project_id}-{name}):
+    two projects importing `os` get one Module each.
+    """
+    def __init__(self, paths: Iterable[str], children_of: Callable[[str], Iterable[str]],
+                 uid_fn: Callable[..., str], project_id: str):
+        self.paths = set(paths)
+        self.uid = uid_fn
+        self.project_id = project_id
+        self._children_of = children_of
+        self._children_cache: Dict[str, Set[str]] = {}
+        self.py_modules: Dict[str, str] = {}
+        # "b.c" / "c" -> files, for flat sys.path-style imports (`from db_config import ...`)
+        self.py_suffixes: Dict[str, List[str]] = {}
+        for rel_path in sorted(self.paths):
+            if not rel_path.endswith(PY_EXTS):
+                continue
+            dotted = python_module_name(rel_path)
+            if not dotted:
+                continue
+            self.py_modules[dotted] = rel_path
+            parts = dotted.split('.')
+            for i in range(1, len(parts)):
+                self.py_suffixes.setdefault(".".join(parts[i:]), []).append(rel_path)
+
+    def children(self, rel_path: str) -> Set[str]:
+        cached = self._children_cache.get(rel_path)
+        if cached is None:
+            cached = set(self._children_of(rel_path) or ())
+            self._children_cache[rel_path] = cached
+        return cached
+
+    def resolve_python_module(self, rel_path: str, level: int, module: str) -> Optional[str]:
+        if level:
+            package = rel_path.split(os.sep)[:-1]
+            if level - 1 > len(package):
+                return None
+            if level > 1:
+                package = package[:len(package) - (level - 1)]
+            dotted = ".".join(package + ([module] if module else []))
+            return self.py_modules.get(dotted)
+
+        if not module:
+            return None
+        exact = self.py_modules.get(module)
+        if exact:
+            return exact
+        candidates = self.py_suffixes.get(module, [])
+        if len(candidates) == 1:
+            return candidates[0]
+        if candidates:
+            here = os.path.dirname(rel_path)
+            same_dir = [c for c in candidates if os.path.dirname(c) == here]
+            if len(same_dir) == 1:
+                return same_dir[0]
+        return None
+
+    def resolve_js_module(self, rel_path: str, spec: str) -> Optional[str]:
+        if not spec.startswith('.'):
+            return None
+        base = os.path.normpath(os.path.join(os.path.dirname(rel_path), spec))
+        candidates = [base] + [base + ext for ext in JS_EXTS] + [os.path.join(base, "index" + ext) for ext in JS_EXTS]
+        for candidate in candidates:
+            if candidate in self.paths:
+                return candidate
+        return None
+
+    def _symbol(self, rel_path: str, name: str, own: Optional[Set[str]] = None) -> Optional[str]:
+        """Function `name` of a file, or the constructor of class `name`."""
+        children = own if own is not None else self.children(rel_path)
+        for candidate in (self.uid("FUNC", rel_path, name), self.uid("FUNC", rel_path, f"{name}___init__")):
+            if candidate in children:
+                return candidate
+        return None
+
+    def resolve(self, rel_path: str, deps: Dict) -> Tuple[Set[Tuple[str, str]], Dict[str, str]]:
+        """
+        Returns (edges, modules):
+        edges   = {(source_uid, target_uid)}
+        modules = {module_uid: name} external packages that need a Module node
+        """
+        file_uid = self.uid("FILE", rel_path)
+        edges: Set[Tuple[str, str]] = set()
+        modules: Dict[str, str] = {}
+
+        def add_external(spec: str):
+            name = external_module_name(spec)
+            if name:
+                module_uid = f"MODULE-{self.project_id}-{name}"
+                modules[module_uid] = name
+                edges.add((file_uid, module_uid))
+
+        if rel_path.endswith(JS_EXTS):
+            for _, spec, _ in deps.get("imports", []):
+                target = self.resolve_js_module(rel_path, spec)
+                if target:
+                    if target != rel_path:
+                        edges.add((file_uid, self.uid("FILE", target)))
+                elif not spec.startswith('.'):
+                    add_external(spec)
+            return edges, modules
+
+        for level, module, names in deps.get("imports", []):
+            targets = []
+            for name in names:
+                submodule = f"{module}.{name}" if module else name
+                target = self.resolve_python_module(rel_path, level, submodule)
+                if target:
+                    targets.append(target)
+            if not targets:
+                target = self.resolve_python_module(rel_path, level, module)
+                if target:
+                    targets.append(target)
+            if targets:
+                for target in targets:
+                    if target != rel_path:
+                        edges.add((file_uid, self.uid("FILE", target)))
+            elif level == 0 and module:
+                add_external(module)
+
+        own = self.children(rel_path)
+        bindings = deps.get("bindings", {})
+        for func_uid, calls in deps.get("calls", {}).items():
+            if func_uid not in own:
+                continue
+            for kind, a, b in calls:
+                target = None
+                if kind == "name":
+                    target = self._symbol(rel_path, a, own)
+                    if not target and a in bindings:
+                        level, module, name = bindings[a]
+                        if name:
+                            source = self.resolve_python_module(rel_path, level, module)
+                            if source:
+                                target = self._symbol(source, name)
+                elif kind == "self":
+                    candidate = self.uid("FUNC", rel_path, f"{a}_{b}")
+                    if candidate in own:
+                        target = candidate
+                elif kind == "attr" and a in bindings:
+                    level, module, name = bindings[a]
+                    if name:
+                        module = f"{module}.{name}" if module else name
+                    source = self.resolve_python_module(rel_path, level, module)
+                    if source:
+                        target = self._symbol(source, b)
+                if target and target != func_uid:
+                    edges.add((func_uid, target))
+        return edges, modules
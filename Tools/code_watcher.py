@@ -0,0 +1,335 @@
+"""
+Watch mode for map_codebase.
+
+Keeps the code graph fresh without full rescans: file events are collected
+(inotify on Linux, polling elsewhere or when inotify is unavailable) and,
+once no new event arrived for `debounce_seconds`, the changed paths are
+re-mapped with CodebaseMapper.map_paths (one transaction per window).
+The baseline scan_and_map runs in the watcher thread too, so start() returns
+at once; events arriving meanwhile are queued and mapped afterwards.
+Events for paths the mapper ignores never open or extend a window, and a
+window is flushed after `max_wait` at the latest (a file written steadily
+would otherwise keep it open forever).
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Dict, Optional, Set, Tuple
+
+try:
+    from priority_gate import lower_priority
+except ImportError:
+    from Tools.priority_gate import lower_priority
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0x00000800
+IN_CLOEXEC = 0x00080000
+
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct("iIII")
+
+RESCAN = object()  # sentinel: events were lost, fall back to an incremental scan
+
+
+class InotifySource:
+    """
+    Recursive inotify watch over the project (ignored directories are never watched).
+    poll(timeout) returns a set of changed rel paths, or RESCAN on queue overflow.
+    """
+    def __init__(self, mapper):
+        self.mapper = mapper
+        self.root = mapper.project_root
+        libc_name = ctypes.util.find_library("c")
+        if not libc_name or not sys.platform.startswith("linux"):
+            raise OSError("inotify is not available on this platform")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.wd_to_dir: Dict[int, str] = {}
+        self.add_tree("")
+
+    def _dir_ignored(self, rel_dir: str) -> bool:
+        name = os.path.basename(rel_dir)
+        return (name in self.mapper.ignore_dirs or name in self.mapper.prune_dir_names
+                or self.mapper.ignore_rules.is_ignored(rel_dir, is_dir=True))
+
+    def add_watch(self, rel_dir: str) -> bool:
+        path = os.path.join(self.root, rel_dir) if rel_dir else self.root
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            print(f"⚠️ inotify_add_watch failed for {path}: {os.strerror(errno)}", file=sys.stderr)
+            return False
+        self.wd_to_dir[wd] = rel_dir
+        return True
+
+    def add_tree(self, rel_dir: str) -> Set[str]:
+        """Watches rel_dir and its non-ignored subdirectories. Returns files found (for new dirs)."""
+        found = set()
+        stack = [rel_dir]
+        while stack:
+            current = stack.pop()
+            if not self.add_watch(current):
+                continue
+            path = os.path.join(self.root, current) if current else self.root
+            try:
+                with os.scandir(path) as it:
+                    for entry in it:
+                        rel_path = os.path.join(current, entry.name) if current else entry.name
+                        if entry.is_dir(follow_symlinks=False):
+                            if not self._dir_ignored(rel_path):
+                                stack.append(rel_path)
+                        else:
+                            found.add(rel_path)
+            except OSError:
+                continue
+        return found
+
+    def poll(self, timeout: float):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, name_len = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + name_len].split(b"\0", 1)[0].decode("utf-8", "surrogateescape")
+            offset += name_len
+
+            if mask & IN_Q_OVERFLOW:
+                return RESCAN
+            if mask & IN_IGNORED:
+                self.wd_to_dir.pop(wd, None)
+                continue
+            rel_dir = self.wd_to_dir.get(wd)
+            if rel_dir is None or not name:
+                continue
+            rel_path = os.path.join(rel_dir, name) if rel_dir else name
+
+            if mask & IN_ISDIR:
+                if self._dir_ignored(rel_path):
+                    continue
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    changed |= self.add_tree(rel_path)
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    # Files under a vanished directory: the manifest knows them
+                    prefix = rel_path + os.sep
+                    changed |= {p for p in self.mapper.manifest.paths() if p.startswith(prefix)}
+                continue
+            changed.add(rel_path)
+        return changed
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class PollingSource:
+    """Fallback: compares (size, mtime) snapshots of discover_files every poll_interval."""
+    def __init__(self, mapper, poll_interval: float = 2.0):
+        self.mapper = mapper
+        self.poll_interval = poll_interval
+        self.snapshot = self._take_snapshot()
+
+    def _take_snapshot(self) -> Dict[str, Tuple[int, int]]:
+        return {rel: (size, mtime) for rel, _, size, mtime in self.mapper.discover_files()}
+
+    def poll(self, timeout: float):
+        time.sleep(min(timeout, self.poll_interval))
+        current = self._take_snapshot()
+        changed = {p for p, stat in current.items() if self.snapshot.get(p) != stat}
+        changed |= set(self.snapshot) - set(current)
+        self.snapshot = current
+        return changed
+
+    def close(self):
+        pass
+
+
+class CodeWatcher:
+    """
+    Background (daemon thread) watcher for one project.
+    `lock` serializes the watcher with manual map_codebase runs on the same mapper.
+    """
+    def __init__(self, mapper, debounce_seconds: float = 1.0, poll_interval: float = 2.0,
+                 use_inotify: bool = True, on_flush=None, max_wait: Optional[float] = None):
+        self.mapper = mapper
+        # on_flush(stats) after every mapped window (e.g. to invalidate in-memory graph caches)
+        self.on_flush = on_flush
+        self.debounce_seconds = debounce_seconds
+        self.max_wait = max_wait if max_wait is not None else 10 * debounce_seconds
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.lock = threading.Lock()
+        self.source = None
+        self.mode = None
+        self.pending: Set[str] = set()
+        self.window_started = 0.0
+        self.last_event = 0.0
+        self.windows_flushed = 0
+        self.baseline_done = False
+        self.last_error: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _open_source(self):
+        if self.use_inotify:
+            try:
+                self.source = InotifySource(self.mapper)
+                self.mode = "inotify"
+                return
+            except (OSError, AttributeError) as e:
+                print(f"⚠️ inotify unavailable ({e}), falling back to polling", file=sys.stderr)
+        self.source = PollingSource(self.mapper, self.poll_interval)
+        self.mode = "polling"
+
+    def start(self):
+        if self.is_running():
+            return
+        # Watch first, then bring the graph up to date once (in the thread): edits made
+        # during the baseline scan are queued as events instead of being lost
+        self._open_source()
+        self.baseline_done = False
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"code-watcher-{self.mapper.project_id}", daemon=True)
+        self._thread.start()
+        print(f"👀 CodeWatcher started ({self.mode}) on {self.mapper.project_root}", file=sys.stderr)
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self._thread = None
+        if self.source:
+            self.source.close()
+            self.source = None
+        print(f"🛑 CodeWatcher stopped for {self.mapper.project_id}", file=sys.stderr)
+
+    def is_running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def _run(self):
+        lower_priority()  # re-mapping is background work: interactive tool calls go first
+        while not self._stop.is_set() and not self.baseline_done:
+            self._baseline()
+        while not self._stop.is_set():
+            try:
+                changed = self.source.poll(self.debounce_seconds / 2)
+                if changed is RESCAN:
+                    print("⚠️ inotify queue overflow: running incremental scan", file=sys.stderr)
+                    with self.lock:
+                        self.mapper.scan_and_map()
+                    self.pending.clear()
+                    if self.on_flush:
+                        self.on_flush(self.mapper.last_stats)
+                    continue
+                self.collect(changed)
+                if self.window_due():
+                    self.flush()
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"❌ CodeWatcher error: {e}", file=sys.stderr)
+                self._stop.wait(self.poll_interval)
+
+    def _baseline(self):
+        """Incremental scan before the first window; retried every poll_interval until it succeeds."""
+        try:
+            with self.lock:
+                self.mapper.scan_and_map()
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"❌ CodeWatcher baseline scan failed, retrying: {e}", file=sys.stderr)
+            self._stop.wait(self.poll_interval)
+            return
+        self.baseline_done = True
+        stats = self.mapper.last_stats
+        if self.on_flush:
+            self.on_flush(stats)
+        print(f"👀 Watch baseline: {stats.get('files_parsed', 0)} re-parsed, {stats.get('files_unchanged', 0)} unchanged, "
+              f"{stats.get('files_removed', 0)} removed", file=sys.stderr)
+
+    def collect(self, changed: Set[str]):
+        """Adds event paths to the window; paths map_paths would ignore are dropped (unless mapped before)."""
+        manifest = self.mapper.manifest
+        relevant = {p for p in changed if manifest.get(p) is not None or not self.mapper.is_path_ignored(p)}
+        if not relevant:
+            return
+        now = time.monotonic()
+        if not self.pending:
+            self.window_started = now
+        self.pending |= relevant
+        self.last_event = now
+
+    def window_due(self) -> bool:
+        """Quiet for debounce_seconds, or open for max_wait."""
+        if not self.pending:
+            return False
+        now = time.monotonic()
+        return now - self.last_event >= self.debounce_seconds or now - self.window_started >= self.max_wait
+
+    def flush(self):
+        """
+        Re-maps every path collected in the current debounce window. On failure
+        (e.g. Neo4j unavailable) the paths go back to pending and are retried
+        with the next window; map_paths has already restored the manifest.
+        """
+        paths, self.pending = self.pending, set()
+        try:
+            with self.lock:
+                stats = self.mapper.map_paths(paths)
+        except Exception:
+            self.pending |= paths
+            raise
+        self.windows_flushed += 1
+        if self.on_flush and (stats["files_parsed"] or stats["files_removed"]):
+            self.on_flush(stats)
+        if stats["files_parsed"] or stats["files_removed"]:
+            print(f"🔄 Watch: {stats['files_parsed']} re-mapped, {stats['files_removed']} removed "
+                  f"({stats['nodes_written']} nodes, {stats['dependency_edges']} edges)", file=sys.stderr)
+        return stats
+
+    def status(self) -> Dict:
+        return {
+            "running": self.is_running(),
+            "mode": self.mode,
+            "baseline_done": self.baseline_done,
+            "pending": len(self.pending),
+            "windows_flushed": self.windows_flushed,
+            "last_error": self.last_error,
+        }
+
+
+if __name__ == "__main__":
+    from codebase_mapper import CodebaseMapper
+
+    watcher = CodeWatcher(CodebaseMapper(), use_inotify="--poll" not in sys.argv)
+    watcher.start()
+    try:
+        while watcher.is_running():
+            time.sleep(1)
+    except KeyboardInterrupt:
+        watcher.stop()
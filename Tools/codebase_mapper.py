@@ -1,9 +1,14 @@
-
 import os
 import ast
+import bisect
 import hashlib
+import json
+import multiprocessing
 import re
-from typing import List, Dict, Set
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Set, Optional, Tuple
 
 # Try importing local modules, handling both script and package execution
 try:
@@ -16,136 +21,181 @@ except ImportError:
         sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
         from Tools.db_config import get_driver, close_driver, WORKSPACE_ROOT
 
+try:
+    from Tools.ignore_rules import IgnoreRules
+    from Tools.code_dependencies import DependencyResolver, python_imports, python_calls, js_imports
+    from Tools.graph_version import bump as bump_graph_version
+    from Tools.priority_gate import lower_priority
+except ImportError:
+    from ignore_rules import IgnoreRules
+    from code_dependencies import DependencyResolver, python_imports, python_calls, js_imports
+    from graph_version import bump as bump_graph_version
+    from priority_gate import lower_priority
+
+# Per-project state folder (RW volume in docker-compose, "Agent brain")
+STATE_DIR_NAME = ".graphmcp"
+MANIFEST_FILE_NAME = "code_manifest.json"
+# v2: symbol line ranges / byte offsets / body hashes
+# v3: raw dependency facts + resolved DEPENDS_ON edges (each bump forces one full re-parse)
+MANIFEST_VERSION = 3
+
+PY_EXTS = ('.py',)
+JS_EXTS = ('.js', '.ts', '.jsx', '.tsx')
+
+# Below this many files the process pool start-up costs more than it saves
+PARALLEL_MIN_FILES = 64
+
+# Nodes (or removals) per write transaction
+DEFAULT_BATCH_SIZE = 500
+
+# scan_and_map with on_checkpoint: flush + save the manifest this often (resumable jobs)
+CHECKPOINT_SECONDS = 30.0
+
+# Compact node tuple exchanged between parser processes and the writer:
+# (uid, type, name, parent_uid, rel_path, start_line, end_line, start_byte, end_byte, body_hash)
+# Lines are 1-based inclusive, bytes are [start, end) over whole lines; None for File nodes.
+(NODE_UID, NODE_TYPE, NODE_NAME, NODE_PARENT, NODE_PATH,
+ NODE_START_LINE, NODE_END_LINE, NODE_START_BYTE, NODE_END_BYTE, NODE_BODY_HASH) = range(10)
+SPAN_KEYS = ("start_line", "end_line", "start_byte", "end_byte", "body_hash")
+
+
+def pool_context():
+    """
+    Start method of the parser pool. Never fork: the mapper runs in a worker
+    thread of the multithreaded server (Neo4j driver, scheduler locks, embedding
+    threads) and a forked child can inherit a lock held by another thread forever.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def default_worker_count() -> int:
+    # One core stays free for interactive tool calls
+    return max(1, (os.cpu_count() or 1) - 1)
+
+
+class FileManifest:
+    """
+    Persistent snapshot of the last mapped state of every project file:
+    rel_path -> {size, mtime (ns), sha, children (uids of Class/Function nodes),
+                 deps (raw import/call facts), edges (DEPENDS_ON pairs written last time),
+                 error (parse error of this sha; children/deps are those of the last good parse)}.
+
+    Lets scan_and_map skip unchanged files (size+mtime, then sha) and
+    detach the code nodes that disappeared from a changed or deleted file.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, Dict] = {}
+        self.load()
+
+    def load(self):
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get("version") == MANIFEST_VERSION:
+                    self.entries = data.get("files", {})
+        except Exception as e:
+            print(f"⚠️ Failed to load code manifest ({self.path}): {e}")
+            self.entries = {}
+
+    def save(self):
+        """Atomic write (tmp + replace) so an interrupted run never corrupts the manifest."""
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"version": MANIFEST_VERSION, "files": self.entries}, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"⚠️ Failed to save code manifest ({self.path}): {e}")
+
+    def get(self, rel_path: str) -> Optional[Dict]:
+        return self.entries.get(rel_path)
+
+    def is_unchanged(self, rel_path: str, size: int, mtime: int) -> bool:
+        entry = self.entries.get(rel_path)
+        return bool(entry) and entry["size"] == size and entry["mtime"] == mtime
+
+    def update(self, rel_path: str, size: int, mtime: int, sha: Optional[str], children: List[str],
+               deps: Optional[Dict] = None, edges: Optional[List] = None, error: Optional[str] = None):
+        entry = {"size": size, "mtime": mtime, "sha": sha, "children": children}
+        if deps is not None:
+            entry["deps"] = deps
+        if edges is not None:
+            entry["edges"] = edges
+        if error is not None:
+            entry["error"] = error
+        self.entries[rel_path] = entry
+
+    def edges_pending(self) -> bool:
+        """Some file's deps were never resolved into DEPENDS_ON (run interrupted or sync failed after a checkpoint)."""
+        return any("deps" in entry and "edges" not in entry for entry in self.entries.values())
+
+    def remove(self, rel_path: str) -> Optional[Dict]:
+        return self.entries.pop(rel_path, None)
+
+    def paths(self) -> Set[str]:
+        return set(self.entries.keys())
+
+    def clear(self):
+        self.entries = {}
+
+
+def generate_uid(type_prefix: str, relative_path: str, name: str = "") -> str:
+    """
+    Generates a deterministic UID.
+    FILE: FILE-{sanitized_path}
+    CLASS: CLASS-{sanitized_path}-{name}
+    FUNC: FUNC-{sanitized_path}-{name}
+    """
+    sanitized_path = relative_path.replace('/', '_').replace('\\', '_').replace('.', '_')
+    if name:
+        return f"{type_prefix}-{sanitized_path}-{name}"
+    return f"{type_prefix}-{sanitized_path}"
+
+
 class CodebaseMapper:
-    def __init__(self, project_root: str = WORKSPACE_ROOT):
+    def __init__(self, project_root: str = WORKSPACE_ROOT, project_id: str = "graphmcp", workers: Optional[int] = None,
+                 batch_size: int = DEFAULT_BATCH_SIZE, progress_callback=None, pause=None):
         self.project_root = project_root
+        self.project_id = project_id
+        self.workers = workers or default_worker_count()
+        self.batch_size = max(1, batch_size)
+        # progress_callback(files_done, files_total, nodes_written)
+        self.progress_callback = progress_callback
+        # pause() between write transactions / watcher windows: blocks while interactive tool calls run (PriorityGate)
+        self.pause = pause
         self.driver = get_driver()
-        self.ignore_dirs = {'.git', 'node_modules', '__pycache__', 'venv', 'env', '.vscode', '.idea', 'dist', 'build', 'Graph_Export'}
+        self.ignore_dirs = {'.git', 'node_modules', '__pycache__', 'venv', 'env', '.vscode', '.idea', 'dist', 'build', 'Graph_Export', STATE_DIR_NAME}
         self.ignore_exts = {'.pyc', '.git', '.DS_Store', '.zip', '.tar', '.gz'}
+        # Directory names whose files _should_ignore always rejects: pruned before descending
+        self.prune_dir_names = {'maintenance', 'archive', 'md', 'examples'}
+        self.ignore_rules = IgnoreRules.from_root(project_root)
+        self.manifest = FileManifest(os.path.join(project_root, STATE_DIR_NAME, MANIFEST_FILE_NAME))
+        self.last_stats: Dict = {}
 
     def generate_uid(self, type_prefix: str, relative_path: str, name: str = "") -> str:
-        """
-        Generates a deterministic UID.
-        FILE: FILE-{sanitized_path}
-        CLASS: CLS-{sanitized_path}-{name}
-        FUNC: FUNC-{sanitized_path}-{name}
-        """
-        sanitized_path = relative_path.replace('/', '_').replace('\\', '_').replace('.', '_')
-        if name:
-            return f"{type_prefix}-{sanitized_path}-{name}"
-        return f"{type_prefix}-{sanitized_path}"
+        return generate_uid(type_prefix, relative_path, name)
 
     def parse_python_file(self, file_path: str, relative_path: str) -> List[Dict]:
-        nodes = []
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
-            
-            tree = ast.parse(content)
-            
-            # File Node
-            file_uid = self.generate_uid("FILE", relative_path)
-            nodes.append({
-                "uid": file_uid,
-                "name": os.path.basename(file_path),
-                "type": "File",
-                "path": relative_path,
-                "content": content, # Optional: might be too heavy?
-                "parent": None
-            })
-
-            # Classes and Functions
-            for node in ast.walk(tree):
-                if isinstance(node, ast.ClassDef):
-                    cls_name = node.name
-                    cls_uid = self.generate_uid("CLASS", relative_path, cls_name)
-                    nodes.append({
-                        "uid": cls_uid,
-                        "name": cls_name,
-                        "type": "Class",
-                        "path": relative_path,
-                        "parent": file_uid
-                    })
-                    
-                    # Methods inside Class
-                    for item in node.body:
-                        if isinstance(item, ast.FunctionDef) or isinstance(item, ast.AsyncFunctionDef):
-                            method_name = item.name
-                            if method_name.startswith("__"): continue # Skip magic methods for less noise
-                            
-                            method_uid = self.generate_uid("FUNC", relative_path, f"{cls_name}_{method_name}")
-                            nodes.append({
-                                "uid": method_uid,
-                                "name": method_name,
-                                "type": "Function",
-                                "path": relative_path,
-                                "parent": cls_uid
-                            })
-
-                elif isinstance(node, ast.FunctionDef) or isinstance(node, ast.AsyncFunctionDef):
-                    # Top level functions (check if it's already processed as method)
-                    # ast.walk visits everything, so we need to be careful.
-                    # Actually, simple walk flattens the tree. 
-                    # We can check strict parentage or just use the fact they are visited.
-                    # For simplicity in this v1: We might double count methods if not careful.
-                    # Better approach: Recursive visitor.
-                    pass
-            
-            # Re-implementing with Visitor for better hierarchy control
-            visitor = CodeVisitor(file_uid, relative_path, self)
-            visitor.visit(tree)
-            nodes.extend(visitor.collected_nodes)
-
         except Exception as e:
-            print(f"Error parsing {relative_path}: {e}")
-            
-        return nodes
+            print(f"Error reading {relative_path}: {e}")
+            return []
+        return parse_python_source(content, relative_path)
 
     def parse_js_file(self, file_path: str, relative_path: str) -> List[Dict]:
-        nodes = []
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
-                
-            file_uid = self.generate_uid("FILE", relative_path)
-            nodes.append({
-                "uid": file_uid,
-                "name": os.path.basename(file_path),
-                "type": "File",
-                "path": relative_path,
-                "parent": None
-            })
-            
-            # Simple Regex for Classes
-            class_matches = re.finditer(r'class\s+(\w+)', content)
-            for match in class_matches:
-                cls_name = match.group(1)
-                cls_uid = self.generate_uid("CLASS", relative_path, cls_name)
-                nodes.append({
-                    "uid": cls_uid,
-                    "name": cls_name,
-                    "type": "Class",
-                    "path": relative_path,
-                    "parent": file_uid
-                })
-
-            # Simple Regex for Functions (function foo() or const foo = () =>)
-            func_matches = re.finditer(r'function\s+(\w+)', content)
-            for match in func_matches:
-                func_name = match.group(1)
-                func_uid = self.generate_uid("FUNC", relative_path, func_name)
-                nodes.append({
-                    "uid": func_uid,
-                    "name": func_name,
-                    "type": "Function",
-                    "path": relative_path,
-                    "parent": file_uid
-                })
-
         except Exception as e:
-            print(f"Error parsing JS {relative_path}: {e}")
-            
-        return nodes
+            print(f"Error reading JS {relative_path}: {e}")
+            return []
+        return parse_js_source(content, relative_path)
 
     def _should_ignore(self, rel_path: str, filename: str) -> bool:
         """
@@ -180,105 +230,567 @@ class CodebaseMapper:
             
         return False
 
-    def scan_and_map(self):
-        all_nodes = []
-        
-        for root, dirs, files in os.walk(self.project_root):
-            # Ignore dirs
-            dirs[:] = [d for d in dirs if d not in self.ignore_dirs]
-            
-            for file in files:
-                full_path = os.path.join(root, file)
-                rel_path = os.path.relpath(full_path, self.project_root)
-                
-                if self._should_ignore(rel_path, file):
+    def discover_files(self):
+        """
+        Walks the project root and yields (rel_path, full_path, size, mtime_ns)
+        for every file that passes the ignore rules.
+
+        Iterative os.scandir walk: ignored directories (hard-coded names and
+        .gitignore/.graphmcpignore rules) are pruned before descending, and
+        the DirEntry type/stat info is reused instead of extra syscalls.
+        """
+        stack = [(self.project_root, "")]
+        while stack:
+            dir_path, rel_dir = stack.pop()
+            try:
+                it = os.scandir(dir_path)
+            except OSError:
+                continue
+            with it:
+                for entry in it:
+                    name = entry.name
+                    rel_path = f"{rel_dir}{os.sep}{name}" if rel_dir else name
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if (name in self.ignore_dirs or name in self.prune_dir_names
+                                    or self.ignore_rules.is_ignored(rel_path, is_dir=True)):
+                                continue
+                            stack.append((entry.path, rel_path))
+                            continue
+                        if not entry.is_file():
+                            continue
+                    except OSError:
+                        continue
+
+                    if self._should_ignore(rel_path, name):
+                        continue
+                    if self.ignore_rules.is_ignored(rel_path, is_dir=False):
+                        continue
+
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    yield rel_path, entry.path, st.st_size, st.st_mtime_ns
+
+    def _manifest_matches_db(self) -> bool:
+        """
+        Cheap guard against a stale manifest (e.g. the DB was wiped or restored):
+        the number of File nodes of this project must match the manifest.
+        """
+        if not self.manifest.entries:
+            return False
+        query = "MATCH (f:File {project_id: $project_id}) RETURN count(f) as count"
+        try:
+            records, _, _ = self.driver.execute_query(query, {"project_id": self.project_id}, database_="neo4j")
+            return records[0]["count"] == len(self.manifest.entries)
+        except Exception as e:
+            print(f"⚠️ Manifest check failed, falling back to full scan: {e}")
+            return False
+
+    def _mapped_uids_by_path(self) -> Dict[str, List[str]]:
+        """
+        Everything mapped so far, before a full scan forgets the manifest:
+        rel_path -> File/Class/Function uids, from the old manifest and from
+        the DB (when the full scan was forced by a stale manifest, the DB is
+        the only record of files deleted since).
+        """
+        mapped = {rel_path: [generate_uid("FILE", rel_path)] + entry.get("children", [])
+                  for rel_path, entry in self.manifest.entries.items()}
+        query = """
+        MATCH (n {project_id: $project_id})
+        WHERE (n:File OR n:Class OR n:Function) AND n.path IS NOT NULL
+        RETURN n.path as path, collect(n.uid) as uids
+        """
+        try:
+            records, _, _ = self.driver.execute_query(query, {"project_id": self.project_id}, database_="neo4j")
+            for record in records:
+                mapped.setdefault(record["path"], []).extend(record["uids"])
+        except Exception as e:
+            print(f"⚠️ Could not list mapped files, only manifest deletions are detached: {e}")
+        return mapped
+
+    def _parse_all(self, tasks: List[Tuple]):
+        """
+        Runs parse_file_worker over tasks and yields results in task order,
+        so the merge is deterministic regardless of worker scheduling.
+        Uses a process pool sized by CPU count for large batches (workers at low
+        OS priority); falls back to inline parsing if the pool cannot be
+        started or breaks.
+        """
+        done = 0
+        if self.workers > 1 and len(tasks) >= PARALLEL_MIN_FILES:
+            try:
+                # Bounded window: results of at most `window` files are held in
+                # memory, so a slow writer throttles the parsers (backpressure).
+                window = self.workers * 64
+                chunksize = max(1, min(32, len(tasks) // (self.workers * 8)))
+                with ProcessPoolExecutor(max_workers=self.workers, initializer=lower_priority,
+                                         mp_context=pool_context()) as pool:
+                    while done < len(tasks):
+                        for result in pool.map(parse_file_worker, tasks[done:done + window], chunksize=chunksize):
+                            done += 1
+                            yield result
+                return
+            except (OSError, BrokenProcessPool) as e:
+                print(f"⚠️ Parser pool failed ({e}), continuing serially from file {done}/{len(tasks)}.")
+        for task in tasks[done:]:
+            yield parse_file_worker(task)
+
+    def scan_and_map(self, full: bool = False, resume: bool = False, on_checkpoint=None,
+                     checkpoint_seconds: float = CHECKPOINT_SECONDS):
+        """
+        Incremental mapping driven by the file manifest.
+
+        - unchanged size+mtime          -> skipped without reading
+        - changed stat, same sha        -> manifest refresh only
+        - changed content / new file    -> re-parsed (process pool) and MERGEd
+        - children missing after parse  -> DETACH DELETEd in the same transaction
+        - files gone from disk          -> File node and its children removed
+
+        Nodes are streamed to Neo4j in transactions of batch_size, parents
+        before children, so memory is bounded by the batch, not the repo.
+
+        full=True ignores the manifest and re-parses everything; nodes of files
+        that were mapped before (old manifest or DB) and are gone are detached.
+        Every `checkpoint_seconds` the pending batch is flushed and the manifest
+        saved, then on_checkpoint() is called: a run interrupted after that
+        continues with resume=True (manifest trusted as is) and skips what was
+        already written. An interrupted run (cancelled job, DB error) also
+        checkpoints before re-raising.
+        Returns the number of upserted nodes (details in self.last_stats).
+        """
+        if not full and not resume and not self._manifest_matches_db():
+            full = True
+        mapped_before = {}
+        if full:
+            mapped_before = self._mapped_uids_by_path()
+            self.manifest.clear()
+
+        writer = NodeStreamWriter(self, self.batch_size)
+        seen_paths = set()
+        file_stats = {}
+        tasks = []
+        stats = {"files_total": 0, "files_parsed": 0, "files_unchanged": 0, "files_removed": 0,
+                 "files_failed": 0, "parse_seconds": 0.0}
+
+        for rel_path, full_path, size, mtime in self.discover_files():
+            seen_paths.add(rel_path)
+            stats["files_total"] += 1
+
+            if self.manifest.is_unchanged(rel_path, size, mtime):
+                stats["files_unchanged"] += 1
+                continue
+
+            file_stats[rel_path] = (size, mtime)
+            if is_code_file(rel_path):
+                old_entry = self.manifest.get(rel_path)
+                tasks.append((rel_path, full_path, old_entry.get("sha") if old_entry else None))
+            else:
+                # just file node, nothing to parse
+                nodes = ((generate_uid("FILE", rel_path), "File", os.path.basename(rel_path), None, rel_path) + (None,) * len(SPAN_KEYS),)
+                self._apply_parsed(rel_path, size, mtime, None, nodes, None, writer, stats)
+
+        # Deterministic order for the parse phase
+        tasks.sort()
+        files_total = stats["files_total"]
+        files_done = files_total - len(tasks)
+        started = time.perf_counter()
+        last_checkpoint = time.monotonic()
+        try:
+            for rel_path, sha, nodes, deps in self._parse_all(tasks):
+                size, mtime = file_stats[rel_path]
+                self._apply_parsed(rel_path, size, mtime, sha, nodes, deps, writer, stats)
+                files_done += 1
+                if writer.flushed_since_report:
+                    # One write transaction done: report, and yield to interactive calls once per batch
+                    writer.flushed_since_report = False
+                    self.report_progress(files_done, files_total, writer.nodes_written)
+                    if self.pause:
+                        self.pause()
+                if on_checkpoint and time.monotonic() - last_checkpoint >= checkpoint_seconds:
+                    self.checkpoint(writer)
+                    on_checkpoint()
+                    last_checkpoint = time.monotonic()
+        except BaseException:
+            self.checkpoint(writer)
+            raise
+        stats["parse_seconds"] = time.perf_counter() - started
+
+        try:
+            # Files deleted from disk (or newly ignored)
+            for rel_path in sorted(self.manifest.paths() - seen_paths):
+                entry = self.manifest.remove(rel_path)
+                writer.add_removed([generate_uid("FILE", rel_path)] + entry.get("children", []))
+                stats["files_removed"] += 1
+            # Full scan: the manifest was cleared, deletions come from what was mapped before
+            for rel_path in sorted(set(mapped_before) - seen_paths):
+                writer.add_removed(sorted(set(mapped_before[rel_path])))
+                stats["files_removed"] += 1
+
+            writer.flush()
+            # Edges need both endpoints written: resolved only after every node is flushed
+            stats["dependency_edges"] = 0
+            if stats["files_parsed"] or stats["files_removed"] or self.manifest.edges_pending():
+                stats["dependency_edges"] = self.sync_dependencies()
+            self.manifest.save()
+        except BaseException:
+            self.reload_manifest()
+            raise
+        self.report_progress(files_total, files_total, writer.nodes_written)
+
+        stats["nodes_written"] = writer.nodes_written
+        stats["uids_removed"] = writer.uids_removed
+        stats["transactions"] = writer.transactions
+        self.bump_version(stats)
+        self.last_stats = stats
+        print(f"Mapped {stats['files_parsed']}/{stats['files_total']} files "
+              f"({stats['files_unchanged']} unchanged, {stats['files_removed']} removed, {stats['files_failed']} unparsable) "
+              f"in {stats['parse_seconds']:.3f}s parse time, {writer.transactions} write transactions.")
+        return writer.nodes_written
+
+    def is_path_ignored(self, rel_path: str) -> bool:
+        """Same verdict discover_files would give, for a single path (watch mode)."""
+        parts = rel_path.split(os.sep)
+        if any(p in self.ignore_dirs or p in self.prune_dir_names for p in parts[:-1]):
+            return True
+        return self._should_ignore(rel_path, parts[-1]) or self.ignore_rules.is_path_ignored(rel_path)
+
+    def map_paths(self, rel_paths) -> Dict:
+        """
+        Re-maps only the given files (created, modified or deleted) and writes
+        their File/Class/Function subgraph in ONE transaction, then refreshes
+        DEPENDS_ON edges. Used by the watcher once per debounce window.
+        Returns stats like scan_and_map.
+        """
+        writer = NodeStreamWriter(self, batch_size=float("inf"))
+        stats = {"files_total": 0, "files_parsed": 0, "files_unchanged": 0, "files_removed": 0,
+                 "files_failed": 0, "parse_seconds": 0.0}
+        started = time.perf_counter()
+        if self.pause:
+            self.pause()  # once per window: the window is one transaction
+
+        try:
+            for rel_path in sorted(set(rel_paths)):
+                full_path = os.path.join(self.project_root, rel_path)
+                stats["files_total"] += 1
+                try:
+                    st = os.stat(full_path)
+                    exists = os.path.isfile(full_path) and not self.is_path_ignored(rel_path)
+                except OSError:
+                    exists = False
+
+                if not exists:
+                    entry = self.manifest.remove(rel_path)
+                    if entry is not None:
+                        writer.add_removed([generate_uid("FILE", rel_path)] + entry.get("children", []))
+                        stats["files_removed"] += 1
                     continue
-                
-                if file.endswith('.py'):
-                    # Use AST
-                    # Note: parse_python_file implementation below calls visitor, 
-                    # let's refine existing one.
-                    all_nodes.extend(self.parse_python_file(full_path, rel_path))
-                elif file.endswith(('.js', '.ts', '.jsx', '.tsx')):
-                   all_nodes.extend(self.parse_js_file(full_path, rel_path))
+
+                if self.manifest.is_unchanged(rel_path, st.st_size, st.st_mtime_ns):
+                    stats["files_unchanged"] += 1
+                    continue
+
+                if is_code_file(rel_path):
+                    old_entry = self.manifest.get(rel_path)
+                    _, sha, nodes, deps = parse_file_worker((rel_path, full_path, old_entry.get("sha") if old_entry else None))
                 else:
-                    # just file node
-                    file_uid = self.generate_uid("FILE", rel_path)
-                    all_nodes.append({
-                        "uid": file_uid,
-                        "name": file,
-                        "type": "File",
-                        "path": rel_path,
-                        "parent": None
-                    })
+                    sha, deps = None, None
+                    nodes = ((generate_uid("FILE", rel_path), "File", os.path.basename(rel_path), None, rel_path) + (None,) * len(SPAN_KEYS),)
+                self._apply_parsed(rel_path, st.st_size, st.st_mtime_ns, sha, nodes, deps, writer, stats)
 
-        # Sync to Neo4j
-        self.batch_create_nodes(all_nodes)
-        return len(all_nodes)
+            stats["parse_seconds"] = time.perf_counter() - started
+            writer.flush()
+            stats["dependency_edges"] = 0
+            if stats["files_parsed"] or stats["files_removed"] or self.manifest.edges_pending():
+                stats["dependency_edges"] = self.sync_dependencies()
+                self.manifest.save()
+        except BaseException:
+            # The in-memory manifest already describes this window: back to what is known to be written
+            self.reload_manifest()
+            raise
 
-    def batch_create_nodes(self, nodes: List[Dict]):
-        if not nodes: return
-        
-        # Cypher query with UNWIND
-        query = """
-        UNWIND $batch AS item
-        MERGE (n {uid: item.uid})
-        SET n.name = item.name,
-            n.path = item.path,
-            n.project_id = 'graphmcp'
-        
-        // Set dynamic labels
-        WITH n, item
-        CALL apoc.create.addLabels(n, [item.type]) YIELD node
-        
-        // Create hierarchy link
-        WITH n, item
-        MATCH (p {uid: item.parent})
-        WHERE item.parent IS NOT NULL
-        MERGE (p)-[:DECOMPOSES]->(n)
+        stats["nodes_written"] = writer.nodes_written
+        stats["uids_removed"] = writer.uids_removed
+        stats["transactions"] = writer.transactions
+        self.bump_version(stats)
+        self.last_stats = stats
+        return stats
+
+    def checkpoint(self, writer: "NodeStreamWriter"):
+        """Flushes pending nodes and saves the manifest, so it matches what is in the graph."""
+        try:
+            writer.flush()
+            self.manifest.save()
+        except Exception as e:
+            # Unflushed files must not look mapped: fall back to the last saved manifest
+            print(f"⚠️ Mapping checkpoint failed, manifest reloaded: {e}")
+            self.reload_manifest()
+
+    def reload_manifest(self):
+        """Drops in-memory manifest changes (write failed): affected files are re-mapped next time."""
+        self.manifest.clear()
+        self.manifest.load()
+
+    def bump_version(self, stats: Dict):
+        """Graph changed: bump the project's version (and the global one when nodes were detached)."""
+        if not (stats["nodes_written"] or stats["uids_removed"]):
+            return
+        try:
+            # Detached code nodes may have had IMPLEMENTS links from global requirements
+            bump_graph_version(self.driver, [self.project_id] + ([None] if stats["uids_removed"] else []))
+        except Exception as e:
+            print(f"⚠️ Graph version bump failed: {e}")
+
+    def report_progress(self, files_done: int, files_total: int, nodes_written: int):
+        if self.progress_callback:
+            self.progress_callback(files_done, files_total, nodes_written)
+        else:
+            print(f"⏳ Mapping: {files_done}/{files_total} files, {nodes_written} nodes written")
+
+    def _apply_parsed(self, rel_path, size, mtime, sha, nodes, deps, writer, stats):
+        """Merges one parse result into the manifest and the pending write set."""
+        old_entry = self.manifest.get(rel_path)
+        if nodes is None:
+            if sha is None:
+                return  # unreadable: keep the previous state, retry next run
+            # Touched but identical (checkout, copy): no re-parse
+            old_entry = old_entry or {}
+            self.manifest.update(rel_path, size, mtime, sha, old_entry.get("children", []),
+                                 deps=old_entry.get("deps"), edges=old_entry.get("edges"))
+            stats["files_unchanged"] += 1
+            return
+
+        if deps and deps.get("error"):
+            # Half-saved / invalid file: its symbols (and their manual links) stay as last mapped
+            # until it parses again; only the File node is written, the removal diff is skipped
+            stats["files_failed"] += 1
+            old_entry = old_entry or {}
+            self.manifest.update(rel_path, size, mtime, sha, old_entry.get("children", []),
+                                 deps=old_entry.get("deps"), edges=old_entry.get("edges"), error=deps["error"])
+            writer.add_nodes(nodes[:1])
+            return
+
+        stats["files_parsed"] += 1
+        children = [n[NODE_UID] for n in nodes if n[NODE_TYPE] != "File"]
+        if old_entry:
+            # Per-file diff of child uid sets: removed classes/functions are detached
+            writer.add_removed(sorted(set(old_entry.get("children", [])) - set(children)))
+        # No "edges": sync_dependencies rewrites this file's DEPENDS_ON edges
+        self.manifest.update(rel_path, size, mtime, sha, children, deps=deps)
+        writer.add_nodes(nodes)
+
+    def sync_dependencies(self) -> int:
         """
-        
-        # Simplified version without APOC (if not available)
-        # We'll stick to running separate queries if types differ, 
-        # but to keep it simple and clean, let's group by type.
-        
-        files = [n for n in nodes if n['type'] == 'File']
-        classes = [n for n in nodes if n['type'] == 'Class']
-        functions = [n for n in nodes if n['type'] == 'Function']
-        
-        self._write_batch("File", files)
-        self._write_batch("Class", classes)
-        self._write_batch("Function", functions)
-        
-    def _write_batch(self, label: str, nodes: List[Dict]):
+        Resolves the raw import/call facts of every mapped file and rewrites the
+        DEPENDS_ON edges of files whose resolved edge set changed (auto edges only:
+        manually linked DEPENDS_ON are never touched). Re-resolving unchanged files
+        is cheap dict work and picks up targets that appeared or vanished elsewhere.
+        Returns the number of edges written.
+        """
+        resolver = DependencyResolver(self.manifest.paths(),
+                                      lambda rel: (self.manifest.get(rel) or {}).get("children", []),
+                                      generate_uid, self.project_id)
+        sources, edges, modules, pending = [], [], {}, []
+        written = 0
+
+        def flush():
+            nonlocal sources, edges, modules, pending, written
+            if not sources:
+                return
+            with self.driver.session(database="neo4j") as session:
+                session.execute_write(self._write_deps_tx, sources,
+                                      [{"uid": uid, "name": name} for uid, name in sorted(modules.items())],
+                                      edges)
+            for entry, edge_list in pending:
+                entry["edges"] = edge_list
+            written += len(edges)
+            sources, edges, modules, pending = [], [], {}, []
+
+        for rel_path in sorted(self.manifest.paths()):
+            entry = self.manifest.get(rel_path)
+            deps = entry.get("deps")
+            if deps is None:
+                continue
+            resolved, file_modules = resolver.resolve(rel_path, deps)
+            edge_list = sorted([src, dst] for src, dst in resolved)
+            if entry.get("edges") == edge_list:
+                continue
+            sources.append(generate_uid("FILE", rel_path))
+            sources.extend(entry.get("children", []))
+            edges.extend({"src": src, "dst": dst} for src, dst in edge_list)
+            modules.update(file_modules)
+            pending.append((entry, edge_list))
+            if len(sources) + len(edges) >= self.batch_size:
+                flush()
+        flush()
+
+        # External modules nobody imports anymore (and old shared MODULE-{name} nodes, once unused)
+        self.driver.execute_query("""
+        MATCH (m:Module)
+        WHERE m.auto = true AND NOT ()-[:DEPENDS_ON]->(m)
+            AND (m.project_id = $project_id OR NOT m.uid STARTS WITH 'MODULE-' + coalesce(m.project_id, '') + '-')
+        DETACH DELETE m
+        """, {"project_id": self.project_id}, database_="neo4j")
+        print(f"Linked {written} DEPENDS_ON edges.")
+        return written
+
+    def _write_deps_tx(self, tx, sources: List[str], modules: List[Dict], edges: List[Dict]):
+        tx.run("""
+        UNWIND $uids AS uid
+        MATCH (s {uid: uid})-[r:DEPENDS_ON]->()
+        WHERE r.auto = true
+        DELETE r
+        """, uids=sources)
+        if modules:
+            tx.run("""
+            UNWIND $modules AS m
+            MERGE (n:Module {uid: m.uid})
+            ON CREATE SET n.auto = true
+            SET n.name = m.name,
+                n.title = m.name,
+                n.project_id = $project_id
+            """, modules=modules, project_id=self.project_id)
+        if edges:
+            tx.run("""
+            UNWIND $edges AS e
+            MATCH (s {uid: e.src})
+            MATCH (t {uid: e.dst})
+            MERGE (s)-[r:DEPENDS_ON]->(t)
+            ON CREATE SET r.auto = true
+            """, edges=edges)
+
+    def benchmark(self, worker_counts: Optional[List[int]] = None) -> List[Dict]:
+        """
+        Parse-throughput benchmark over the project (no DB writes, manifest untouched).
+        Returns one row per worker count: files, nodes, seconds, files_per_sec.
+        """
+        tasks = sorted((rel_path, full_path, None) for rel_path, full_path, _, _ in self.discover_files()
+                       if is_code_file(rel_path))
+        worker_counts = worker_counts or sorted({1, default_worker_count()})
+        saved_workers = self.workers
+        rows = []
+        try:
+            for count in worker_counts:
+                self.workers = count
+                started = time.perf_counter()
+                node_count = sum(len(nodes or ()) for _, _, nodes, _ in self._parse_all(tasks))
+                elapsed = time.perf_counter() - started
+                rows.append({
+                    "workers": count,
+                    "files": len(tasks),
+                    "nodes": node_count,
+                    "seconds": elapsed,
+                    "files_per_sec": len(tasks) / elapsed if elapsed > 0 else 0.0
+                })
+        finally:
+            self.workers = saved_workers
+        return rows
+
+    def batch_create_nodes(self, nodes: List[Tuple], removed_uids: Optional[List[str]] = None):
+        if not nodes and not removed_uids: return
+
+        # APOC-free: group by type so each label gets a static MERGE.
+        files = [n for n in nodes if n[NODE_TYPE] == 'File']
+        classes = [n for n in nodes if n[NODE_TYPE] == 'Class']
+        functions = [n for n in nodes if n[NODE_TYPE] == 'Function']
+
+        with self.driver.session(database="neo4j") as session:
+            session.execute_write(self._write_tx, files, classes, functions, removed_uids or [])
+
+    def _write_tx(self, tx, files: List[Tuple], classes: List[Tuple], functions: List[Tuple], removed_uids: List[str]):
+        # Parents first, so the MATCH on item.parent always resolves
+        self._write_batch(tx, "File", files)
+        self._write_batch(tx, "Class", classes)
+        self._write_batch(tx, "Function", functions)
+
+        if removed_uids:
+            tx.run("""
+            UNWIND $uids AS uid
+            MATCH (n {uid: uid})
+            WHERE n:File OR n:Class OR n:Function
+            DETACH DELETE n
+            """, uids=removed_uids)
+
+    def _write_batch(self, tx, label: str, nodes: List[Tuple]):
         if not nodes: return
-        
+
         query = f"""
         UNWIND $batch AS item
         MERGE (n:{label} {{uid: item.uid}})
         SET n.name = item.name,
             n.path = item.path,
-            n.project_id = 'graphmcp', // Hardcoded for now
-            n.title = item.name
-        
+            n.project_id = $project_id,
+            n.title = item.name,
+            n.start_line = item.start_line,
+            n.end_line = item.end_line,
+            n.start_byte = item.start_byte,
+            n.end_byte = item.end_byte,
+            n.body_hash = item.body_hash
+
         WITH n, item
         MATCH (p {{uid: item.parent}})
         WHERE item.parent IS NOT NULL
         MERGE (p)-[:DECOMPOSES]->(n)
         """
-        
+
         # Clean dicts for transport
         cleaned_nodes = []
         for n in nodes:
             cleaned_nodes.append({
-                "uid": n['uid'],
-                "name": n['name'],
-                "path": n['path'],
-                "parent": n['parent']
+                "uid": n[NODE_UID],
+                "name": n[NODE_NAME],
+                "path": n[NODE_PATH],
+                "parent": n[NODE_PARENT],
+                "start_line": n[NODE_START_LINE],
+                "end_line": n[NODE_END_LINE],
+                "start_byte": n[NODE_START_BYTE],
+                "end_byte": n[NODE_END_BYTE],
+                "body_hash": n[NODE_BODY_HASH]
             })
-            
-        self.driver.execute_query(query, {"batch": cleaned_nodes}, database_="neo4j")
-        print(f"Saved {len(cleaned_nodes)} {label} nodes.")
+
+        tx.run(query, batch=cleaned_nodes, project_id=self.project_id)
+
+
+class NodeStreamWriter:
+    """
+    Bounded buffer between the parsers and Neo4j.
+    Flushes one write transaction every `batch_size` nodes or removals.
+
+    Parsers emit a file's nodes parent-first and batch_create_nodes writes
+    File -> Class -> Function inside a transaction, so every
+    MATCH (p {uid: item.parent}) resolves against this or an earlier batch.
+    """
+    def __init__(self, mapper: "CodebaseMapper", batch_size: int):
+        self.mapper = mapper
+        self.batch_size = batch_size
+        self.nodes: List[Tuple] = []
+        self.removed: List[str] = []
+        self.nodes_written = 0
+        self.uids_removed = 0
+        self.transactions = 0
+        self.flushed_since_report = False
+
+    def add_nodes(self, nodes):
+        self.nodes.extend(nodes)
+        if len(self.nodes) >= self.batch_size:
+            self.flush()
+
+    def add_removed(self, uids):
+        self.removed.extend(uids)
+        if len(self.removed) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.nodes and not self.removed:
+            return
+        self.mapper.batch_create_nodes(self.nodes, self.removed)
+        self.nodes_written += len(self.nodes)
+        self.uids_removed += len(self.removed)
+        self.transactions += 1
+        self.flushed_since_report = True
+        self.nodes = []
+        self.removed = []
 
 
 class CodeVisitor(ast.NodeVisitor):
@@ -351,73 +863,298 @@ class CodeVisitor(ast.NodeVisitor):
     def visit_AsyncFunctionDef(self, node):
         self.visit_FunctionDef(node)
 
-# Monkey patch/Better Logic for Parsing
-# The visitor above has a flaw: it treats methods as top-level functions too if we just `generic_visit` or standard visit flow.
-# Let's fix parse_python_file to be robust.
 
-def parse_python_enhanced(self, file_path: str, relative_path: str) -> List[Dict]:
+def line_byte_offsets(data: bytes) -> List[int]:
+    """Byte offset of the start of every line (index 0 = line 1)."""
+    offsets = [0]
+    pos = data.find(b'\n')
+    while pos != -1:
+        offsets.append(pos + 1)
+        pos = data.find(b'\n', pos + 1)
+    return offsets
+
+
+def symbol_span(data: bytes, line_offsets: List[int], start_line: int, end_line: int) -> Dict:
+    """
+    Whole-line span of a symbol: 1-based inclusive lines, [start_byte, end_byte)
+    and sha1 of exactly those bytes (what read_node will slice back out).
+    """
+    start_byte = line_offsets[start_line - 1]
+    end_byte = line_offsets[end_line] if end_line < len(line_offsets) else len(data)
+    return {
+        "start_line": start_line,
+        "end_line": end_line,
+        "start_byte": start_byte,
+        "end_byte": end_byte,
+        "body_hash": hashlib.sha1(data[start_byte:end_byte]).hexdigest(),
+    }
+
+
+def _python_span(node, data: bytes, line_offsets: List[int]) -> Dict:
+    # Decorators belong to the symbol
+    start_line = min([node.lineno] + [d.lineno for d in node.decorator_list])
+    end_line = getattr(node, "end_lineno", None) or node.lineno
+    return symbol_span(data, line_offsets, start_line, end_line)
+
+
+def parse_python_source(content: str, relative_path: str, data: Optional[bytes] = None,
+                        deps: Optional[Dict] = None) -> List[Dict]:
+    """
+    Top-level classes (+ their methods) and top-level functions of a Python file.
+    Always starts with the File node so parents precede children.
+    Symbols carry their line/byte span and body hash from the same AST pass.
+    If `deps` is given, it is filled with raw import/call facts (see code_dependencies),
+    or with deps["error"] when the source does not parse (only the File node is returned).
+    """
     nodes = []
+    file_uid = generate_uid("FILE", relative_path)
+    nodes.append({
+        "uid": file_uid,
+        "name": os.path.basename(relative_path),
+        "type": "File",
+        "path": relative_path,
+        "parent": None
+    })
+
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-            
         tree = ast.parse(content)
-        file_uid = self.generate_uid("FILE", relative_path)
-        
-        # ADD FILE NODE (Only once)
-        if not any(n['uid'] == file_uid for n in nodes):
-             nodes.append({
-                "uid": file_uid,
-                "name": os.path.basename(file_path),
-                "type": "File",
+    except Exception as e:
+        print(f"Error parsing {relative_path}: {e}")
+        if deps is not None:
+            deps["error"] = f"{type(e).__name__}: {e}"
+        return nodes
+
+    if data is None:
+        data = content.encode('utf-8')
+    line_offsets = line_byte_offsets(data)
+    calls = {}
+    if deps is not None:
+        deps["imports"], deps["bindings"] = python_imports(tree)
+        deps["calls"] = calls
+
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef):
+            cls_name = node.name
+            cls_uid = generate_uid("CLASS", relative_path, cls_name)
+            nodes.append({
+                "uid": cls_uid,
+                "name": cls_name,
+                "type": "Class",
                 "path": relative_path,
-                "parent": None
+                "parent": file_uid,
+                **_python_span(node, data, line_offsets)
             })
 
-        for node in tree.body:
-            if isinstance(node, ast.ClassDef):
-                cls_name = node.name
-                cls_uid = self.generate_uid("CLASS", relative_path, cls_name)
-                nodes.append({
-                    "uid": cls_uid,
-                    "name": cls_name,
-                    "type": "Class",
-                    "path": relative_path,
-                    "parent": file_uid
-                })
-                
-                for item in node.body:
-                     if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
-                        method_name = item.name
-                        if method_name.startswith("__") and method_name != "__init__": continue
-                        method_uid = self.generate_uid("FUNC", relative_path, f"{cls_name}_{method_name}")
-                        nodes.append({
-                            "uid": method_uid,
-                            "name": method_name,
-                            "type": "Function",
-                            "path": relative_path,
-                            "parent": cls_uid
-                        })
-                        
-            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-                func_name = node.name
-                func_uid = self.generate_uid("FUNC", relative_path, func_name)
-                nodes.append({
-                    "uid": func_uid,
-                    "name": func_name,
-                    "type": "Function",
-                    "path": relative_path,
-                    "parent": file_uid
-                })
-                
-    except Exception as e:
-        print(f"Error parsing {relative_path}: {e}")
+            for item in node.body:
+                 if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    method_name = item.name
+                    if method_name.startswith("__") and method_name != "__init__": continue
+                    method_uid = generate_uid("FUNC", relative_path, f"{cls_name}_{method_name}")
+                    nodes.append({
+                        "uid": method_uid,
+                        "name": method_name,
+                        "type": "Function",
+                        "path": relative_path,
+                        "parent": cls_uid,
+                        **_python_span(item, data, line_offsets)
+                    })
+                    if deps is not None:
+                        calls[method_uid] = python_calls(item, cls_name)
+
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            func_name = node.name
+            func_uid = generate_uid("FUNC", relative_path, func_name)
+            nodes.append({
+                "uid": func_uid,
+                "name": func_name,
+                "type": "Function",
+                "path": relative_path,
+                "parent": file_uid,
+                **_python_span(node, data, line_offsets)
+            })
+            if deps is not None:
+                calls[func_uid] = python_calls(node)
+
+    return nodes
+
+
+def _js_block_end(content: str, start: int) -> int:
+    """
+    Approximate end of the `{...}` block following `start` (index of the closing
+    brace). Skips strings, template literals and comments; regexes are not
+    understood. Falls back to `start` when no block is found.
+    """
+    n = len(content)
+    i = content.find('{', start)
+    if i == -1:
+        return start
+    depth = 0
+    while i < n:
+        c = content[i]
+        if c in '"\'`':
+            i += 1
+            while i < n and content[i] != c:
+                if content[i] == '\\':
+                    i += 1
+                elif c != '`' and content[i] == '\n':
+                    break
+                i += 1
+        elif c == '/' and content.startswith('//', i):
+            nl = content.find('\n', i)
+            i = n if nl == -1 else nl
+            continue
+        elif c == '/' and content.startswith('/*', i):
+            close = content.find('*/', i + 2)
+            i = n if close == -1 else close + 2
+            continue
+        elif c == '{':
+            depth += 1
+        elif c == '}':
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    return n - 1
+
+
+def _js_span(content: str, char_line_starts: List[int], data: bytes, line_offsets: List[int], match) -> Dict:
+    start_line = bisect.bisect_right(char_line_starts, match.start())
+    end_line = bisect.bisect_right(char_line_starts, max(match.start(), _js_block_end(content, match.end())))
+    return symbol_span(data, line_offsets, start_line, end_line)
+
+
+def parse_js_source(content: str, relative_path: str, data: Optional[bytes] = None,
+                    deps: Optional[Dict] = None) -> List[Dict]:
+    """
+    Regex-level JS/TS mapping: classes and `function foo` declarations.
+    Symbol spans are approximated by brace matching.
+    `deps` receives import specifiers only (no call resolution for JS).
+    """
+    nodes = []
+    file_uid = generate_uid("FILE", relative_path)
+    nodes.append({
+        "uid": file_uid,
+        "name": os.path.basename(relative_path),
+        "type": "File",
+        "path": relative_path,
+        "parent": None
+    })
+
+    if data is None:
+        data = content.encode('utf-8')
+    line_offsets = line_byte_offsets(data)
+    char_line_starts = [0] + [m.end() for m in re.finditer('\n', content)]
+    if deps is not None:
+        deps["imports"] = js_imports(content)
+
+    # Simple Regex for Classes
+    class_matches = re.finditer(r'class\s+(\w+)', content)
+    for match in class_matches:
+        cls_name = match.group(1)
+        cls_uid = generate_uid("CLASS", relative_path, cls_name)
+        nodes.append({
+            "uid": cls_uid,
+            "name": cls_name,
+            "type": "Class",
+            "path": relative_path,
+            "parent": file_uid,
+            **_js_span(content, char_line_starts, data, line_offsets, match)
+        })
+
+    # Simple Regex for Functions (function foo() or const foo = () =>)
+    func_matches = re.finditer(r'function\s+(\w+)', content)
+    for match in func_matches:
+        func_name = match.group(1)
+        func_uid = generate_uid("FUNC", relative_path, func_name)
+        nodes.append({
+            "uid": func_uid,
+            "name": func_name,
+            "type": "Function",
+            "path": relative_path,
+            "parent": file_uid,
+            **_js_span(content, char_line_starts, data, line_offsets, match)
+        })
+
     return nodes
 
-CodebaseMapper.parse_python_file = parse_python_enhanced
+
+def is_code_file(rel_path: str) -> bool:
+    return rel_path.endswith(PY_EXTS) or rel_path.endswith(JS_EXTS)
+
+
+def parse_file_bytes(rel_path: str, data: bytes, deps: Optional[Dict] = None) -> List[Dict]:
+    """
+    Parses raw file bytes into File/Class/Function node dicts (File node first).
+    Code files also fill `deps` with raw dependency facts when it is given.
+    """
+    if is_code_file(rel_path):
+        try:
+            content = data.decode('utf-8')
+        except UnicodeDecodeError as e:
+            print(f"Error decoding {rel_path}: {e}")
+            content = None
+            if deps is not None:
+                deps["error"] = f"UnicodeDecodeError: {e}"
+        if content is not None:
+            if rel_path.endswith(PY_EXTS):
+                return parse_python_source(content, rel_path, data, deps)
+            return parse_js_source(content, rel_path, data, deps)
+    # just file node
+    return [{
+        "uid": generate_uid("FILE", rel_path),
+        "name": os.path.basename(rel_path),
+        "type": "File",
+        "path": rel_path,
+        "parent": None
+    }]
+
+
+def node_tuple(node: Dict) -> Tuple:
+    """Node dict -> compact tuple (see NODE_* indexes)."""
+    return (node["uid"], node["type"], node["name"], node["parent"], node["path"],
+            *(node.get(key) for key in SPAN_KEYS))
+
+
+def parse_file_worker(task: Tuple) -> Tuple:
+    """
+    ProcessPool entry point (module-level so it pickles).
+    task = (rel_path, full_path, previous_sha)
+
+    Returns (rel_path, sha, nodes, deps):
+    - nodes is a tuple of compact node tuples (see NODE_* indexes)
+    - deps holds raw import/call facts (resolved later by the parent process)
+    - nodes and deps are None when the sha equals previous_sha (nothing to do)
+    - sha, nodes and deps are None when the file could not be read
+    """
+    rel_path, full_path, previous_sha = task
+    try:
+        with open(full_path, 'rb') as f:
+            data = f.read()
+    except OSError as e:
+        print(f"Error reading {rel_path}: {e}")
+        return rel_path, None, None, None
+
+    sha = hashlib.sha1(data).hexdigest()
+    if previous_sha and sha == previous_sha:
+        return rel_path, sha, None, None
+
+    deps = {}
+    nodes = parse_file_bytes(rel_path, data, deps)
+    return rel_path, sha, tuple(node_tuple(n) for n in nodes), deps
+
 
 if __name__ == "__main__":
+    import sys
     mapper = CodebaseMapper()
+    for arg in sys.argv[1:]:
+        if arg.startswith("--batch-size="):
+            mapper.batch_size = max(1, int(arg.split("=", 1)[1]))
+    if "--benchmark" in sys.argv:
+        print(f"Benchmarking parser throughput on {mapper.project_root}...")
+        for row in mapper.benchmark():
+            print(f"  workers={row['workers']:<3} files={row['files']:<6} nodes={row['nodes']:<7} "
+                  f"{row['seconds']:.3f}s  ({row['files_per_sec']:.0f} files/s)")
+        sys.exit(0)
     print("Mapping codebase...")
-    count = mapper.scan_and_map()
+    count = mapper.scan_and_map(full="--full" in sys.argv)
     print(f"Mapped {count} nodes.")
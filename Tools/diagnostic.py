@@ -1,20 +1,31 @@
 import os
+import sys
 from neo4j import GraphDatabase
 
 NEO4J_URI = "bolt://neo4j-db:7687"
 NEO4J_USER = "neo4j"
 NEO4J_PASSWORD = "password"
 
-def check_graph():
+# Agent to inspect: argv[1] > MCP_AGENT_ID > the default agent
+DEFAULT_AGENT_ID = os.environ.get("MCP_AGENT_ID", "yuri_agent")
+
+def check_graph(agent_id: str = DEFAULT_AGENT_ID):
     driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
     with driver.session() as session:
         # Check current location of agent
-        result = session.run("MATCH (a:Agent {id: 'yuri_agent'})-[:LOCATED_AT]->(n) RETURN n.uid as uid, labels(n) as labels, n.title as title")
+        result = session.run("MATCH (a:Agent {id: $agent_id})-[:LOCATED_AT]->(n) RETURN n.uid as uid, labels(n) as labels, n.title as title",
+                             agent_id=agent_id)
         record = result.single()
         if record:
-            print(f"Agent Location: {record['uid']} ({record['labels'][0]}: {record['title']})")
+            print(f"Agent {agent_id} Location: {record['uid']} ({record['labels'][0]}: {record['title']})")
         else:
-            print("Agent Location: NOT SET")
+            print(f"Agent {agent_id} Location: NOT SET")
+
+        # Other agents (one per named session)
+        result = session.run("MATCH (a:Agent) OPTIONAL MATCH (a)-[:LOCATED_AT]->(n) RETURN a.id as id, n.uid as uid ORDER BY id")
+        for record in result:
+            if record['id'] != agent_id:
+                print(f"  other agent {record['id']}: {record['uid'] or 'NOT SET'}")
             
         # Check all nodes
         print("\nAll Nodes:")
@@ -34,4 +45,4 @@ def check_graph():
     driver.close()
 
 if __name__ == "__main__":
-    check_graph()
+    check_graph(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_AGENT_ID)
@@ -0,0 +1,226 @@
+"""
+Embedding model registry and online re-embedding migration.
+
+Every stored vector is tagged with the model that produced it:
+
+    n.embedding_model = "all-MiniLM-L6-v2"   (NULL on legacy nodes = DEFAULT_MODEL)
+
+and every vector search compares only vectors of the searching project's
+model. Each project selects its model (`ModelRegistry`, persisted in
+.graphmcp/embedding_models.json); global nodes (project_id NULL) stay on
+DEFAULT_MODEL.
+
+Switching a project's model is an online migration (`ModelMigrator`):
+1. the registry records the target as the project's `next` model;
+2. a background thread re-embeds the project's nodes in batches into
+   n.embedding_next / n.embedding_next_model, while searches keep reading
+   n.embedding (old model);
+3. when every node has a `next` vector, one transaction swaps them in
+   (cutover). The registry is switched under the same lock, and passage
+   vectors are queued for rebuilding with the new model.
+Writers keep marking nodes dirty during the migration. The embedding queue
+re-encodes them with the active model and drops their stale `next` vector,
+so the migrator picks them up again.
+"""
+import json
+import os
+import sys
+import threading
+from typing import Callable, Dict, List, Optional
+
+try:
+    from priority_gate import lower_priority
+except ImportError:
+    from Tools.priority_gate import lower_priority
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+MODELS = {
+    "all-MiniLM-L6-v2": {"dim": 384, "note": "default: fast, English-centric"},
+    "paraphrase-MiniLM-L3-v2": {"dim": 384, "note": "fastest, lower quality"},
+    "paraphrase-multilingual-MiniLM-L12-v2": {"dim": 384, "note": "multilingual (Russian), ~2x slower"},
+    "all-mpnet-base-v2": {"dim": 768, "note": "best quality, ~5x slower"},
+}
+MODEL_KEYS = ("embedding_model", "embedding_next", "embedding_next_model")
+
+SEMANTIC_MATCH = "(n:Idea OR n:Spec OR n:Requirement OR n:Task OR n:Domain)"
+# Vector-search filter: params $model, $default_model (see ModelRegistry.params)
+MODEL_MATCH = "coalesce(n.embedding_model, $default_model) = $model"
+
+MIGRATE_FETCH_QUERY = f"""
+MATCH (n)
+WHERE n.project_id = $project_id AND {SEMANTIC_MATCH} AND n.embedding_dirty IS NULL
+    AND coalesce(n.embedding_next_model, '') <> $model
+RETURN n.uid AS uid, coalesce(n.title, '') AS title, coalesce(n.description, '') AS description
+LIMIT $limit
+"""
+MIGRATE_WRITE_QUERY = """
+UNWIND $rows AS row
+MATCH (n {uid: row.uid})
+WHERE n.embedding_dirty IS NULL AND coalesce(n.title, '') = row.title AND coalesce(n.description, '') = row.description
+SET n.embedding_next = row.embedding, n.embedding_next_model = $model
+"""
+REMAINING_QUERY = f"""
+MATCH (n)
+WHERE n.project_id = $project_id AND {SEMANTIC_MATCH}
+    AND (n.embedding_dirty IS NOT NULL OR coalesce(n.embedding_next_model, '') <> $model)
+RETURN count(n) AS remaining
+"""
+CUTOVER_QUERY = f"""
+MATCH (n)
+WHERE n.project_id = $project_id AND {SEMANTIC_MATCH} AND n.embedding_next_model = $model
+SET n.embedding = n.embedding_next, n.embedding_model = $model,
+    n.knn_uids = null, n.knn_scores = null,
+    n.passage_starts = null, n.passage_ends = null, n.passage_vectors = null, n.passage_hash = null,
+    n.embedding_dirty = CASE WHEN n.content IS NULL THEN n.embedding_dirty ELSE timestamp() END
+REMOVE n.embedding_next, n.embedding_next_model
+RETURN count(n) AS switched
+"""
+CANCEL_QUERY = f"""
+MATCH (n)
+WHERE n.project_id = $project_id AND {SEMANTIC_MATCH} AND n.embedding_next_model IS NOT NULL
+REMOVE n.embedding_next, n.embedding_next_model
+"""
+
+
+class ModelRegistry:
+    """Per-project model selection: {project_id: {"model": active, "next": migration target or None}}."""
+
+    def __init__(self, config_path: str):
+        self.config_path = config_path
+        self.lock = threading.RLock()  # cutover vs embedding queue batches
+        self.projects: Dict[str, Dict[str, Optional[str]]] = {}
+        try:
+            if os.path.exists(config_path):
+                with open(config_path, "r", encoding="utf-8") as f:
+                    self.projects = json.load(f).get("projects", {})
+        except Exception as e:
+            print(f"⚠️ Failed to load embedding model registry: {e}", file=sys.stderr)
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.config_path), exist_ok=True)
+        tmp = self.config_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"projects": self.projects}, f, indent=2)
+        os.replace(tmp, self.config_path)
+
+    def active(self, project_id: Optional[str]) -> str:
+        if project_id is None:
+            return DEFAULT_MODEL
+        return self.projects.get(project_id, {}).get("model") or DEFAULT_MODEL
+
+    def next(self, project_id: Optional[str]) -> Optional[str]:
+        if project_id is None:
+            return None
+        return self.projects.get(project_id, {}).get("next")
+
+    def params(self, project_id: Optional[str]) -> Dict[str, str]:
+        """Query parameters for MODEL_MATCH."""
+        return {"model": self.active(project_id), "default_model": DEFAULT_MODEL}
+
+    def migrations(self) -> Dict[str, str]:
+        return {pid: cfg["next"] for pid, cfg in self.projects.items() if cfg.get("next")}
+
+    def models_in_use(self) -> List[str]:
+        return sorted({DEFAULT_MODEL} | {cfg.get("model") or DEFAULT_MODEL for cfg in self.projects.values()})
+
+    def begin(self, project_id: str, model: str) -> Optional[str]:
+        """Sets the migration target; selecting the active model cancels a running migration. Returns the target."""
+        if model not in MODELS:
+            raise ValueError(f"Unknown embedding model '{model}'. Known: {sorted(MODELS)}")
+        with self.lock:
+            cfg = self.projects.setdefault(project_id, {"model": DEFAULT_MODEL, "next": None})
+            cfg["next"] = None if model == (cfg.get("model") or DEFAULT_MODEL) else model
+            self._save()
+            return cfg["next"]
+
+    def finish(self, project_id: str):
+        with self.lock:
+            cfg = self.projects[project_id]
+            cfg["model"], cfg["next"] = cfg["next"], None
+            self._save()
+
+
+class ModelMigrator:
+    """Background re-embedding of migrating projects into n.embedding_next, then atomic cutover."""
+
+    def __init__(self, registry: ModelRegistry, encode_batch: Callable, on_cutover: Optional[Callable] = None,
+                 batch_size: int = 64, poll_interval: float = 60.0, pause: Optional[Callable] = None):
+        self.registry = registry
+        self.encode_batch = encode_batch          # (texts, model=...) -> vectors or None
+        self.on_cutover = on_cutover              # (project_id, old_model, new_model)
+        self.pause = pause                        # () before each batch (PriorityGate)
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._driver_factory = None
+
+    def start(self, driver_factory):
+        self._driver_factory = driver_factory
+        if not (self._thread and self._thread.is_alive()):
+            self._thread = threading.Thread(target=self._run, name="embedding-migration", daemon=True)
+            self._thread.start()
+        return self
+
+    def notify(self):
+        self._wake.set()
+
+    def _run(self):
+        lower_priority()
+        while True:
+            try:
+                while self.registry.migrations() and self.step(self._driver_factory()):
+                    pass
+            except Exception as e:
+                print(f"⚠️ Embedding migration failed: {e}", file=sys.stderr)
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def remaining(self, driver, project_id: str) -> int:
+        model = self.registry.next(project_id)
+        if not model:
+            return 0
+        records, _, _ = driver.execute_query(REMAINING_QUERY, {"project_id": project_id, "model": model},
+                                             database_="neo4j")
+        return records[0]["remaining"] if records else 0
+
+    def step(self, driver) -> bool:
+        """One batch for every migrating project (or its cutover). False when nothing could progress."""
+        progressed = False
+        for project_id, model in self.registry.migrations().items():
+            if self.pause:
+                self.pause()
+            records, _, _ = driver.execute_query(
+                MIGRATE_FETCH_QUERY, {"project_id": project_id, "model": model, "limit": self.batch_size},
+                database_="neo4j")
+            if records:
+                vectors = self.encode_batch([f"{r['title']} {r['description']}" for r in records], model=model)
+                if vectors is None:
+                    continue  # model unavailable: retried on the next poll
+                rows = [{"uid": r["uid"], "title": r["title"], "description": r["description"], "embedding": vec}
+                        for r, vec in zip(records, vectors)]
+                driver.execute_query(MIGRATE_WRITE_QUERY, {"rows": rows, "model": model}, database_="neo4j")
+                progressed = True
+            elif self.cutover(driver, project_id):
+                progressed = True
+        return progressed
+
+    def cutover(self, driver, project_id: str) -> bool:
+        """Swaps in the new vectors once none is missing (dirty nodes wait for the embedding queue)."""
+        with self.registry.lock:
+            model = self.registry.next(project_id)
+            if not model or self.remaining(driver, project_id):
+                return False
+            old = self.registry.active(project_id)
+            records, _, _ = driver.execute_query(CUTOVER_QUERY, {"project_id": project_id, "model": model},
+                                                 database_="neo4j")
+            self.registry.finish(project_id)
+        switched = records[0]["switched"] if records else 0
+        print(f"🔀 Embedding cutover for {project_id}: {old} -> {model} ({switched} nodes)", file=sys.stderr)
+        if self.on_cutover:
+            self.on_cutover(project_id, old, model)
+        return True
+
+    def cancel(self, driver, project_id: str):
+        """Drops the partial `next` vectors of a cancelled migration."""
+        driver.execute_query(CANCEL_QUERY, {"project_id": project_id}, database_="neo4j")
@@ -0,0 +1,195 @@
+"""
+Durable re-embedding queue for semantic nodes.
+
+Writers never encode inline. They mark the node in the same write that
+changes its text:
+
+    SET ..., <MARK_DIRTY>      ->  n.embedding_dirty = timestamp()  (semantic labels only)
+
+The mark is the queue entry. It lives in the graph, so it survives restarts,
+and out-of-process writers (GraphSync.push_file_to_db, import_md_to_neo4j.py)
+can enqueue work without talking to the server.
+
+`EmbeddingQueue` drains the marks in a background thread, one batch at a time:
+- one query fetches up to `batch_size` dirty nodes (oldest mark first);
+- one model call encodes their "title description" texts. Texts whose sha1
+  equals n.embedding_hash are not re-encoded; their mark is just cleared.
+  Each node is encoded with its project's active model (ModelRegistry) and tagged
+  with n.embedding_model. A re-encoded node drops its migration vector
+  (n.embedding_next), so ModelMigrator picks it up again;
+- passages of changed `content` are refreshed (passage_chunker);
+- one UNWIND writes the vectors and clears each mark, but only if the mark
+  still holds the value that was read. A node rewritten mid-batch stays
+  queued and is re-embedded in the next round.
+The worker wakes on `notify()` (in-process writers) and every `poll_interval`
+seconds (external writers). If the model is unavailable, the marks stay in place.
+The worker thread runs at low OS priority and calls `pause()` before every
+batch (PriorityGate: interactive tool calls go first).
+`on_batch(project_ids)` is called after a batch changed vectors (graph version bump).
+"""
+import hashlib
+import sys
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+try:
+    from passage_chunker import refresh_passages
+    from embedding_models import DEFAULT_MODEL, SEMANTIC_MATCH
+    from priority_gate import lower_priority
+except ImportError:
+    from Tools.passage_chunker import refresh_passages
+    from Tools.embedding_models import DEFAULT_MODEL, SEMANTIC_MATCH
+    from Tools.priority_gate import lower_priority
+
+# SET fragment for writers (the node variable must be `n`)
+MARK_DIRTY = f"n.embedding_dirty = CASE WHEN {SEMANTIC_MATCH} THEN timestamp() ELSE n.embedding_dirty END"
+QUEUE_KEYS = ("embedding_dirty", "embedding_hash")
+
+FETCH_QUERY = f"""
+MATCH (n)
+WHERE n.embedding_dirty IS NOT NULL AND {SEMANTIC_MATCH}
+RETURN n.uid AS uid, n.embedding_dirty AS token, n.title AS title, n.description AS description,
+       n.project_id AS project_id, n.content AS content, n.passage_hash AS passage_hash,
+       n.embedding_hash AS embedding_hash, n.embedding IS NOT NULL AS has_embedding,
+       n.embedding_model AS embedding_model
+ORDER BY n.embedding_dirty
+LIMIT $limit
+"""
+WRITE_QUERY = """
+UNWIND $rows AS row
+MATCH (n {uid: row.uid})
+WHERE n.embedding_dirty = row.token
+SET n.embedding = coalesce(row.embedding, n.embedding), n.embedding_hash = row.hash
+REMOVE n.embedding_dirty
+FOREACH (_ IN CASE WHEN row.embedding IS NULL THEN [] ELSE [1] END |
+    SET n.embedding_model = row.model, n.embedding_next = null, n.embedding_next_model = null)
+RETURN n.uid AS uid
+"""
+PENDING_QUERY = f"MATCH (n) WHERE n.embedding_dirty IS NOT NULL AND {SEMANTIC_MATCH} RETURN count(n) AS pending"
+
+
+def semantic_text(title: Optional[str], description: Optional[str]) -> str:
+    return f"{title or ''} {description or ''}"
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingQueue:
+    def __init__(self, encode_batch: Callable[..., Optional[List[List[float]]]],
+                 on_embedded: Optional[Callable] = None, registry=None, batch_size: int = 32,
+                 poll_interval: float = 30.0, on_batch: Optional[Callable] = None,
+                 pause: Optional[Callable] = None):
+        self.encode_batch = encode_batch  # (texts, model=...) -> vectors or None
+        self.on_embedded = on_embedded    # (uid, embedding, project_id, model)
+        self.on_batch = on_batch          # (project_ids) whose vectors changed
+        self.pause = pause                # () before each batch: blocks while interactive calls run
+        self.registry = registry          # ModelRegistry; None: every node on DEFAULT_MODEL
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        # one batch at a time (worker vs refresh_knowledge), never during a model cutover
+        self.lock = registry.lock if registry else threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._driver_factory = None
+        self._start_lock = threading.Lock()  # writers on several worker threads kick the queue at once
+
+    # --- lifecycle ---
+
+    def start(self, driver_factory):
+        """Starts the background worker (once)."""
+        with self._start_lock:
+            self._driver_factory = driver_factory
+            if not (self._thread and self._thread.is_alive()):
+                self._thread = threading.Thread(target=self._run, name="embedding-queue", daemon=True)
+                self._thread.start()
+        return self
+
+    def notify(self):
+        """A writer marked nodes dirty: drain now instead of at the next poll."""
+        self._wake.set()
+
+    def _run(self):
+        lower_priority()
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                self.drain(self._driver_factory())
+            except Exception as e:
+                print(f"⚠️ Embedding queue failed: {e}", file=sys.stderr)
+
+    # --- work ---
+
+    def model_for(self, project_id: Optional[str]) -> str:
+        return self.registry.active(project_id) if self.registry else DEFAULT_MODEL
+
+    def pending(self, driver) -> int:
+        records, _, _ = driver.execute_query(PENDING_QUERY, database_="neo4j")
+        return records[0]["pending"] if records else 0
+
+    def process_batch(self, driver) -> Optional[Dict[str, int]]:
+        """Embeds one batch of dirty nodes. None when the queue is empty or the model is unavailable."""
+        if self.pause:
+            self.pause()
+        with self.lock:
+            records, _, _ = driver.execute_query(FETCH_QUERY, {"limit": self.batch_size}, database_="neo4j")
+            if not records:
+                return None
+
+            rows = []
+            stale = defaultdict(list)  # model -> [(row, text)] whose text or model changed since the last embedding
+            with_content = defaultdict(list)
+            for r in records:
+                model = self.model_for(r["project_id"])
+                text = semantic_text(r["title"], r["description"])
+                row = {"uid": r["uid"], "token": r["token"], "hash": text_hash(text), "embedding": None, "model": model}
+                rows.append(row)
+                if (row["hash"] != r["embedding_hash"] or not r["has_embedding"]
+                        or (r["embedding_model"] or DEFAULT_MODEL) != model):
+                    stale[model].append((row, text))
+                if r["content"]:
+                    with_content[model].append(r)
+
+            for model, items in stale.items():
+                vectors = self.encode_batch([text for _, text in items], model=model)
+                if vectors is None:
+                    return None  # model unavailable: marks stay, retried on the next wake
+                for (row, _), vec in zip(items, vectors):
+                    row["embedding"] = vec
+
+            passages = 0
+            for model, nodes in with_content.items():
+                encode = lambda texts, model=model: self.encode_batch(texts, model=model)
+                passages += refresh_passages(driver, nodes, encode, batch_size=self.batch_size)
+            written, _, _ = driver.execute_query(WRITE_QUERY, {"rows": rows}, database_="neo4j")
+
+        cleared = {w["uid"] for w in written}
+        projects = {r["uid"]: r["project_id"] for r in records}
+        embedded = 0
+        for row in rows:
+            if row["embedding"] is not None and row["uid"] in cleared:
+                embedded += 1
+                if self.on_embedded:
+                    self.on_embedded(row["uid"], row["embedding"], projects[row["uid"]], row["model"])
+        if self.on_batch and (embedded or passages):
+            self.on_batch(sorted({projects[uid] for uid in cleared}, key=lambda p: (p is None, p or "")))
+        return {"nodes": len(cleared), "embedded": embedded, "passages": passages}
+
+    def drain(self, driver) -> Dict[str, int]:
+        """Processes batches until the queue is empty (or the model is unavailable). Returns totals."""
+        totals = {"nodes": 0, "embedded": 0, "passages": 0}
+        while True:
+            stats = self.process_batch(driver)
+            if not stats:
+                break
+            for key in totals:
+                totals[key] += stats[key]
+            if not stats["nodes"]:
+                break  # every mark was rewritten mid-batch: let the next wake pick them up
+        if totals["nodes"]:
+            print(f"🧠 Embedding queue: {totals['embedded']} re-embedded, {totals['nodes']} cleared, "
+                  f"{totals['passages']} passage sets", file=sys.stderr)
+        return totals
@@ -0,0 +1,137 @@
+"""
+Connected components over the topology mirror (union-find), for find_orphans.
+
+The "main graph" is the component of the root (IDEA-Genesis) in the
+undirected DECOMPOSES|IMPLEMENTS graph. Membership is a union-find lookup
+instead of collecting the whole subgraph in Neo4j (no APOC needed).
+
+Maintenance (driven by TopologyMirror listener events):
+- edge added (tracked type)  -> union, O(α(n))
+- node added                 -> new singleton
+- edge/node removed, reload  -> marked dirty, rebuilt lazily on next use
+  (union-find cannot split a component)
+Per-project orphan reports are cached until the next relevant event.
+
+Lock order: mirror.lock, then self.lock (listener events arrive with
+mirror.lock held), as in HierarchyIndex / ImpactIndex.
+"""
+import threading
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+COMPONENT_REL_TYPES = ("DECOMPOSES", "IMPLEMENTS")
+ROOT_UID = "IDEA-Genesis"
+# Meta-Graph nodes hang off NodeType (no uid) and are never part of the project tree
+SYSTEM_LABELS = {"Action", "Constraint", "NodeType"}
+
+
+class ComponentIndex:
+    def __init__(self, mirror, rel_types=COMPONENT_REL_TYPES):
+        self.mirror = mirror
+        self.rel_types = set(rel_types)
+        self.lock = threading.RLock()
+        self.parent = array("i")
+        self.size = array("i")
+        self.dirty = True
+        self.version = 0
+        self.rebuilds = 0
+        self._reports: Dict[Tuple, Tuple[int, List[str], List[str]]] = {}
+        mirror.add_listener(self.on_event)
+
+    # --- union-find ---
+
+    def _grow(self, n: int):
+        while len(self.parent) < n:
+            self.parent.append(len(self.parent))
+            self.size.append(1)
+
+    def find(self, i: int) -> int:
+        parent = self.parent
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+        while parent[i] != root:  # path compression
+            parent[i], i = root, parent[i]
+        return root
+
+    def union(self, a: int, b: int):
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return
+        if self.size[ra] < self.size[rb]:
+            ra, rb = rb, ra
+        self.parent[rb] = ra
+        self.size[ra] += self.size[rb]
+
+    def rebuild(self):
+        with self.mirror.lock, self.lock:
+            n = len(self.mirror.uids)
+            self.parent = array("i", range(n))
+            self.size = array("i", [1]) * n
+            for rel_type in self.rel_types:
+                for s, t in self.mirror.edge_ids(rel_type):
+                    self.union(s, t)
+            self.dirty = False
+            self.rebuilds += 1
+            self.version += 1
+            self._reports.clear()
+
+    # --- incremental maintenance ---
+
+    def on_event(self, event, *args):
+        with self.lock:
+            if event == "edge+" and args[1] in self.rel_types and not self.dirty:
+                s = self.mirror.uid_to_id.get(args[0])
+                t = self.mirror.uid_to_id.get(args[2])
+                if s is None or t is None:
+                    self.dirty = True
+                else:
+                    self._grow(max(s, t) + 1)
+                    self.union(s, t)
+            elif event == "node+" and not self.dirty:
+                self._grow(len(self.mirror.uids))
+            elif event in ("edge+", "edge-") and args[1] not in self.rel_types:
+                pass  # degree changed only: cached reports are still dropped below
+            else:
+                self.dirty = True
+            self.version += 1
+            self._reports.clear()
+
+    def ensure(self):
+        if self.dirty:
+            self.rebuild()
+
+    def connected(self, uid_a: str, uid_b: str) -> bool:
+        with self.mirror.lock, self.lock:
+            self.ensure()
+            a, b = self.mirror.id_of(uid_a), self.mirror.id_of(uid_b)
+            if a is None or b is None:
+                return False
+            return self.find(a) == self.find(b)
+
+    # --- reports ---
+
+    def orphans(self, project_id: Optional[str], root_uid: str = ROOT_UID) -> Tuple[List[str], List[str]]:
+        """
+        (absolute_orphans, islands) for a project (global nodes included), sorted by uid.
+        absolute: no relationships at all; islands: linked, but not connected to root_uid.
+        """
+        key = (project_id, root_uid)
+        with self.mirror.lock, self.lock:
+            cached = self._reports.get(key)
+            if cached and cached[0] == self.version:
+                return cached[1], cached[2]
+            self.ensure()
+            mirror = self.mirror
+            root = mirror.id_of(root_uid)
+            root_component = self.find(root) if root is not None else None
+            absolute, islands = [], []
+            for uid in sorted(mirror.nodes(project_id=project_id)):
+                if mirror.label_of(uid) in SYSTEM_LABELS:
+                    continue
+                if mirror.degree(uid) == 0:
+                    absolute.append(uid)
+                elif root_component is None or self.find(mirror.uid_to_id[uid]) != root_component:
+                    islands.append(uid)
+            self._reports[key] = (self.version, absolute, islands)
+            return absolute, islands
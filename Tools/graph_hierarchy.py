@@ -0,0 +1,104 @@
+"""
+Materialized DECOMPOSES hierarchy on top of the topology mirror (illuminate_path).
+
+For a node, `ancestors(uid)` / `descendants(uid)` return every node reachable
+up / down the DECOMPOSES tree with its hop distance. Each closure is computed
+once by BFS over the mirror (every node and edge of the closure visited once,
+independent of how many paths lead to it) and then served from memory.
+
+Invalidation (TopologyMirror listener events) is local to the changed edge:
+- edge s->t added/removed: ancestor closures of t and of everything below t,
+  descendant closures of s and of everything above s
+- node removed, reload: everything (ids and edges changed wholesale)
+"""
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+HIERARCHY_REL_TYPE = "DECOMPOSES"
+UP, DOWN = "in", "out"  # parents are reached over incoming DECOMPOSES edges
+
+
+class HierarchyIndex:
+    def __init__(self, mirror, rel_type: str = HIERARCHY_REL_TYPE):
+        self.mirror = mirror
+        self.rel_type = rel_type
+        self.lock = threading.RLock()
+        self._closures: Dict[str, Dict[int, Dict[int, int]]] = {UP: {}, DOWN: {}}
+        self.hits = 0
+        self.misses = 0
+        mirror.add_listener(self.on_event)
+
+    def _closure(self, node_id: int, direction: str) -> Dict[int, int]:
+        memo = self._closures[direction]
+        cached = memo.get(node_id)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        mirror = self.mirror
+        dist = {node_id: 0}
+        queue = deque([node_id])
+        while queue:
+            current = queue.popleft()
+            d = dist[current] + 1
+            for nxt in mirror._neighbor_ids(current, self.rel_type, direction):
+                if nxt not in dist and nxt in mirror.alive:
+                    dist[nxt] = d
+                    queue.append(nxt)
+        del dist[node_id]
+        memo[node_id] = dist
+        return dist
+
+    def _read(self, uid: str, direction: str, max_depth: Optional[int]) -> Dict[str, int]:
+        with self.mirror.lock, self.lock:
+            node_id = self.mirror.id_of(uid)
+            if node_id is None:
+                return {}
+            uids = self.mirror.uids
+            return {uids[i]: d for i, d in self._closure(node_id, direction).items()
+                    if max_depth is None or d <= max_depth}
+
+    def ancestors(self, uid: str, max_depth: Optional[int] = None) -> Dict[str, int]:
+        """{ancestor_uid: hops} over incoming DECOMPOSES edges."""
+        return self._read(uid, UP, max_depth)
+
+    def descendants(self, uid: str, max_depth: Optional[int] = None) -> Dict[str, int]:
+        """{descendant_uid: hops} over outgoing DECOMPOSES edges."""
+        return self._read(uid, DOWN, max_depth)
+
+    # --- invalidation ---
+
+    def _invalidate_around(self, node_id: int, direction: str):
+        """Drops `direction` closures of node_id and of every node on the opposite side of it."""
+        memo = self._closures[direction]
+        if not memo:
+            return
+        opposite = DOWN if direction == UP else UP
+        memo.pop(node_id, None)
+        for other in self._closure(node_id, opposite):
+            memo.pop(other, None)
+
+    def on_event(self, event, *args):
+        with self.lock:
+            if event in ("edge+", "edge-"):
+                if args[1] != self.rel_type:
+                    return
+                s = self.mirror.uid_to_id.get(args[0])
+                t = self.mirror.uid_to_id.get(args[2])
+                if s is None or t is None:
+                    self.clear()
+                    return
+                # Reachability above s / below t does not go through the edge s->t,
+                # so the closures used to find the affected nodes stay valid
+                self._invalidate_around(t, UP)
+                self._invalidate_around(s, DOWN)
+            elif event == "node+":
+                return  # a new node has no edges yet
+            else:
+                self.clear()
+
+    def clear(self):
+        with self.lock:
+            self._closures[UP].clear()
+            self._closures[DOWN].clear()
@@ -0,0 +1,130 @@
+"""
+Downstream impact analysis over the topology mirror (analyze_impact).
+
+"What is affected if X changes": X affects
+- its DECOMPOSES children            (X)-[:DECOMPOSES]->(child)
+- whatever IMPLEMENTS it             (impl)-[:IMPLEMENTS]->(X)
+- whatever DEPENDS_ON it             (dependent)-[:DEPENDS_ON]->(X)
+and, transitively, everything those affect.
+
+Reverse-reachability index: the impact set of a node (hop distance + the
+relationship it was reached through) is computed once by BFS, bounded by
+`max_depth` hops and `budget` nodes so hub requirements answer in bounded
+time, and memoized. `owners[v]` records which memoized sets contain v, so a
+changed "affects" edge a->b only drops the sets of a and of the owners of a
+(nobody else can reach the edge). Node removal and reload clear the index.
+"""
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Set, Tuple
+
+# rel_type -> mirror direction to follow from the changed node to the affected one
+IMPACT_RULES = (("DECOMPOSES", "out"), ("IMPLEMENTS", "in"), ("DEPENDS_ON", "in"))
+DEFAULT_MAX_DEPTH = 8
+DEFAULT_BUDGET = 5000
+
+
+class ImpactIndex:
+    def __init__(self, mirror, rules=IMPACT_RULES, max_depth: int = DEFAULT_MAX_DEPTH,
+                 budget: int = DEFAULT_BUDGET):
+        self.mirror = mirror
+        self.rules = tuple(rules)
+        self.rel_types = {rel for rel, _ in self.rules}
+        self.max_depth = max_depth
+        self.budget = budget
+        self.lock = threading.RLock()
+        self._sets: Dict[int, Tuple[Dict[int, Tuple[int, str]], bool]] = {}
+        self._owners: Dict[int, Set[int]] = {}
+        self.hits = 0
+        self.misses = 0
+        mirror.add_listener(self.on_event)
+
+    def _compute(self, node_id: int) -> Tuple[Dict[int, Tuple[int, str]], bool]:
+        """{affected_id: (hops, via_rel_type)} and whether the budget cut the BFS short."""
+        mirror = self.mirror
+        found: Dict[int, Tuple[int, str]] = {}
+        seen = {node_id}
+        queue = deque([(node_id, 0)])
+        while queue:
+            current, d = queue.popleft()
+            if d >= self.max_depth:
+                continue
+            for rel_type, direction in self.rules:
+                for nxt in mirror._neighbor_ids(current, rel_type, direction):
+                    if nxt in seen or nxt not in mirror.alive:
+                        continue
+                    if len(found) >= self.budget:
+                        return found, True
+                    seen.add(nxt)
+                    found[nxt] = (d + 1, rel_type)
+                    queue.append((nxt, d + 1))
+        return found, False
+
+    def _impact_set(self, node_id: int):
+        cached = self._sets.get(node_id)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        result = self._compute(node_id)
+        self._sets[node_id] = result
+        for other in result[0]:
+            self._owners.setdefault(other, set()).add(node_id)
+        return result
+
+    def impact(self, uid: str, max_depth: Optional[int] = None) -> Tuple[List[Tuple[str, int, str]], bool]:
+        """
+        ([(uid, hops, via_rel_type)] sorted by hops then uid, truncated).
+        truncated is True when the node budget cut the traversal short.
+        """
+        with self.mirror.lock, self.lock:
+            node_id = self.mirror.id_of(uid)
+            if node_id is None:
+                return [], False
+            found, truncated = self._impact_set(node_id)
+            uids = self.mirror.uids
+            rows = [(uids[i], d, via) for i, (d, via) in found.items()
+                    if max_depth is None or d <= max_depth]
+            rows.sort(key=lambda r: (r[1], r[0]))
+            return rows, truncated
+
+    # --- invalidation ---
+
+    def _drop(self, node_id: int):
+        entry = self._sets.pop(node_id, None)
+        if entry is None:
+            return
+        for other in entry[0]:
+            owners = self._owners.get(other)
+            if owners:
+                owners.discard(node_id)
+                if not owners:
+                    del self._owners[other]
+
+    def _affects_source(self, s: str, rel_type: str, t: str) -> Optional[int]:
+        """The node whose change propagates over this edge (the 'a' of a->b)."""
+        for rule_type, direction in self.rules:
+            if rule_type == rel_type:
+                return self.mirror.uid_to_id.get(s if direction == "out" else t)
+        return None
+
+    def on_event(self, event, *args):
+        with self.lock:
+            if event in ("edge+", "edge-"):
+                if args[1] not in self.rel_types:
+                    return
+                source = self._affects_source(*args)
+                if source is None:
+                    self.clear()
+                    return
+                for owner in list(self._owners.get(source, ())) + [source]:
+                    self._drop(owner)
+            elif event == "node+":
+                return  # no edges yet
+            else:
+                self.clear()
+
+    def clear(self):
+        with self.lock:
+            self._sets.clear()
+            self._owners.clear()
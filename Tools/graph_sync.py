@@ -13,8 +13,12 @@ if __name__ == "__main__" and __package__ is None:
 
 try:
     from Tools.db_config import get_driver, close_driver, WORKSPACE_ROOT
+    from Tools.embedding_queue import MARK_DIRTY
+    from Tools.graph_version import bump as bump_graph_version
 except ImportError:
     from db_config import get_driver, close_driver, WORKSPACE_ROOT
+    from embedding_queue import MARK_DIRTY
+    from graph_version import bump as bump_graph_version
 
 # Folder Mapping
 TYPE_TO_FOLDER = {
@@ -148,6 +152,13 @@ class GraphSync:
         # EXCLUDE properties that will be rendered as relationships to avoid YAML key duplication
         excluded_keys = [
             'uid', 'type', 'title', 'description', 'created_at', 'updated_at', 'content', 'embedding',
+            # Derived search structures (similarity_index.py)
+            'knn_uids', 'knn_scores',
+            'passage_starts', 'passage_ends', 'passage_vectors', 'passage_hash',
+            # Re-embedding queue marks (embedding_queue.py)
+            'embedding_dirty', 'embedding_hash',
+            # Embedding model tags / migration vectors (embedding_models.py)
+            'embedding_model', 'embedding_next', 'embedding_next_model',
             # Relationship properties (rendered separately as YAML lists below)
             'decomposes', 'implements', 'depends_on', 'relates_to', 'restricts', 'can_perform'
         ]
@@ -341,7 +352,8 @@ class GraphSync:
                 print(f"❌ Node {uid} does not exist and no type provided. Cannot create.")
                 return
 
-        # A. Update Properties (and Create if needed)
+        # A. Update Properties (and Create if needed).
+        # The node is queued for re-embedding (embedding_queue.py); unchanged text is not re-encoded.
         set_clauses = []
         for k, v in props.items():
             set_clauses.append(f"n.{k} = ${k}")
@@ -354,20 +366,22 @@ class GraphSync:
                 # Cypher doesn't allow dynamic labels in MERGE easily without APOC or string formatting
                 query = f"""
                 MERGE (n:{safe_type} {{uid: $uid}})
-                SET {", ".join(set_clauses)}, n.updated_at = datetime()
+                SET {", ".join(set_clauses)}, n.updated_at = datetime(), {MARK_DIRTY}
                 RETURN n
                 """
             else:
                 # Update existing only
                 query = f"""
                 MATCH (n {{uid: $uid}})
-                SET {", ".join(set_clauses)}, n.updated_at = datetime()
+                SET {", ".join(set_clauses)}, n.updated_at = datetime(), {MARK_DIRTY}
                 RETURN n
                 """
             
             props['uid'] = uid
             try:
                 drv.execute_query(query, props, database_="neo4j")
+                # Neighbours show this node's title: their cached answers are stale too
+                bump_graph_version(drv, uids=[uid], with_neighbors=True)
                 print(f"✅ Synced {uid} ({node_type or 'Existing'}) to DB")
             except Exception as e:
                 print(f"❌ DB Sync Error for {uid}: {e}")
@@ -503,6 +517,17 @@ class GraphSync:
 
         return file_path
 
+    def sync_nodes(self, uids):
+        """
+        Batch variant of sync_node: every uid is exported once, in the given order
+        (duplicates skipped). Returns the number of files written.
+        """
+        written = 0
+        for uid in dict.fromkeys(u for u in uids if u):
+            if self.sync_node(uid):
+                written += 1
+        return written
+
     def delete_node(self, uid: str):
         """
         Removes the markdown file associated with a UID.
@@ -525,21 +550,27 @@ class GraphSync:
             print(f"ℹ️ GraphSync: No file found for {uid} to delete.")
         return found
 
-    def sync_all(self):
+    def sync_all(self, progress_callback=None, start_after: str = None):
         """
         Regenerate ALL markdown files from Neo4j.
+        Nodes go in uid order: start_after resumes an interrupted run.
+        progress_callback(done, total, last_uid) is called after every node (it may raise to stop).
         """
         drv = self.get_driver()
 
-        query = "MATCH (n) RETURN n.uid as uid"
-        records, _, _ = drv.execute_query(query, database_="neo4j")
+        query = """
+        MATCH (n) WHERE n.uid IS NOT NULL AND ($after IS NULL OR n.uid > $after)
+        RETURN n.uid as uid ORDER BY uid
+        """
+        records, _, _ = drv.execute_query(query, {"after": start_after}, database_="neo4j")
 
         count = 0
         for r in records:
             uid = r['uid']
-            if uid:
-                self.sync_node(uid)
-                count += 1
+            self.sync_node(uid)
+            count += 1
+            if progress_callback:
+                progress_callback(count, len(records), uid)
 
         return f"Synced {count} nodes."
 
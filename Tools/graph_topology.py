@@ -0,0 +1,717 @@
+"""
+In-process topology mirror of the Neo4j graph.
+
+Traversal-heavy tools (look_around, find_orphans, illuminate_path, ...) ask
+the mirror instead of running variable-length MATCHes in Neo4j:
+
+- uid interning: every node with a `uid` gets a dense int id
+- CSR adjacency per relationship type, outgoing and incoming
+  (offsets/targets as array('i'), or zero-copy memoryviews over a snapshot mmap)
+- a delta overlay for edges added/removed since the CSR was built,
+  compacted back into CSR when it grows
+- label and project bitsets
+
+Kept current by the tool mutation paths (add_node / add_edge / remove_*),
+verified against DB counts every `verify_interval` seconds, and reloaded when
+marked stale by bulk writers (map_codebase, sync_graph, imports).
+Only node properties needed for topology live here; titles etc. stay in Neo4j.
+
+Threads and locks: tool bodies run concurrently in worker threads (server.off_loop),
+so every in-process index is shared between them. The single lock order is
+
+    TopologyMirror.lock  ->  listener index lock (ComponentIndex, HierarchyIndex, ImpactIndex)
+
+Listener events are delivered with mirror.lock held, so an index method that reads
+the mirror takes `with self.mirror.lock, self.lock:`. It must never call into the
+mirror while holding only its own lock. The other locks are leaves: LexicalIndex,
+SimilarityIndex, ResponseCache, GraphVersion, JobManager and AgentStateStore never
+call into the mirror or into each other under their lock. The one exception is the
+embedding queue: ModelRegistry.lock -> SimilarityIndex.lock (upsert of a batch).
+Neo4j queries run before the mirror lock is taken (load, verify).
+"""
+import bisect
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+SNAPSHOT_MAGIC = b"GMTOPO1\n"
+SNAPSHOT_VERSION = 1
+
+NODES_QUERY = """
+MATCH (n) WHERE n.uid IS NOT NULL
+RETURN n.uid AS uid, labels(n) AS labels, n.project_id AS project_id
+"""
+EDGES_QUERY = """
+MATCH (s)-[r]->(t) WHERE s.uid IS NOT NULL AND t.uid IS NOT NULL
+RETURN s.uid AS s, type(r) AS type, t.uid AS t
+"""
+COUNTS_QUERY = """
+MATCH (n) WHERE n.uid IS NOT NULL
+WITH count(n) AS nodes
+OPTIONAL MATCH (s)-[r]->(t) WHERE s.uid IS NOT NULL AND t.uid IS NOT NULL
+RETURN nodes, count(r) AS edges
+"""
+
+OUT, IN = "out", "in"
+
+
+class Bitset:
+    """Growable bitset over dense int ids (bytearray backed)."""
+    __slots__ = ("bits",)
+
+    def __init__(self, size: int = 0):
+        self.bits = bytearray((size + 7) >> 3)
+
+    def add(self, i: int):
+        byte = i >> 3
+        if byte >= len(self.bits):
+            self.bits.extend(bytes(byte - len(self.bits) + 1))
+        self.bits[byte] |= 1 << (i & 7)
+
+    def discard(self, i: int):
+        byte = i >> 3
+        if byte < len(self.bits):
+            self.bits[byte] &= ~(1 << (i & 7)) & 0xFF
+
+    def __contains__(self, i: int) -> bool:
+        byte = i >> 3
+        return byte < len(self.bits) and bool(self.bits[byte] >> (i & 7) & 1)
+
+    def __iter__(self):
+        for byte_index, byte in enumerate(self.bits):
+            if byte:
+                base = byte_index << 3
+                for bit in range(8):
+                    if byte >> bit & 1:
+                        yield base + bit
+
+    def __len__(self) -> int:
+        return sum(bin(byte).count("1") for byte in self.bits if byte)
+
+    def union(self, other: "Bitset") -> "Bitset":
+        result = Bitset()
+        a, b = self.bits, other.bits
+        if len(a) < len(b):
+            a, b = b, a
+        result.bits = bytearray(a)
+        for i, byte in enumerate(b):
+            result.bits[i] |= byte
+        return result
+
+    def intersection(self, other: "Bitset") -> "Bitset":
+        result = Bitset()
+        result.bits = bytearray(x & y for x, y in zip(self.bits, other.bits))
+        return result
+
+
+def build_csr(n: int, pairs: Iterable[Tuple[int, int]]) -> Tuple[array, array]:
+    """(offsets[n+1], targets) with targets sorted inside every row."""
+    rows: Dict[int, List[int]] = {}
+    for s, t in pairs:
+        rows.setdefault(s, []).append(t)
+    offsets = array("i", [0]) * (n + 1)
+    targets = array("i")
+    position = 0
+    for i in range(n):
+        row = rows.get(i)
+        if row:
+            row.sort()
+            targets.extend(row)
+            position += len(row)
+        offsets[i + 1] = position
+    return offsets, targets
+
+
+class TopologyMirror:
+    def __init__(self, snapshot_path: Optional[str] = None, verify_interval: float = 60.0,
+                 compact_threshold: int = 4096):
+        self.snapshot_path = snapshot_path
+        self.verify_interval = verify_interval
+        self.compact_threshold = compact_threshold
+        self.lock = threading.RLock()
+        self.loaded = False
+        self.stale = False
+        self.last_verified = 0.0
+        self.generation = 0  # bumped on every change, for caches built on top of the mirror
+        self._listeners = []
+        self._mmap = None
+        self._reset()
+
+    # --- state ---
+
+    def _reset(self):
+        self.uids: List[str] = []
+        self.uid_to_id: Dict[str, int] = {}
+        self.alive = Bitset()
+        self.label_names: List[str] = []
+        self.label_index: Dict[str, int] = {}
+        self.label_bits: Dict[str, Bitset] = {}
+        self.primary_label: array = array("i")
+        self.project_names: List[Optional[str]] = []
+        self.project_index: Dict[Optional[str], int] = {}
+        self.project_bits: Dict[Optional[str], Bitset] = {}
+        self.node_project: array = array("i")
+        self.rel_types: List[str] = []
+        # rel_type -> {OUT: (offsets, targets), IN: (offsets, targets)}
+        self.csr: Dict[str, Dict[str, Tuple]] = {}
+        self.base_nodes = 0
+        self.base_edges = 0
+        # rel_type -> direction -> {id: set(ids)}
+        self.added: Dict[str, Dict[str, Dict[int, Set[int]]]] = {}
+        self.removed: Dict[str, Dict[str, Dict[int, Set[int]]]] = {}
+        self.delta_size = 0
+        self.edge_count = 0
+
+    def add_listener(self, callback):
+        """callback(event, *args) on every mutation: ('node+', uid), ('node-', uid), ('edge+', s, rel, t), ('edge-', s, rel, t), ('reload',)."""
+        self._listeners.append(callback)
+
+    def _notify(self, *event):
+        self.generation += 1
+        for callback in self._listeners:
+            try:
+                callback(*event)
+            except Exception as e:
+                print(f"⚠️ Topology listener failed: {e}", file=sys.stderr)
+
+    def _intern(self, uid: str) -> int:
+        node_id = self.uid_to_id.get(uid)
+        if node_id is None:
+            node_id = len(self.uids)
+            self.uids.append(uid)
+            self.uid_to_id[uid] = node_id
+            self.primary_label.append(-1)
+            self.node_project.append(-1)
+        return node_id
+
+    def _label_id(self, label: str) -> int:
+        index = self.label_index.get(label)
+        if index is None:
+            index = len(self.label_names)
+            self.label_names.append(label)
+            self.label_index[label] = index
+            self.label_bits[label] = Bitset()
+        return index
+
+    def _project_id(self, project_id: Optional[str]) -> int:
+        index = self.project_index.get(project_id)
+        if index is None:
+            index = len(self.project_names)
+            self.project_names.append(project_id)
+            self.project_index[project_id] = index
+            self.project_bits[project_id] = Bitset()
+        return index
+
+    def _set_node(self, uid: str, labels: Iterable[str], project_id: Optional[str]) -> int:
+        node_id = self._intern(uid)
+        self.alive.add(node_id)
+        labels = list(labels or [])
+        for label in labels:
+            self._label_id(label)
+            self.label_bits[label].add(node_id)
+        if labels:
+            self.primary_label[node_id] = self.label_index[labels[0]]
+        old_project = self.node_project[node_id]
+        if old_project != -1:
+            self.project_bits[self.project_names[old_project]].discard(node_id)
+        self.node_project[node_id] = self._project_id(project_id)
+        self.project_bits[project_id].add(node_id)
+        return node_id
+
+    # --- loading / verification ---
+
+    def load(self, driver):
+        """Full load from Neo4j: 2 queries (nodes, edges), then CSR build."""
+        started = time.perf_counter()
+        nodes, _, _ = driver.execute_query(NODES_QUERY, database_="neo4j")
+        edges, _, _ = driver.execute_query(EDGES_QUERY, database_="neo4j")
+        with self.lock:
+            self._reset()
+            self._release_mmap()
+            for record in nodes:
+                self._set_node(record["uid"], record["labels"], record["project_id"])
+            by_type: Dict[str, List[Tuple[int, int]]] = {}
+            for record in edges:
+                s = self.uid_to_id.get(record["s"])
+                t = self.uid_to_id.get(record["t"])
+                if s is None or t is None:
+                    continue
+                by_type.setdefault(record["type"], []).append((s, t))
+            self._build(by_type)
+            self.loaded = True
+            self.stale = False
+            self.last_verified = time.time()
+            self._notify("reload")
+            if self.snapshot_path:
+                try:
+                    self.save_snapshot()
+                except OSError as e:
+                    print(f"⚠️ Failed to save topology snapshot: {e}", file=sys.stderr)
+        print(f"🕸️ Topology mirror loaded: {len(self.uids)} nodes, {self.edge_count} edges "
+              f"in {time.perf_counter() - started:.2f}s", file=sys.stderr)
+
+    def _build(self, by_type: Dict[str, List[Tuple[int, int]]]):
+        n = len(self.uids)
+        self.csr = {}
+        self.rel_types = sorted(by_type)
+        for rel_type in self.rel_types:
+            pairs = by_type[rel_type]
+            self.csr[rel_type] = {
+                OUT: build_csr(n, pairs),
+                IN: build_csr(n, ((t, s) for s, t in pairs)),
+            }
+        self.base_nodes = n
+        self.base_edges = sum(len(p) for p in by_type.values())
+        self.edge_count = self.base_edges
+        self.added = {}
+        self.removed = {}
+        self.delta_size = 0
+
+    def db_counts(self, driver) -> Tuple[int, int]:
+        records, _, _ = driver.execute_query(COUNTS_QUERY, database_="neo4j")
+        return records[0]["nodes"], records[0]["edges"]
+
+    def verify(self, driver) -> bool:
+        """Compares node/edge counts with the DB; reloads on mismatch. Returns True if it was consistent."""
+        nodes, edges = self.db_counts(driver)
+        with self.lock:
+            consistent = nodes == len(self.alive) and edges == self.edge_count
+            self.last_verified = time.time()
+        if not consistent:
+            print(f"⚠️ Topology mirror drifted (db {nodes}/{edges}, mirror {len(self.alive)}/{self.edge_count}), reloading",
+                  file=sys.stderr)
+            self.load(driver)
+        return consistent
+
+    def mark_stale(self):
+        """Bulk writers (mapper, importer, sync) call this: the next ensure_fresh reloads."""
+        self.stale = True
+
+    def ensure_fresh(self, driver) -> "TopologyMirror":
+        if not self.loaded:
+            if self.snapshot_path and self.load_snapshot(self.snapshot_path):
+                self.verify(driver)  # reloads from the DB if the snapshot is outdated
+            else:
+                self.load(driver)
+        elif self.stale:
+            self.load(driver)
+        elif time.time() - self.last_verified > self.verify_interval:
+            self.verify(driver)
+        return self
+
+    # --- adjacency ---
+
+    def _row(self, rel_type: str, direction: str, node_id: int):
+        base = self.csr.get(rel_type)
+        if base and node_id < self.base_nodes:
+            offsets, targets = base[direction]
+            return targets[offsets[node_id]:offsets[node_id + 1]]
+        return ()
+
+    def _base_has(self, rel_type: str, s: int, t: int) -> bool:
+        base = self.csr.get(rel_type)
+        if not base or s >= self.base_nodes:
+            return False
+        offsets, targets = base[OUT]
+        lo, hi = offsets[s], offsets[s + 1]
+        i = bisect.bisect_left(targets, t, lo, hi)
+        return i < hi and targets[i] == t
+
+    def _neighbor_ids(self, node_id: int, rel_type: str, direction: str) -> List[int]:
+        row = self._row(rel_type, direction, node_id)
+        removed = self.removed.get(rel_type, {}).get(direction, {}).get(node_id)
+        result = [x for x in row if not removed or x not in removed]
+        added = self.added.get(rel_type, {}).get(direction, {}).get(node_id)
+        if added:
+            result.extend(added)
+        return result
+
+    def _delta(self, store, rel_type: str, direction: str) -> Dict[int, Set[int]]:
+        return store.setdefault(rel_type, {}).setdefault(direction, {})
+
+    def has_edge(self, source_uid: str, rel_type: str, target_uid: str) -> bool:
+        with self.lock:
+            s = self.uid_to_id.get(source_uid)
+            t = self.uid_to_id.get(target_uid)
+            if s is None or t is None:
+                return False
+            if t in self.added.get(rel_type, {}).get(OUT, {}).get(s, ()):
+                return True
+            if t in self.removed.get(rel_type, {}).get(OUT, {}).get(s, ()):
+                return False
+            return self._base_has(rel_type, s, t)
+
+    # --- mutation hooks ---
+
+    def add_node(self, uid: str, labels: Iterable[str], project_id: Optional[str] = None):
+        with self.lock:
+            if not self.loaded:
+                return
+            self._set_node(uid, labels, project_id)
+            self._notify("node+", uid)
+
+    def remove_node(self, uid: str):
+        with self.lock:
+            node_id = self.uid_to_id.get(uid)
+            if not self.loaded or node_id is None or node_id not in self.alive:
+                return
+            for rel_type in list(set(self.rel_types) | set(self.added)):
+                for t in self._neighbor_ids(node_id, rel_type, OUT):
+                    self._remove_edge_ids(node_id, rel_type, t)
+                for s in self._neighbor_ids(node_id, rel_type, IN):
+                    self._remove_edge_ids(s, rel_type, node_id)
+            self.alive.discard(node_id)
+            for bits in self.label_bits.values():
+                bits.discard(node_id)
+            project = self.node_project[node_id]
+            if project != -1:
+                self.project_bits[self.project_names[project]].discard(node_id)
+            self._notify("node-", uid)
+            self._maybe_compact()
+
+    def add_edge(self, source_uid: str, rel_type: str, target_uid: str):
+        with self.lock:
+            if not self.loaded:
+                return
+            s = self.uid_to_id.get(source_uid)
+            t = self.uid_to_id.get(target_uid)
+            if s is None or t is None or s not in self.alive or t not in self.alive:
+                # Node created outside the hooks: let the next verify reload
+                self.stale = True
+                return
+            removed = self.removed.get(rel_type, {}).get(OUT, {}).get(s)
+            if removed and t in removed:
+                removed.discard(t)
+                self._delta(self.removed, rel_type, IN)[t].discard(s)
+                self.delta_size -= 1
+            elif self._base_has(rel_type, s, t) or t in self.added.get(rel_type, {}).get(OUT, {}).get(s, ()):
+                return  # MERGE semantics: already there
+            else:
+                self._delta(self.added, rel_type, OUT).setdefault(s, set()).add(t)
+                self._delta(self.added, rel_type, IN).setdefault(t, set()).add(s)
+                self.delta_size += 1
+            self.edge_count += 1
+            self._notify("edge+", source_uid, rel_type, target_uid)
+            self._maybe_compact()
+
+    def remove_edge(self, source_uid: str, rel_type: str, target_uid: str):
+        with self.lock:
+            s = self.uid_to_id.get(source_uid)
+            t = self.uid_to_id.get(target_uid)
+            if not self.loaded or s is None or t is None:
+                return
+            if self._remove_edge_ids(s, rel_type, t):
+                self._notify("edge-", source_uid, rel_type, target_uid)
+                self._maybe_compact()
+
+    def _remove_edge_ids(self, s: int, rel_type: str, t: int) -> bool:
+        added = self.added.get(rel_type, {}).get(OUT, {}).get(s)
+        if added and t in added:
+            added.discard(t)
+            self.added[rel_type][IN][t].discard(s)
+            self.delta_size -= 1
+        elif self._base_has(rel_type, s, t) and t not in self.removed.get(rel_type, {}).get(OUT, {}).get(s, ()):
+            self._delta(self.removed, rel_type, OUT).setdefault(s, set()).add(t)
+            self._delta(self.removed, rel_type, IN).setdefault(t, set()).add(s)
+            self.delta_size += 1
+        else:
+            return False
+        self.edge_count -= 1
+        return True
+
+    def _maybe_compact(self):
+        if self.delta_size > max(self.compact_threshold, self.base_edges // 4):
+            self.compact()
+
+    def compact(self):
+        """Folds the delta overlay (and nodes added since the build) into fresh CSR arrays."""
+        with self.lock:
+            by_type: Dict[str, List[Tuple[int, int]]] = {}
+            for rel_type in set(self.rel_types) | set(self.added):
+                pairs = []
+                for s in range(len(self.uids)):
+                    for t in self._neighbor_ids(s, rel_type, OUT):
+                        pairs.append((s, t))
+                if pairs:
+                    by_type[rel_type] = pairs
+            self._build(by_type)
+            self._release_mmap()
+
+    # --- queries ---
+
+    def has(self, uid: str) -> bool:
+        node_id = self.uid_to_id.get(uid)
+        return node_id is not None and node_id in self.alive
+
+    def label_of(self, uid: str) -> Optional[str]:
+        node_id = self.uid_to_id.get(uid)
+        if node_id is None or node_id not in self.alive or self.primary_label[node_id] == -1:
+            return None
+        return self.label_names[self.primary_label[node_id]]
+
+    def project_of(self, uid: str) -> Optional[str]:
+        node_id = self.uid_to_id.get(uid)
+        if node_id is None or self.node_project[node_id] == -1:
+            return None
+        return self.project_names[self.node_project[node_id]]
+
+    def id_of(self, uid: str) -> Optional[int]:
+        node_id = self.uid_to_id.get(uid)
+        return node_id if node_id is not None and node_id in self.alive else None
+
+    def degree(self, uid: str) -> int:
+        """Number of incident edges (all types, both directions)."""
+        with self.lock:
+            node_id = self.uid_to_id.get(uid)
+            if node_id is None:
+                return 0
+            return len(self._neighbors_of(node_id, None, "both"))
+
+    def edge_ids(self, rel_type: str) -> List[Tuple[int, int]]:
+        """(source_id, target_id) of every current edge of one type (CSR minus removed, plus added)."""
+        with self.lock:
+            return [(s, t) for s in range(len(self.uids)) for t in self._neighbor_ids(s, rel_type, OUT)]
+
+    def neighbors(self, uid: str, rel_types: Optional[Iterable[str]] = None, direction: str = "both") -> List[str]:
+        with self.lock:
+            node_id = self.uid_to_id.get(uid)
+            if node_id is None:
+                return []
+            return [self.uids[i] for i in self._neighbors_of(node_id, rel_types, direction)]
+
+    def _neighbors_of(self, node_id: int, rel_types, direction: str) -> List[int]:
+        types_ = list(rel_types) if rel_types else list(set(self.rel_types) | set(self.added))
+        directions = (OUT, IN) if direction == "both" else (direction,)
+        result = []
+        for rel_type in types_:
+            for d in directions:
+                result.extend(self._neighbor_ids(node_id, rel_type, d))
+        return result
+
+    def within_hops(self, uid: str, max_hops: int, rel_types: Optional[Iterable[str]] = None,
+                    direction: str = "both") -> Dict[str, int]:
+        """BFS distances (1..max_hops) from uid; the start node is excluded."""
+        with self.lock:
+            start = self.uid_to_id.get(uid)
+            if start is None:
+                return {}
+            rel_types = list(rel_types) if rel_types else None
+            dist = {start: 0}
+            queue = deque([start])
+            while queue:
+                current = queue.popleft()
+                d = dist[current]
+                if d >= max_hops:
+                    continue
+                for nxt in self._neighbors_of(current, rel_types, direction):
+                    if nxt not in dist and nxt in self.alive:
+                        dist[nxt] = d + 1
+                        queue.append(nxt)
+            del dist[start]
+            return {self.uids[i]: d for i, d in dist.items()}
+
+    def shortest_path(self, source_uid: str, target_uid: str, rel_types: Optional[Iterable[str]] = None,
+                      max_hops: int = 12) -> Optional[List[Tuple[str, Optional[str], bool]]]:
+        """
+        Bidirectional BFS over edges of rel_types (either direction).
+        Returns [(uid, rel_type, forward)] from source to target, where rel_type/forward
+        describe the edge from the previous step (forward: prev-[rel]->uid);
+        the first entry is (source_uid, None, True). None if unreachable within max_hops.
+        """
+        with self.lock:
+            start, goal = self.uid_to_id.get(source_uid), self.uid_to_id.get(target_uid)
+            if start is None or goal is None or start not in self.alive or goal not in self.alive:
+                return None
+            if start == goal:
+                return [(source_uid, None, True)]
+            types_ = list(rel_types) if rel_types else list(set(self.rel_types) | set(self.added))
+            # node -> (neighbor towards the origin, rel_type, edge points away from the origin)
+            parents = ({start: None}, {goal: None})
+            dist = ({start: 0}, {goal: 0})
+            frontiers = ([start], [goal])
+            depth = [0, 0]
+            while frontiers[0] and frontiers[1] and depth[0] + depth[1] < max_hops:
+                side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+                seen, other = parents[side], dist[1 - side]
+                next_frontier, meet = [], None
+                for current in frontiers[side]:
+                    for rel_type in types_:
+                        for direction in (OUT, IN):
+                            for nxt in self._neighbor_ids(current, rel_type, direction):
+                                if nxt in seen or nxt not in self.alive:
+                                    continue
+                                seen[nxt] = (current, rel_type, direction == OUT)
+                                dist[side][nxt] = depth[side] + 1
+                                next_frontier.append(nxt)
+                                # the whole layer is expanded: keep the meeting point closest to the other end
+                                if nxt in other and (meet is None or other[nxt] < other[meet]):
+                                    meet = nxt
+                depth[side] += 1
+                if meet is not None:
+                    return self._join_path(parents, meet)
+                frontiers = (next_frontier, frontiers[1]) if side == 0 else (frontiers[0], next_frontier)
+            return None
+
+    def _join_path(self, parents, meet: int) -> List[Tuple[str, Optional[str], bool]]:
+        forward, backward = parents
+        chain = []  # source ... meet, each with the edge that led to it
+        node = meet
+        while forward[node] is not None:
+            prev, rel_type, away = forward[node]
+            chain.append((node, rel_type, away))
+            node = prev
+        chain.append((node, None, True))
+        chain.reverse()
+        node = meet
+        while backward[node] is not None:
+            nxt, rel_type, away = backward[node]
+            # discovered from nxt (target side): from meet towards target the edge is reversed
+            chain.append((nxt, rel_type, not away))
+            node = nxt
+        return [(self.uids[i], rel_type, fwd) for i, rel_type, fwd in chain]
+
+    def nodes(self, label: Optional[str] = None, project_id: Optional[str] = None,
+              include_global: bool = True) -> List[str]:
+        """uids of live nodes, filtered by label and project (NULL project_id counts as global)."""
+        with self.lock:
+            bits = self.alive
+            if label is not None:
+                bits = bits.intersection(self.label_bits.get(label, Bitset()))
+            if project_id is not None:
+                scope = self.project_bits.get(project_id, Bitset())
+                if include_global and None in self.project_bits:
+                    scope = scope.union(self.project_bits[None])
+                bits = bits.intersection(scope)
+            return [self.uids[i] for i in bits]
+
+    # --- snapshot ---
+
+    def save_snapshot(self, path: Optional[str] = None):
+        """
+        Binary snapshot: magic, header length, JSON header (uids, labels, projects,
+        array directory), then the raw int32 arrays (4-byte aligned) for mmap.
+        """
+        path = path or self.snapshot_path
+        if not path:
+            return
+        with self.lock:
+            if self.delta_size:
+                self.compact()
+            arrays = [("primary_label", self.primary_label), ("node_project", self.node_project)]
+            for rel_type in self.rel_types:
+                for direction in (OUT, IN):
+                    offsets, targets = self.csr[rel_type][direction]
+                    arrays.append((f"{rel_type}:{direction}:offsets", offsets))
+                    arrays.append((f"{rel_type}:{direction}:targets", targets))
+            directory, position = [], 0
+            for name, values in arrays:
+                length = len(values)
+                directory.append([name, position, length])
+                position += length * 4
+            header = json.dumps({
+                "version": SNAPSHOT_VERSION,
+                "uids": self.uids,
+                "alive": [i for i in self.alive],
+                "labels": {label: list(bits) for label, bits in self.label_bits.items()},
+                "label_names": self.label_names,
+                "project_names": self.project_names,
+                "rel_types": self.rel_types,
+                "edge_count": self.edge_count,
+                "arrays": directory,
+            }).encode("utf-8")
+            pad = (-(len(SNAPSHOT_MAGIC) + 8 + len(header))) % 4
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(SNAPSHOT_MAGIC)
+                f.write(struct.pack("<Q", len(header)))
+                f.write(header)
+                f.write(b"\0" * pad)
+                for _, values in arrays:
+                    f.write(values.tobytes() if isinstance(values, array) else array("i", values).tobytes())
+            os.replace(tmp_path, path)
+
+    def load_snapshot(self, path: Optional[str] = None) -> bool:
+        """Maps a snapshot file; CSR arrays become zero-copy memoryviews over the mmap."""
+        path = path or self.snapshot_path
+        if not path or not os.path.exists(path):
+            return False
+        try:
+            with open(path, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if mm[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+                mm.close()
+                return False
+            header_len = struct.unpack("<Q", mm[len(SNAPSHOT_MAGIC):len(SNAPSHOT_MAGIC) + 8])[0]
+            header_start = len(SNAPSHOT_MAGIC) + 8
+            header = json.loads(mm[header_start:header_start + header_len].decode("utf-8"))
+            if header.get("version") != SNAPSHOT_VERSION:
+                mm.close()
+                return False
+            data_start = header_start + header_len
+            data_start += (-data_start) % 4
+            view = memoryview(mm)
+            arrays = {}
+            for name, position, length in header["arrays"]:
+                start = data_start + position
+                arrays[name] = view[start:start + length * 4].cast("i")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Topology snapshot unreadable ({path}): {e}", file=sys.stderr)
+            return False
+
+        with self.lock:
+            self._reset()
+            self._release_mmap()
+            self.uids = header["uids"]
+            self.uid_to_id = {uid: i for i, uid in enumerate(self.uids)}
+            for i in header["alive"]:
+                self.alive.add(i)
+            self.label_names = header["label_names"]
+            self.label_index = {label: i for i, label in enumerate(self.label_names)}
+            for label, members in header["labels"].items():
+                bits = Bitset(len(self.uids))
+                for i in members:
+                    bits.add(i)
+                self.label_bits[label] = bits
+            # Small per-node arrays are copied: they grow when nodes are added
+            self.primary_label = array("i", arrays["primary_label"])
+            self.node_project = array("i", arrays["node_project"])
+            self.project_names = header["project_names"]
+            self.project_index = {p: i for i, p in enumerate(self.project_names)}
+            self.project_bits = {p: Bitset(len(self.uids)) for p in self.project_names}
+            for i in self.alive:
+                if self.node_project[i] != -1:
+                    self.project_bits[self.project_names[self.node_project[i]]].add(i)
+            self.rel_types = header["rel_types"]
+            for rel_type in self.rel_types:
+                self.csr[rel_type] = {
+                    d: (arrays[f"{rel_type}:{d}:offsets"], arrays[f"{rel_type}:{d}:targets"]) for d in (OUT, IN)
+                }
+            self.base_nodes = len(self.uids)
+            self.base_edges = self.edge_count = header["edge_count"]
+            self._mmap = (mm, view, arrays)
+            self.loaded = True
+            self.stale = False
+            self._notify("reload")
+        return True
+
+    def _release_mmap(self):
+        """Drops the snapshot mapping; callers replace the CSR views first (reset/compact)."""
+        if self._mmap is None:
+            return
+        mm, view, arrays = self._mmap
+        self._mmap = None
+        try:
+            for values in arrays.values():
+                values.release()
+            view.release()
+            mm.close()
+        except (BufferError, ValueError):
+            pass
@@ -0,0 +1,211 @@
+"""
+Monotonic per-project graph versions + response cache for read-only tools.
+
+Every writer bumps the version of the scopes it touched:
+
+    (:GraphVersion {project_id: "graphmcp", version: 42, epoch: "<uuid>"})
+    (:GraphVersion {project_id: "*", ...})        -- global nodes (project_id NULL), Meta-Graph
+
+A read-only tool answer depends on its project and on global nodes, so it is
+cached under (tool, normalized args, location, workflow, project,
+(project epoch+version), (global epoch+version)). Any write to either
+scope changes the key, so stale answers are never served; they just age
+out of the LRU. `epoch` is set when a version node is (re)created, so a
+wiped or restored database never reuses an old key.
+
+Writers in other processes (importer, mapper, Markdown watcher) bump through
+the same queries, so no in-process notification is needed for the cache.
+In-memory indexes (topology mirror, BM25) are a different matter: they are
+only updated by the server's own writers. `VersionWatermark` tells the
+versions the server produced itself from everybody else's, so an index is
+reloaded once another writer has moved any scope since it was loaded.
+"""
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+GLOBAL_SCOPE = "*"
+
+# Scopes of the given nodes (+ optionally their neighbours), merged with explicit scopes
+SCOPES_QUERY = """
+UNWIND $uids AS suid
+MATCH (n {uid: suid})
+OPTIONAL MATCH (n)--(m) WHERE $with_neighbors
+WITH collect(DISTINCT coalesce(n.project_id, '*')) AS own, [x IN collect(DISTINCT m) | coalesce(x.project_id, '*')] AS near
+RETURN own + near AS scopes
+"""
+BUMP_QUERY = """
+UNWIND $scopes AS scope
+MERGE (v:GraphVersion {project_id: scope})
+ON CREATE SET v.version = 0, v.epoch = randomUUID()
+SET v.version = v.version + 1
+RETURN v.project_id AS scope, v.epoch AS epoch, v.version AS version
+"""
+BUMP_ALL_QUERY = """
+MERGE (g:GraphVersion {project_id: '*'})
+ON CREATE SET g.version = 0, g.epoch = randomUUID()
+WITH count(g) AS _
+MATCH (v:GraphVersion)
+SET v.version = v.version + 1
+"""
+READ_QUERY = """
+UNWIND $scopes AS scope
+OPTIONAL MATCH (v:GraphVersion {project_id: scope})
+RETURN scope, v.epoch AS epoch, coalesce(v.version, 0) AS version
+"""
+READ_ALL_QUERY = """
+MATCH (v:GraphVersion)
+RETURN v.project_id AS scope, v.epoch AS epoch, v.version AS version
+"""
+
+
+def scope_of(project_id: Optional[str]) -> str:
+    return GLOBAL_SCOPE if project_id is None else project_id
+
+
+def node_scopes(driver, uids: Iterable[str], with_neighbors: bool = False) -> Sequence[str]:
+    """Scopes of existing nodes (query before deleting them)."""
+    uids = [u for u in uids if u]
+    if not uids:
+        return []
+    records, _, _ = driver.execute_query(SCOPES_QUERY, {"uids": uids, "with_neighbors": with_neighbors},
+                                         database_="neo4j")
+    return sorted({s for r in records for s in r["scopes"]})
+
+
+def bump(driver, project_ids: Iterable[Optional[str]] = (), uids: Iterable[str] = (),
+         with_neighbors: bool = False) -> List[Tuple]:
+    """Bumps the given projects (None = global) plus the scopes of `uids` (and their neighbours).
+    Returns the new versions as (scope, epoch, version)."""
+    scopes = {scope_of(p) for p in project_ids}
+    scopes.update(node_scopes(driver, uids, with_neighbors))
+    if not scopes:
+        return []
+    records, _, _ = driver.execute_query(BUMP_QUERY, {"scopes": sorted(scopes)}, database_="neo4j")
+    return [(r["scope"], r["epoch"], r["version"]) for r in records]
+
+
+def bump_all(driver):
+    """Bulk rewrites (importer, bootstrap): every project and the global scope."""
+    driver.execute_query(BUMP_ALL_QUERY, database_="neo4j")
+
+
+def current(driver, project_id: Optional[str]) -> Tuple:
+    """Version key of a project: ((scope, epoch, version), ...) for the project and the global scope."""
+    scopes = sorted({scope_of(project_id), GLOBAL_SCOPE})
+    records, _, _ = driver.execute_query(READ_QUERY, {"scopes": scopes}, database_="neo4j")
+    return tuple((r["scope"], r["epoch"], r["version"]) for r in records)
+
+
+def all_versions(driver) -> Dict[str, Tuple]:
+    """scope -> (epoch, version) of every scope, for indexes that hold the whole graph."""
+    records, _, _ = driver.execute_query(READ_ALL_QUERY, database_="neo4j")
+    return {r["scope"]: (r["epoch"], r["version"]) for r in records}
+
+
+def normalize_args(arguments: Optional[Dict]) -> str:
+    return json.dumps(arguments or {}, sort_keys=True, ensure_ascii=False, default=str)
+
+
+class ResponseCache:
+    """LRU of tool responses (tuples of texts), bounded by entry count and total characters."""
+
+    def __init__(self, max_entries: int = 512, max_chars: int = 4_000_000):
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self.lock = threading.Lock()
+        self.entries: "OrderedDict[Tuple, Tuple[str, ...]]" = OrderedDict()
+        self.chars = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key) -> Optional[Tuple[str, ...]]:
+        with self.lock:
+            texts = self.entries.get(key)
+            if texts is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return texts
+
+    def put(self, key, texts: Sequence[str]):
+        texts = tuple(texts)
+        size = sum(len(t) for t in texts)
+        if size > self.max_chars:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.chars -= sum(len(t) for t in old)
+            self.entries[key] = texts
+            self.chars += size
+            while len(self.entries) > self.max_entries or self.chars > self.max_chars:
+                _, evicted = self.entries.popitem(last=False)
+                self.chars -= sum(len(t) for t in evicted)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.chars = 0
+
+
+class VersionWatermark:
+    """
+    Graph versions an in-memory index is known to reflect.
+
+    reset(versions) after a load, with all_versions() read BEFORE loading;
+    produced(bumped) for every bump of a writer that also updated the index.
+    is_current(all_versions()) is False once some scope moved past what the
+    load and those writers account for, i.e. another writer (another process,
+    or a bulk path that skips the index) changed the graph: reload then.
+    Concurrent own bumps may return out of order; they are matched as a set.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.known: Optional[Dict[str, Tuple]] = None
+        self.own: Dict[str, set] = {}
+
+    def reset(self, versions: Dict[str, Tuple]):
+        with self.lock:
+            self.known = dict(versions)
+            self.own = {}
+
+    def produced(self, bumped: Iterable[Tuple]):
+        with self.lock:
+            if self.known is None:
+                return
+            for scope, epoch, version in bumped:
+                self.own.setdefault(scope, set()).add((epoch, version))
+
+    def is_current(self, versions: Dict[str, Tuple]) -> bool:
+        with self.lock:
+            if self.known is None:
+                return False
+            for scope in set(versions) | set(self.known):
+                epoch, version = versions.get(scope, (None, 0))  # a scope gone from the DB: wiped
+                known_epoch, known_version = self.known.get(scope, (None, 0))
+                own = self.own.get(scope, set())
+                # Own bumps directly above the watermark advance it (a new scope starts at version 1)
+                while True:
+                    following = [e for e, v in own if v == known_version + 1 and (known_epoch is None or e == known_epoch)]
+                    if not following:
+                        break
+                    own.discard((following[0], known_version + 1))
+                    known_epoch, known_version = following[0], known_version + 1
+                self.known[scope] = (known_epoch, known_version)
+                if (epoch, version) != (known_epoch, known_version):
+                    return False
+            return True
+
+    def ensure_current(self, index, driver):
+        """index.ensure_fresh(), reloading first if another writer moved a version since the load."""
+        versions = all_versions(driver)  # read before a reload: later writes are seen next time
+        if self.is_current(versions):
+            return index.ensure_fresh(driver)
+        index.mark_stale()
+        index.ensure_fresh(driver)
+        self.reset(versions)
+        return index
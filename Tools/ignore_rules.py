@@ -0,0 +1,159 @@
+"""
+Ignore rules for codebase discovery.
+
+Compiles the project's root `.gitignore` and `.graphmcpignore` once into
+regular expressions, so the mapper can prune whole directories before
+descending into them instead of filtering file by file.
+
+Supported gitignore syntax:
+- `#` comments, blank lines, `\\#` / `\\!` escapes
+- `!pattern` negation (last matching rule wins)
+- `dir/` directory-only rules
+- anchored rules (`/build`, `docs/api`) vs. basename rules (`*.log`)
+- `*`, `?`, `[...]` and `**` (`**/x`, `x/**`, `a/**/b`)
+
+Nested .gitignore files are not read.
+"""
+import os
+import re
+from typing import Iterable, List, Optional, Tuple
+
+IGNORE_FILE_NAMES = ('.gitignore', '.graphmcpignore')
+
+
+def _translate(pattern: str) -> str:
+    """Translates one gitignore glob (without anchors) into a regex body."""
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            if pattern.startswith('**', i):
+                if i + 2 < n and pattern[i + 2] == '/':
+                    # "**/" matches zero or more directories
+                    out.append('(?:.*/)?')
+                    i += 3
+                else:
+                    out.append('.*')
+                    i += 2
+                continue
+            out.append('[^/]*')
+        elif c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            j = i + 1
+            if j < n and pattern[j] in '!^':
+                j += 1
+            if j < n and pattern[j] == ']':
+                j += 1
+            while j < n and pattern[j] != ']':
+                j += 1
+            if j >= n:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:j].replace('\\', '\\\\')
+                if body[:1] in ('!', '^'):
+                    body = '^' + body[1:]
+                out.append(f'[{body}]')
+                i = j + 1
+                continue
+        elif c == '\\' and i + 1 < n:
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+            continue
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return ''.join(out)
+
+
+def compile_rule(line: str) -> Optional[Tuple["re.Pattern", bool, bool]]:
+    """
+    Compiles one ignore-file line into (regex, negate, dir_only).
+    Returns None for blank lines and comments.
+    """
+    line = line.rstrip('\n').rstrip('\r')
+    # Trailing spaces are ignored unless escaped
+    if not line.endswith('\\ '):
+        line = line.rstrip(' ')
+    if not line or line.startswith('#'):
+        return None
+
+    negate = False
+    if line.startswith('!'):
+        negate = True
+        line = line[1:]
+    elif line.startswith('\\!') or line.startswith('\\#'):
+        line = line[1:]
+
+    dir_only = line.endswith('/')
+    line = line.rstrip('/')
+    if not line:
+        return None
+
+    # A slash at the start or in the middle anchors the rule to the root
+    anchored = '/' in line
+    line = line.lstrip('/')
+    body = _translate(line)
+    if anchored:
+        regex = '^' + body + '$'
+    else:
+        regex = '^(?:.*/)?' + body + '$'
+    return re.compile(regex), negate, dir_only
+
+
+class IgnoreRules:
+    """
+    Ordered set of compiled ignore rules for one project root.
+    Paths are project-relative, '/'-separated.
+    """
+    def __init__(self, lines: Iterable[str] = ()):
+        self.rules: List[Tuple["re.Pattern", bool, bool]] = []
+        self.add_lines(lines)
+
+    def add_lines(self, lines: Iterable[str]):
+        for line in lines:
+            rule = compile_rule(line)
+            if rule:
+                self.rules.append(rule)
+
+    @classmethod
+    def from_root(cls, project_root: str, file_names: Iterable[str] = IGNORE_FILE_NAMES) -> "IgnoreRules":
+        rules = cls()
+        for name in file_names:
+            path = os.path.join(project_root, name)
+            try:
+                with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                    rules.add_lines(f)
+            except OSError:
+                continue
+        return rules
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def is_ignored(self, rel_path: str, is_dir: bool = False) -> bool:
+        """
+        Checks the path itself against the rules (last match wins).
+        Parent directories are not checked: the walker never descends
+        into an ignored directory, which gives the gitignore semantics
+        that files inside an excluded directory cannot be re-included.
+        """
+        if not self.rules:
+            return False
+        if os.sep != '/':
+            rel_path = rel_path.replace(os.sep, '/')
+        for regex, negate, dir_only in reversed(self.rules):
+            if dir_only and not is_dir:
+                continue
+            if regex.match(rel_path):
+                return not negate
+        return False
+
+    def is_path_ignored(self, rel_path: str) -> bool:
+        """Checks a file path including all of its parent directories."""
+        parts = rel_path.replace(os.sep, '/').split('/')
+        for depth in range(1, len(parts)):
+            if self.is_ignored('/'.join(parts[:depth]), is_dir=True):
+                return True
+        return self.is_ignored(rel_path, is_dir=False)
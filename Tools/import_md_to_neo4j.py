@@ -15,8 +15,12 @@ if __name__ == "__main__" and __package__ is None:
 
 try:
     from Tools.db_config import get_driver, close_driver, WORKSPACE_ROOT
+    from Tools.embedding_queue import MARK_DIRTY
+    from Tools.graph_version import bump_all
 except ImportError:
     from db_config import get_driver, close_driver, WORKSPACE_ROOT
+    from embedding_queue import MARK_DIRTY
+    from graph_version import bump_all
 
 GRAPH_EXPORT = Path(WORKSPACE_ROOT) / "Graph_Export"
 
@@ -205,7 +209,7 @@ def import_md_files():
                 session.run(f"""
                     UNWIND $batch AS node
                     MERGE (n:{safe_label} {{uid: node.uid}})
-                    SET n += node.props
+                    SET n += node.props, {MARK_DIRTY}
                 """, batch=batch)
                 created += len(batch)
         print(f"✅ Created {created} nodes")
@@ -279,6 +283,8 @@ def import_md_files():
 
         print(f"✅ Created {linked} relationships")
     
+    # Every project may have changed: cached read-only answers are invalidated
+    bump_all(driver)
     close_driver()
     print("\n" + "="*70)
     print("✅ IMPORT COMPLETE")
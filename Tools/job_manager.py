@@ -0,0 +1,249 @@
+"""
+Background jobs for long-running tools (map_codebase, sync_graph, refresh_knowledge).
+
+The tool call only submits a job and returns its id; a thread runs it:
+
+    job = jobs.submit("map_codebase", project_id, project_root, {"full": True})
+    ... job_status(job_id) / job_cancel(job_id)
+
+Every job is a JSON file in .graphmcp/jobs/<id>.json:
+    {id, kind, project_id, project_root, args, state, created, started, finished,
+     progress: {done, total, unit, eta_seconds}, partial: {...}, checkpoint: {...},
+     result, error, resumes}
+The file is rewritten on state changes, on checkpoints, and at most every
+`save_interval` seconds on progress.
+
+A runner is `fn(ctx: JobContext) -> result dict`. It reports progress through
+the context; `ctx.progress()` is also the cancellation point (raises
+JobCancelled). A runner stores what it needs to continue in the checkpoint.
+When the server restarts, jobs left queued/running are started again
+(`resume()`) with their last saved checkpoint. Runners must therefore be safe
+to repeat from a checkpoint (at-least-once).
+"""
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+ACTIVE_STATES = ("queued", "running")
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobContext:
+    def __init__(self, manager: "JobManager", job: Dict):
+        self.manager = manager
+        self.job = job
+        self.cancel_event = threading.Event()
+        self._rate_start = None  # (monotonic time, done) of this run's first progress report
+        self._last_save = 0.0
+
+    @property
+    def args(self) -> Dict:
+        return self.job["args"]
+
+    @property
+    def checkpoint(self) -> Dict:
+        return self.job["checkpoint"]
+
+    def check_cancel(self):
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+    def progress(self, done: int, total: Optional[int] = None, unit: Optional[str] = None, **partial):
+        """Progress counters (+ partial results). ETA from this run's rate. Raises JobCancelled."""
+        now = time.monotonic()
+        with self.manager.lock:
+            progress = self.job["progress"]
+            progress["done"] = done
+            if total is not None:
+                progress["total"] = total
+            if unit:
+                progress["unit"] = unit
+            if self._rate_start is None:
+                self._rate_start = (now, done)
+            started, done0 = self._rate_start
+            total = progress.get("total")
+            if total and done > done0 and now > started:
+                progress["eta_seconds"] = round(max(0, total - done) * (now - started) / (done - done0), 1)
+            self.job["partial"].update(partial)
+        if now - self._last_save >= self.manager.save_interval:
+            self._last_save = now
+            self.manager.save(self.job)
+        self.check_cancel()
+
+    def save_checkpoint(self, **data):
+        """Stores resume data and persists the job immediately."""
+        with self.manager.lock:
+            self.job["checkpoint"].update(data)
+        self.manager.save(self.job)
+        self.check_cancel()
+
+
+class JobManager:
+    def __init__(self, jobs_dir: str, keep: int = 100, save_interval: float = 1.0,
+                 thread_init: Optional[Callable[[], None]] = None):
+        self.jobs_dir = jobs_dir
+        self.thread_init = thread_init      # called first in every job thread (e.g. lower_priority)
+        self.keep = keep                    # finished jobs kept on disk
+        self.save_interval = save_interval
+        self.lock = threading.RLock()
+        self.runners: Dict[str, Callable[[JobContext], Dict]] = {}
+        self.jobs: Dict[str, Dict] = {}
+        self.contexts: Dict[str, JobContext] = {}
+        self.threads: Dict[str, threading.Thread] = {}
+        self._load()
+
+    # --- persistence ---
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, f"{job_id}.json")
+
+    def _load(self):
+        if not os.path.isdir(self.jobs_dir):
+            return
+        for name in os.listdir(self.jobs_dir):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.jobs_dir, name), "r", encoding="utf-8") as f:
+                    job = json.load(f)
+                self.jobs[job["id"]] = job
+            except Exception as e:
+                print(f"⚠️ Failed to load job {name}: {e}", file=sys.stderr)
+
+    def save(self, job: Dict):
+        with self.lock:
+            data = json.dumps(job, ensure_ascii=False, default=str)
+        try:
+            os.makedirs(self.jobs_dir, exist_ok=True)
+            tmp = self._path(job["id"]) + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp, self._path(job["id"]))
+        except Exception as e:
+            print(f"⚠️ Failed to save job {job['id']}: {e}", file=sys.stderr)
+
+    def _prune(self):
+        with self.lock:
+            finished = sorted((j for j in self.jobs.values() if j["state"] not in ACTIVE_STATES),
+                              key=lambda j: j["created"])
+            for job in finished[:max(0, len(finished) - self.keep)]:
+                del self.jobs[job["id"]]
+                try:
+                    os.remove(self._path(job["id"]))
+                except OSError:
+                    pass
+
+    # --- API ---
+
+    def register(self, kind: str, runner: Callable[[JobContext], Dict]):
+        self.runners[kind] = runner
+
+    def submit(self, kind: str, project_id: Optional[str], project_root: Optional[str] = None,
+               args: Optional[Dict] = None) -> Dict:
+        """Starts a job. An active job of the same kind and project is returned instead of starting a second one."""
+        if kind not in self.runners:
+            raise ValueError(f"Unknown job kind '{kind}'")
+        with self.lock:
+            for job in self.jobs.values():
+                if job["kind"] == kind and job["project_id"] == project_id and job["state"] in ACTIVE_STATES:
+                    return job
+            job = {"id": f"JOB-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}", "kind": kind,
+                   "project_id": project_id, "project_root": project_root, "args": args or {},
+                   "state": "queued", "created": time.time(), "started": None, "finished": None,
+                   "progress": {"done": 0, "total": None, "unit": None, "eta_seconds": None},
+                   "partial": {}, "checkpoint": {}, "result": None, "error": None, "resumes": 0}
+            self.jobs[job["id"]] = job
+        self.save(job)
+        self._start(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return json.loads(json.dumps(job, default=str)) if job else None
+
+    def list(self, project_id: Optional[str] = None, limit: int = 20) -> List[Dict]:
+        with self.lock:
+            jobs = [j for j in self.jobs.values() if project_id is None or j["project_id"] == project_id]
+            jobs.sort(key=lambda j: j["created"], reverse=True)
+            return [json.loads(json.dumps(j, default=str)) for j in jobs[:limit]]
+
+    def cancel(self, job_id: str) -> Optional[Dict]:
+        """Requests cancellation; the runner stops at its next progress report."""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if not job:
+                return None
+            if job["state"] in ACTIVE_STATES:
+                context = self.contexts.get(job_id)
+                if context:
+                    context.cancel_event.set()
+                else:
+                    self._finish(job, "cancelled")
+        return self.get(job_id)
+
+    def resume(self) -> List[str]:
+        """Restarts jobs interrupted by a shutdown, from their last checkpoint."""
+        resumed = []
+        with self.lock:
+            for job in self.jobs.values():
+                if job["state"] in ACTIVE_STATES and job["id"] not in self.threads and job["kind"] in self.runners:
+                    job["state"] = "queued"
+                    job["resumes"] += 1
+                    resumed.append(job)
+        for job in resumed:
+            self.save(job)
+            self._start(job)
+        return [job["id"] for job in resumed]
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict]:
+        thread = self.threads.get(job_id)
+        if thread:
+            thread.join(timeout)
+        return self.get(job_id)
+
+    # --- execution ---
+
+    def _start(self, job: Dict):
+        context = JobContext(self, job)
+        thread = threading.Thread(target=self._run, args=(context,), name=f"job-{job['id']}", daemon=True)
+        with self.lock:
+            self.contexts[job["id"]] = context
+            self.threads[job["id"]] = thread
+        thread.start()
+
+    def _run(self, context: JobContext):
+        job = context.job
+        if self.thread_init:
+            self.thread_init()
+        with self.lock:
+            job["state"], job["started"] = "running", time.time()
+        self.save(job)
+        print(f"🏗️ Job {job['id']} ({job['kind']}, {job['project_id']}) started", file=sys.stderr)
+        try:
+            result = self.runners[job["kind"]](context)
+            self._finish(job, "done", result=result)
+        except JobCancelled:
+            self._finish(job, "cancelled")
+        except Exception as e:
+            self._finish(job, "failed", error=str(e))
+        finally:
+            with self.lock:
+                self.contexts.pop(job["id"], None)
+                self.threads.pop(job["id"], None)
+        self._prune()
+
+    def _finish(self, job: Dict, state: str, result: Optional[Dict] = None, error: Optional[str] = None):
+        with self.lock:
+            job["state"], job["finished"] = state, time.time()
+            job["result"], job["error"] = result, error
+            job["progress"]["eta_seconds"] = None
+        self.save(job)
+        print(f"🏁 Job {job['id']} ({job['kind']}) {state}{': ' + error if error else ''}", file=sys.stderr)
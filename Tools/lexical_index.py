@@ -0,0 +1,163 @@
+"""
+Local BM25 inverted index for keyword / identifier search.
+
+Complements the embedding search: exact identifiers (function names, UIDs,
+file names) rank first, and search keeps working while the transformer
+model is loading or unavailable.
+
+- tokenizer: Latin/Cyrillic words and digits, lower-cased (ё -> е);
+  identifiers are also split on snake_case / camelCase / dashes, and the
+  whole identifier is kept as its own token ("get_driver" -> get_driver, get, driver)
+- fields: uid, title, name (code symbols) weighted x3; description, content, path x1
+- incremental: `upsert` / `remove` touch only that node's postings;
+  bulk writers (map_codebase, watcher) `mark_stale` and the index reloads lazily;
+  the server also reloads it when another process bumped a graph version
+  (server.get_lexical, graph_version.VersionWatermark)
+- `rrf_fuse` merges ranked lists (e.g. BM25 + vector) by reciprocal rank fusion
+"""
+import math
+import re
+import sys
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+WORD_RE = re.compile(r"[0-9A-Za-zА-Яа-яЁё_\-\.]+")
+PART_RE = re.compile(r"[А-ЯЁ]?[а-яё]+|[А-ЯЁ]+(?![а-яё])|[A-Z]?[a-z]+|[A-Z]+(?![a-z])|[0-9]+")
+FIELD_WEIGHTS = {"uid": 3, "title": 3, "name": 3, "description": 1, "content": 1, "path": 1}
+K1 = 1.2
+B = 0.75
+RRF_K = 60
+
+LOAD_QUERY = """
+MATCH (n) WHERE n.uid IS NOT NULL AND NOT (n:Action OR n:Constraint OR n:NodeType)
+RETURN n.uid AS uid, labels(n)[0] AS type, n.project_id AS project_id,
+       n.title AS title, n.name AS name, n.description AS description,
+       n.content AS content, n.path AS path
+"""
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    tokens = []
+    for word in WORD_RE.findall(str(text)):
+        word = word.strip("-._")
+        if not word:
+            continue
+        parts = PART_RE.findall(word)
+        whole = word.lower().replace("ё", "е")
+        if len(parts) != 1 or parts[0] != word:
+            tokens.append(whole)  # full identifier: exact lookups rank first
+        tokens.extend(p.lower().replace("ё", "е") for p in parts)
+    return tokens
+
+
+def rrf_fuse(rankings: Sequence[Sequence[str]], k: int = RRF_K) -> List[Tuple[str, float]]:
+    """Reciprocal rank fusion of ranked uid lists: score(uid) = sum 1 / (k + rank)."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, uid in enumerate(ranking, 1):
+            scores[uid] = scores.get(uid, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: -item[1])
+
+
+class LexicalIndex:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.loaded = False
+        self.stale = False
+        self._reset()
+
+    def _reset(self):
+        self.postings: Dict[str, Dict[str, int]] = {}   # term -> {uid: weighted tf}
+        self.doc_terms: Dict[str, Counter] = {}
+        self.doc_len: Dict[str, int] = {}
+        self.doc_meta: Dict[str, Tuple[Optional[str], Optional[str]]] = {}  # uid -> (type, project_id)
+        self.total_len = 0
+
+    # --- lifecycle ---
+
+    def load(self, driver):
+        records, _, _ = driver.execute_query(LOAD_QUERY, database_="neo4j")
+        with self.lock:
+            self._reset()
+            for r in records:
+                self._add(r["uid"], r["type"], r["project_id"], r)
+            self.loaded = True
+            self.stale = False
+        print(f"🔤 Lexical index loaded: {len(self.doc_len)} docs, {len(self.postings)} terms", file=sys.stderr)
+
+    def mark_stale(self):
+        self.stale = True
+
+    def ensure_fresh(self, driver) -> "LexicalIndex":
+        if not self.loaded or self.stale:
+            self.load(driver)
+        return self
+
+    # --- incremental updates ---
+
+    def _add(self, uid: str, node_type: Optional[str], project_id: Optional[str], fields):
+        terms = Counter()
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(fields.get(field)):
+                terms[token] += weight
+        self.doc_terms[uid] = terms
+        self.doc_len[uid] = sum(terms.values())
+        self.doc_meta[uid] = (node_type, project_id)
+        self.total_len += self.doc_len[uid]
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[uid] = tf
+
+    def _drop(self, uid: str):
+        terms = self.doc_terms.pop(uid, None)
+        if terms is None:
+            return
+        for term in terms:
+            docs = self.postings.get(term)
+            if docs:
+                docs.pop(uid, None)
+                if not docs:
+                    del self.postings[term]
+        self.total_len -= self.doc_len.pop(uid, 0)
+        self.doc_meta.pop(uid, None)
+
+    def upsert(self, uid: str, node_type: Optional[str], project_id: Optional[str] = None, **fields):
+        """(Re)indexes one node; fields: title, name, description, content, path."""
+        with self.lock:
+            if not self.loaded:
+                return  # picked up by the first load
+            self._drop(uid)
+            self._add(uid, node_type, project_id, dict(fields, uid=uid))
+
+    def remove(self, uid: str):
+        with self.lock:
+            self._drop(uid)
+
+    # --- search ---
+
+    def search(self, query: str, project_id: Optional[str] = None, types: Optional[Iterable[str]] = None,
+               limit: int = 20) -> List[Tuple[str, float]]:
+        """BM25 over the query tokens; nodes of project_id or global (project_id NULL)."""
+        types = set(types) if types else None
+        with self.lock:
+            n_docs = len(self.doc_len)
+            if not n_docs:
+                return []
+            avgdl = self.total_len / n_docs
+            scores: Dict[str, float] = {}
+            for term in set(tokenize(query)):
+                docs = self.postings.get(term)
+                if not docs:
+                    continue
+                idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+                for uid, tf in docs.items():
+                    node_type, node_project = self.doc_meta[uid]
+                    if project_id is not None and node_project not in (project_id, None):
+                        continue
+                    if types is not None and node_type not in types:
+                        continue
+                    norm = tf + K1 * (1 - B + B * self.doc_len[uid] / avgdl)
+                    scores[uid] = scores.get(uid, 0.0) + idf * tf * (K1 + 1) / norm
+            return sorted(scores.items(), key=lambda item: -item[1])[:limit]
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Поиск семантических дубликатов по всем эмбеддингам графа (batch job).
+
+В отличие от проверки в create_concept (одна нода за раз), ловит и дубликаты,
+пришедшие через import_md_to_neo4j.py / watcher:
+- все эмбеддинги загружаются одним запросом в матрицу (numpy, cosine);
+- пары выше порога ищутся блочным умножением матриц (block x block);
+- для очень больших графов: --lsh (random hyperplane LSH) сужает кандидатов
+  до пар, совпавших хотя бы в одной полосе сигнатуры;
+- отчёт ранжирован по similarity, отдельно для каждого проекта
+  (глобальные ноды сравниваются со всеми проектами);
+- сравниваются только векторы одной модели (n.embedding_model).
+
+Только чтение: ничего не удаляет.
+
+Usage:
+    python find_near_duplicates.py [--threshold=0.92] [--top=50] [--lsh] [--output=report.md]
+"""
+import os
+import sys
+import time
+from collections import defaultdict
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)  # Tools/
+sys.path.append(parent_dir)
+
+try:
+    from db_config import get_driver, close_driver
+    from embedding_models import DEFAULT_MODEL
+except ImportError:
+    sys.path.append(os.path.dirname(parent_dir))
+    from Tools.db_config import get_driver, close_driver
+    from Tools.embedding_models import DEFAULT_MODEL
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_THRESHOLD = 0.92
+BLOCK_SIZE = 1024
+LSH_BANDS = 16
+LSH_ROWS = 8
+
+LOAD_QUERY = """
+MATCH (n)
+WHERE n.embedding IS NOT NULL AND n.uid IS NOT NULL
+RETURN n.uid as uid, n.title as title, labels(n)[0] as type, n.project_id as project_id, n.embedding as embedding,
+       coalesce(n.embedding_model, $default_model) as model
+"""
+
+
+def normalized_matrix(vectors):
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def blocked_pairs(matrix, threshold, block=BLOCK_SIZE):
+    """All (i, j, score) with i < j and cosine >= threshold, one block x block product at a time."""
+    n = len(matrix)
+    pairs = []
+    for i0 in range(0, n, block):
+        left = matrix[i0:i0 + block]
+        for j0 in range(i0, n, block):
+            scores = left @ matrix[j0:j0 + block].T
+            if j0 == i0:
+                scores = np.triu(scores, k=1)  # each pair once, no self-pairs
+            rows, cols = np.nonzero(scores >= threshold)
+            pairs.extend((i0 + r, j0 + c, float(scores[r, c])) for r, c in zip(rows.tolist(), cols.tolist()))
+    return pairs
+
+
+def lsh_pairs(matrix, threshold, bands=LSH_BANDS, rows=LSH_ROWS, seed=0):
+    """Candidate pairs from random-hyperplane signatures (same bucket in any band), then exact scores."""
+    rng = np.random.default_rng(seed)
+    planes = rng.standard_normal((matrix.shape[1], bands * rows)).astype(np.float32)
+    bits = (matrix @ planes) > 0
+    candidates = set()
+    for band in range(bands):
+        buckets = defaultdict(list)
+        keys = np.packbits(bits[:, band * rows:(band + 1) * rows], axis=1)
+        for i, key in enumerate(map(bytes, keys)):
+            buckets[key].append(i)
+        for members in buckets.values():
+            for a in range(len(members)):
+                for b in range(a + 1, len(members)):
+                    candidates.add((members[a], members[b]))
+    if not candidates:
+        return []
+    left, right = map(np.asarray, zip(*candidates))
+    scores = np.einsum("ij,ij->i", matrix[left], matrix[right])
+    keep = scores >= threshold
+    return list(zip(left[keep].tolist(), right[keep].tolist(), scores[keep].tolist()))
+
+
+def python_pairs(vectors, threshold):
+    """Fallback without numpy (small graphs only)."""
+    unit = []
+    for v in vectors:
+        norm = sum(x * x for x in v) ** 0.5 or 1.0
+        unit.append([x / norm for x in v])
+    pairs = []
+    for i in range(len(unit)):
+        for j in range(i + 1, len(unit)):
+            score = sum(a * b for a, b in zip(unit[i], unit[j]))
+            if score >= threshold:
+                pairs.append((i, j, score))
+    return pairs
+
+
+def find_pairs(records, threshold, use_lsh=False):
+    vectors = [r["embedding"] for r in records]
+    if np is None:
+        return python_pairs(vectors, threshold)
+    matrix = normalized_matrix(vectors)
+    return lsh_pairs(matrix, threshold) if use_lsh else blocked_pairs(matrix, threshold)
+
+
+def project_groups(records):
+    """project_id -> record indices (each project + the global nodes); global-only under None."""
+    by_project = defaultdict(list)
+    for i, r in enumerate(records):
+        by_project[r["project_id"]].append(i)
+    global_nodes = by_project.get(None, [])
+    groups = {p: members + global_nodes for p, members in by_project.items() if p is not None}
+    groups[None] = global_nodes
+    return groups
+
+
+def model_groups(records):
+    """Records per embedding model (vectors of different models are not comparable)."""
+    by_model = defaultdict(list)
+    for r in records:
+        by_model[r["model"]].append(r)
+    return list(by_model.values())
+
+
+def find_near_duplicates(records, threshold=DEFAULT_THRESHOLD, use_lsh=False):
+    """{project_id: [(score, record_a, record_b)] sorted by score desc}."""
+    report = {}
+    for model_records in model_groups(records):
+        for project, members in project_groups(model_records).items():
+            group = [model_records[i] for i in members]
+            pairs = []
+            for i, j, score in find_pairs(group, threshold, use_lsh):
+                a, b = group[i], group[j]
+                if project is not None and a["project_id"] is None and b["project_id"] is None:
+                    continue  # global-only pairs are reported once, under (global)
+                pairs.append((score, a, b))
+            if pairs:
+                report.setdefault(project, []).extend(pairs)
+    return {project: sorted(pairs, key=lambda p: -p[0]) for project, pairs in report.items()}
+
+
+def format_report(report, threshold, top):
+    lines = [f"# Near-duplicate report (cosine >= {threshold})", ""]
+    if not report:
+        lines.append("✅ Дубликатов не найдено")
+    for project in sorted(report, key=lambda p: (p is None, p or "")):
+        pairs = report[project]
+        lines.append(f"## {project or '(global)'}: {len(pairs)} pairs")
+        for score, a, b in pairs[:top]:
+            lines.append(f"- {score:.3f}  [{a['type']}] {a['uid']}: {a['title'] or 'N/A'}"
+                         f"  ⇄  [{b['type']}] {b['uid']}: {b['title'] or 'N/A'}")
+        if len(pairs) > top:
+            lines.append(f"- ... and {len(pairs) - top} more")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def main():
+    threshold, top, output = DEFAULT_THRESHOLD, 50, None
+    for arg in sys.argv[1:]:
+        if arg.startswith("--threshold="):
+            threshold = float(arg.split("=", 1)[1])
+        elif arg.startswith("--top="):
+            top = int(arg.split("=", 1)[1])
+        elif arg.startswith("--output="):
+            output = arg.split("=", 1)[1]
+    use_lsh = "--lsh" in sys.argv
+
+    driver = get_driver()
+    started = time.time()
+    records, _, _ = driver.execute_query(LOAD_QUERY, {"default_model": DEFAULT_MODEL}, database_="neo4j")
+    loaded = time.time()
+    print(f"🧠 Loaded {len(records)} embeddings in {loaded - started:.2f}s")
+
+    report = find_near_duplicates(records, threshold, use_lsh)
+    print(f"🔍 Scanned in {time.time() - loaded:.2f}s ({'LSH prefilter' if use_lsh else 'blocked matmul'})")
+
+    text = format_report(report, threshold, top)
+    print(text)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"📝 Report written to {output}")
+    close_driver()
+
+
+if __name__ == "__main__":
+    main()
@@ -35,7 +35,7 @@ def main():
         filename = os.path.basename(path)
         
         # Используем логику маппера
-        if mapper._should_ignore(path, filename):
+        if mapper._should_ignore(path, filename) or mapper.ignore_rules.is_path_ignored(path):
             nodes_to_delete.append(r)
             print(f"  🔍 Будет удален: {path}")
 
@@ -0,0 +1,122 @@
+"""
+Passage-level embeddings for long node content.
+
+Node embeddings cover only "title description"; long `content` bodies are
+split into overlapping passages (cut at whitespace), embedded in batches and
+stored on the node next to their character offsets:
+
+    n.passage_starts  = [int, ...]
+    n.passage_ends    = [int, ...]
+    n.passage_vectors = [float, ...]   (passages x dim, row-major; Neo4j has no nested lists)
+    n.passage_hash    = sha1(content)  (unchanged bodies are not re-embedded)
+
+Readers (illuminate_path, get_full_context) score the stored passages against
+the query vector and show only the best slices of `content`.
+"""
+import hashlib
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+PASSAGE_SIZE = 600
+PASSAGE_OVERLAP = 150
+ENCODE_BATCH = 32
+
+PASSAGE_KEYS = ("passage_starts", "passage_ends", "passage_vectors", "passage_hash")
+
+WRITE_QUERY = """
+UNWIND $rows AS row
+MATCH (n {uid: row.uid})
+SET n.passage_starts = row.starts, n.passage_ends = row.ends,
+    n.passage_vectors = row.vectors, n.passage_hash = row.hash
+"""
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+def chunk_spans(text: str, size: int = PASSAGE_SIZE, overlap: int = PASSAGE_OVERLAP) -> List[Tuple[int, int]]:
+    """(start, end) character spans of overlapping passages, cut at whitespace where possible."""
+    n = len(text)
+    if n <= size:
+        return [(0, n)] if text.strip() else []
+    spans = []
+    start = 0
+    while start < n:
+        end = min(start + size, n)
+        if end < n:
+            cut = max(text.rfind("\n", start + size // 2, end), text.rfind(" ", start + size // 2, end))
+            if cut > start:
+                end = cut
+        spans.append((start, end))
+        if end >= n:
+            break
+        nxt = max(end - overlap, start + 1)
+        space = text.find(" ", nxt, end)
+        start = space + 1 if space != -1 else nxt
+    return spans
+
+
+def build_rows(nodes: Sequence[Dict], encode_batch: Callable[[List[str]], Optional[List[List[float]]]],
+               batch_size: int = ENCODE_BATCH) -> List[Dict]:
+    """
+    nodes: [{uid, content, passage_hash}]. Returns write rows for nodes whose content changed,
+    embedding all their passages in batches of `batch_size` texts.
+    """
+    pending = []
+    for node in nodes:
+        content = node.get("content") or ""
+        digest = content_hash(content)
+        if digest == node.get("passage_hash"):
+            continue
+        pending.append((node["uid"], content, digest, chunk_spans(content)))
+
+    texts = [content[s:e] for _, content, _, spans in pending for s, e in spans]
+    vectors = []
+    for i in range(0, len(texts), batch_size):
+        encoded = encode_batch(texts[i:i + batch_size])
+        if encoded is None:
+            return []  # model unavailable: try again on the next refresh
+        vectors.extend(encoded)
+
+    rows, offset = [], 0
+    for uid, _, digest, spans in pending:
+        node_vectors = vectors[offset:offset + len(spans)]
+        offset += len(spans)
+        rows.append({
+            "uid": uid,
+            "starts": [s for s, _ in spans],
+            "ends": [e for _, e in spans],
+            "vectors": [x for vec in node_vectors for x in vec],
+            "hash": digest,
+        })
+    return rows
+
+
+def refresh_passages(driver, nodes: Sequence[Dict], encode_batch, batch_size: int = ENCODE_BATCH,
+                     nodes_per_write: int = 64) -> int:
+    """(Re)embeds passages of changed nodes, one UNWIND write per `nodes_per_write` nodes. Returns nodes written."""
+    written = 0
+    for i in range(0, len(nodes), nodes_per_write):
+        rows = build_rows(nodes[i:i + nodes_per_write], encode_batch, batch_size)
+        if rows:
+            driver.execute_query(WRITE_QUERY, {"rows": rows}, database_="neo4j")
+        written += len(rows)
+    return written
+
+
+def top_passages(content: Optional[str], starts, ends, flat_vectors, query_vec, k: int = 1,
+                 min_score: float = 0.0) -> List[Tuple[float, int, int, str]]:
+    """Best k (score, start, end, text) passages of content for query_vec (dot product)."""
+    if not content or not starts or not flat_vectors or not query_vec:
+        return []
+    dim = len(flat_vectors) // len(starts)
+    if dim != len(query_vec):
+        return []  # stored with another model
+    scored = []
+    for i, (s, e) in enumerate(zip(starts, ends)):
+        vec = flat_vectors[i * dim:(i + 1) * dim]
+        score = sum(a * b for a, b in zip(vec, query_vec))
+        if score >= min_score:
+            scored.append((score, s, e, content[s:e]))
+    scored.sort(key=lambda p: -p[0])
+    return scored[:k]
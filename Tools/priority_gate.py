@@ -0,0 +1,101 @@
+"""
+Priority between interactive tool calls and bulk background work.
+
+Agents wait on interactive calls (look_around, move_to, ...). Embedding
+batches, AST parsing and Markdown rendering only need to finish eventually.
+All of them share the same cores, so:
+
+- every MCP tool call runs inside `gate.interactive()`;
+- bulk work calls `gate.pause()` between batches (embedding queue and model
+  migration batches, map_codebase write transactions, watcher windows).
+  While interactive calls are running, pause() blocks until they finish.
+  The wait is capped at `max_wait` per pause, so sustained traffic slows
+  bulk work down but never starves it. Work that goes item by item
+  (sync_graph renders one node at a time) uses `gate.pacer()`: at most one
+  pause per `slice_seconds` of work, not one per item;
+- bulk threads and parser processes run at a lower OS priority
+  (`lower_priority()`: nice on Linux, per thread), so when both run, the
+  kernel picks the interactive thread first;
+- the parser pool leaves one core free (codebase_mapper.default_worker_count).
+"""
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+BULK_NICENESS = 10
+# pacer(): bulk work runs at least this long between two pauses
+BULK_SLICE_SECONDS = 0.5
+
+
+def lower_priority(niceness: int = BULK_NICENESS):
+    """
+    Lowers the calling thread's priority (Linux: nice is per thread). Elsewhere only
+    a main thread (e.g. a parser process) is reniced: nice there is per process.
+    """
+    try:
+        if sys.platform.startswith("linux") and hasattr(threading, "get_native_id"):
+            tid = threading.get_native_id()
+            current = os.getpriority(os.PRIO_PROCESS, tid)
+            os.setpriority(os.PRIO_PROCESS, tid, max(current, min(19, niceness)))
+        elif threading.current_thread() is threading.main_thread():
+            os.nice(niceness)
+    except (AttributeError, OSError):
+        pass  # not supported / not permitted: run at normal priority
+
+
+class PriorityGate:
+    def __init__(self, max_wait: float = 1.0):
+        self.max_wait = max_wait
+        self.cond = threading.Condition()
+        self.interactive_running = 0
+        self.interactive_total = 0
+        self.pauses = 0          # bulk pauses that had to wait
+        self.pause_seconds = 0.0
+
+    @contextmanager
+    def interactive(self):
+        """Wraps an interactive tool call: bulk work holds back at its next pause()."""
+        with self.cond:
+            self.interactive_running += 1
+            self.interactive_total += 1
+        try:
+            yield
+        finally:
+            with self.cond:
+                self.interactive_running -= 1
+                if not self.interactive_running:
+                    self.cond.notify_all()
+
+    def pause(self):
+        """Called by bulk work between batches: waits (at most max_wait) while interactive calls run."""
+        with self.cond:
+            if not self.interactive_running:
+                return
+            started = time.monotonic()
+            self.cond.wait_for(lambda: not self.interactive_running, timeout=self.max_wait)
+            self.pauses += 1
+            self.pause_seconds += time.monotonic() - started
+
+    def pacer(self, slice_seconds: float = BULK_SLICE_SECONDS) -> "Pacer":
+        """pause() for per-item loops: yields once per time slice of work."""
+        return Pacer(self, slice_seconds)
+
+    def metrics(self) -> dict:
+        return {"interactive_running": self.interactive_running, "interactive_total": self.interactive_total,
+                "bulk_pauses_total": self.pauses, "bulk_pause_seconds_total": round(self.pause_seconds, 6)}
+
+
+class Pacer:
+    """Callable for per-item bulk loops: calls gate.pause() only when slice_seconds of work have passed since the last one."""
+    def __init__(self, gate: PriorityGate, slice_seconds: float = BULK_SLICE_SECONDS):
+        self.gate = gate
+        self.slice_seconds = slice_seconds
+        self.next_pause = time.monotonic() + slice_seconds
+
+    def __call__(self):
+        if time.monotonic() < self.next_pause:
+            return
+        self.gate.pause()
+        self.next_pause = time.monotonic() + self.slice_seconds
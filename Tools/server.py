@@ -3,9 +3,13 @@ import mcp.types as types
 from db_config import get_driver, WORKSPACE_ROOT
 from graph_sync import GraphSync
 import constraint_primitives as primitives
+import asyncio
+import functools
+import hashlib
 import os
 import re
 import sys
+import time
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 try:
     from codebase_mapper import CodebaseMapper
@@ -13,99 +17,318 @@ except ImportError:
     # Fallback to prevent crash if file not found immediately
     CodebaseMapper = None
     print("⚠️ Warning: CodebaseMapper module not found (codebase_mapper.py).", file=sys.stderr)
+try:
+    from code_watcher import CodeWatcher
+except ImportError:
+    CodeWatcher = None
+
+from graph_topology import TopologyMirror
+from graph_components import ComponentIndex, ROOT_UID
+from graph_hierarchy import HierarchyIndex
+from graph_impact import ImpactIndex
+from similarity_index import SimilarityIndex
+from lexical_index import LexicalIndex, rrf_fuse
+from passage_chunker import PASSAGE_KEYS, top_passages
+from embedding_queue import EmbeddingQueue, MARK_DIRTY, QUEUE_KEYS, SEMANTIC_MATCH
+from embedding_models import ModelRegistry, ModelMigrator, MODELS, DEFAULT_MODEL, MODEL_KEYS, MODEL_MATCH
+import graph_version
+from graph_version import ResponseCache
+from single_flight import SingleFlight
+from tool_scheduler import ToolScheduler
+from job_manager import JobManager
+from priority_gate import PriorityGate, lower_priority
+from agent_sessions import AgentStateStore, current_agent, resolve_agent_id, is_ephemeral, DEFAULT_AGENT_ID
+
+# Watch mode: project_id -> running CodeWatcher
+CODE_WATCHERS = {}
 
 # Initialize MCP Server
 mcp = Server("graph-native-core")
 sync_tool = GraphSync()
 
-# --- PHASE 8: MULTI-PROJECT STATE ---
-STATE_FILE = os.path.join(os.path.dirname(__file__), ".active_project_state")
+# In-memory topology mirror (CSR) for traversal-heavy tools.
+# Kept current by the mutation hooks below; bulk writers mark it stale.
+topology = TopologyMirror(snapshot_path=os.path.join(WORKSPACE_ROOT, ".graphmcp", "topology.bin"))
+# Union-find components on top of the mirror (find_orphans)
+components = ComponentIndex(topology)
+# Memoized DECOMPOSES ancestor/descendant closures (illuminate_path)
+hierarchy = HierarchyIndex(topology)
+# Memoized reverse-reachability sets (analyze_impact)
+impact_index = ImpactIndex(topology)
+# Graph versions the mirror reflects: a bump by another writer (importer, GraphSync.push_file_to_db) reloads it
+topology_versions = graph_version.VersionWatermark()
+
+def get_topology():
+    """Fresh topology mirror, or None if it cannot be loaded (callers fall back to Cypher)."""
+    try:
+        return topology_versions.ensure_current(topology, get_driver())
+    except Exception as e:
+        print(f"⚠️ Topology mirror unavailable: {e}", file=sys.stderr)
+        return None
+
+# Per-project embedding model selection (n.embedding_model tags, online migrations)
+model_registry = ModelRegistry(os.path.join(WORKSPACE_ROOT, ".graphmcp", "embedding_models.json"))
+
+# Precomputed top-k semantic neighbours (n.knn_uids / n.knn_scores), maintained in the background.
+# One index per embedding model: vectors of different models are never compared.
+similarity_indexes = {}
+
+def similarity_for(model):
+    index = similarity_indexes.get(model)
+    if index is None:
+        # setdefault: two tool threads asking at once share one index
+        index = similarity_indexes.setdefault(model, SimilarityIndex(model=model, default_model=DEFAULT_MODEL))
+    return index
+
+def get_similarity(project_id=None):
+    """Loaded similarity index for the project's model, or None (callers fall back to a full similarity scan)."""
+    try:
+        return similarity_for(model_registry.active(project_id)).start(get_driver)
+    except Exception as e:
+        print(f"⚠️ Similarity index unavailable: {e}", file=sys.stderr)
+        return None
+
+# BM25 keyword index (title/description/content/code names); bulk writers mark it stale,
+# writes from other processes (importer, GraphSync.push_file_to_db) are caught by the version check
+lexical = LexicalIndex()
+lexical_versions = graph_version.VersionWatermark()
 
-def load_project_state():
-    """Loads active project state from file persistence."""
-    default_state = {"id": "graphmcp", "root": WORKSPACE_ROOT, "workflow": "Architect"}
+def get_lexical():
+    """Fresh lexical index, or None if it cannot be loaded."""
     try:
-        import json
-        if os.path.exists(STATE_FILE):
-            with open(STATE_FILE, 'r') as f:
-                state = json.load(f)
-                # Ensure all keys exist (migration support)
-                if "workflow" not in state: state["workflow"] = "Architect"
-                return state
+        return lexical_versions.ensure_current(lexical, get_driver())
     except Exception as e:
-        print(f"⚠️ Failed to load project state: {e}", file=sys.stderr)
-    return default_state
+        print(f"⚠️ Lexical index unavailable: {e}", file=sys.stderr)
+        return None
+
+def invalidate_code_indexes(stats=None):
+    """Bulk code writes (map_codebase, watcher): in-memory indexes reload lazily."""
+    topology.mark_stale()
+    lexical.mark_stale()
+
+# Read-only tool answers keyed by graph version (GraphVersion nodes, bumped by every writer).
+# Mirror-backed answers (find_orphans, illuminate_path) qualify because get_topology() reloads
+# the mirror once any writer outside this server moved a version (topology_versions).
+response_cache = ResponseCache()
+CACHEABLE_TOOLS = {"look_around", "read_node", "explain_physics", "find_orphans", "get_full_context", "illuminate_path"}
+# read_node of a mapped Class/Function reads its slice from disk (+ body_hash stale check): an edit on disk
+# does not bump the graph version, so these answers are never cached
+CODE_SYMBOL_PREFIXES = ("CLASS-", "FUNC-")
+# Concurrent identical calls of these share one computation (run off the event loop)
+READ_ONLY_TOOLS = CACHEABLE_TOOLS | {"look_for_similar", "analyze_impact", "find_path"}
+in_flight = SingleFlight()
+
+# Reads run in parallel; writers are serialized per project or per touched uid set
+tool_scheduler = ToolScheduler()
+# Interactive tool calls go first: bulk work (embeddings, mapping, rendering) pauses between batches
+priority_gate = PriorityGate()
+UID_WRITE_TOOLS = {"create_concept", "register_task", "link_nodes", "delete_link", "delete_node", "update_node", "move_to"}
+
+def write_lock_keys(name, arguments, loc_uid):
+    """Keys a mutating tool touches; None = the whole project (project/workflow switches, job submission)."""
+    if name not in UID_WRITE_TOOLS:
+        return None
+    keys = {arguments.get(k) for k in ("uid", "source_uid", "target_uid")}
+    if name == "create_concept":
+        # New node hangs under the current location; same type+title = same uid
+        keys |= {loc_uid, f"new:{arguments.get('type')}:{arguments.get('title')}"}
+    elif name == "register_task":
+        keys.add(f"new:Task:{arguments.get('title')}")
+    elif name == "move_to":
+        keys.add(f"@agent:{get_current_agent_id()}")
+    return keys
+
+def metrics_text():
+    """Prometheus text for /metrics: scheduler lanes, response cache, single-flight, priority gate."""
+    return tool_scheduler.prometheus() + "".join(
+        f"graphmcp_priority_{name} {value}\n" for name, value in priority_gate.metrics().items()) + (
+        f"graphmcp_response_cache_entries {len(response_cache.entries)}\n"
+        f"graphmcp_response_cache_hits_total {response_cache.hits}\n"
+        f"graphmcp_response_cache_misses_total {response_cache.misses}\n"
+        f"graphmcp_single_flight_in_flight {in_flight.in_flight()}\n"
+        f"graphmcp_single_flight_shared_total {in_flight.shared}\n"
+    )
 
-def save_project_state(project_id, project_root, workflow):
-    """Persists active project state."""
+def bump_graph_version(project_ids=(), uids=(), with_neighbors=False):
+    """After a write: bump the current project, `project_ids` (None = global) and the scopes of `uids`."""
+    try:
+        bumped = graph_version.bump(get_driver(), [get_current_project_id(), *project_ids], uids, with_neighbors)
+        # Server writers update the in-memory indexes themselves: their bumps do not force a reload
+        topology_versions.produced(bumped)
+        lexical_versions.produced(bumped)
+    except Exception as e:
+        # Versions could not move: cached answers may be stale, drop them all
+        print(f"⚠️ Graph version bump failed, response cache cleared: {e}", file=sys.stderr)
+        response_cache.clear()
+
+def is_cacheable(name, arguments):
+    if name == "read_node" and str(arguments.get("uid") or "").startswith(CODE_SYMBOL_PREFIXES):
+        return False
+    return name in CACHEABLE_TOOLS
+
+def response_cache_key(name, arguments, loc_uid):
+    """(tool, args, location, workflow, project, versions), or None if the versions cannot be read."""
+    project_id = get_current_project_id()
     try:
-        import json
-        with open(STATE_FILE, 'w') as f:
-            json.dump({"id": project_id, "root": project_root, "workflow": workflow}, f)
+        versions = graph_version.current(get_driver(), project_id)
     except Exception as e:
-        print(f"⚠️ Failed to save project state: {e}", file=sys.stderr)
+        print(f"⚠️ Graph version unavailable, response not cached: {e}", file=sys.stderr)
+        return None
+    return (name, graph_version.normalize_args(arguments), loc_uid, get_current_workflow(), project_id, versions)
+
+SIMILAR_DETAILS_QUERY = """
+UNWIND $uids AS suid
+MATCH (n {uid: suid})
+RETURN n.uid as uid, n.title as title, labels(n)[0] as type
+"""
+
+# create_concept duplicate check without the similarity index: full scan over the project's model vectors
+DUPLICATE_SCAN_QUERY = f"""
+MATCH (n)
+WHERE n.embedding IS NOT NULL AND n.uid <> $new_uid
+    AND (n:Idea OR n:Spec OR n:Requirement OR n:Task OR n:Domain)
+    AND (n.project_id = $project_id OR n.project_id IS NULL)
+    AND {MODEL_MATCH}
+WITH n, REDUCE(s = 0.0, i IN RANGE(0, size(n.embedding)-1) | s + n.embedding[i] * $emb[i]) as score
+WHERE score > 0.6
+RETURN n.uid as uid, score
+ORDER BY score DESC LIMIT 3
+"""
 
-# Initialize State
-_initial_state = load_project_state()
-ACTIVE_PROJECT_ID = _initial_state["id"]
-ACTIVE_PROJECT_ROOT = _initial_state["root"]
-ACTIVE_WORKFLOW = _initial_state["workflow"]
-print(f"🚀 ACTIVE PROJECT: {ACTIVE_PROJECT_ID} (Root: {ACTIVE_PROJECT_ROOT}) | Workflow: {ACTIVE_WORKFLOW}", file=sys.stderr)
+def precomputed_similar(uid, project_id, min_score, limit):
+    """Top neighbours of uid from the similarity index as records (uid/title/type/score), or None."""
+    index = get_similarity(project_id)
+    neighbors = index.neighbors(uid, project_id=project_id, min_score=min_score, limit=limit) if index else None
+    if neighbors is None:
+        return None
+    if not neighbors:
+        return []
+    records, _, _ = get_driver().execute_query(SIMILAR_DETAILS_QUERY, {"uids": [u for u, _ in neighbors]}, database_="neo4j")
+    details = {r["uid"]: r for r in records}
+    return [{"uid": u, "title": details[u]["title"], "type": details[u]["type"], "score": score}
+            for u, score in neighbors if u in details]
+
+# --- PHASE 8: MULTI-PROJECT STATE (per agent: project, root, workflow) ---
+# The agent of the calling session comes from the current_agent context variable (see agent_sessions.py)
+agent_states = AgentStateStore(
+    os.path.join(WORKSPACE_ROOT, ".graphmcp", "agents.json"),
+    default={"id": "graphmcp", "root": WORKSPACE_ROOT, "workflow": "Architect"},
+    legacy_path=os.path.join(os.path.dirname(__file__), ".active_project_state"),
+)
+_initial_state = agent_states.get(DEFAULT_AGENT_ID)
+print(f"🚀 ACTIVE PROJECT ({DEFAULT_AGENT_ID}): {_initial_state['id']} (Root: {_initial_state['root']}) | Workflow: {_initial_state['workflow']}", file=sys.stderr)
+
+def get_current_agent_id():
+    return current_agent.get()
 
 def get_current_project_id():
-    return ACTIVE_PROJECT_ID
+    return agent_states.get(current_agent.get())["id"]
 
 def get_current_project_root():
-    return ACTIVE_PROJECT_ROOT
+    return agent_states.get(current_agent.get())["root"]
 
 def get_current_workflow():
-    return ACTIVE_WORKFLOW
+    return agent_states.get(current_agent.get())["workflow"]
 
 def set_current_project(project_id: str, project_root: str):
-    global ACTIVE_PROJECT_ID, ACTIVE_PROJECT_ROOT, ACTIVE_WORKFLOW
-    ACTIVE_PROJECT_ID = project_id
-    ACTIVE_PROJECT_ROOT = project_root
-    # Preserve current workflow when switching project
-    save_project_state(project_id, project_root, ACTIVE_WORKFLOW)
-    
-    print(f"🔄 Switched to project: {ACTIVE_PROJECT_ID} at {ACTIVE_PROJECT_ROOT}", file=sys.stderr)
+    # Preserves the agent's current workflow
+    state = agent_states.update(current_agent.get(), id=project_id, root=project_root)
+    print(f"🔄 [{current_agent.get()}] Switched to project: {state['id']} at {state['root']}", file=sys.stderr)
 
 def set_workflow_state(mode: str):
-    global ACTIVE_PROJECT_ID, ACTIVE_PROJECT_ROOT, ACTIVE_WORKFLOW
-    if mode not in ["Architect", "Builder", "Auditor"]:
-        raise ValueError(f"Invalid workflow mode: {mode}")
-    
-    ACTIVE_WORKFLOW = mode
-    save_project_state(ACTIVE_PROJECT_ID, ACTIVE_PROJECT_ROOT, mode)
-    print(f"🔄 Switched Workflow to: {ACTIVE_WORKFLOW}", file=sys.stderr)
-    
-    print(f"🔄 Switched to project: {ACTIVE_PROJECT_ID} at {ACTIVE_PROJECT_ROOT}", file=sys.stderr)
+    state = agent_states.update(current_agent.get(), workflow=mode)
+    print(f"🔄 [{current_agent.get()}] Switched Workflow to: {state['workflow']} (project {state['id']})", file=sys.stderr)
+
+def forget_agent(agent_id: str):
+    """An ephemeral session ended: drop its state and its Agent node (location)."""
+    agent_states.forget(agent_id)
+    try:
+        get_driver().execute_query("MATCH (a:Agent {id: $agent_id}) DETACH DELETE a", {"agent_id": agent_id}, database_="neo4j")
+    except Exception as e:
+        print(f"⚠️ Failed to remove agent {agent_id}: {e}", file=sys.stderr)
 
 # --- EMBEDDING MANAGER (LIGHTWEIGHT) ---
 class EmbeddingManager:
+    """Loaded sentence-transformers models by name (registry: embedding_models.MODELS)."""
     _instance = None
-    _model = None
+    _models = {}
 
     @classmethod
-    def get_model(cls):
-        if cls._model is None:
+    def get_model(cls, name=None):
+        name = name or DEFAULT_MODEL
+        if name not in cls._models:
             try:
                 from sentence_transformers import SentenceTransformer
-                print("🧠 Loading Embedding Model (all-MiniLM-L6-v2)...", file=sys.stderr)
-                cls._model = SentenceTransformer('all-MiniLM-L6-v2')
+                print(f"🧠 Loading Embedding Model ({name})...", file=sys.stderr)
+                cls._models[name] = SentenceTransformer(name)
             except Exception as e:
-                print(f"❌ Error loading model: {e}", file=sys.stderr)
+                print(f"❌ Error loading model {name}: {e}", file=sys.stderr)
                 return None
-        return cls._model
+        return cls._models[name]
 
     @classmethod
-    def get_embedding(cls, text):
-        model = cls.get_model()
-        if not model: return None
-        return model.encode(text).tolist()
+    def get_embedding(cls, text, model=None):
+        encoder = cls.get_model(model)
+        if not encoder: return None
+        return encoder.encode(text).tolist()
+
+    @classmethod
+    def get_embeddings(cls, texts, batch_size=32, model=None):
+        """Batch encode (one model call for many passages)."""
+        encoder = cls.get_model(model)
+        if not encoder: return None
+        return encoder.encode(list(texts), batch_size=batch_size).tolist()
+
+def project_embedding(text, project_id):
+    """Query vector in the project's embedding model (compare only with MODEL_MATCH vectors)."""
+    return emb_manager.get_embedding(text, model=model_registry.active(project_id))
 
 emb_manager = EmbeddingManager()
 
+# Durable re-embedding queue (n.embedding_dirty marks), drained by a background worker
+embedding_queue = EmbeddingQueue(
+    emb_manager.get_embeddings,
+    on_embedded=lambda uid, emb, project_id, model: similarity_for(model).upsert(uid, emb, project_id),
+    on_batch=lambda project_ids: bump_graph_version(project_ids),
+    registry=model_registry,
+    pause=priority_gate.pause,
+)
+
+def kick_embedding_queue():
+    """Writers marked nodes dirty: wake the re-embedding worker."""
+    embedding_queue.start(get_driver).notify()
+
+def on_embedding_cutover(project_id, old_model, new_model):
+    """A project switched models: its nodes moved between similarity indexes; passages are re-queued."""
+    for model in (old_model, new_model):
+        index = similarity_indexes.get(model)
+        if index and index.loaded:
+            index.load(get_driver())
+    bump_graph_version([project_id])
+    kick_embedding_queue()
+
+# Background re-embedding into n.embedding_next for projects switching models (set_embedding_model)
+migrator = ModelMigrator(model_registry, emb_manager.get_embeddings, on_cutover=on_embedding_cutover,
+                         pause=priority_gate.pause)
+
+# Long-running tools (map_codebase, sync_graph, refresh_knowledge) run as background jobs,
+# persisted in .graphmcp/jobs and resumed from their checkpoint after a restart
+jobs = JobManager(os.path.join(WORKSPACE_ROOT, ".graphmcp", "jobs"), thread_init=lower_priority)
+JOB_TOOLS = {"job_status", "job_cancel"}  # bookkeeping only: never wait behind the project's writers
+SYNC_CHECKPOINT_EVERY = 100  # nodes
+
+def format_seconds(seconds) -> str:
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+
+def job_started_text(job) -> list[types.TextContent]:
+    return [types.TextContent(type="text", text=f"🏗️ Job **{job['id']}** ({job['kind']}, project {job['project_id']}) is {job['state']}.\n"
+                                                f"Call job_status with job_id='{job['id']}' for progress, ETA and results; job_cancel to stop it.")]
+
 # --- MIDDLEWARE: THE LENS (META-GRAPH IMPLEMENTATION) ---
 def get_allowed_tool_names(context_node_type):
     """
@@ -166,16 +389,16 @@ def get_node_type(uid):
 
 def get_agent_location():
     """
-    Returns the UID of the node where the Agent is currently located.
-    Checks for persisted (:Agent)-[:LOCATED_AT]->(node) relationship.
+    Returns the UID of the node where the session's Agent is currently located.
+    Checks for persisted (:Agent {id})-[:LOCATED_AT]->(node) relationship.
     Defaults to 'IDEA-Genesis' if no location is found.
     """
     driver = get_driver()
     if not driver: return "IDEA-Genesis" # Emergency fallback
 
-    # 1. Try to find LOCATED_AT relationship for yuri_agent
-    query = "MATCH (:Agent {id: 'yuri_agent'})-[:LOCATED_AT]->(n) RETURN n.uid as uid"
-    records, _, _ = driver.execute_query(query, database_="neo4j")
+    # 1. Try to find LOCATED_AT relationship for the session's agent
+    query = "MATCH (:Agent {id: $agent_id})-[:LOCATED_AT]->(n) RETURN n.uid as uid"
+    records, _, _ = driver.execute_query(query, {"agent_id": get_current_agent_id()}, database_="neo4j")
     
     if records:
         return records[0]['uid']
@@ -299,7 +522,23 @@ def check_action_permission(tool_name: str, arguments: dict) -> tuple[bool, str]
         return False, f"❌ VALIDATION ERROR: Failed to check permissions: {e}"
 
 # --- TOOL IMPLEMENTATIONS ---
-async def tool_look_around(arguments: dict) -> list[types.TextContent]:
+def off_loop(fn):
+    """
+    Blocking tool body (Neo4j, disk, model calls) -> async handler that runs it in a worker
+    thread: the event loop keeps accepting and scheduling other calls meanwhile. No event loop
+    exists in that thread, so bodies must not use loop-bound objects. `handler.sync` is the
+    plain function, for calls from inside another body.
+    Bodies share the in-memory indexes across threads: lock order in graph_topology.py.
+    """
+    @functools.wraps(fn)
+    async def handler(arguments: dict) -> list[types.TextContent]:
+        # to_thread copies contextvars: the session's agent (current_agent) follows the call
+        return await asyncio.to_thread(fn, arguments)
+    handler.sync = fn
+    return handler
+
+@off_loop
+def tool_look_around(arguments: dict) -> list[types.TextContent]:
     """
     ENHANCED DASHBOARD: Returns comprehensive context for Agent decision-making.
     
@@ -430,14 +669,30 @@ async def tool_look_around(arguments: dict) -> list[types.TextContent]:
     # === 5. RELATED REQUIREMENTS (2 hops) with description ===
     current_project = get_current_project_id()
     
-    req_query = """
-    MATCH (n {uid: $uid})-[*1..2]-(r:Requirement)
-    WHERE (r.project_id = $project_id OR r.project_id IS NULL)
-    RETURN DISTINCT r.uid as uid, r.title as title, 
-           SUBSTRING(COALESCE(r.description, ''), 0, 100) as desc
-    LIMIT 5
-    """
-    req_rec, _, _ = driver.execute_query(req_query, {"uid": loc_uid, "project_id": current_project}, database_="neo4j")
+    mirror = get_topology()
+    if mirror:
+        # 2-hop BFS in memory, then one indexed lookup for the display fields
+        in_scope = set(mirror.nodes("Requirement", current_project))
+        hops = mirror.within_hops(loc_uid, 2)
+        req_uids = sorted((u for u in hops if u in in_scope), key=lambda u: (hops[u], u))[:5]
+        req_query = """
+        UNWIND $uids AS uid
+        MATCH (r:Requirement {uid: uid})
+        RETURN r.uid as uid, r.title as title,
+               SUBSTRING(COALESCE(r.description, ''), 0, 100) as desc
+        """
+        req_rec, _, _ = driver.execute_query(req_query, {"uids": req_uids}, database_="neo4j") if req_uids else ([], None, None)
+        order = {u: i for i, u in enumerate(req_uids)}
+        req_rec = sorted(req_rec, key=lambda r: order[r['uid']])
+    else:
+        req_query = """
+        MATCH (n {uid: $uid})-[*1..2]-(r:Requirement)
+        WHERE (r.project_id = $project_id OR r.project_id IS NULL)
+        RETURN DISTINCT r.uid as uid, r.title as title, 
+               SUBSTRING(COALESCE(r.description, ''), 0, 100) as desc
+        LIMIT 5
+        """
+        req_rec, _, _ = driver.execute_query(req_query, {"uid": loc_uid, "project_id": current_project}, database_="neo4j")
     
     if req_rec:
         output_parts.append("📋 **RELATED REQUIREMENTS** (within 2 hops)")
@@ -465,7 +720,8 @@ async def tool_look_around(arguments: dict) -> list[types.TextContent]:
     
     return [types.TextContent(type="text", text="\n".join(output_parts))]
 
-async def tool_move_to(arguments: dict) -> list[types.TextContent]:
+@off_loop
+def tool_move_to(arguments: dict) -> list[types.TextContent]:
     """
     Moves Agent to a neighbor node.
     After successful move, automatically returns look_around context.
@@ -486,7 +742,7 @@ async def tool_move_to(arguments: dict) -> list[types.TextContent]:
 
     # 2. Move Agent (Atomic Transaction)
     move_query = """
-    MERGE (a:Agent {id: 'yuri_agent'})
+    MERGE (a:Agent {id: $agent_id})
     WITH a
     MATCH (target {uid: $uid})
     OPTIONAL MATCH (a)-[r:LOCATED_AT]->(old)
@@ -494,11 +750,11 @@ async def tool_move_to(arguments: dict) -> list[types.TextContent]:
     CREATE (a)-[:LOCATED_AT]->(target)
     """
     try:
-        driver.execute_query(move_query, {"uid": target_uid}, database_="neo4j")
+        driver.execute_query(move_query, {"uid": target_uid, "agent_id": get_current_agent_id()}, database_="neo4j")
         
         # 3. AUTO-REFRESH: Return look_around context for new location
         # This is like a camera following the player in a game
-        look_result = await tool_look_around({})
+        look_result = tool_look_around.sync({})
         
         move_confirmation = f"✅ **MOVED TO:** {target_uid} ({target_type}: {target_title})\n"
         move_confirmation += "=" * 50 + "\n\n"
@@ -651,7 +907,8 @@ def validate_physics_constraints(text: str):
     if cyrillic_count / len(clean_text) < 0.25:
         raise ValueError("PHYSICS ERROR: Language Violation. Content must be primarily in Russian (REQ-Russian_Language).")
 
-async def tool_create_concept(arguments: dict) -> list[types.TextContent]:
+@off_loop
+def tool_create_concept(arguments: dict) -> list[types.TextContent]:
     """
     Creates a new high-level node (Spec, Req, etc.) and syncs to Markdown.
     Used by Agent to build the graph.
@@ -725,28 +982,24 @@ async def tool_create_concept(arguments: dict) -> list[types.TextContent]:
         n.description = $desc,
         n.status = 'Draft',
         n.created_at = datetime(),
-        n.project_id = $project_id
+        n.project_id = $project_id,
+        {MARK_DIRTY}
     MERGE (parent)-[:DECOMPOSES]->(n)
     RETURN n.uid as uid
     """
     try:
-        # Generate Semantic Embedding
-        semantic_text = f"{title} {desc}"
-        embedding = emb_manager.get_embedding(semantic_text)
-
+        # Embedding is computed by the background queue (n.embedding_dirty)
         _, _, _ = driver.execute_query(
             query_create, 
             {"parent_uid": parent_uid, "uid": uid, "title": title, "desc": desc, "project_id": current_project}, 
             database_="neo4j"
         )
         
-        # Save Embedding if successful
-        if embedding:
-            driver.execute_query(
-                "MATCH (n {uid: $uid}) SET n.embedding = $emb",
-                {"uid": uid, "emb": embedding},
-                database_="neo4j"
-            )
+        topology.add_node(uid, [c_type], current_project)
+        topology.add_edge(parent_uid, "DECOMPOSES", uid)
+        lexical.upsert(uid, c_type, current_project, title=title, description=desc)
+        bump_graph_version(uids=[uid, parent_uid])
+        kick_embedding_queue()
 
         # Sync new node AND parent (because parent now has a new connection)
         file_path = sync_tool.sync_node(uid, sync_connected=True)
@@ -758,37 +1011,46 @@ async def tool_create_concept(arguments: dict) -> list[types.TextContent]:
         impact_report.append(f"   Title: {title}")
         impact_report.append(f"   Synced to: {file_path}\n")
         
-        # 1. Check for semantically similar nodes (possible duplicates)
+        # 1. Check for similar nodes (possible duplicates): semantic + keyword, fused by rank.
+        # The node's own vector is written later by the queue, so the text is encoded as a query here.
+        impact_report.append("🔍 **ПОХОЖИЕ НОДЫ** (возможные дубликаты)")
+        vector_scores = {}
+        embedding = project_embedding(f"{title} {desc}", current_project)
         if embedding:
-            impact_report.append("🔍 **СЕМАНТИЧЕСКИ БЛИЗКИЕ НОДЫ** (возможные дубликаты)")
-            
-            similar_query = """
-            MATCH (n)
-            WHERE n.embedding IS NOT NULL AND n.uid <> $new_uid
-                AND (n:Idea OR n:Spec OR n:Requirement OR n:Task OR n:Domain)
-                AND (n.project_id = $project_id OR n.project_id IS NULL)
-            WITH n, REDUCE(s = 0.0, i IN RANGE(0, size(n.embedding)-1) | s + n.embedding[i] * $emb[i]) as score
-            WHERE score > 0.6
-            RETURN n.uid as uid, n.title as title, labels(n)[0] as type, score
-            ORDER BY score DESC LIMIT 3
-            """
-            
-            similar_rec, _, _ = driver.execute_query(
-                similar_query, 
-                {"new_uid": uid, "emb": embedding, "project_id": current_project}, 
-                database_="neo4j"
-            )
-            
-            if similar_rec:
-                for s in similar_rec:
-                    stype = s["type"]
-                    suid = s["uid"]
-                    stitle = s.get("title", "N/A")
-                    score = s["score"]
-                    impact_report.append(f"   ⚠️  [{stype}] {suid}: {stitle} (Similarity: {score:.3f})")
-                impact_report.append("   💡 Проверьте, не дубликат ли это\n")
-            else:
-                impact_report.append("   (Нет похожих нод)\n")
+            index = get_similarity(current_project)
+            vector_hits = index.search(embedding, project_id=current_project, min_score=0.6, limit=3,
+                                       exclude={uid}) if index else None
+            if vector_hits is None:
+                vector_rec, _, _ = driver.execute_query(
+                    DUPLICATE_SCAN_QUERY,
+                    {"new_uid": uid, "emb": embedding, "project_id": current_project, **model_registry.params(current_project)},
+                    database_="neo4j"
+                )
+                vector_hits = [(r["uid"], r["score"]) for r in vector_rec]
+            vector_scores = dict(vector_hits)
+        lex = get_lexical()
+        keyword_scores = dict((u, score) for u, score in lex.search(
+            f"{title} {desc}", current_project, types=["Idea", "Spec", "Requirement", "Task", "Domain"], limit=4
+        ) if u != uid) if lex else {}
+        fused = rrf_fuse([list(vector_scores), list(keyword_scores)])[:3]
+        similar_rec = []
+        if fused:
+            details_rec, _, _ = driver.execute_query(SIMILAR_DETAILS_QUERY, {"uids": [u for u, _ in fused]}, database_="neo4j")
+            details = {d["uid"]: d for d in details_rec}
+            similar_rec = [details[u] for u, _ in fused if u in details]
+
+        if similar_rec:
+            for s in similar_rec:
+                suid = s["uid"]
+                scores = []
+                if suid in vector_scores:
+                    scores.append(f"Similarity: {vector_scores[suid]:.3f}")
+                if suid in keyword_scores:
+                    scores.append(f"BM25: {keyword_scores[suid]:.2f}")
+                impact_report.append(f"   ⚠️  [{s['type']}] {suid}: {s.get('title', 'N/A')} ({', '.join(scores)})")
+            impact_report.append("   💡 Проверьте, не дубликат ли это\n")
+        else:
+            impact_report.append("   (Нет похожих нод)\n")
         
         # 2. Show applied Constraints
         impact_report.append("⚠️ **ПРИМЕНЁННЫЕ CONSTRAINTS**")
@@ -818,13 +1080,25 @@ async def tool_create_concept(arguments: dict) -> list[types.TextContent]:
         
         # 4. Show related Specs/Requirements in vicinity
         impact_report.append("📋 **ЗАТРОНУТЫЕ ОБЛАСТИ ГРАФА**")
-        related_query = """
-        MATCH path = (new {uid: $uid})-[:DECOMPOSES*1..2]-(related)
-        WHERE related:Spec OR related:Requirement
-        RETURN DISTINCT related.uid as uid, related.title as title, labels(related)[0] as type
-        LIMIT 5
-        """
-        related_rec, _, _ = driver.execute_query(related_query, {"uid": uid}, database_="neo4j")
+        mirror = get_topology()
+        if mirror:
+            nearby = mirror.within_hops(uid, 2, ["DECOMPOSES"])
+            related_uids = sorted((u for u in nearby if mirror.label_of(u) in ("Spec", "Requirement")),
+                                  key=lambda u: (nearby[u], u))[:5]
+            related_query = """
+            UNWIND $uids AS ruid
+            MATCH (related {uid: ruid})
+            RETURN related.uid as uid, related.title as title, labels(related)[0] as type
+            """
+            related_rec, _, _ = driver.execute_query(related_query, {"uids": related_uids}, database_="neo4j") if related_uids else ([], None, None)
+        else:
+            related_query = """
+            MATCH path = (new {uid: $uid})-[:DECOMPOSES*1..2]-(related)
+            WHERE related:Spec OR related:Requirement
+            RETURN DISTINCT related.uid as uid, related.title as title, labels(related)[0] as type
+            LIMIT 5
+            """
+            related_rec, _, _ = driver.execute_query(related_query, {"uid": uid}, database_="neo4j")
         
         if related_rec:
             for r in related_rec:
@@ -845,50 +1119,131 @@ async def tool_create_concept(arguments: dict) -> list[types.TextContent]:
     except Exception as e:
         return [types.TextContent(type="text", text=f"❌ Error creating concept: {e}")]
 
-async def tool_refresh_knowledge(arguments: dict) -> list[types.TextContent]:
+@off_loop
+def tool_refresh_knowledge(arguments: dict) -> list[types.TextContent]:
     """
-    Refreshes semantic embeddings for all nodes in the graph.
+    Refreshes semantic embeddings for all nodes in the graph (background job).
     Useful after bulk imports or manual edits.
     """
+    try:
+        return job_started_text(jobs.submit("refresh_knowledge", get_current_project_id(), get_current_project_root()))
+    except Exception as e:
+        return [types.TextContent(type="text", text=f"❌ Error refreshing knowledge: {e}")]
+
+# Queue every semantic node (embedding_hash cleared: force re-encoding, not just changed texts)
+REFRESH_QUERY = f"""
+MATCH (n)
+WHERE {SEMANTIC_MATCH}
+SET n.embedding_dirty = timestamp(), n.embedding_hash = null
+RETURN count(n) as queued
+"""
+
+def run_refresh_knowledge_job(ctx):
+    """
+    1. Marks every semantic node dirty (once: the marks are durable, a resumed job skips this).
+    2. Drains the queue batch by batch (batched encode + UNWIND writes); the worker shares the same lock.
+    """
+    driver = get_driver()
+    if "queued" not in ctx.checkpoint:
+        records, _, _ = driver.execute_query(REFRESH_QUERY, database_="neo4j")
+        print(f"🧠 Refreshing embeddings for {records[0]['queued']} nodes...", file=sys.stderr)
+        ctx.save_checkpoint(queued=records[0]['queued'])
+    queued = ctx.checkpoint["queued"]
+    totals = {"embedded": ctx.job["partial"].get("embedded", 0), "passages": ctx.job["partial"].get("passages", 0)}
+    while True:
+        ctx.progress(max(0, queued - embedding_queue.pending(driver)), queued, unit="nodes", **totals)
+        stats = embedding_queue.process_batch(driver)
+        if not stats or not stats["nodes"]:
+            break  # done, model unavailable, or every mark rewritten mid-batch (the worker takes over)
+        totals["embedded"] += stats["embedded"]
+        totals["passages"] += stats["passages"]
+    return {**totals, "still_queued": embedding_queue.pending(driver)}
+
+jobs.register("refresh_knowledge", run_refresh_knowledge_job)
+
+
+@off_loop
+def tool_set_embedding_model(arguments: dict) -> list[types.TextContent]:
+    """
+    Per-project embedding model selection.
+    Switching starts a background migration (n.embedding_next) with an atomic cutover at the end.
+    """
+    model = arguments.get("model")
+    current_project = get_current_project_id()
     driver = get_driver()
     if not driver: return [types.TextContent(type="text", text="Error: No Backend Connection")]
     
-    # 1. Fetch all semantic nodes
-    query = """
-    MATCH (n)
-    WHERE (n:Idea OR n:Spec OR n:Requirement OR n:Task OR n:Domain)
-    RETURN n.uid as uid, n.title as title, n.description as description
-    """
     try:
-        records, _, _ = driver.execute_query(query, database_="neo4j")
-        updated_count = 0
-        
-        print(f"🧠 Refreshing embeddings for {len(records)} nodes...", file=sys.stderr)
-        
-        with driver.session(database="neo4j") as session:
-            for rec in records:
-                uid = rec['uid']
-                title = rec.get('title', '') or ''
-                desc = rec.get('description', '') or ''
-                
-                # Re-calculate embedding
-                semantic_text = f"{title} {desc}"
-                embedding = emb_manager.get_embedding(semantic_text)
-                
-                if embedding:
-                    session.run(
-                        "MATCH (n {uid: $uid}) SET n.embedding = $emb",
-                        {"uid": uid, "emb": embedding}
-                    )
-                    updated_count += 1
-                    
-        return [types.TextContent(
-            type="text", 
-            text=f"✅ Knowledge Refreshed. Updated embeddings for {updated_count} nodes."
-        )]
-        
+        if model:
+            running = model_registry.next(current_project)
+            target = model_registry.begin(current_project, model)
+            if target:
+                migrator.start(get_driver).notify()
+            elif running:
+                migrator.cancel(driver, current_project)
+        
+        active = model_registry.active(current_project)
+        target = model_registry.next(current_project)
+        lines = [f"🧠 **EMBEDDING MODELS** (project: {current_project})", ""]
+        for name, info in sorted(MODELS.items()):
+            marker = " ← ACTIVE" if name == active else (" ← MIGRATING TO" if name == target else "")
+            lines.append(f"   • {name} (dim {info['dim']}): {info['note']}{marker}")
+        lines.append("")
+        if target:
+            lines.append(f"🔄 Migration {active} → {target}: {migrator.remaining(driver, current_project)} nodes to re-embed.")
+            lines.append("   Searches use the old vectors until cutover.")
+        elif model and model == active:
+            lines.append(f"✅ {current_project} uses {active}.")
+        lines.append(f"💡 Global nodes (no project) stay on {DEFAULT_MODEL}.")
+        return [types.TextContent(type="text", text="\n".join(lines))]
+    
     except Exception as e:
-        return [types.TextContent(type="text", text=f"❌ Error refreshing knowledge: {e}")]
+        return [types.TextContent(type="text", text=f"❌ Error setting embedding model: {e}")]
+
+
+async def tool_job_status(arguments: dict) -> list[types.TextContent]:
+    """Progress, ETA and (partial) results of a background job; without job_id, the project's recent jobs."""
+    job_id = arguments.get("job_id")
+    if not job_id:
+        recent = jobs.list(get_current_project_id(), limit=10)
+        if not recent:
+            return [types.TextContent(type="text", text="ℹ️ No background jobs for this project.")]
+        lines = ["🏗️ **JOBS**", ""]
+        for job in recent:
+            done, total = job["progress"]["done"], job["progress"]["total"]
+            lines.append(f"   • {job['id']} ({job['kind']}): {job['state']}" + (f", {done}/{total}" if total else ""))
+        return [types.TextContent(type="text", text="\n".join(lines))]
+
+    job = jobs.get(job_id)
+    if not job:
+        return [types.TextContent(type="text", text=f"❌ Job {job_id} not found.")]
+    progress = job["progress"]
+    lines = [f"🏗️ **JOB {job['id']}** ({job['kind']}, project {job['project_id']})",
+             f"State: {job['state']}" + (f" (resumed {job['resumes']}x after restart)" if job["resumes"] else "")]
+    if progress["total"]:
+        percent = 100 * progress["done"] // max(1, progress["total"])
+        line = f"Progress: {progress['done']}/{progress['total']} {progress['unit'] or ''} ({percent}%)"
+        if job["state"] == "running" and progress["eta_seconds"] is not None:
+            line += f", ETA {format_seconds(progress['eta_seconds'])}"
+        lines.append(line)
+    if job["started"]:
+        lines.append(f"Elapsed: {format_seconds((job['finished'] or time.time()) - job['started'])}")
+    if job["partial"]:
+        lines.append("Partial: " + ", ".join(f"{k}={v}" for k, v in job["partial"].items()))
+    if job["result"]:
+        lines.append("✅ Result: " + ", ".join(f"{k}={v}" for k, v in job["result"].items()))
+    if job["error"]:
+        lines.append(f"❌ Error: {job['error']}")
+    return [types.TextContent(type="text", text="\n".join(lines))]
+
+async def tool_job_cancel(arguments: dict) -> list[types.TextContent]:
+    job_id = arguments.get("job_id")
+    job = jobs.cancel(job_id) if job_id else None
+    if not job:
+        return [types.TextContent(type="text", text=f"❌ Job {job_id} not found.")]
+    if job["state"] in ("queued", "running"):
+        return [types.TextContent(type="text", text=f"🛑 Cancellation requested for {job_id}: it stops at its next progress report (work done so far is kept).")]
+    return [types.TextContent(type="text", text=f"ℹ️ Job {job_id} is {job['state']}.")]
 
 
 @mcp.list_tools()
@@ -968,7 +1323,7 @@ async def list_tools() -> list[types.Tool]:
         ),
         types.Tool(
             name="sync_graph",
-            description="Forces a full synchronization of the Neo4j graph into Obsidian Markdown files.",
+            description="Forces a full synchronization of the Neo4j graph into Obsidian Markdown files. Runs as a background job: returns a job id for job_status.",
             inputSchema={"type": "object"}
         ),
         types.Tool(
@@ -1063,10 +1418,14 @@ async def list_tools() -> list[types.Tool]:
         ),
         types.Tool(
             name="map_codebase",
-            description="Scans the active project codebase to create Graph nodes (File, Class, Function). Use this to keep the Graph in sync with Reality.",
+            description="Scans the active project codebase to create Graph nodes (File, Class, Function). Use this to keep the Graph in sync with Reality. Incremental: only files changed since the last run are re-parsed. Runs as a background job: returns a job id for job_status.",
             inputSchema={
                 "type": "object",
-                "properties": {},
+                "properties": {
+                    "full": {"type": "boolean", "description": "Ignore the file manifest and re-parse every file (default: false)"},
+                    "watch": {"type": "boolean", "description": "true: keep the code graph fresh by re-mapping changed files in the background (inotify, polling fallback). false: stop watching."},
+                    "debounce_seconds": {"type": "number", "description": "Watch mode: quiet period before a batch of changes is re-mapped (default: 1.0)"}
+                },
                 "required": []
             }
         ),
@@ -1095,7 +1454,7 @@ async def list_tools() -> list[types.Tool]:
         ),
         types.Tool(
             name="refresh_knowledge",
-            description="Recalculates semantic embeddings for ALL nodes. Use this if you suspect the graph is out of sync with manual file edits.",
+            description="Recalculates semantic embeddings for ALL nodes. Use this if you suspect the graph is out of sync with manual file edits. Runs as a background job: returns a job id for job_status.",
             inputSchema={
                 "type": "object",
                 "properties": {},
@@ -1112,11 +1471,74 @@ async def list_tools() -> list[types.Tool]:
                 },
                 "required": []
             }
+        ),
+        types.Tool(
+            name="analyze_impact",
+            description="Downstream impact analysis: what is affected if this node changes (DECOMPOSES children, IMPLEMENTS and DEPENDS_ON dependents, transitively). Read-only.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "uid": {"type": "string", "description": "Node to analyze (default: current location)"},
+                    "max_depth": {"type": "integer", "description": "Max hops from the node (default: 4)"},
+                    "limit": {"type": "integer", "description": "Max number of affected nodes to list (default: 50)"}
+                },
+                "required": []
+            }
+        ),
+        types.Tool(
+            name="find_path",
+            description="Shortest path between two nodes (hop sequence with titles). Use it to plan a route or move_to the target directly instead of exploring hop by hop. Read-only.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "source_uid": {"type": "string", "description": "Start node (default: current location)"},
+                    "target_uid": {"type": "string", "description": "Destination node"},
+                    "rel_types": {"type": "array", "items": {"type": "string"}, "description": "Relationship types to traverse, either direction (default: all)"},
+                    "max_hops": {"type": "integer", "description": "Give up beyond this many hops (default: 12)"}
+                },
+                "required": ["target_uid"]
+            }
+        ),
+        types.Tool(
+            name="set_embedding_model",
+            description="Shows the embedding model registry, or switches the current project to another model. The switch is an online migration: searches keep using the old vectors until every node is re-embedded, then cut over atomically.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "model": {"type": "string", "enum": sorted(MODELS), "description": "Target model (omit to show status; the active model cancels a running migration)"}
+                }
+            }
+        ),
+        types.Tool(
+            name="job_status",
+            description="Progress counters, ETA and partial results of a background job (map_codebase, sync_graph, refresh_knowledge). Without job_id: recent jobs of the project.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "job_id": {"type": "string", "description": "Job id returned by the tool that started it"}
+                }
+            }
+        ),
+        types.Tool(
+            name="job_cancel",
+            description="Cancels a background job. Work already written is kept; the job stops at its next progress report.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "job_id": {"type": "string"}
+                },
+                "required": ["job_id"]
+            }
         )
     ]
 
 @mcp.call_tool()
 async def call_tool(name: str, arguments: dict) -> list[types.TextContent]:
+    # Every agent call is interactive: background batches hold back until it returns
+    with priority_gate.interactive():
+        return await route_tool_call(name, arguments)
+
+async def route_tool_call(name: str, arguments: dict) -> list[types.TextContent]:
     print(f"DEBUG_TOOL_CALL: name='{name}' arguments={arguments} type={type(arguments)}", file=sys.stderr)
     # --- MIDDLEWARE CHECK ---
     loc_uid = get_agent_location()
@@ -1148,7 +1570,32 @@ async def call_tool(name: str, arguments: dict) -> list[types.TextContent]:
         if not allowed:
             return [types.TextContent(type="text", text=error_msg)]
 
-    # --- DISPATCH ---
+    # --- SCHEDULING: writers wait for conflicting writers of the same project ---
+    project_id = get_current_project_id()
+    if name in JOB_TOOLS:
+        return await dispatch_tool(name, arguments)
+    if name not in READ_ONLY_TOOLS:
+        async with tool_scheduler.writing(project_id, write_lock_keys(name, arguments, loc_uid)):
+            return await dispatch_tool(name, arguments)
+
+    # --- RESPONSE CACHE (read-only tools; a graph version bump changes the key) ---
+    read_key = response_cache_key(name, arguments, loc_uid)
+    cacheable = is_cacheable(name, arguments)
+    if read_key and cacheable:
+        cached = response_cache.get(read_key)
+        if cached is not None:
+            return [types.TextContent(type="text", text=text) for text in cached]
+
+    async with tool_scheduler.reading(project_id):
+        if not read_key:
+            return await dispatch_tool(name, arguments)
+        # --- SINGLE-FLIGHT: identical calls already in flight wait for the same answer ---
+        result = await in_flight.do(read_key, lambda: dispatch_tool(name, arguments))
+    if cacheable and not any(r.text.startswith(("❌", "Error")) for r in result):
+        response_cache.put(read_key, [r.text for r in result])
+    return list(result)
+
+async def dispatch_tool(name: str, arguments: dict) -> list[types.TextContent]:
     if name == "look_around": return await tool_look_around(arguments)
     elif name == "move_to": return await tool_move_to(arguments)
     elif name == "create_concept": return await tool_create_concept(arguments)
@@ -1168,10 +1615,16 @@ async def call_tool(name: str, arguments: dict) -> list[types.TextContent]:
     elif name == "map_codebase": return await tool_map_codebase(arguments)
     elif name == "illuminate_path": return await tool_illuminate_path(arguments)
     elif name == "refresh_knowledge": return await tool_refresh_knowledge(arguments)
+    elif name == "job_status": return await tool_job_status(arguments)
+    elif name == "job_cancel": return await tool_job_cancel(arguments)
     elif name == "find_orphans": return await tool_find_orphans(arguments)
+    elif name == "analyze_impact": return await tool_analyze_impact(arguments)
+    elif name == "find_path": return await tool_find_path(arguments)
+    elif name == "set_embedding_model": return await tool_set_embedding_model(arguments)
     else: return [types.TextContent(type="text", text=f"Error: Unknown tool {name}")]
 
-async def tool_delete_node(arguments: dict) -> list[types.TextContent]:
+@off_loop
+def tool_delete_node(arguments: dict) -> list[types.TextContent]:
     uid = arguments.get("uid")
     if not uid: return [types.TextContent(type="text", text="Error: UID is required")]
     
@@ -1203,8 +1656,16 @@ async def tool_delete_node(arguments: dict) -> list[types.TextContent]:
     # DETACH DELETE removes all relationships as well
     query = "MATCH (n {uid: $uid}) DETACH DELETE n RETURN count(n) as count"
     try:
+        # Scopes of the node and its neighbours, read while they are still connected
+        touched_scopes = graph_version.node_scopes(driver, [uid], with_neighbors=True)
         records, _, _ = driver.execute_query(query, {"uid": uid}, database_="neo4j")
         db_deleted = records[0]['count'] > 0
+        if db_deleted:
+            bump_graph_version(touched_scopes)
+            topology.remove_node(uid)
+            for index in list(similarity_indexes.values()):
+                index.remove(uid)
+            lexical.remove(uid)
         
         # Always attempt to delete file (Clean up ghosts)
         file_deleted = sync_tool.delete_node(uid)
@@ -1224,45 +1685,63 @@ def _propagate_implementation_links(driver, source_uid, target_uid):
     """
     Implementation Echo:
     If a Child (Class/Function) implements a Requirement, 
-    its Parent (File) must also implement it.
+    its Parents (Class -> File -> ...) must also implement it.
+    
+    One variable-length MERGE over all DECOMPOSES ancestors (one round trip
+    regardless of depth). Returns the uids of the touched parents so the
+    caller can flush their exports once.
     """
     query = """
-    MATCH (child {uid: $source_uid})
-    MATCH (child)-[:IMPLEMENTS]->(req {uid: $target_uid})
+    MATCH (child {uid: $source_uid})-[:IMPLEMENTS]->(req {uid: $target_uid})
     
-    // Find parent container (File or Class)
-    MATCH (parent)-[:DECOMPOSES]->(child)
+    // All parent containers up the hierarchy (Class, File, ...)
+    MATCH (parent)-[:DECOMPOSES*1..]->(child)
+    WITH DISTINCT parent, req
     
     // Echo the link up
     MERGE (parent)-[:IMPLEMENTS]->(req)
-    RETURN parent.uid, labels(parent)[0] as type
+    RETURN parent.uid as uid
     """
     try:
         records, _, _ = driver.execute_query(query, 
             {"source_uid": source_uid, "target_uid": target_uid}, 
             database_="neo4j")
-            
-        for r in records:
-            parent_uid = r['parent.uid']
-            # Sync parent to update frontmatter
-            sync_tool.sync_node(parent_uid)
-            
-            # Recursive propagation (if Class inside File)
-            _propagate_implementation_links(driver, parent_uid, target_uid)
-            
     except Exception as e:
         print(f"⚠️ Echo propagation failed: {e}", file=sys.stderr)
+        return []
+    
+    parents = [r['uid'] for r in records if r['uid']]
+    for parent_uid in parents:
+        topology.add_edge(parent_uid, "IMPLEMENTS", target_uid)
+    return parents
 
 
 
-async def tool_sync_graph(arguments: dict) -> list[types.TextContent]:
+@off_loop
+def tool_sync_graph(arguments: dict) -> list[types.TextContent]:
     try:
-        result = sync_tool.sync_all()
-        return [types.TextContent(type="text", text=f"✅ Graph Synchronization Complete. {result}")]
+        return job_started_text(jobs.submit("sync_graph", get_current_project_id(), get_current_project_root()))
     except Exception as e:
         return [types.TextContent(type="text", text=f"❌ Sync Error: {e}")]
 
-async def tool_link_nodes(arguments: dict) -> list[types.TextContent]:
+def run_sync_graph_job(ctx):
+    """Renders every node to Markdown in uid order; the checkpoint is the last rendered uid."""
+    synced = ctx.checkpoint.get("synced", 0)
+    pace = priority_gate.pacer()  # one node per call: yield per time slice, not per node
+
+    def on_progress(done, total, last_uid):
+        pace()
+        if done % SYNC_CHECKPOINT_EVERY == 0 or done == total:
+            ctx.save_checkpoint(last_uid=last_uid, synced=synced + done)
+        ctx.progress(synced + done, synced + total, unit="nodes")
+
+    message = sync_tool.sync_all(on_progress, start_after=ctx.checkpoint.get("last_uid"))
+    return {"synced": ctx.checkpoint.get("synced", synced), "message": f"Graph Synchronization Complete. {message}"}
+
+jobs.register("sync_graph", run_sync_graph_job)
+
+@off_loop
+def tool_link_nodes(arguments: dict) -> list[types.TextContent]:
     source = arguments.get("source_uid")
     target = arguments.get("target_uid")
     rel_type = arguments.get("rel_type")
@@ -1334,21 +1813,62 @@ async def tool_link_nodes(arguments: dict) -> list[types.TextContent]:
         RETURN s.uid, t.uid
         """
         records, _, _ = driver.execute_query(query, {"source": source, "target": target}, database_="neo4j")
+        topology.add_edge(source, rel_type, target)
         
         # 3. Post-Hook: Implementation Echo
+        echoed = []
         if rel_type == "IMPLEMENTS":
-            _propagate_implementation_links(driver, source, target)
+            echoed = _propagate_implementation_links(driver, source, target)
         
-        # Sync both nodes
-        sync_tool.sync_node(source)
-        sync_tool.sync_node(target)
+        bump_graph_version(uids=[source, target] + echoed)
+        # Sync both nodes (+ echoed parents), each exported once
+        sync_tool.sync_nodes([source, target] + echoed)
         
         return [types.TextContent(type="text", text=f"✅ Linked {source} -[:{rel_type}]-> {target}.\nMarkdown files updated.")]
         
     except Exception as e:
         return [types.TextContent(type="text", text=f"❌ Error linking nodes: {e}")]
 
-async def tool_update_node(arguments: dict) -> list[types.TextContent]:
+LINK_REL_TYPES = ["IMPLEMENTS", "DECOMPOSES", "DEPENDS_ON", "CONFLICT", "RELATES_TO"]
+
+@off_loop
+def tool_delete_link(arguments: dict) -> list[types.TextContent]:
+    """
+    Removes a specific relationship (source)-[:rel_type]->(target).
+    Permission per rel_type is checked by the Meta-Graph middleware (ACT-delete_link_*).
+    """
+    source = arguments.get("source_uid")
+    target = arguments.get("target_uid")
+    rel_type = arguments.get("rel_type")
+    
+    if not source or not target or not rel_type:
+        return [types.TextContent(type="text", text="Error: source_uid, target_uid and rel_type are required.")]
+    # rel_type is interpolated into Cypher: whitelist only
+    if rel_type not in LINK_REL_TYPES:
+        return [types.TextContent(type="text", text=f"❌ Error: Unknown rel_type '{rel_type}'. Allowed: {LINK_REL_TYPES}")]
+    
+    driver = get_driver()
+    query = f"""
+    MATCH (s {{uid: $source}})-[r:{rel_type}]->(t {{uid: $target}})
+    DELETE r
+    RETURN count(r) as count
+    """
+    try:
+        records, _, _ = driver.execute_query(query, {"source": source, "target": target}, database_="neo4j")
+        if not records or records[0]['count'] == 0:
+            return [types.TextContent(type="text", text=f"⚠️ No link {source} -[:{rel_type}]-> {target} found.")]
+        topology.remove_edge(source, rel_type, target)
+        bump_graph_version(uids=[source, target])
+        
+        sync_tool.sync_node(source)
+        sync_tool.sync_node(target)
+        
+        return [types.TextContent(type="text", text=f"✅ Removed {source} -[:{rel_type}]-> {target}.\nMarkdown files updated.")]
+    except Exception as e:
+        return [types.TextContent(type="text", text=f"❌ Error deleting link: {e}")]
+
+@off_loop
+def tool_update_node(arguments: dict) -> list[types.TextContent]:
     """
     Updates properties of an existing node.
     Useful for detailed metadata like 'spec_ref', 'priority', 'status', etc.
@@ -1369,17 +1889,21 @@ async def tool_update_node(arguments: dict) -> list[types.TextContent]:
         if any(lbl in ['Action', 'Constraint', 'NodeType'] for lbl in labels):
             return [types.TextContent(type="text", text=f"⛔ IRON DOME SECURITY: Permission Denied. You cannot modify system node {uid} (Type: {labels}). These define the laws of physics.")]
 
-    forbidden_keys = ['uid', 'type', 'created_at', 'embedding', 'project_id']
+    forbidden_keys = ['uid', 'type', 'created_at', 'embedding', 'project_id', *PASSAGE_KEYS, *QUEUE_KEYS, *MODEL_KEYS]
     clean_props = {k: v for k, v in properties.items() if k not in forbidden_keys}
     
     if not clean_props:
         return [types.TextContent(type="text", text=f"Error: No valid properties to update. Forbidden keys: {forbidden_keys}")]
 
+    # Embedded text changed: queue the node for re-embedding (passages included)
+    reembed = any(k in clean_props for k in ('title', 'description', 'content'))
+
     driver = get_driver()
     query = f"""
     MATCH (n {{uid: $uid}})
-    SET n += $props
-    RETURN n.uid, n.title
+    SET n += $props{', ' + MARK_DIRTY if reembed else ''}
+    RETURN n.uid, n.title, labels(n)[0] as type, n.project_id as project_id,
+           n.name as name, n.description as description, n.content as content, n.path as path
     """
     
     try:
@@ -1387,6 +1911,13 @@ async def tool_update_node(arguments: dict) -> list[types.TextContent]:
         
         if not records:
             return [types.TextContent(type="text", text=f"⚠️ Node {uid} not found.")]
+        r = records[0]
+        lexical.upsert(uid, r['type'], r['project_id'], title=r['n.title'], name=r['name'],
+                       description=r['description'], content=r['content'], path=r['path'])
+        # Neighbours show this node's title: their answers change too
+        bump_graph_version(uids=[uid], with_neighbors=True)
+        if reembed:
+            kick_embedding_queue()
             
         # Sync to Markdown
         file_path = sync_tool.sync_node(uid)
@@ -1396,7 +1927,8 @@ async def tool_update_node(arguments: dict) -> list[types.TextContent]:
     except Exception as e:
         return [types.TextContent(type="text", text=f"❌ Error updating node: {e}")]
 
-async def tool_register_task(arguments: dict) -> list[types.TextContent]:
+@off_loop
+def tool_register_task(arguments: dict) -> list[types.TextContent]:
 
     """
     Registers a new Task node from Human's chat message.
@@ -1445,33 +1977,26 @@ async def tool_register_task(arguments: dict) -> list[types.TextContent]:
     driver = get_driver()
     
     # 3. Create Task node (without automatic linking)
-    query_create = """
-    MERGE (n:Task {uid: $uid})
+    query_create = f"""
+    MERGE (n:Task {{uid: $uid}})
     SET n.title = $title,
         n.description = $desc,
         n.status = 'Registered',
-        n.created_at = datetime()
+        n.created_at = datetime(),
+        {MARK_DIRTY}
     RETURN n.uid as uid
     """
     
     try:
-        # Generate Semantic Embedding
-        semantic_text = f"{title} {desc}"
-        embedding = emb_manager.get_embedding(semantic_text)
-
         driver.execute_query(query_create, {
             "uid": uid,
             "title": title,
             "desc": desc
         }, database_="neo4j")
-        
-        # Save Embedding if successful
-        if embedding:
-            driver.execute_query(
-                "MATCH (n {uid: $uid}) SET n.embedding = $emb",
-                {"uid": uid, "emb": embedding},
-                database_="neo4j"
-            )
+        topology.add_node(uid, ["Task"])
+        lexical.upsert(uid, "Task", title=title, description=desc)
+        bump_graph_version(uids=[uid])
+        kick_embedding_queue()
 
         # Sync new node to Markdown
         file_path = sync_tool.sync_node(uid, sync_connected=False)
@@ -1485,7 +2010,8 @@ async def tool_register_task(arguments: dict) -> list[types.TextContent]:
         return [types.TextContent(type="text", text=f"❌ Error registering task: {e}")]
 
 
-async def tool_format_cypher(arguments: dict) -> list[types.TextContent]:
+@off_loop
+def tool_format_cypher(arguments: dict) -> list[types.TextContent]:
     """
     Formats Cypher scripts for Meta-Graph changes.
     ONLY AT HUMAN REQUEST - Agent helps format, Human decides and executes.
@@ -1575,46 +2101,76 @@ CREATE (c)-[:RESTRICTS]->(a);
     )]
 
 
-async def tool_look_for_similar(arguments: dict) -> list[types.TextContent]:
+@off_loop
+def tool_look_for_similar(arguments: dict) -> list[types.TextContent]:
+    """
+    Hybrid search: vector similarity (embedding) + BM25 keyword index,
+    fused by reciprocal rank. Keyword matches alone are used while the
+    model is unavailable.
+    """
     query_text = arguments.get("query")
-    embedding = emb_manager.get_embedding(query_text)
+    current_project = get_current_project_id()
+    embedding = project_embedding(query_text, current_project)
+    lex = get_lexical()
     
-    if not embedding:
+    if not embedding and not lex:
         return [types.TextContent(type="text", text="Error: Semantic search is not available (model failed to load).")]
 
     driver = get_driver()
-    current_project = get_current_project_id()
     
     # Manual Dot Product calculation in Cypher (since we lack vector functions/GDS)
     # Sentence-transformers usually return normalized vectors, so dot product = cosine similarity.
-    vector_search_cypher = """
+    # Only vectors of the project's embedding model are comparable.
+    vector_search_cypher = f"""
     MATCH (n)
     WHERE n.embedding IS NOT NULL 
         AND (n:Idea OR n:Spec OR n:Requirement OR n:Task)
         AND (n.project_id = $project_id OR n.project_id IS NULL)
+        AND {MODEL_MATCH}
     WITH n, REDUCE(s = 0.0, i IN RANGE(0, size(n.embedding)-1) | s + n.embedding[i] * $query_emb[i]) as score
     WHERE score > 0.3
     RETURN n.uid as uid, n.title as title, labels(n)[0] as type, score
-    ORDER BY score DESC LIMIT 10
+    ORDER BY score DESC LIMIT 20
     """
     
     try:
-        driver = get_driver()
-        records, _, _ = driver.execute_query(
-            vector_search_cypher, 
-            {"query_emb": embedding, "project_id": current_project}, 
-            database_="neo4j"
-        )
+        vector_records = []
+        if embedding:
+            vector_records, _, _ = driver.execute_query(
+                vector_search_cypher, 
+                {"query_emb": embedding, "project_id": current_project, **model_registry.params(current_project)}, 
+                database_="neo4j"
+            )
+        keyword_hits = lex.search(query_text, project_id=current_project, limit=20) if lex else []
         
-        if not records:
+        if not vector_records and not keyword_hits:
              return [types.TextContent(type="text", text="No similar nodes found (threshold > 0.3).")]
-             
-        results = [f"- [{r['type']}] {r['uid']}: {r['title']} (Score: {r['score']:.4f})" for r in records]
-        return [types.TextContent(type="text", text="Semantically similar nodes:\n" + "\n".join(results))]
+        
+        vector_scores = {r['uid']: r['score'] for r in vector_records}
+        keyword_scores = dict(keyword_hits)
+        fused = rrf_fuse([list(vector_scores), list(keyword_scores)])[:10]
+        
+        details_rec, _, _ = driver.execute_query(SIMILAR_DETAILS_QUERY, {"uids": [u for u, _ in fused]}, database_="neo4j")
+        details = {r['uid']: r for r in details_rec}
+        
+        results = []
+        for uid, _ in fused:
+            d = details.get(uid)
+            if not d:
+                continue
+            scores = []
+            if uid in vector_scores:
+                scores.append(f"Score: {vector_scores[uid]:.4f}")
+            if uid in keyword_scores:
+                scores.append(f"BM25: {keyword_scores[uid]:.2f}")
+            results.append(f"- [{d['type']}] {uid}: {d['title']} ({', '.join(scores)})")
+        header = "Similar nodes (semantic + keyword):" if embedding else "Keyword matches (semantic search unavailable):"
+        return [types.TextContent(type="text", text=header + "\n" + "\n".join(results))]
     except Exception as e:
         return [types.TextContent(type="text", text=f"Error during semantic search: {e}")]
 
-async def tool_explain_physics(arguments: dict) -> list[types.TextContent]:
+@off_loop
+def tool_explain_physics(arguments: dict) -> list[types.TextContent]:
     """
     Explains why a tool is available or blocked at the current location.
     Introspects the Meta-Graph to provide reasoning and unlock paths.
@@ -1732,7 +2288,8 @@ async def tool_explain_physics(arguments: dict) -> list[types.TextContent]:
 
 
 
-async def tool_get_full_context(arguments: dict) -> list[types.TextContent]:
+@off_loop
+def tool_get_full_context(arguments: dict) -> list[types.TextContent]:
     """
     Gets FULL context for a task:
     - Semantically similar nodes (embeddings)
@@ -1791,23 +2348,28 @@ async def tool_get_full_context(arguments: dict) -> list[types.TextContent]:
         context_parts.append("")
     
     # === 3. SEMANTICALLY SIMILAR NODES ===
-    embedding = emb_manager.get_embedding(f"{loc_type} {loc_title}") # Changed to use loc_type and loc_title
     current_project = get_current_project_id() # Added
+    # Precomputed neighbours of the location node; full scan only if it has no embedding yet
+    sim_rec = precomputed_similar(loc_uid, current_project, min_score=0.4, limit=5)
+    embedding = None if sim_rec is not None else project_embedding(f"{loc_type} {loc_title}", current_project)
     
-    if embedding:
+    if sim_rec is not None or embedding:
         context_parts.append("🧠 **СЕМАНТИЧЕСКИ БЛИЗКИЕ НОДЫ** (top-5)")
         
-        vector_search_cypher = """
+        vector_search_cypher = f"""
         MATCH (n)
         WHERE n.embedding IS NOT NULL AND (n:Idea OR n:Spec OR n:Requirement OR n:Task OR n:Domain)
             AND (n.project_id = $project_id OR n.project_id IS NULL)
+            AND {MODEL_MATCH}
         WITH n, REDUCE(s = 0.0, i IN RANGE(0, size(n.embedding)-1) | s + n.embedding[i] * $query_emb[i]) as score
         WHERE score > 0.4
         RETURN n.uid as uid, n.title as title, labels(n)[0] as type, score
         ORDER BY score DESC LIMIT 5
         """
         
-        sim_rec, _, _ = driver.execute_query(vector_search_cypher, {"query_emb": embedding, "project_id": current_project}, database_="neo4j")
+        if sim_rec is None:
+            sim_rec, _, _ = driver.execute_query(vector_search_cypher, {"query_emb": embedding, "project_id": current_project,
+                                                                        **model_registry.params(current_project)}, database_="neo4j")
         
         if sim_rec:
             for s in sim_rec:
@@ -1842,6 +2404,33 @@ async def tool_get_full_context(arguments: dict) -> list[types.TextContent]:
         context_parts.append("   (Нет связанных Specs/Requirements)")
     context_parts.append("")
     
+    # === 4b. RELEVANT PASSAGES (long content of the nodes above, scored against the query) ===
+    query_embedding = project_embedding(query, current_project) if query else None
+    if query_embedding:
+        candidate_uids = {loc_uid}
+        candidate_uids.update(r["uid"] for r in (sim_rec or []))
+        candidate_uids.update(r["uid"] for r in related_rec)
+        passages_query = f"""
+        UNWIND $uids AS puid
+        MATCH (n {{uid: puid}})
+        WHERE n.passage_starts IS NOT NULL AND {MODEL_MATCH}
+        RETURN n.uid as uid, n.content as content,
+               n.passage_starts as starts, n.passage_ends as ends, n.passage_vectors as vectors
+        """
+        passage_rec, _, _ = driver.execute_query(passages_query, {"uids": list(candidate_uids), **model_registry.params(current_project)},
+                                                 database_="neo4j")
+        best = []
+        for p in passage_rec:
+            for score, start, end, text in top_passages(p["content"], p["starts"], p["ends"], p["vectors"],
+                                                        query_embedding, k=2, min_score=0.3):
+                best.append((score, p["uid"], start, end, text))
+        if best:
+            context_parts.append("📖 **РЕЛЕВАНТНЫЕ ФРАГМЕНТЫ** (top-3 по запросу)")
+            for score, puid, start, end, text in sorted(best, key=lambda b: -b[0])[:3]:
+                context_parts.append(f"   {puid} [{start}:{end}] (relevance {score:.2f}):")
+                context_parts.append(f"      {text}")
+            context_parts.append("")
+    
     # === 5. ACTIVE CONSTRAINTS ===
     context_parts.append("⚠️ **АКТИВНЫЕ CONSTRAINTS** (применяются ко всем actions)")
     
@@ -1893,10 +2482,11 @@ async def tool_get_full_context(arguments: dict) -> list[types.TextContent]:
     return [types.TextContent(type="text", text=full_text)]
 
 
-async def tool_switch_project(arguments: dict) -> list[types.TextContent]:
+@off_loop
+def tool_switch_project(arguments: dict) -> list[types.TextContent]:
     """
-    Switches the active project context.
-    Updates global state (ACTIVE_PROJECT_ID, ACTIVE_PROJECT_ROOT).
+    Switches the active project context of the calling agent.
+    Updates its state (agent_states: project id, root); other sessions keep their project.
     """
     project_id = arguments.get("project_id")
     # For now, we assume root is managed externally or stays same for simple test
@@ -1905,16 +2495,17 @@ async def tool_switch_project(arguments: dict) -> list[types.TextContent]:
     if not project_id:
         return [types.TextContent(type="text", text="Error: project_id is required")]
         
-    # Switch Global State
+    # Switch the agent's state
     # Note: project_root argument can be added later
     set_current_project(project_id, WORKSPACE_ROOT)
     
     return [types.TextContent(type="text", text=f"✅ **SWITCHED PROJECT**\n\nActive Project: `{project_id}`\nRoot: `{WORKSPACE_ROOT}`\n\nAll subsequent queries will be filtered by this project_id.")]
 
 
-async def tool_set_workflow(arguments: dict) -> list[types.TextContent]:
+@off_loop
+def tool_set_workflow(arguments: dict) -> list[types.TextContent]:
     """
-    Sets the agent's active workflow mode.
+    Sets the calling agent's active workflow mode.
     Modes: Architect, Builder, Auditor.
     """
     mode = arguments.get("mode")
@@ -1938,22 +2529,114 @@ async def tool_set_workflow(arguments: dict) -> list[types.TextContent]:
         return [types.TextContent(type="text", text=f"Error: {e}")]
 
 
-async def tool_map_codebase(arguments: dict) -> list[types.TextContent]:
+@off_loop
+def tool_map_codebase(arguments: dict) -> list[types.TextContent]:
     """
     Scans codebase and maps it to Neo4j.
     """
     if not CodebaseMapper:
          return [types.TextContent(type="text", text="Error: CodebaseMapper not loaded. Please ensure Tools/codebase_mapper.py exists.")]
          
-    mapper = CodebaseMapper()
+    project_id = get_current_project_id()
+    if "watch" in arguments:
+        return tool_map_codebase_watch(project_id, bool(arguments["watch"]), arguments)
+
     try:
-        count = mapper.scan_and_map()
-        return [types.TextContent(type="text", text=f"✅ Data Mapped Successfully.\nProcessed {count} nodes (Files, Classes, Functions).\nGraph is now aware of the codebase structure.")]
+        return job_started_text(jobs.submit("map_codebase", project_id, get_current_project_root(),
+                                            {"full": bool(arguments.get("full", False))}))
     except Exception as e:
         return [types.TextContent(type="text", text=f"❌ Error mapping codebase: {e}")]
 
+def run_map_codebase_job(ctx):
+    """
+    Incremental scan of the job's project. The manifest is checkpointed while mapping:
+    a resumed job trusts it and skips every file already written.
+    """
+    project_id = ctx.job["project_id"]
+    resume = bool(ctx.checkpoint.get("manifest_saved"))
+    full = bool(ctx.args.get("full")) and not resume
+    progress = lambda done, total, nodes_written: ctx.progress(done, total, unit="files", nodes_written=nodes_written)
+    checkpoint = lambda: ctx.save_checkpoint(manifest_saved=True)
 
-async def tool_read_node(arguments: dict) -> list[types.TextContent]:
+    watcher = CODE_WATCHERS.get(project_id)
+    if watcher and watcher.is_running():
+        # Share the watcher's mapper/manifest instead of racing it
+        with watcher.lock:
+            mapper = watcher.mapper
+            saved_callback, mapper.progress_callback = mapper.progress_callback, progress
+            try:
+                count = mapper.scan_and_map(full=full, resume=resume, on_checkpoint=checkpoint)
+            finally:
+                mapper.progress_callback = saved_callback
+    else:
+        mapper = CodebaseMapper(ctx.job["project_root"], project_id, progress_callback=progress,
+                                pause=priority_gate.pause)
+        count = mapper.scan_and_map(full=full, resume=resume, on_checkpoint=checkpoint)
+    invalidate_code_indexes()
+    stats = mapper.last_stats
+    return {"nodes": count, **{key: stats.get(key, 0) for key in
+                               ("files_parsed", "files_unchanged", "files_removed", "files_failed", "uids_removed",
+                                "dependency_edges")}}
+
+if CodebaseMapper:
+    jobs.register("map_codebase", run_map_codebase_job)
+
+
+def tool_map_codebase_watch(project_id: str, enable: bool, arguments: dict) -> list[types.TextContent]:
+    """Starts/stops the background CodeWatcher of the active project."""
+    watcher = CODE_WATCHERS.get(project_id)
+    if not enable:
+        if not watcher:
+            return [types.TextContent(type="text", text=f"ℹ️ Watch mode is not active for project '{project_id}'.")]
+        watcher.stop()
+        del CODE_WATCHERS[project_id]
+        return [types.TextContent(type="text", text=f"🛑 Watch mode stopped for project '{project_id}' ({watcher.windows_flushed} change batches mapped).")]
+
+    if not CodeWatcher:
+        return [types.TextContent(type="text", text="Error: code_watcher module not loaded.")]
+    if watcher and watcher.is_running():
+        status = watcher.status()
+        baseline = "baseline done" if status["baseline_done"] else "baseline scan running"
+        return [types.TextContent(type="text", text=f"👀 Watch mode already active for '{project_id}' ({status['mode']}, {baseline}, {status['windows_flushed']} batches mapped, {status['pending']} pending).")]
+
+    # Baseline scan and windows run in the watcher thread and yield to agents
+    mapper = CodebaseMapper(get_current_project_root(), project_id, pause=priority_gate.pause)
+    watcher = CodeWatcher(mapper, debounce_seconds=float(arguments.get("debounce_seconds", 1.0)),
+                          on_flush=invalidate_code_indexes)
+    try:
+        watcher.start()
+    except Exception as e:
+        return [types.TextContent(type="text", text=f"❌ Error starting watch mode: {e}")]
+    CODE_WATCHERS[project_id] = watcher
+    return [types.TextContent(type="text", text=f"👀 **WATCH MODE ON** for '{project_id}' ({watcher.mode}).\n"
+                                                f"The baseline scan runs in the background; edits made meanwhile are mapped after it.\n"
+                                                f"Changed files are re-mapped in one transaction per {watcher.debounce_seconds}s quiet window. Call map_codebase with watch=false to stop.")]
+
+
+def read_code_slice(record) -> tuple:
+    """
+    Reads [start_byte, end_byte) of a mapped Class/Function from its source file
+    (seek + bounded read, no full-file load or re-parse).
+    Returns (content, note). content is None when the file cannot be read.
+    """
+    path = record.get("path")
+    start, end = record.get("start_byte"), record.get("end_byte")
+    full_path = os.path.join(get_current_project_root(), path)
+    location = f"📄 **Source:** `{path}` lines {record.get('start_line')}-{record.get('end_line')}"
+    try:
+        with open(full_path, "rb") as f:
+            f.seek(start)
+            data = f.read(max(0, end - start))
+    except (OSError, TypeError) as e:
+        return None, f"{location}\n⚠️ Could not read source: {e}"
+
+    if record.get("body_hash") and hashlib.sha1(data).hexdigest() != record.get("body_hash"):
+        location += "\n⚠️ File changed since the last map_codebase: the slice may be stale. Run map_codebase to refresh."
+    return data.decode("utf-8", errors="replace"), location
+
+
+@off_loop
+def tool_read_node(arguments: dict) -> list[types.TextContent]:
     """
     Reads the FULL content of a node by UID.
     Returns title, description, and body text.
@@ -1975,7 +2658,13 @@ async def tool_read_node(arguments: dict) -> list[types.TextContent]:
            n.description as description,
            n.content as content,
            n.status as status,
-           n.project_id as project_id
+           n.project_id as project_id,
+           n.path as path,
+           n.start_line as start_line,
+           n.end_line as end_line,
+           n.start_byte as start_byte,
+           n.end_byte as end_byte,
+           n.body_hash as body_hash
     """
     
     try:
@@ -1998,8 +2687,13 @@ async def tool_read_node(arguments: dict) -> list[types.TextContent]:
     content = record.get("content", "")
     status = record.get("status", "N/A")
     created_at = record.get("created_at", "N/A")
+    source_note = None
     
-    # 2. If content is empty, try to read from Markdown file
+    # 2a. Code symbols: read only the mapped slice of the source file
+    if not content and node_type in ("Class", "Function") and record.get("start_byte") is not None:
+        content, source_note = read_code_slice(record)
+    
+    # 2b. If content is empty, try to read from Markdown file
     if not content:
         # Use Centralized Logic
         file_path = sync_tool.get_file_path(uid, node_type)
@@ -2028,6 +2722,10 @@ async def tool_read_node(arguments: dict) -> list[types.TextContent]:
         output_parts.append(description)
         output_parts.append(f"")
     
+    if source_note:
+        output_parts.append(source_note)
+        output_parts.append(f"")
+    
     if content:
         # Limit content to prevent token explosion
         MAX_CONTENT_LENGTH = 8000
@@ -2043,7 +2741,8 @@ async def tool_read_node(arguments: dict) -> list[types.TextContent]:
 
 
 
-async def tool_find_orphans(arguments: dict) -> list[types.TextContent]:
+@off_loop
+def tool_find_orphans(arguments: dict) -> list[types.TextContent]:
     """
     Finds isolated nodes (orphans) that have NO effective connection to the main graph hierarchy.
     The "Main Graph" is defined as the set of nodes reachable from the 'IDEA-Genesis' root.
@@ -2051,6 +2750,9 @@ async def tool_find_orphans(arguments: dict) -> list[types.TextContent]:
     This finds:
     1. Absolute orphans (0 connections)
     2. "Micro-islands" (Nodes connected to each other but isolated from the main tree)
+    
+    Connectivity comes from the union-find ComponentIndex over the topology mirror
+    (DECOMPOSES|IMPLEMENTS, both directions): no APOC, cached per project.
     """
     limit = arguments.get("limit", 50)
     driver = get_driver()
@@ -2059,62 +2761,38 @@ async def tool_find_orphans(arguments: dict) -> list[types.TextContent]:
     output_lines = []
     
     try:
-        # 1. ABSOLUTE ORPHANS (Degree 0)
-        query_absolute = """
-        MATCH (n)
-        WHERE (n.project_id = $project_id OR n.project_id IS NULL)
-          AND NOT (n:NodeType)
-          AND NOT (n)--()
-        RETURN n.uid as uid, labels(n)[0] as type, n.title as title
-        LIMIT $limit
-        """
-        
-        abs_records, _, _ = driver.execute_query(query_absolute, 
-            {"project_id": current_project, "limit": limit}, 
-            database_="neo4j")
-            
-        if abs_records:
-             output_lines.append(f"Found {len(abs_records)} absolute orphans (0 links):")
-             for r in abs_records:
-                 output_lines.append(f"- [{r['type']}] {r['uid']}: {r.get('title', 'N/A')}")
-        
-        # Determine how many more we need
-        remaining_limit = limit - len(abs_records)
+        if not get_topology():
+            return [types.TextContent(type="text", text="❌ Error finding orphans: graph topology could not be loaded.")]
+        absolute, islands = components.orphans(current_project, ROOT_UID)
         
-        if remaining_limit > 0:
-            # 2. ISLAND DETECTION (Connectivity check to IDEA-Genesis)
-            # Find nodes that have relationships but are NOT connected to IDEA-Genesis
-            
-            island_query = """
-            MATCH (root:Idea {uid: 'IDEA-Genesis'})
-            // Get all nodes in the Main Component via VERTICAL relationships only
-            // DECOMPOSES: Hierarchy (Idea->Spec->Req... File->Class->Func)
-            // IMPLEMENTS: Realization (File->Req...)
-            CALL apoc.path.subgraphNodes(root, {relationshipFilter: 'DECOMPOSES|IMPLEMENTS'}) YIELD node as connected_node
-            WITH collect(connected_node) as main_component_nodes
-            
-            MATCH (n)
-            WHERE (n.project_id = $project_id OR n.project_id IS NULL)
-              AND NOT (n:NodeType)
-              AND NOT n IN main_component_nodes
-              AND (n)--() // Only consider nodes that HAVE links (absolute orphans already found)
-              
+        # 1. ABSOLUTE ORPHANS (Degree 0)
+        abs_uids = absolute[:limit]
+        # 2. ISLAND DETECTION (not connected to IDEA-Genesis)
+        island_uids = islands[:max(0, limit - len(abs_uids))]
+        
+        # Display fields for the reported nodes only
+        details = {}
+        if abs_uids or island_uids:
+            detail_query = """
+            UNWIND $uids AS uid
+            MATCH (n {uid: uid})
             RETURN n.uid as uid, labels(n)[0] as type, n.title as title
-            LIMIT $limit
             """
+            records, _, _ = driver.execute_query(detail_query, {"uids": abs_uids + island_uids}, database_="neo4j")
+            details = {r['uid']: r for r in records}
+        
+        def describe(uid):
+            r = details.get(uid) or {}
+            return f"- [{r.get('type') or topology.label_of(uid)}] {uid}: {r.get('title') or 'N/A'}"
             
-            try:
-                island_records, _, _ = driver.execute_query(island_query, 
-                    {"project_id": current_project, "limit": remaining_limit}, 
-                    database_="neo4j")
-                    
-                if island_records:
-                    if output_lines: output_lines.append("") # Spacer
-                    output_lines.append(f"Found {len(island_records)} island nodes (isolated groups):")
-                    for r in island_records:
-                        output_lines.append(f"- [{r['type']}] {r['uid']}: {r.get('title', 'N/A')}")
-            except Exception as e:
-                output_lines.append(f"\n⚠️ Warning: Island detection failed (possibly APOC missing): {e}")
+        if abs_uids:
+             output_lines.append(f"Found {len(abs_uids)} absolute orphans (0 links):")
+             output_lines.extend(describe(u) for u in abs_uids)
+        
+        if island_uids:
+            if output_lines: output_lines.append("") # Spacer
+            output_lines.append(f"Found {len(island_uids)} island nodes (isolated groups):")
+            output_lines.extend(describe(u) for u in island_uids)
 
         if not output_lines:
              return [types.TextContent(type="text", text="✅ No orphans or islands found! The graph is fully connected (to 'IDEA-Genesis').")]
@@ -2125,7 +2803,150 @@ async def tool_find_orphans(arguments: dict) -> list[types.TextContent]:
         return [types.TextContent(type="text", text=f"❌ Error finding orphans: {e}")]
 
 
-async def tool_illuminate_path(arguments: dict) -> list[types.TextContent]:
+IMPACT_TYPE_ORDER = ["Spec", "Requirement", "Task", "Domain", "File", "Class", "Function"]
+
+@off_loop
+def tool_analyze_impact(arguments: dict) -> list[types.TextContent]:
+    """
+    What is affected if a node changes: DECOMPOSES children, IMPLEMENTS and
+    DEPENDS_ON dependents, transitively, with hop distances.
+    Served from the ImpactIndex (memoized reverse reachability over the
+    topology mirror, bounded per node so hub requirements stay cheap).
+    """
+    uid = arguments.get("uid") or get_agent_location()
+    max_depth = arguments.get("max_depth", 4)
+    limit = arguments.get("limit", 50)
+    driver = get_driver()
+    
+    try:
+        mirror = get_topology()
+        if not mirror:
+            return [types.TextContent(type="text", text="❌ Error analyzing impact: graph topology could not be loaded.")]
+        if not mirror.has(uid):
+            return [types.TextContent(type="text", text=f"❌ Error: Node {uid} not found.")]
+        
+        rows, truncated = impact_index.impact(uid, max_depth=max_depth)
+        if not rows:
+            return [types.TextContent(type="text", text=f"✅ Nothing downstream depends on {uid} (within {max_depth} hops).")]
+        
+        shown = rows[:limit]
+        detail_query = """
+        UNWIND $uids AS uid
+        MATCH (n {uid: uid})
+        RETURN n.uid as uid, n.title as title
+        """
+        records, _, _ = driver.execute_query(detail_query, {"uids": [r[0] for r in shown]}, database_="neo4j")
+        titles = {r['uid']: r['title'] for r in records}
+        
+        by_type = {}
+        for ruid, hops, via in shown:
+            by_type.setdefault(mirror.label_of(ruid) or "Unknown", []).append((ruid, hops, via))
+        
+        output_lines = [f"💥 **IMPACT OF {uid}** ({mirror.label_of(uid)})",
+                        f"   Affected nodes: {len(rows)}{'+' if truncated else ''} (within {max_depth} hops)"]
+        order = IMPACT_TYPE_ORDER + sorted(t for t in by_type if t not in IMPACT_TYPE_ORDER)
+        for ntype in order:
+            if ntype not in by_type:
+                continue
+            output_lines.append("")
+            output_lines.append(f"📋 **{ntype}** ({len(by_type[ntype])})")
+            for ruid, hops, via in by_type[ntype]:
+                output_lines.append(f"   [{hops}] {ruid}: {titles.get(ruid) or 'N/A'} (via {via})")
+        
+        if len(rows) > len(shown):
+            output_lines.append("")
+            output_lines.append(f"... and {len(rows) - len(shown)} more (increase limit)")
+        if truncated:
+            output_lines.append("⚠️ Traversal budget reached: this is a hub node, the list is partial.")
+        
+        return [types.TextContent(type="text", text="\n".join(output_lines))]
+        
+    except Exception as e:
+        return [types.TextContent(type="text", text=f"❌ Error analyzing impact: {e}")]
+
+
+@off_loop
+def tool_find_path(arguments: dict) -> list[types.TextContent]:
+    """
+    Shortest path between two nodes: bidirectional BFS over the topology mirror,
+    then one query for the titles of the nodes on the path.
+    """
+    source = arguments.get("source_uid") or get_agent_location()
+    target = arguments.get("target_uid")
+    rel_types = arguments.get("rel_types") or None
+    max_hops = arguments.get("max_hops", 12)
+    if not target:
+        return [types.TextContent(type="text", text="Error: target_uid is required")]
+    driver = get_driver()
+    
+    try:
+        mirror = get_topology()
+        if not mirror:
+            return [types.TextContent(type="text", text="❌ Error finding path: graph topology could not be loaded.")]
+        for uid in (source, target):
+            if not mirror.has(uid):
+                return [types.TextContent(type="text", text=f"❌ Error: Node {uid} not found.")]
+        
+        path = mirror.shortest_path(source, target, rel_types, max_hops=max_hops)
+        if path is None:
+            via = f" over {rel_types}" if rel_types else ""
+            return [types.TextContent(type="text", text=f"⚠️ No path from {source} to {target}{via} within {max_hops} hops.")]
+        
+        title_query = """
+        UNWIND $uids AS uid
+        MATCH (n {uid: uid})
+        RETURN n.uid as uid, n.title as title
+        """
+        records, _, _ = driver.execute_query(title_query, {"uids": [step[0] for step in path]}, database_="neo4j")
+        titles = {r['uid']: r['title'] for r in records}
+        
+        output_lines = [f"🧭 **PATH** {source} → {target} ({len(path) - 1} hops)", ""]
+        for i, (uid, rel_type, forward) in enumerate(path):
+            if rel_type:
+                output_lines.append(f"      {'↓' if forward else '↑'} [:{rel_type}]{'' if forward else ' (reverse)'}")
+            output_lines.append(f"   {i}. [{mirror.label_of(uid)}] {uid}: {titles.get(uid) or 'N/A'}")
+        output_lines.append("")
+        output_lines.append(f"💡 move_to('{target}') to jump directly.")
+        
+        return [types.TextContent(type="text", text="\n".join(output_lines))]
+        
+    except Exception as e:
+        return [types.TextContent(type="text", text=f"❌ Error finding path: {e}")]
+
+
+def _illuminate_path_cypher(driver, entry_uid: str):
+    """Fallback for illuminate_path when the topology mirror is unavailable: (vertical uids, lateral uids) or None."""
+    # Each expansion is collected before the next one starts (no cartesian product)
+    path_query = """
+    MATCH (entry {uid: $entry_uid})
+    OPTIONAL MATCH (entry)<-[:DECOMPOSES*1..5]-(ancestor)
+    WITH entry, COLLECT(DISTINCT ancestor.uid) as ancestors
+    OPTIONAL MATCH (entry)-[:DECOMPOSES*1..5]->(descendant)
+    WITH entry, ancestors, COLLECT(DISTINCT descendant.uid) as descendants
+    OPTIONAL MATCH (entry)-[:DEPENDS_ON|CONFLICT|IMPLEMENTS]-(related)
+    RETURN ancestors, descendants, COLLECT(DISTINCT related.uid) as laterals
+    """
+    
+    path_rec, _, _ = driver.execute_query(
+        path_query,
+        {"entry_uid": entry_uid},
+        database_="neo4j"
+    )
+    
+    if not path_rec:
+        return None
+    
+    record = path_rec[0]
+    all_uids = {entry_uid}
+    all_uids.update(uid for uid in (record['ancestors'] or []) + (record['descendants'] or []) if uid)
+    lateral_uids = {uid for uid in (record['laterals'] or []) if uid}
+    return all_uids, lateral_uids
+
+
+ILLUMINATE_ENTRY_TYPES = ["Idea", "Spec", "Requirement", "Task", "Domain"]
+
+@off_loop
+def tool_illuminate_path(arguments: dict) -> list[types.TextContent]:
     """
     🔦 ILLUMINATE THE PATH
     
@@ -2151,31 +2972,42 @@ async def tool_illuminate_path(arguments: dict) -> list[types.TextContent]:
     output_parts.append("=" * 60)
     output_parts.append("")
     
-    # 1. SEMANTIC SEARCH - Find entry point
-    query_embedding = emb_manager.get_embedding(query)
+    # 1. HYBRID SEARCH - Find entry point (vector + BM25, fused by rank)
     current_project = get_current_project_id()
+    query_embedding = project_embedding(query, current_project)
+    lex = get_lexical()
     
-    if not query_embedding:
+    if not query_embedding and not lex:
         return [types.TextContent(type="text", text="Error: Could not generate embedding for query")]
     
     # Find most relevant node as entry point (Filtered by Project)
-    search_query = """
+    search_query = f"""
     MATCH (n)
     WHERE n.embedding IS NOT NULL 
         AND (n:Idea OR n:Spec OR n:Requirement OR n:Task OR n:Domain)
         AND (n.project_id = $project_id OR n.project_id IS NULL)
+        AND {MODEL_MATCH}
     WITH n, REDUCE(s = 0.0, i IN RANGE(0, size(n.embedding)-1) | s + n.embedding[i] * $emb[i]) as score
     WHERE score > 0.5
     RETURN n.uid as uid, n.title as title, labels(n)[0] as type, score
     ORDER BY score DESC
-    LIMIT 1
+    LIMIT 10
     """
     
-    entry_rec, _, _ = driver.execute_query(
-        search_query, 
-        {"emb": query_embedding, "project_id": current_project}, 
-        database_="neo4j"
-    )
+    vector_rec = []
+    if query_embedding:
+        vector_rec, _, _ = driver.execute_query(
+            search_query, 
+            {"emb": query_embedding, "project_id": current_project, **model_registry.params(current_project)}, 
+            database_="neo4j"
+        )
+    vector_scores = {r['uid']: r['score'] for r in vector_rec}
+    keyword_hits = lex.search(query, project_id=current_project, types=ILLUMINATE_ENTRY_TYPES, limit=10) if lex else []
+    fused = rrf_fuse([list(vector_scores), [u for u, _ in keyword_hits]])
+    
+    entry_rec = []
+    if fused:
+        entry_rec, _, _ = driver.execute_query(SIMILAR_DETAILS_QUERY, {"uids": [fused[0][0]]}, database_="neo4j")
     
     if not entry_rec:
         output_parts.append("❌ No relevant nodes found for this query.")
@@ -2185,66 +3017,29 @@ async def tool_illuminate_path(arguments: dict) -> list[types.TextContent]:
     entry_uid = entry_rec[0]['uid']
     entry_title = entry_rec[0]['title']
     entry_type = entry_rec[0]['type']
-    entry_score = entry_rec[0]['score']
     
-    output_parts.append(f"📍 **ENTRY POINT** (similarity: {entry_score:.2f})")
+    if entry_uid in vector_scores:
+        output_parts.append(f"📍 **ENTRY POINT** (similarity: {vector_scores[entry_uid]:.2f})")
+    else:
+        output_parts.append(f"📍 **ENTRY POINT** (keyword match: BM25 {dict(keyword_hits)[entry_uid]:.2f})")
     output_parts.append(f"   {entry_uid} ({entry_type}): {entry_title}")
     output_parts.append("")
     
     # 2. COLLECT PATH NODES
-    # Get all nodes on the vertical path (up and down) + lateral connections
-    path_query = """
-    // Find entry node
-    MATCH (entry {uid: $entry_uid})
-    
-    // Collect path UP (to ancestors)
-    OPTIONAL MATCH pathUp = (entry)<-[:DECOMPOSES*1..5]-(ancestor)
-    
-    // Collect path DOWN (to descendants)
-    OPTIONAL MATCH pathDown = (entry)-[:DECOMPOSES*1..5]->(descendant)
-    
-    // Collect lateral connections
-    OPTIONAL MATCH (entry)-[lateral:DEPENDS_ON|CONFLICT|IMPLEMENTS]-(related)
-    
-    // Return all unique nodes
-    WITH entry,
-         COLLECT(DISTINCT ancestor) as ancestors,
-         COLLECT(DISTINCT descendant) as descendants,
-         COLLECT(DISTINCT related) as laterals
-    
-    RETURN entry, ancestors, descendants, laterals
-    """
-    
-    path_rec, _, _ = driver.execute_query(
-        path_query,
-        {"entry_uid": entry_uid},
-        database_="neo4j"
-    )
-    
-    if not path_rec:
-        output_parts.append("❌ Could not trace path from entry point.")
-        return [types.TextContent(type="text", text="\n".join(output_parts))]
+    # Vertical path (up and down) from the materialized hierarchy + lateral connections
+    mirror = get_topology()
+    if mirror and mirror.has(entry_uid):
+        all_uids = {entry_uid}
+        all_uids.update(hierarchy.ancestors(entry_uid, max_depth=5))
+        all_uids.update(hierarchy.descendants(entry_uid, max_depth=5))
+        lateral_uids = set(mirror.neighbors(entry_uid, ["DEPENDS_ON", "CONFLICT", "IMPLEMENTS"]))
+    else:
+        path = _illuminate_path_cypher(driver, entry_uid)
+        if path is None:
+            output_parts.append("❌ Could not trace path from entry point.")
+            return [types.TextContent(type="text", text="\n".join(output_parts))]
+        all_uids, lateral_uids = path
     
-    record = path_rec[0]
-    entry_node = record['entry']
-    ancestors = record['ancestors'] or []
-    descendants = record['descendants'] or []
-    laterals = record['laterals'] or []
-    
-    # Collect all UIDs to fetch content
-    all_uids = set()
-    all_uids.add(entry_uid)
-    for node in ancestors:
-        if node and node.get('uid'):
-            all_uids.add(node['uid'])
-    for node in descendants:
-        if node and node.get('uid'):
-            all_uids.add(node['uid'])
-    
-    lateral_uids = set()
-    for node in laterals:
-        if node and node.get('uid'):
-            lateral_uids.add(node['uid'])
     
     output_parts.append(f"📊 **PATH STATISTICS**")
     output_parts.append(f"   • Vertical path: {len(all_uids)} nodes")
@@ -2252,14 +3047,21 @@ async def tool_illuminate_path(arguments: dict) -> list[types.TextContent]:
     output_parts.append("")
     
     # 3. FETCH CONTENT OF ALL PATH NODES
-    content_query = """
+    content_query = f"""
     MATCH (n)
     WHERE n.uid IN $uids
+    // Passages are usable only if stored in the query's embedding model
+    WITH n, $with_passages AND n.passage_starts IS NOT NULL AND {MODEL_MATCH} as passages
     RETURN n.uid as uid, 
            labels(n)[0] as type,
            n.title as title,
            SUBSTRING(COALESCE(n.description, ''), 0, 500) as description,
-           SUBSTRING(COALESCE(n.content, ''), 0, 500) as content
+           // Full body only when stored passages can be sliced out of it
+           CASE WHEN passages THEN n.content
+                ELSE SUBSTRING(COALESCE(n.content, ''), 0, 500) END as content,
+           CASE WHEN passages THEN n.passage_starts END as passage_starts,
+           CASE WHEN passages THEN n.passage_ends END as passage_ends,
+           CASE WHEN passages THEN n.passage_vectors END as passage_vectors
     ORDER BY 
         CASE labels(n)[0]
             WHEN 'Idea' THEN 1
@@ -2277,7 +3079,7 @@ async def tool_illuminate_path(arguments: dict) -> list[types.TextContent]:
     
     content_rec, _, _ = driver.execute_query(
         content_query,
-        {"uids": list(all_uids)},
+        {"uids": list(all_uids), "with_passages": bool(query_embedding), **model_registry.params(current_project)},
         database_="neo4j"
     )
     
@@ -2297,7 +3099,12 @@ async def tool_illuminate_path(arguments: dict) -> list[types.TextContent]:
         if desc:
             output_parts.append(f"Description: {desc[:300]}...")
         
-        if content:
+        if node['passage_starts']:
+            # Only the passage most relevant to the query, not the head of the body
+            for score, start, end, text in top_passages(content, node['passage_starts'], node['passage_ends'],
+                                                        node['passage_vectors'], query_embedding, k=1, min_score=0.25):
+                output_parts.append(f"Passage [{start}:{end}] (relevance {score:.2f}): {text}")
+        elif content:
             output_parts.append(f"Content: {content[:300]}...")
     
     # 4. LATERAL CONNECTIONS
@@ -2308,7 +3115,7 @@ async def tool_illuminate_path(arguments: dict) -> list[types.TextContent]:
         
         lateral_rec, _, _ = driver.execute_query(
             content_query,
-            {"uids": list(lateral_uids)},
+            {"uids": list(lateral_uids), "with_passages": False, **model_registry.params(current_project)},
             database_="neo4j"
         )
         
@@ -2337,6 +3144,16 @@ async def tool_illuminate_path(arguments: dict) -> list[types.TextContent]:
 if __name__ == "__main__":
     import sys
     
+    # Drain embeddings queued while the server was down (imports, Markdown edits)
+    kick_embedding_queue()
+    # Resume unfinished embedding model migrations
+    if model_registry.migrations():
+        migrator.start(get_driver)
+    # Restart background jobs interrupted by the shutdown, from their checkpoints
+    resumed = jobs.resume()
+    if resumed:
+        print(f"🏗️ Resumed {len(resumed)} background jobs: {', '.join(resumed)}", file=sys.stderr)
+
     # Check if we should use stdio (explicitly asked)
     if "--stdio" in sys.argv:
         from mcp.server.stdio import stdio_server
@@ -2415,9 +3232,28 @@ if __name__ == "__main__":
                     return
                 
                 # Authenticated - proceed normally
+                if path == "/metrics":
+                    response = Response(metrics_text(), media_type="text/plain; version=0.0.4")
+                    await response(scope, receive, send)
+                    return
                 if path == "/sse":
-                    async with sse.connect_sse(scope, receive, send) as (read_stream, write_stream):
-                        await mcp.run(read_stream, write_stream, mcp.create_initialization_options())
+                    # One agent per session: named by X-MCP-Agent-Id, else the default agent (ephemeral on request)
+                    try:
+                        agent_id, ephemeral = resolve_agent_id(get_header(scope, "X-MCP-Agent-Id"))
+                    except ValueError as e:
+                        response = Response(f"❌ {e}", status_code=400)
+                        await response(scope, receive, send)
+                        return
+                    # Every tool call of this session (incl. worker threads) inherits the context variable
+                    agent_token = current_agent.set(agent_id)
+                    print(f"🤖 Session opened for agent {agent_id}{' (ephemeral)' if ephemeral else ''}", file=sys.stderr)
+                    try:
+                        async with sse.connect_sse(scope, receive, send) as (read_stream, write_stream):
+                            await mcp.run(read_stream, write_stream, mcp.create_initialization_options())
+                    finally:
+                        current_agent.reset(agent_token)
+                        if ephemeral:
+                            await asyncio.to_thread(forget_agent, agent_id)
                     return
                 if path.startswith("/messages"):
                     await sse.handle_post_message(scope, receive, send)
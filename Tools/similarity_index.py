@@ -0,0 +1,277 @@
+"""
+Precomputed k-nearest-neighbour similarity for semantic nodes.
+
+Every embedded Idea/Spec/Requirement/Task/Domain keeps its top-k most similar
+nodes (same project + global nodes) as two compact node properties:
+
+    n.knn_uids   = [uid, ...]      (most similar first)
+    n.knn_scores = [float, ...]    (dot product, same scale as the Cypher scans)
+
+One index covers one embedding model (n.embedding_model, see
+embedding_models.py): vectors of different models are never compared.
+The embeddings live in one in-memory matrix (numpy when available, plain
+lists otherwise). When a node's embedding changes (`upsert`) or it is removed,
+only that node and the nodes whose lists it enters or leaves are recomputed,
+by a background thread that also writes the changed lists back in one UNWIND
+per batch. Dashboards read `neighbors()` in O(k); `search()` scores an
+arbitrary query vector against the matrix.
+"""
+import heapq
+import sys
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # optional: pure-Python scoring for small graphs
+    np = None
+
+SEMANTIC_LABELS = ("Idea", "Spec", "Requirement", "Task", "Domain")
+DEFAULT_K = 10
+
+LOAD_QUERY = """
+MATCH (n)
+WHERE n.embedding IS NOT NULL AND n.uid IS NOT NULL
+    AND (n:Idea OR n:Spec OR n:Requirement OR n:Task OR n:Domain)
+    AND ($model IS NULL OR coalesce(n.embedding_model, $default_model) = $model)
+RETURN n.uid AS uid, n.project_id AS project_id, n.embedding AS embedding,
+       n.knn_uids AS knn_uids, n.knn_scores AS knn_scores
+"""
+WRITE_QUERY = """
+UNWIND $rows AS row
+MATCH (n {uid: row.uid})
+SET n.knn_uids = row.uids, n.knn_scores = row.scores
+"""
+
+
+class SimilarityIndex:
+    def __init__(self, k: int = DEFAULT_K, batch_size: int = 64, model: Optional[str] = None,
+                 default_model: Optional[str] = None):
+        self.k = k
+        self.model = model                  # None: every embedded node (single-model graphs, tests)
+        self.default_model = default_model  # model of untagged (legacy) vectors
+        self.batch_size = batch_size
+        self.lock = threading.RLock()
+        self.loaded = False
+        self.uids: List[Optional[str]] = []
+        self.row_of: Dict[str, int] = {}
+        self.projects: List[Optional[str]] = []
+        self.vectors = None  # np.ndarray (rows, dim) or list of lists
+        self.knn: Dict[str, List[Tuple[str, float]]] = {}
+        self.dirty: Set[str] = set()       # embedding changed: own list + reverse updates pending
+        self.unsaved: Set[str] = set()     # list changed in memory, not yet written
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._driver_factory = None
+        self._start_lock = threading.Lock()  # concurrent tool calls: load and start the thread once
+
+    # --- lifecycle ---
+
+    def load(self, driver):
+        records, _, _ = driver.execute_query(LOAD_QUERY, {"model": self.model, "default_model": self.default_model},
+                                             database_="neo4j")
+        with self.lock:
+            self.uids, self.row_of, self.projects, self.knn = [], {}, [], {}
+            self.vectors = None
+            self.dirty.clear()
+            self.unsaved.clear()
+            for r in records:
+                self._set_row(r["uid"], r["embedding"], r["project_id"])
+            for r in records:
+                stored = list(zip(r["knn_uids"] or [], r["knn_scores"] or []))
+                if r["knn_uids"] is None or any(u not in self.row_of for u, _ in stored):
+                    self.dirty.add(r["uid"])
+                else:
+                    self.knn[r["uid"]] = stored
+            self.loaded = True
+        print(f"🧭 Similarity index loaded ({self.model or 'all models'}): {len(records)} vectors, {len(self.dirty)} lists to (re)build",
+              file=sys.stderr)
+        if self.dirty:
+            self._wake.set()
+
+    def start(self, driver_factory):
+        """Loads the index (once) and starts the background maintenance thread."""
+        with self._start_lock:
+            self._driver_factory = driver_factory
+            if not self.loaded:
+                self.load(driver_factory())
+            if not (self._thread and self._thread.is_alive()):
+                self._thread = threading.Thread(target=self._run, name="similarity-index", daemon=True)
+                self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            try:
+                while self.process_pending(self._driver_factory()):
+                    pass
+            except Exception as e:
+                print(f"⚠️ Similarity index update failed: {e}", file=sys.stderr)
+
+    # --- vectors ---
+
+    def _set_row(self, uid: str, embedding, project_id: Optional[str]) -> int:
+        row = self.row_of.get(uid)
+        if np is not None:
+            vec = np.asarray(embedding, dtype=np.float32)
+            if self.vectors is None:
+                self.vectors = np.zeros((0, len(vec)), dtype=np.float32)
+            if row is None:
+                if len(self.uids) == len(self.vectors):  # grow capacity by doubling
+                    grown = np.zeros((max(16, 2 * len(self.vectors)), len(vec)), dtype=np.float32)
+                    grown[:len(self.vectors)] = self.vectors
+                    self.vectors = grown
+                row = len(self.uids)
+                self.uids.append(uid)
+                self.projects.append(project_id)
+            self.vectors[row] = vec
+        else:
+            if self.vectors is None:
+                self.vectors = []
+            if row is None:
+                row = len(self.uids)
+                self.uids.append(uid)
+                self.projects.append(project_id)
+                self.vectors.append(list(embedding))
+            else:
+                self.vectors[row] = list(embedding)
+        self.projects[row] = project_id
+        self.row_of[uid] = row
+        return row
+
+    def _candidates(self, row: int) -> List[int]:
+        """Rows a node may be compared with: same project + global (global nodes see everything)."""
+        project = self.projects[row]
+        return [i for i, u in enumerate(self.uids)
+                if u is not None and i != row and (project is None or self.projects[i] in (project, None))]
+
+    def _scores(self, row: int, candidates: List[int]) -> List[float]:
+        if np is not None:
+            if not candidates:
+                return []
+            return (self.vectors[candidates] @ self.vectors[row]).tolist()
+        vec = self.vectors[row]
+        return [sum(a * b for a, b in zip(self.vectors[i], vec)) for i in candidates]
+
+    def _top_k(self, row: int) -> List[Tuple[str, float]]:
+        candidates = self._candidates(row)
+        scores = self._scores(row, candidates)
+        best = heapq.nlargest(self.k, zip(scores, candidates))
+        return [(self.uids[i], float(score)) for score, i in best]
+
+    def _visible(self, row: int, other_row: int) -> bool:
+        project = self.projects[row]
+        return project is None or self.projects[other_row] in (project, None)
+
+    # --- updates ---
+
+    def upsert(self, uid: str, embedding, project_id: Optional[str] = None):
+        """Called after a node's embedding was (re)written."""
+        if not embedding:
+            return
+        with self.lock:
+            if not self.loaded:
+                return
+            self._set_row(uid, embedding, project_id)
+            self.knn.pop(uid, None)
+            self.dirty.add(uid)
+        self._wake.set()
+
+    def remove(self, uid: str):
+        with self.lock:
+            row = self.row_of.pop(uid, None)
+            if row is None:
+                return
+            self.uids[row] = None
+            self.knn.pop(uid, None)
+            self.dirty.discard(uid)
+            for other, neighbors in self.knn.items():
+                if any(u == uid for u, _ in neighbors):
+                    self.dirty.add(other)  # needs a replacement neighbour
+        self._wake.set()
+
+    def process_pending(self, driver) -> int:
+        """Recomputes one batch of dirty nodes (+ reverse updates) and persists changed lists."""
+        with self.lock:
+            taken = list(self.dirty)[:self.batch_size]
+            self.dirty.difference_update(taken)
+            batch = [u for u in taken if u in self.row_of]
+            for uid in batch:
+                row = self.row_of[uid]
+                self.knn[uid] = self._top_k(row)
+                self.unsaved.add(uid)
+                self._update_reverse(uid, row)
+            rows = [{"uid": u, "uids": [n for n, _ in self.knn[u]], "scores": [s for _, s in self.knn[u]]}
+                    for u in self.unsaved if u in self.knn]
+            self.unsaved.clear()
+        if rows:
+            driver.execute_query(WRITE_QUERY, {"rows": rows}, database_="neo4j")
+        return len(batch)
+
+    def _update_reverse(self, uid: str, row: int):
+        """uid's vector changed: fix the lists it enters, leaves or moves within."""
+        candidates = self._candidates(row)
+        for other_row, score in zip(candidates, self._scores(row, candidates)):
+            other = self.uids[other_row]
+            if other in self.dirty or not self._visible(other_row, row):
+                continue
+            neighbors = self.knn.get(other)
+            if neighbors is None:
+                continue
+            without = [(u, s) for u, s in neighbors if u != uid]
+            if len(without) < len(neighbors) and len(without) == self.k - 1 and score < neighbors[-1][1]:
+                # uid dropped below the old k-th score: someone else may now belong in the list
+                self.knn[other] = self._top_k(other_row)
+            elif len(without) < len(neighbors) or len(neighbors) < self.k or score > neighbors[-1][1]:
+                without.append((uid, score))
+                without.sort(key=lambda n: -n[1])
+                self.knn[other] = without[:self.k]
+            else:
+                continue
+            self.unsaved.add(other)
+
+    # --- reads ---
+
+    def neighbors(self, uid: str, project_id: Optional[str] = None, min_score: float = 0.0,
+                  limit: Optional[int] = None) -> Optional[List[Tuple[str, float]]]:
+        """
+        Precomputed neighbours of uid, best first, as [(uid, score)].
+        A node whose list is still pending is computed on the spot (its reverse
+        updates stay with the background thread). None if uid has no embedding.
+        """
+        with self.lock:
+            row = self.row_of.get(uid)
+            if row is None:
+                return None
+            neighbors = self.knn.get(uid)
+            if neighbors is None:
+                neighbors = self.knn[uid] = self._top_k(row)
+            result = [(u, s) for u, s in neighbors
+                      if s > min_score and u in self.row_of
+                      and (project_id is None or self.projects[self.row_of[u]] in (project_id, None))]
+            return result[:limit] if limit else result
+
+    def search(self, embedding, project_id: Optional[str] = None, min_score: float = 0.0,
+               limit: Optional[int] = None, exclude=()) -> Optional[List[Tuple[str, float]]]:
+        """
+        Indexed nodes most similar to a query vector, best first, as [(uid, score)]
+        (e.g. a node whose own embedding is still queued). None if the index is not loaded.
+        """
+        with self.lock:
+            if not self.loaded:
+                return None
+            if self.vectors is None or not embedding:
+                return []
+            rows = [i for i, u in enumerate(self.uids)
+                    if u is not None and u not in exclude
+                    and (project_id is None or self.projects[i] in (project_id, None))]
+            if not rows:
+                return []
+            if np is not None:
+                scores = (self.vectors[rows] @ np.asarray(embedding, dtype=np.float32)).tolist()
+            else:
+                scores = [sum(a * b for a, b in zip(self.vectors[i], embedding)) for i in rows]
+            best = heapq.nlargest(limit or len(rows), zip(scores, rows))
+            return [(self.uids[i], float(score)) for score, i in best if score > min_score]
@@ -0,0 +1,44 @@
+"""
+Single-flight deduplication of concurrent identical calls.
+
+When several agents (or one agent retrying) call the same read-only tool with
+the same arguments at the same time, only the first call (the leader) computes
+the answer. The calls that arrive while it is in flight await the same task
+and get the same result, or the same exception:
+
+    result = await in_flight.do(key, lambda: compute())
+
+The computation is a task of its own, shielded from its callers: a client that
+disconnects cancels only its own wait, never the answer the others are waiting
+for. The key is dropped as soon as the task finishes, so the next call computes
+again (the response cache keeps finished answers, see graph_version.py).
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    def __init__(self):
+        self.calls: Dict[Hashable, asyncio.Task] = {}
+        self.led = 0     # computations started
+        self.shared = 0  # calls served by a computation already in flight
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable]):
+        task = self.calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self.calls[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+            self.led += 1
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def in_flight(self) -> int:
+        return len(self.calls)
+
+    def _done(self, key: Hashable, task: asyncio.Task):
+        if self.calls.get(key) is task:
+            del self.calls[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved: every caller may have left before it finished
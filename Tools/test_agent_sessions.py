@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Test script for per-session agent identity (agent_sessions.py)
+
+Tests that:
+1. Agent ids come from the header (named); no header means the default agent; ephemeral ids are opt-in; bad ids are rejected
+2. Each agent has its own project/workflow; named agents persist, ephemeral ones do not; legacy state seeds new agents
+3. The agent id follows a session's tool calls into worker threads, without leaking between sessions
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from agent_sessions import (AgentStateStore, current_agent, resolve_agent_id, is_ephemeral, DEFAULT_AGENT_ID,
+                            EPHEMERAL_REQUEST)
+
+
+def check(label, ok):
+    print(f"  {'✅' if ok else '❌'} {label}")
+    return ok
+
+
+def test_resolve():
+    print("=" * 70)
+    print("TEST 1: Agent ids")
+    print("=" * 70)
+
+    named = resolve_agent_id(" builder-1 ")
+    first, second = resolve_agent_id(EPHEMERAL_REQUEST), resolve_agent_id(f" {EPHEMERAL_REQUEST} ")
+    rejected = []
+    for bad in ("a b", "x" * 65, "session-spoof", "<script>"):
+        try:
+            resolve_agent_id(bad)
+        except ValueError:
+            rejected.append(bad)
+    return all([
+        check("header names the agent", named == ("builder-1", False)),
+        check("no header: the persistent default agent", resolve_agent_id(None) == resolve_agent_id("") == (DEFAULT_AGENT_ID, False)),
+        check("ephemeral on request, unique per connection", first[1] and second[1] and first[0] != second[0]
+              and is_ephemeral(first[0])),
+        check("malformed ids rejected", len(rejected) == 4),
+    ])
+
+
+def test_state_store():
+    print("=" * 70)
+    print("TEST 2: Per-agent state")
+    print("=" * 70)
+
+    folder = tempfile.mkdtemp()
+    legacy = os.path.join(folder, ".active_project_state")
+    with open(legacy, "w") as f:
+        json.dump({"id": "legacy", "root": "/work", "workflow": "Builder"}, f)
+    path = os.path.join(folder, ".graphmcp", "agents.json")
+    store = AgentStateStore(path, default={"id": "graphmcp", "root": "/", "workflow": "Architect"}, legacy_path=legacy)
+
+    store.update("alice", id="p-alice")
+    store.update("bob", workflow="Auditor")
+    store.update("session-abc", id="p-tmp")
+    try:
+        store.update("alice", workflow="Pirate")
+        invalid_rejected = False
+    except ValueError:
+        invalid_rejected = True
+    reloaded = AgentStateStore(path, default={"id": "graphmcp", "root": "/", "workflow": "Architect"})
+    store.forget("session-abc")
+    return all([
+        check("new agents start from the legacy state", store.get("carol") == {"id": "legacy", "root": "/work", "workflow": "Builder"}),
+        check("agents do not share state", store.get("alice")["id"] == "p-alice" and store.get("bob")["id"] == "legacy"
+              and store.get("alice")["workflow"] == "Builder" and store.get("bob")["workflow"] == "Auditor"),
+        check("invalid workflow rejected", invalid_rejected and store.get("alice")["workflow"] == "Builder"),
+        check("named agents persisted, ephemeral not", sorted(reloaded.states) == ["alice", "bob"]),
+        check("ephemeral state forgotten", store.get("session-abc")["id"] == "legacy"),
+        check("returned states are copies", (store.get("alice").update(id="x"), store.get("alice")["id"])[1] == "p-alice"),
+    ])
+
+
+async def session(agent_id, results):
+    """Like the /sse handler: set the agent, then run 'tool calls' in worker threads (server.off_loop)."""
+    current_agent.set(agent_id)
+
+    def tool(arguments):
+        time.sleep(0.01)
+        return current_agent.get()
+
+    seen = []
+    for _ in range(3):
+        seen.append(await asyncio.to_thread(tool, {}))
+    results[agent_id] = seen
+
+
+async def test_context():
+    print("=" * 70)
+    print("TEST 3: Agent id per session")
+    print("=" * 70)
+
+    results = {}
+    await asyncio.gather(asyncio.create_task(session("alice", results)), asyncio.create_task(session("bob", results)))
+    return all([
+        check("worker threads see their session's agent", results == {"alice": ["alice"] * 3, "bob": ["bob"] * 3}),
+        check("outside a session: default agent", current_agent.get() == DEFAULT_AGENT_ID),
+    ])
+
+
+if __name__ == "__main__":
+    passed = test_resolve()
+    passed = test_state_store() and passed
+    passed = asyncio.run(test_context()) and passed
+    print("=" * 70)
+    print("✅ ALL TESTS PASSED" if passed else "❌ SOME TESTS FAILED")
+    sys.exit(0 if passed else 1)
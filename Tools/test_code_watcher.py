@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Test script for watch mode (code_watcher.py, no database required)
+
+Tests that:
+1. A window whose write fails is not lost: paths go back to pending and the
+   manifest does not claim the files are mapped
+2. Ignored paths never open a window; a steadily written file is flushed after max_wait
+3. start() returns before the baseline scan ends; edits made during it are mapped afterwards
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from codebase_mapper import CodebaseMapper, FileManifest, STATE_DIR_NAME, MANIFEST_FILE_NAME
+from code_watcher import CodeWatcher
+from ignore_rules import IgnoreRules
+
+
+def check(label, ok):
+    print(f"  {'✅' if ok else '❌'} {label}")
+    return ok
+
+
+class FlakyWriter:
+    """Stands in for the Neo4j write of CodebaseMapper.batch_create_nodes."""
+    def __init__(self):
+        self.fail = False
+        self.written = []
+
+    def __call__(self, nodes, removed_uids=None):
+        if self.fail:
+            raise ConnectionError("Neo4j unavailable")
+        self.written.extend(n[0] for n in nodes)
+
+
+def make_mapper(root):
+    """CodebaseMapper without a driver: writes go to a FlakyWriter."""
+    mapper = CodebaseMapper.__new__(CodebaseMapper)
+    mapper.project_root, mapper.project_id, mapper.pause = root, "p1", None
+    mapper.workers, mapper.batch_size, mapper.progress_callback = 1, 500, lambda *a: None
+    mapper.ignore_dirs, mapper.ignore_exts = {".git", STATE_DIR_NAME}, {".pyc"}
+    mapper.prune_dir_names = {"maintenance", "archive", "md", "examples"}
+    mapper.ignore_rules = IgnoreRules.from_root(root)
+    mapper.manifest = FileManifest(os.path.join(root, STATE_DIR_NAME, MANIFEST_FILE_NAME))
+    mapper.last_stats = {}
+    mapper.batch_create_nodes = FlakyWriter()
+    mapper.sync_dependencies = lambda: 0
+    mapper.bump_version = lambda stats: None
+    mapper._manifest_matches_db = lambda: True
+    return mapper
+
+
+def write(root, rel_path, source):
+    with open(os.path.join(root, rel_path), "w", encoding="utf-8") as f:
+        f.write(source)
+
+
+def test_failed_window():
+    print("=" * 70)
+    print("TEST 1: Failed window is retried")
+    print("=" * 70)
+
+    root = tempfile.mkdtemp()
+    mapper = make_mapper(root)
+    watcher = CodeWatcher(mapper)
+    write(root, "a.py", "def one():\n    pass\n")
+    watcher.pending = {"a.py"}
+    watcher.flush()
+    mapped_sha = mapper.manifest.get("a.py")["sha"]
+
+    write(root, "a.py", "def one():\n    pass\n\ndef two():\n    pass\n")
+    write(root, "b.py", "def three():\n    pass\n")
+    watcher.pending = {"a.py", "b.py"}
+    mapper.batch_create_nodes.fail = True
+    try:
+        watcher.flush()
+        raised = False
+    except ConnectionError:
+        raised = True
+    results = [
+        check("write error surfaces", raised),
+        check("paths back in pending", watcher.pending == {"a.py", "b.py"}),
+        check("manifest not advanced", mapper.manifest.get("a.py")["sha"] == mapped_sha
+              and mapper.manifest.get("b.py") is None),
+    ]
+
+    mapper.batch_create_nodes.fail = False
+    stats = watcher.flush()
+    return all(results + [
+        check("retry maps both files", stats["files_parsed"] == 2 and not watcher.pending),
+        check("manifest advanced after the write", mapper.manifest.get("a.py")["sha"] != mapped_sha
+              and len(mapper.manifest.get("a.py")["children"]) == 2),
+    ])
+
+
+class SteadySource:
+    """An event source that reports the same paths on every poll."""
+    def __init__(self, paths):
+        self.paths = paths
+
+    def poll(self, timeout):
+        time.sleep(0.01)
+        return set(self.paths)
+
+    def close(self):
+        pass
+
+
+def run_watcher(watcher, source, seconds):
+    watcher.source = source
+    watcher.baseline_done = True
+    thread = threading.Thread(target=watcher._run, daemon=True)
+    thread.start()
+    time.sleep(seconds)
+    watcher._stop.set()
+    thread.join(5)
+
+
+def test_windows():
+    print("=" * 70)
+    print("TEST 2: Window bounds")
+    print("=" * 70)
+
+    root = tempfile.mkdtemp()
+    os.makedirs(os.path.join(root, ".git"))
+    write(root, "app.log", "line\n")
+    mapper = make_mapper(root)
+
+    ignored = CodeWatcher(mapper, debounce_seconds=0.05)
+    run_watcher(ignored, SteadySource([os.path.join(".git", "index")]), 0.3)
+
+    steady = CodeWatcher(mapper, debounce_seconds=0.05, max_wait=0.1)
+    run_watcher(steady, SteadySource(["app.log"]), 0.5)
+    return all([
+        check("ignored paths never queued", ignored.windows_flushed == 0 and not ignored.pending),
+        check("default max_wait is 10 debounce windows", ignored.max_wait == 0.5),
+        check(f"steady writes flushed every max_wait ({steady.windows_flushed} windows)", steady.windows_flushed >= 3),
+    ])
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_background_baseline():
+    print("=" * 70)
+    print("TEST 3: Baseline scan in the watcher thread")
+    print("=" * 70)
+
+    root = tempfile.mkdtemp()
+    write(root, "a.py", "def one():\n    pass\n")
+    mapper = make_mapper(root)
+    release = threading.Event()
+    scan_and_map = mapper.scan_and_map
+
+    def slow_scan(*args, **kwargs):
+        release.wait(5)  # a large repo
+        written = scan_and_map(*args, **kwargs)
+        write(root, "b.py", "def two():\n    pass\n")  # edited after discovery, before the baseline ends
+        return written
+
+    mapper.scan_and_map = slow_scan
+    watcher = CodeWatcher(mapper, debounce_seconds=0.05, poll_interval=0.05, use_inotify=False)
+    started = time.monotonic()
+    watcher.start()
+    returned_in = time.monotonic() - started
+    running = not watcher.status()["baseline_done"]
+
+    release.set()
+    mapped = wait_for(lambda: mapper.manifest.get("b.py") is not None)
+    watcher.stop()
+    return all([
+        check(f"start() returned at once ({returned_in:.2f}s)", returned_in < 1.0 and running),
+        check("baseline done in the thread", watcher.baseline_done and mapper.manifest.get("a.py") is not None),
+        check("edit during the baseline mapped by a window", mapped and watcher.windows_flushed >= 1),
+    ])
+
+
+if __name__ == "__main__":
+    passed = test_failed_window()
+    passed = test_windows() and passed
+    passed = test_background_baseline() and passed
+    print("=" * 70)
+    print("✅ ALL TESTS PASSED" if passed else "❌ SOME TESTS FAILED")
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Test script for CodebaseMapper parsing (no database required)
+
+Tests that:
+1. Symbols carry line ranges, byte offsets and a body hash of exactly their slice
+2. Imports and resolvable calls become DEPENDS_ON edges (File->File, File->Module, Function->Function)
+3. A file edited into invalid syntax keeps its mapped symbols (no removal diff) until it parses again
+4. A full scan detaches the nodes of files deleted before it (manifest kept or lost)
+5. DEPENDS_ON edges are still written when the run that parsed the files failed in the sync
+6. The process pool (forkserver/spawn, never fork) parses exactly like the serial path, and a pool
+   that breaks mid-run falls back to serial parsing without losing or repeating files
+"""
+
+import os
+import sys
+import hashlib
+import tempfile
+from concurrent.futures.process import BrokenProcessPool
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import codebase_mapper
+from codebase_mapper import (parse_file_bytes, generate_uid, parse_file_worker, CodebaseMapper, FileManifest,
+                             STATE_DIR_NAME, MANIFEST_FILE_NAME, NODE_UID, NODE_TYPE, NODE_PATH)
+from code_dependencies import DependencyResolver
+from ignore_rules import IgnoreRules
+
+
+def check(label, actual, expected):
+    ok = actual == expected
+    print(f"  {'✅' if ok else '❌'} {label}: {actual} (expected {expected})")
+    return ok
+
+
+PROJECT = {
+    os.path.join("pkg", "__init__.py"): "",
+    os.path.join("pkg", "util.py"): (
+        "import json\n"
+        "\n"
+        "def helper(x):\n"
+        "    return json.dumps(x)\n"
+        "\n"
+        "class Store:\n"
+        "    def __init__(self):\n"
+        "        self.items = []\n"
+        "\n"
+        "    def add(self, item):\n"
+        "        self.items.append(helper(item))\n"
+    ),
+    os.path.join("pkg", "app.py"): (
+        "from .util import helper, Store\n"
+        "from pkg import util\n"
+        "import requests\n"
+        "\n"
+        "@decorated\n"
+        "def run():\n"
+        "    s = Store()\n"
+        "    s.add(1)\n"
+        "    util.helper(2)\n"
+        "    return helper(3)\n"
+    ),
+    os.path.join("web", "main.js"): (
+        "import { x } from './lib';\n"
+        "const React = require('react');\n"
+        "function start() {\n"
+        "  return x;\n"
+        "}\n"
+    ),
+    os.path.join("web", "lib.js"): "export const x = 1;\n",
+}
+
+
+def parse_project():
+    parsed = {}
+    for rel_path, source in PROJECT.items():
+        deps = {}
+        nodes = parse_file_bytes(rel_path, source.encode("utf-8"), deps)
+        parsed[rel_path] = (nodes, deps)
+    return parsed
+
+
+def test_symbol_spans(parsed):
+    print("=" * 70)
+    print("TEST 1: Symbol spans")
+    print("=" * 70)
+
+    rel_path = os.path.join("pkg", "app.py")
+    data = PROJECT[rel_path].encode("utf-8")
+    run = next(n for n in parsed[rel_path][0] if n["name"] == "run")
+    body = data[run["start_byte"]:run["end_byte"]]
+
+    store_rel = os.path.join("pkg", "util.py")
+    add = next(n for n in parsed[store_rel][0] if n["name"] == "add")
+
+    results = [
+        check("decorator included in start_line", run["start_line"], 5),
+        check("end_line", run["end_line"], 10),
+        check("slice starts with decorator", body.decode().startswith("@decorated\n"), True),
+        check("body_hash matches slice", run["body_hash"], hashlib.sha1(body).hexdigest()),
+        check("method line range", (add["start_line"], add["end_line"]), (10, 11)),
+    ]
+    return all(results)
+
+
+def test_dependencies(parsed):
+    print("=" * 70)
+    print("TEST 2: Dependency resolution")
+    print("=" * 70)
+
+    children = {rel: [n["uid"] for n in nodes if n["type"] != "File"] for rel, (nodes, _) in parsed.items()}
+    resolver = DependencyResolver(PROJECT.keys(), lambda rel: children.get(rel, []), generate_uid, "p1")
+    other_project = DependencyResolver(PROJECT.keys(), lambda rel: children.get(rel, []), generate_uid, "p2")
+
+    app = os.path.join("pkg", "app.py")
+    util = os.path.join("pkg", "util.py")
+    edges, modules = resolver.resolve(app, parsed[app][1])
+    util_edges, _ = resolver.resolve(util, parsed[util][1])
+    js_edges, js_modules = resolver.resolve(os.path.join("web", "main.js"),
+                                            parsed[os.path.join("web", "main.js")][1])
+
+    run_uid = generate_uid("FUNC", app, "run")
+    expected_calls = {
+        (run_uid, generate_uid("FUNC", util, "helper")),
+        (run_uid, generate_uid("FUNC", util, "Store___init__")),
+    }
+    results = [
+        check("File -> File (relative import)", (generate_uid("FILE", app), generate_uid("FILE", util)) in edges, True),
+        check("File -> Module (external)", (generate_uid("FILE", app), "MODULE-p1-requests") in edges, True),
+        check("Module node requested", modules, {"MODULE-p1-requests": "requests"}),
+        check("Module nodes are per project", other_project.resolve(app, parsed[app][1])[1], {"MODULE-p2-requests": "requests"}),
+        check("Function -> Function calls", {e for e in edges if e[0] == run_uid}, expected_calls),
+        check("self.method call", (generate_uid("FUNC", util, "Store_add"), generate_uid("FUNC", util, "helper")) in util_edges, True),
+        check("JS relative import", (generate_uid("FILE", os.path.join("web", "main.js")),
+                                     generate_uid("FILE", os.path.join("web", "lib.js"))) in js_edges, True),
+        check("JS external module", js_modules, {"MODULE-p1-react": "react"}),
+    ]
+    return all(results)
+
+
+class RecordingWriter:
+    def __init__(self):
+        self.nodes, self.removed = [], []
+
+    def add_nodes(self, nodes):
+        self.nodes.extend(nodes)
+
+    def add_removed(self, uids):
+        self.removed.extend(uids)
+
+
+def test_syntax_error():
+    print("=" * 70)
+    print("TEST 3: Half-saved file does not wipe its symbols")
+    print("=" * 70)
+
+    folder = tempfile.mkdtemp()
+    rel_path = os.path.join("pkg", "util.py")
+    full_path = os.path.join(folder, "util.py")
+    mapper = CodebaseMapper.__new__(CodebaseMapper)  # no driver: _apply_parsed only touches the manifest/writer
+    mapper.manifest = FileManifest(os.path.join(folder, "manifest.json"))
+    stats = {"files_parsed": 0, "files_unchanged": 0, "files_failed": 0}
+
+    def edit(source):
+        with open(full_path, "w", encoding="utf-8") as f:
+            f.write(source)
+        entry = mapper.manifest.get(rel_path)
+        _, sha, nodes, deps = parse_file_worker((rel_path, full_path, entry["sha"] if entry else None))
+        writer = RecordingWriter()
+        mapper._apply_parsed(rel_path, len(source), 0, sha, nodes, deps, writer, stats)
+        return writer
+
+    good = PROJECT[rel_path]
+    edit(good)
+    children = mapper.manifest.get(rel_path)["children"]
+    broken = edit(good.replace("def add(self, item):", "def add(self, item"))
+    entry = mapper.manifest.get(rel_path)
+    passed = all([
+        check("symbols mapped", len(children), 4),
+        check("nothing removed while broken", broken.removed, []),
+        check("only the File node written", [n[0] for n in broken.nodes], [generate_uid("FILE", rel_path)]),
+        check("children/deps kept", (entry["children"], "imports" in entry.get("deps", {})), (children, True)),
+        check("file marked as erroring", entry.get("error", "").startswith("SyntaxError"), True),
+    ])
+    fixed = edit(good.replace("    def add(self, item):\n        self.items.append(helper(item))\n", ""))
+    return all([
+        passed,
+        check("fixed file: removal diff applies again", fixed.removed, [generate_uid("FUNC", rel_path, "Store_add")]),
+        check("error cleared", "error" in mapper.manifest.get(rel_path), False),
+        check("counters", (stats["files_parsed"], stats["files_failed"]), (2, 1)),
+    ])
+
+
+class FakeGraph:
+    """Stands in for Neo4j: the mapper's node writes and the File queries it runs."""
+    def __init__(self):
+        self.nodes = {}  # uid -> (type, path)
+
+    def write(self, nodes, removed_uids=None):
+        for uid in removed_uids or []:
+            self.nodes.pop(uid, None)
+        for n in nodes:
+            self.nodes[n[NODE_UID]] = (n[NODE_TYPE], n[NODE_PATH])
+
+    def execute_query(self, query, params=None, database_=None):
+        if "count(f)" in query:
+            return [{"count": sum(1 for t, _ in self.nodes.values() if t == "File")}], None, None
+        if "collect(n.uid)" in query:
+            by_path = {}
+            for uid, (_, path) in self.nodes.items():
+                by_path.setdefault(path, []).append(uid)
+            return [{"path": path, "uids": uids} for path, uids in by_path.items()], None, None
+        return [], None, None
+
+
+def make_mapper(root, graph):
+    """CodebaseMapper over a FakeGraph (DEPENDS_ON sync and version bumps stubbed)."""
+    mapper = CodebaseMapper.__new__(CodebaseMapper)
+    mapper.project_root, mapper.project_id, mapper.driver = root, "p1", graph
+    mapper.workers, mapper.batch_size, mapper.progress_callback, mapper.pause = 1, 500, lambda *a: None, None
+    mapper.ignore_dirs, mapper.ignore_exts = {".git", STATE_DIR_NAME}, {".pyc"}
+    mapper.prune_dir_names = {"maintenance", "archive", "md", "examples"}
+    mapper.ignore_rules = IgnoreRules.from_root(root)
+    mapper.manifest = FileManifest(os.path.join(root, STATE_DIR_NAME, MANIFEST_FILE_NAME))
+    mapper.last_stats = {}
+    mapper.batch_create_nodes = graph.write
+    mapper.sync_dependencies = lambda: 0
+    mapper.bump_version = lambda stats: None
+    return mapper
+
+
+def write_project(root, files):
+    for rel_path, source in files.items():
+        os.makedirs(os.path.join(root, os.path.dirname(rel_path)), exist_ok=True)
+        with open(os.path.join(root, rel_path), "w", encoding="utf-8") as f:
+            f.write(source)
+
+
+def test_full_scan_deletion():
+    print("=" * 70)
+    print("TEST 4: Full scan after a deletion")
+    print("=" * 70)
+
+    root = tempfile.mkdtemp()
+    write_project(root, PROJECT)
+    graph = FakeGraph()
+    mapper = make_mapper(root, graph)
+    mapper.scan_and_map(full=True)
+    util, main_js = os.path.join("pkg", "util.py"), os.path.join("web", "main.js")
+    mapped = len(graph.nodes)
+
+    os.remove(os.path.join(root, util))
+    mapper.scan_and_map(full=True)
+    kept_manifest = dict(mapper.last_stats)
+    util_gone = not any(path == util for _, path in graph.nodes.values())
+
+    # Manifest lost (DB restored, state dir wiped): only the DB knows main.js was mapped
+    os.remove(os.path.join(root, main_js))
+    mapper.manifest.clear()
+    mapper.scan_and_map()
+    lost_manifest = dict(mapper.last_stats)
+    return all([
+        check("full scan after deletion: nodes detached", (kept_manifest["files_removed"], kept_manifest["uids_removed"]), (1, 5)),
+        check("deleted file's symbols gone", util_gone, True),
+        check("lost manifest: deletion found in the DB", (lost_manifest["files_removed"], lost_manifest["uids_removed"]), (1, 2)),
+        check("graph back in line with the manifest", mapper._manifest_matches_db(), True),
+        check("nodes left", len(graph.nodes), mapped - 7),
+    ])
+
+
+class FlakySync:
+    """Stands in for sync_dependencies: records resolved edges in the manifest, or fails."""
+    def __init__(self, mapper):
+        self.mapper, self.fail, self.calls = mapper, False, 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("Neo4j unavailable")
+        for entry in self.mapper.manifest.entries.values():
+            if "deps" in entry:
+                entry["edges"] = []
+        return 0
+
+
+def test_resume_after_failed_sync():
+    print("=" * 70)
+    print("TEST 5: Resume after a failed DEPENDS_ON sync")
+    print("=" * 70)
+
+    root = tempfile.mkdtemp()
+    write_project(root, PROJECT)
+    graph = FakeGraph()
+    mapper = make_mapper(root, graph)
+    mapper.sync_dependencies = FlakySync(mapper)
+    mapper.sync_dependencies.fail = True
+    checkpoints = []
+    try:
+        mapper.scan_and_map(full=True, on_checkpoint=lambda: checkpoints.append(1), checkpoint_seconds=0)
+        raised = False
+    except ConnectionError:
+        raised = True
+
+    resumed = make_mapper(root, graph)  # new job: manifest from the last checkpoint
+    resumed.sync_dependencies = FlakySync(resumed)
+    resumed.scan_and_map(resume=True)
+    resumed_sync = resumed.sync_dependencies.calls
+    resumed.scan_and_map()
+    return all([
+        check("sync failure surfaces after checkpoints", (raised, len(checkpoints) > 0), (True, True)),
+        check("resumed run parses nothing", resumed.last_stats["files_parsed"], 0),
+        check("resumed run still syncs DEPENDS_ON", resumed_sync, 1),
+        check("no sync once edges are written", resumed.sync_dependencies.calls, 1),
+    ])
+
+
+class BreakingPool:
+    """ProcessPoolExecutor stand-in whose workers die after `survive` results."""
+    survive = 10
+
+    def __init__(self, max_workers=None, initializer=None, mp_context=None):
+        self.mp_context = mp_context
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def map(self, fn, tasks, chunksize=1):
+        for i, task in enumerate(tasks):
+            if i == self.survive:
+                raise BrokenProcessPool("worker died")
+            yield fn(task)
+
+
+def test_parser_pool():
+    print("=" * 70)
+    print("TEST 6: Parser pool")
+    print("=" * 70)
+
+    root = tempfile.mkdtemp()
+    files = {os.path.join("pkg", f"mod_{i:03d}.py"): f"import os\n\nclass C{i}:\n    def run(self):\n        return f{i}()\n\ndef f{i}():\n    return {i}\n"
+             for i in range(codebase_mapper.PARALLEL_MIN_FILES + 6)}
+    write_project(root, files)
+    mapper = make_mapper(root, FakeGraph())
+    tasks = sorted((rel, os.path.join(root, rel), None) for rel in files)
+
+    mapper.workers = 1
+    serial = list(mapper._parse_all(tasks))
+    mapper.workers = 2
+    parallel = list(mapper._parse_all(tasks))
+
+    real_pool, codebase_mapper.ProcessPoolExecutor = codebase_mapper.ProcessPoolExecutor, BreakingPool
+    try:
+        recovered = list(mapper._parse_all(tasks))
+    finally:
+        codebase_mapper.ProcessPoolExecutor = real_pool
+    return all([
+        check("pool start method is not fork", codebase_mapper.pool_context().get_start_method() in ("forkserver", "spawn"), True),
+        check("parallel == serial (nodes, deps, order)", parallel == serial, True),
+        check("every file parsed", len(serial), len(tasks)),
+        check("broken pool: serial fallback, same result", recovered == serial, True),
+    ])
+
+
+if __name__ == "__main__":
+    parsed = parse_project()
+    passed = test_symbol_spans(parsed)
+    passed = test_dependencies(parsed) and passed
+    passed = test_syntax_error() and passed
+    passed = test_full_scan_deletion() and passed
+    passed = test_resume_after_failed_sync() and passed
+    passed = test_parser_pool() and passed
+    print("=" * 70)
+    print("✅ ALL TESTS PASSED" if passed else "❌ SOME TESTS FAILED")
+    sys.exit(0 if passed else 1)
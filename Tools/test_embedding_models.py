@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Test script for the embedding model registry and online migration (embedding_models.py, no database required)
+
+Tests that:
+1. Per-project model selection persists; selecting the active model cancels a migration
+2. Migration fills n.embedding_next while n.embedding stays on the old model, then cuts over atomically
+3. Nodes edited during a migration are re-embedded by the queue and migrated again before cutover
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from embedding_models import ModelRegistry, ModelMigrator, DEFAULT_MODEL
+from embedding_queue import EmbeddingQueue
+
+NEW_MODEL = "all-mpnet-base-v2"
+
+
+class FakeGraph:
+    """In-memory nodes; serves the migrator's and the embedding queue's queries."""
+    def __init__(self, nodes):
+        self.nodes = {n["uid"]: dict(n) for n in nodes}
+
+    def project(self, pid):
+        return [n for n in self.nodes.values() if n.get("project_id") == pid]
+
+    def execute_query(self, query, params=None, **kwargs):
+        params = params or {}
+        if "AS remaining" in query:
+            return [{"remaining": sum(1 for n in self.project(params["project_id"])
+                                      if n.get("embedding_dirty") is not None
+                                      or n.get("embedding_next_model") != params["model"])}], None, None
+        if "SET n.embedding_next = row.embedding" in query:
+            for row in params["rows"]:
+                n = self.nodes[row["uid"]]
+                if n.get("embedding_dirty") is None and (n.get("title") or "") == row["title"]:
+                    n["embedding_next"], n["embedding_next_model"] = row["embedding"], params["model"]
+            return [], None, None
+        if "n.embedding_next_model, '') <> $model" in query:
+            todo = [n for n in self.project(params["project_id"])
+                    if n.get("embedding_dirty") is None and n.get("embedding_next_model") != params["model"]]
+            return [{"uid": n["uid"], "title": n.get("title") or "", "description": n.get("description") or ""}
+                    for n in todo[:params["limit"]]], None, None
+        if "AS switched" in query:
+            switched = 0
+            for n in self.project(params["project_id"]):
+                if n.get("embedding_next_model") == params["model"]:
+                    n["embedding"], n["embedding_model"] = n.pop("embedding_next"), params["model"]
+                    del n["embedding_next_model"]
+                    switched += 1
+            return [{"switched": switched}], None, None
+        if "ORDER BY n.embedding_dirty" in query:
+            dirty = [n for n in self.nodes.values() if n.get("embedding_dirty") is not None]
+            return [{"uid": n["uid"], "token": n["embedding_dirty"], "title": n.get("title"), "description": None,
+                     "project_id": n.get("project_id"), "content": None, "passage_hash": None,
+                     "embedding_hash": None, "has_embedding": "embedding" in n,
+                     "embedding_model": n.get("embedding_model")} for n in dirty], None, None
+        if "REMOVE n.embedding_dirty" in query:
+            written = []
+            for row in params["rows"]:
+                n = self.nodes[row["uid"]]
+                if row["embedding"] is not None:
+                    n["embedding"], n["embedding_model"] = row["embedding"], row["model"]
+                    n.pop("embedding_next", None)
+                    n.pop("embedding_next_model", None)
+                n["embedding_dirty"] = None
+                written.append({"uid": row["uid"]})
+            return written, None, None
+        raise AssertionError(f"unexpected query: {query}")
+
+
+def encode(texts, model=None):
+    """Vectors that remember which model produced them."""
+    return [[model or DEFAULT_MODEL, t] for t in texts]
+
+
+def check(label, ok):
+    print(f"  {'✅' if ok else '❌'} {label}")
+    return ok
+
+
+def test_registry():
+    print("=" * 70)
+    print("TEST 1: Registry persistence")
+    print("=" * 70)
+
+    path = os.path.join(tempfile.mkdtemp(), "embedding_models.json")
+    registry = ModelRegistry(path)
+    results = [check("default model", registry.active("p1") == DEFAULT_MODEL and registry.next("p1") is None)]
+    registry.begin("p1", NEW_MODEL)
+    reloaded = ModelRegistry(path)
+    results.append(check("migration target persisted", reloaded.migrations() == {"p1": NEW_MODEL}))
+    reloaded.begin("p1", DEFAULT_MODEL)
+    results.append(check("active model cancels", reloaded.migrations() == {} and reloaded.active("p1") == DEFAULT_MODEL))
+    try:
+        registry.begin("p1", "no-such-model")
+        results.append(check("unknown model rejected", False))
+    except ValueError:
+        results.append(check("unknown model rejected", True))
+    return all(results)
+
+
+def test_migration():
+    print("=" * 70)
+    print("TEST 2: Online migration with cutover")
+    print("=" * 70)
+
+    graph = FakeGraph([{"uid": f"REQ-{i}", "title": f"Req {i}", "project_id": "p1",
+                        "embedding": [DEFAULT_MODEL, f"Req {i} "]} for i in range(5)]
+                      + [{"uid": "REQ-Other", "title": "Other", "project_id": "p2", "embedding": [DEFAULT_MODEL, "x"]}])
+    registry = ModelRegistry(os.path.join(tempfile.mkdtemp(), "embedding_models.json"))
+    cutovers = []
+    migrator = ModelMigrator(registry, encode, on_cutover=lambda *args: cutovers.append(args), batch_size=2)
+    queue = EmbeddingQueue(encode, registry=registry)
+
+    registry.begin("p1", NEW_MODEL)
+    migrator.step(graph)
+    results = [
+        check("searches still on old vectors", all(n["embedding"][0] == DEFAULT_MODEL for n in graph.nodes.values())),
+        check("first batch migrated", sum(n.get("embedding_next_model") == NEW_MODEL for n in graph.nodes.values()) == 2),
+    ]
+
+    # An edit lands mid-migration: queue re-embeds with the active (old) model and drops the stale next vector
+    graph.nodes["REQ-0"].update(title="Req 0 edited", embedding_dirty=1)
+    results.append(check("dirty node blocks cutover", not migrator.cutover(graph, "p1")))
+    queue.drain(graph)
+    results.append(check("queue re-embedded with old model", graph.nodes["REQ-0"]["embedding"][0] == DEFAULT_MODEL
+                         and "embedding_next" not in graph.nodes["REQ-0"]))
+
+    while migrator.step(graph):
+        pass
+    project_nodes = graph.project("p1")
+    results += [
+        check("cut over to the new model", registry.active("p1") == NEW_MODEL and registry.migrations() == {}),
+        check("all p1 vectors from the new model", all(n["embedding"][0] == NEW_MODEL and n["embedding_model"] == NEW_MODEL
+                                                      for n in project_nodes)),
+        check("edited text migrated", graph.nodes["REQ-0"]["embedding"][1].startswith("Req 0 edited")),
+        check("other project untouched", graph.nodes["REQ-Other"]["embedding"][0] == DEFAULT_MODEL),
+        check("cutover reported", cutovers == [("p1", DEFAULT_MODEL, NEW_MODEL)]),
+    ]
+    return all(results)
+
+
+if __name__ == "__main__":
+    passed = test_registry()
+    passed = test_migration() and passed
+    print("=" * 70)
+    print("✅ ALL TESTS PASSED" if passed else "❌ SOME TESTS FAILED")
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Test script for the durable re-embedding queue (embedding_queue.py, no database required)
+
+Tests that:
+1. Dirty nodes are embedded in batches, marks are cleared, listeners are notified
+2. Unchanged texts are not re-encoded; nodes rewritten mid-batch stay queued
+3. Marks survive while the model is unavailable
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from embedding_queue import EmbeddingQueue, semantic_text, text_hash
+
+
+class FakeGraph:
+    """In-memory nodes; serves the queue's fetch / write queries."""
+    def __init__(self, nodes):
+        self.nodes = {n["uid"]: dict(n) for n in nodes}
+        self.before_write = None  # hook: simulate a writer landing mid-batch
+
+    def execute_query(self, query, params=None, **kwargs):
+        if "ORDER BY n.embedding_dirty" in query:
+            dirty = sorted((n for n in self.nodes.values() if n.get("embedding_dirty") is not None),
+                           key=lambda n: n["embedding_dirty"])[:params["limit"]]
+            return [{"uid": n["uid"], "token": n["embedding_dirty"], "title": n.get("title"),
+                     "description": n.get("description"), "project_id": n.get("project_id"),
+                     "content": n.get("content"), "passage_hash": n.get("passage_hash"),
+                     "embedding_hash": n.get("embedding_hash"), "has_embedding": n.get("embedding") is not None,
+                     "embedding_model": n.get("embedding_model")}
+                    for n in dirty], None, None
+        if "REMOVE n.embedding_dirty" in query:
+            if self.before_write:
+                self.before_write(self)
+            written = []
+            for row in params["rows"]:
+                node = self.nodes[row["uid"]]
+                if node.get("embedding_dirty") != row["token"]:
+                    continue
+                if row["embedding"] is not None:
+                    node["embedding"] = row["embedding"]
+                node["embedding_hash"] = row["hash"]
+                node["embedding_dirty"] = None
+                written.append({"uid": row["uid"]})
+            return written, None, None
+        if "passage_starts" in query:
+            for row in params["rows"]:
+                self.nodes[row["uid"]]["passage_hash"] = row["hash"]
+            return [], None, None
+        if "count(n) AS pending" in query:
+            return [{"pending": sum(n.get("embedding_dirty") is not None for n in self.nodes.values())}], None, None
+        raise AssertionError(f"unexpected query: {query}")
+
+
+class FakeModel:
+    def __init__(self):
+        self.calls = []
+        self.available = True
+
+    def encode(self, texts, model=None):
+        if not self.available:
+            return None
+        self.calls.append(list(texts))
+        return [[float(len(t)), 1.0] for t in texts]
+
+
+def check(label, ok):
+    print(f"  {'✅' if ok else '❌'} {label}")
+    return ok
+
+
+def test_drain():
+    print("=" * 70)
+    print("TEST 1: Batched drain")
+    print("=" * 70)
+
+    graph = FakeGraph([{"uid": f"REQ-{i}", "title": f"Req {i}", "description": "d", "project_id": "p1",
+                        "embedding_dirty": i} for i in range(5)]
+                      + [{"uid": "SPEC-Long", "title": "Long", "content": "word " * 300, "embedding_dirty": 9}])
+    model = FakeModel()
+    notified = []
+    queue = EmbeddingQueue(model.encode, on_embedded=lambda uid, emb, pid, model: notified.append(uid), batch_size=2)
+    stats = queue.drain(graph)
+
+    return all([
+        check("all 6 embedded", stats["embedded"] == 6 and all(n.get("embedding") for n in graph.nodes.values())),
+        check("queue empty", queue.pending(graph) == 0),
+        check("node texts encoded in batches of 2", [len(c) for c in model.calls if len(c[0]) < 100] == [2, 2, 2]),
+        check("passages refreshed for content", stats["passages"] == 1 and graph.nodes["SPEC-Long"].get("passage_hash")),
+        check("listener notified", sorted(notified) == sorted(graph.nodes)),
+    ])
+
+
+def test_skip_and_race():
+    print("=" * 70)
+    print("TEST 2: Unchanged text skipped, mid-batch rewrite stays queued")
+    print("=" * 70)
+
+    same = semantic_text("Same", "text")
+    graph = FakeGraph([
+        {"uid": "REQ-Same", "title": "Same", "description": "text", "embedding": [1.0],
+         "embedding_hash": text_hash(same), "embedding_dirty": 1},
+        {"uid": "REQ-Race", "title": "Old", "description": "", "embedding_dirty": 2},
+    ])
+    model = FakeModel()
+    queue = EmbeddingQueue(model.encode)
+
+    def rewrite(g):
+        g.nodes["REQ-Race"].update(title="New", embedding_dirty=3)
+        g.before_write = None
+    graph.before_write = rewrite
+
+    first = queue.process_batch(graph)
+    results = [
+        check("only the changed text encoded", model.calls == [[semantic_text("Old", "")]]),
+        check("unchanged node cleared, vector kept", graph.nodes["REQ-Same"]["embedding_dirty"] is None
+              and graph.nodes["REQ-Same"]["embedding"] == [1.0]),
+        check("rewritten node still queued", first["nodes"] == 1 and graph.nodes["REQ-Race"]["embedding_dirty"] == 3),
+    ]
+    queue.process_batch(graph)
+    results.append(check("re-embedded with the new text", graph.nodes["REQ-Race"]["embedding"][0] == len(semantic_text("New", ""))))
+    return all(results)
+
+
+def test_model_unavailable():
+    print("=" * 70)
+    print("TEST 3: Model unavailable")
+    print("=" * 70)
+
+    graph = FakeGraph([{"uid": "TASK-A", "title": "A", "embedding_dirty": 1}])
+    model = FakeModel()
+    model.available = False
+    queue = EmbeddingQueue(model.encode)
+    stats = queue.drain(graph)
+    results = [check("nothing embedded, mark kept", stats["embedded"] == 0 and queue.pending(graph) == 1)]
+    model.available = True
+    results.append(check("drained once the model is back", queue.drain(graph)["embedded"] == 1))
+    return all(results)
+
+
+if __name__ == "__main__":
+    passed = test_drain()
+    passed = test_skip_and_race() and passed
+    passed = test_model_unavailable() and passed
+    print("=" * 70)
+    print("✅ ALL TESTS PASSED" if passed else "❌ SOME TESTS FAILED")
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+Test script for the in-memory topology mirror (graph_topology.py, no database required)
+
+Tests that:
+1. BFS over CSR + delta overlay matches a reference traversal after random mutations
+2. Snapshot save/mmap load round-trips and verifies against DB counts
+3. Union-find components (find_orphans) stay correct under incremental updates,
+   and do not deadlock against concurrent link/unlink
+4. Memoized DECOMPOSES closures (illuminate_path) are invalidated on link/unlink/delete
+5. Impact sets (analyze_impact) follow DECOMPOSES down, IMPLEMENTS/DEPENDS_ON reversed
+6. Bidirectional BFS (find_path) returns shortest, valid edge sequences
+7. Concurrent tool traffic (find_orphans, illuminate_path, analyze_impact, find_path vs
+   link_nodes/delete_link/delete_node and reloads) neither deadlocks nor corrupts the indexes
+"""
+
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from graph_topology import TopologyMirror
+from graph_components import ComponentIndex
+from graph_hierarchy import HierarchyIndex
+from graph_impact import ImpactIndex
+
+
+class FakeDriver:
+    """Answers the mirror's three queries from in-memory node/edge lists."""
+    def __init__(self, nodes, edges):
+        self.nodes, self.edges = nodes, edges
+
+    def execute_query(self, query, params=None, **kwargs):
+        if "count(r)" in query:
+            return [{"nodes": len(self.nodes), "edges": len(self.edges)}], None, None
+        if "type(r)" in query:
+            return [{"s": s, "type": r, "t": t} for s, r, t in self.edges], None, None
+        return [{"uid": u, "labels": l, "project_id": p} for u, l, p in self.nodes], None, None
+
+
+def reference_hops(driver, uid, max_hops):
+    alive = {n[0] for n in driver.nodes}
+    adjacency = {}
+    for s, _, t in driver.edges:
+        adjacency.setdefault(s, set()).add(t)
+        adjacency.setdefault(t, set()).add(s)
+    dist, frontier = {uid: 0}, [uid]
+    for step in range(1, max_hops + 1):
+        nxt = []
+        for x in frontier:
+            for y in adjacency.get(x, ()):
+                if y not in dist and y in alive:
+                    dist[y] = step
+                    nxt.append(y)
+        frontier = nxt
+    del dist[uid]
+    return dist
+
+
+def build_graph():
+    random.seed(7)
+    nodes = [(f"N{i}", ["Requirement" if i % 3 == 0 else "Spec"], "p1" if i % 2 else None) for i in range(200)]
+    edges = set()
+    while len(edges) < 600:
+        a, b = random.randrange(200), random.randrange(200)
+        if a != b:
+            edges.add((f"N{a}", random.choice(["DECOMPOSES", "IMPLEMENTS"]), f"N{b}"))
+    return FakeDriver(nodes, list(edges))
+
+
+def test_mutations(driver, mirror):
+    print("=" * 70)
+    print("TEST 1: Traversal after mutations")
+    print("=" * 70)
+
+    for _ in range(300):
+        if random.random() < 0.5:
+            edge = random.choice(driver.edges)
+            driver.edges.remove(edge)
+            mirror.remove_edge(*edge)
+        else:
+            a, b = random.randrange(200), random.randrange(200)
+            edge = (f"N{a}", "DEPENDS_ON", f"N{b}")
+            if a != b and edge not in driver.edges:
+                driver.edges.append(edge)
+                mirror.add_edge(*edge)
+
+    driver.nodes.append(("NEW", ["Requirement"], "p1"))
+    mirror.add_node("NEW", ["Requirement"], "p1")
+    driver.edges.append(("NEW", "DECOMPOSES", "N1"))
+    mirror.add_edge("NEW", "DECOMPOSES", "N1")
+
+    driver.nodes = [n for n in driver.nodes if n[0] != "N5"]
+    driver.edges = [e for e in driver.edges if "N5" not in (e[0], e[2])]
+    mirror.remove_node("N5")
+
+    ok = True
+    for uid in ["N0", "N1", "NEW", "N7"]:
+        match = mirror.within_hops(uid, 3) == reference_hops(driver, uid, 3)
+        print(f"  {'✅' if match else '❌'} 3-hop BFS from {uid}")
+        ok = ok and match
+    consistent = mirror.verify(driver)
+    print(f"  {'✅' if consistent else '❌'} counts match DB ({mirror.edge_count} edges)")
+    return ok and consistent
+
+
+def test_paths(driver, mirror):
+    print("=" * 70)
+    print("TEST 6: Bidirectional shortest paths")
+    print("=" * 70)
+
+    edges = set(driver.edges)
+    ok, checked = True, 0
+    for source in ["N0", "N1", "NEW", "N7", "N33"]:
+        distances = reference_hops(driver, source, 12)
+        for target in ["N2", "N10", "N99", "N150", "N5"]:
+            path = mirror.shortest_path(source, target, max_hops=12)
+            if target not in distances:
+                ok = ok and path is None
+                continue
+            checked += 1
+            valid = path[0][0] == source and path[-1][0] == target and len(path) - 1 == distances[target]
+            for (a, _, _), (b, rel, forward) in zip(path, path[1:]):
+                valid = valid and ((a, rel, b) if forward else (b, rel, a)) in edges
+            ok = ok and valid
+    print(f"  {'✅' if ok else '❌'} {checked} paths shortest and made of real edges")
+    return ok
+
+
+def test_snapshot(driver, mirror, path):
+    print("=" * 70)
+    print("TEST 2: Snapshot round-trip (mmap)")
+    print("=" * 70)
+
+    mirror.save_snapshot(path)
+    restored = TopologyMirror(snapshot_path=path)
+    loaded = restored.load_snapshot()
+    print(f"  {'✅' if loaded else '❌'} snapshot loaded")
+    if not loaded:
+        return False
+    consistent = restored.verify(driver)
+    print(f"  {'✅' if consistent else '❌'} snapshot consistent with DB")
+    match = restored.within_hops("N1", 3) == reference_hops(driver, "N1", 3)
+    print(f"  {'✅' if match else '❌'} BFS over mmap-backed CSR")
+    scoped = set(restored.nodes("Requirement", "p1")) == {
+        u for u, labels, p in driver.nodes if labels[0] == "Requirement" and p in ("p1", None)}
+    print(f"  {'✅' if scoped else '❌'} label + project bitset filter")
+    return consistent and match and scoped
+
+
+def test_components():
+    print("=" * 70)
+    print("TEST 3: Union-find components for find_orphans")
+    print("=" * 70)
+
+    nodes = [(u, ["Spec"], "p1") for u in ["IDEA-Genesis", "A", "B", "C", "D", "LONE"]]
+    edges = [("IDEA-Genesis", "DECOMPOSES", "A"), ("C", "DECOMPOSES", "D"), ("B", "DEPENDS_ON", "A")]
+    driver = FakeDriver(nodes, edges)
+    mirror = TopologyMirror()
+    mirror.ensure_fresh(driver)
+    index = ComponentIndex(mirror)
+
+    results = []
+    # B only DEPENDS_ON the tree: not part of the DECOMPOSES|IMPLEMENTS main component
+    results.append(index.orphans("p1") == (["LONE"], ["B", "C", "D"]))
+    mirror.add_edge("A", "IMPLEMENTS", "C")          # incremental union
+    results.append(index.orphans("p1") == (["LONE"], ["B"]))
+    results.append(index.rebuilds == 1)
+    mirror.remove_edge("A", "IMPLEMENTS", "C")       # split: lazy rebuild
+    results.append(index.orphans("p1") == (["LONE"], ["B", "C", "D"]))
+    results.append(index.rebuilds == 2)
+
+    # find_orphans in one thread, link/unlink IMPLEMENTS in another (lock order mirror -> index)
+    stop = threading.Event()
+
+    def reports():
+        while not stop.is_set():
+            index.orphans("p1")
+
+    def links():
+        for _ in range(2000):
+            mirror.add_edge("A", "IMPLEMENTS", "C")
+            mirror.remove_edge("A", "IMPLEMENTS", "C")
+        stop.set()
+
+    threads = [threading.Thread(target=reports, daemon=True), threading.Thread(target=links, daemon=True)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(20)
+    finished = not any(thread.is_alive() for thread in threads)
+    results.append(finished)
+    results.append(finished and index.orphans("p1") == (["LONE"], ["B", "C", "D"]))
+
+    for i, ok in enumerate(results, 1):
+        print(f"  {'✅' if ok else '❌'} step {i}")
+    return all(results)
+
+
+def test_hierarchy():
+    print("=" * 70)
+    print("TEST 4: DECOMPOSES closure after link/unlink/delete")
+    print("=" * 70)
+
+    random.seed(11)
+    nodes = [(f"H{i}", ["Spec"], "p1") for i in range(60)]
+    edges = list({(f"H{random.randrange(i)}", "DECOMPOSES", f"H{i}") for i in range(1, 60) for _ in range(2)})
+    driver = FakeDriver(nodes, edges)
+    mirror = TopologyMirror()
+    mirror.ensure_fresh(driver)
+    index = HierarchyIndex(mirror)
+
+    ok = True
+    for step in range(120):
+        uid = f"H{random.randrange(60)}"
+        if mirror.has(uid):
+            ok = ok and index.ancestors(uid) == reference_closure(driver.edges, uid, "up")
+            ok = ok and index.descendants(uid, max_depth=3) == {
+                u: d for u, d in reference_closure(driver.edges, uid, "down").items() if d <= 3}
+        action = step % 3
+        if action == 0 and driver.edges:
+            edge = random.choice(driver.edges)
+            driver.edges.remove(edge)
+            mirror.remove_edge(*edge)
+        elif action == 1:
+            a, b = random.randrange(60), random.randrange(60)
+            edge = (f"H{a}", "DECOMPOSES", f"H{b}")
+            if a != b and edge not in driver.edges and mirror.has(edge[0]) and mirror.has(edge[2]):
+                driver.edges.append(edge)
+                mirror.add_edge(*edge)
+        elif step % 30 == 2:
+            victim = f"H{random.randrange(60)}"
+            driver.nodes = [n for n in driver.nodes if n[0] != victim]
+            driver.edges = [e for e in driver.edges if victim not in (e[0], e[2])]
+            mirror.remove_node(victim)
+
+    print(f"  {'✅' if ok else '❌'} closures match reference ({index.hits} hits, {index.misses} misses)")
+    return ok and index.hits > 0
+
+
+def reference_closure(edges, uid, direction):
+    adjacency = {}
+    for s, _, t in edges:
+        a, b = (t, s) if direction == "up" else (s, t)
+        adjacency.setdefault(a, []).append(b)
+    dist, queue = {uid: 0}, [uid]
+    for x in queue:
+        for y in adjacency.get(x, ()):
+            if y not in dist:
+                dist[y] = dist[x] + 1
+                queue.append(y)
+    del dist[uid]
+    return dist
+
+
+def reference_impact(edges, uid, max_depth):
+    affects = {}
+    for s, rel, t in edges:
+        a, b = (s, t) if rel == "DECOMPOSES" else (t, s)
+        affects.setdefault(a, []).append(b)
+    dist, queue = {uid: 0}, [uid]
+    for x in queue:
+        if dist[x] >= max_depth:
+            continue
+        for y in affects.get(x, ()):
+            if y not in dist:
+                dist[y] = dist[x] + 1
+                queue.append(y)
+    del dist[uid]
+    return dist
+
+
+def test_impact():
+    print("=" * 70)
+    print("TEST 5: Impact sets after link/unlink")
+    print("=" * 70)
+
+    random.seed(5)
+    rels = ["DECOMPOSES", "IMPLEMENTS", "DEPENDS_ON"]
+    nodes = [(f"I{i}", ["Requirement"], "p1") for i in range(80)]
+    edges = list({(f"I{random.randrange(80)}", random.choice(rels), f"I{random.randrange(80)}") for _ in range(160)})
+    edges = [e for e in edges if e[0] != e[2]]
+    driver = FakeDriver(nodes, edges)
+    mirror = TopologyMirror()
+    mirror.ensure_fresh(driver)
+    index = ImpactIndex(mirror, max_depth=4)
+
+    ok = True
+    for step in range(150):
+        uid = f"I{random.randrange(80)}"
+        rows, _ = index.impact(uid)
+        ok = ok and {u: d for u, d, _ in rows} == reference_impact(driver.edges, uid, 4)
+        if step % 2 and driver.edges:
+            edge = random.choice(driver.edges)
+            driver.edges.remove(edge)
+            mirror.remove_edge(*edge)
+        else:
+            a, b = random.randrange(80), random.randrange(80)
+            edge = (f"I{a}", random.choice(rels), f"I{b}")
+            if a != b and edge not in driver.edges:
+                driver.edges.append(edge)
+                mirror.add_edge(*edge)
+
+    capped = ImpactIndex(mirror, max_depth=4, budget=3)
+    rows, truncated = capped.impact("I0")
+    bounded = len(rows) <= 3
+    print(f"  {'✅' if ok else '❌'} impact sets match reference ({index.hits} hits, {index.misses} misses)")
+    print(f"  {'✅' if bounded else '❌'} budget caps hub traversal (truncated={truncated})")
+    return ok and bounded and index.hits > 0
+
+
+def test_concurrency():
+    print("=" * 70)
+    print("TEST 7: Concurrent readers and writers (lock order mirror -> index)")
+    print("=" * 70)
+
+    random.seed(13)
+    rels = ["DECOMPOSES", "IMPLEMENTS", "DEPENDS_ON"]
+    nodes = [("IDEA-Genesis", ["Idea"], "p1")] + [(f"C{i}", ["Spec"], "p1") for i in range(60)]
+    edges = list({(random.choice(["IDEA-Genesis"] + [f"C{j}" for j in range(i)]), random.choice(rels), f"C{i}")
+                  for i in range(60)})
+    driver = FakeDriver(nodes, list(edges))
+    mirror = TopologyMirror(compact_threshold=40)
+    mirror.ensure_fresh(driver)
+    components, hierarchy, impact = ComponentIndex(mirror), HierarchyIndex(mirror), ImpactIndex(mirror, max_depth=4)
+
+    stop = threading.Event()
+    errors = []
+
+    def guarded(fn):
+        def run():
+            try:
+                fn()
+            except Exception as e:
+                errors.append(repr(e))
+                stop.set()
+        return threading.Thread(target=run, daemon=True)
+
+    def uid():
+        return f"C{random.randrange(60)}"
+
+    def orphans():                      # find_orphans
+        while not stop.is_set():
+            components.orphans("p1")
+            components.connected("IDEA-Genesis", uid())
+
+    def paths():                        # illuminate_path / analyze_impact / find_path / look_around
+        while not stop.is_set():
+            u = uid()
+            hierarchy.ancestors(u)
+            hierarchy.descendants(u, max_depth=3)
+            impact.impact(u)
+            mirror.shortest_path(u, uid())
+            mirror.within_hops(u, 2)
+
+    def writes():                       # link_nodes / delete_link / delete_node / create_concept
+        for step in range(1500):
+            s, t = uid(), uid()
+            if s == t:
+                continue
+            edge = (s, random.choice(rels), t)
+            if step % 3 == 0:
+                mirror.add_edge(*edge)
+            elif step % 3 == 1:
+                mirror.remove_edge(*edge)
+            elif step % 150 == 2:
+                mirror.remove_node(s)
+                mirror.add_node(s, ["Spec"], "p1")
+            else:
+                mirror.add_edge(*edge)
+                mirror.remove_edge(*edge)
+        stop.set()
+
+    def reloads():                      # bulk writers mark the mirror stale; the next call reloads it
+        while not stop.is_set():
+            mirror.load(driver)
+            stop.wait(0.05)
+
+    threads = [guarded(fn) for fn in (orphans, orphans, paths, paths, writes, reloads)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 30
+    for thread in threads:
+        thread.join(max(0.0, deadline - time.monotonic()))
+    finished = not any(thread.is_alive() for thread in threads)
+
+    consistent = finished
+    if finished:
+        # Incrementally maintained answers == indexes built from scratch over the final mirror
+        fresh = ComponentIndex(mirror), HierarchyIndex(mirror), ImpactIndex(mirror, max_depth=4)
+        consistent = components.orphans("p1") == fresh[0].orphans("p1") and all(
+            hierarchy.ancestors(f"C{i}") == fresh[1].ancestors(f"C{i}")
+            and hierarchy.descendants(f"C{i}") == fresh[1].descendants(f"C{i}")
+            and impact.impact(f"C{i}") == fresh[2].impact(f"C{i}") for i in range(60))
+    print(f"  {'✅' if finished else '❌'} no deadlock (all threads finished)")
+    print(f"  {'✅' if not errors else '❌'} no errors in reader/writer threads {errors[:3]}")
+    print(f"  {'✅' if consistent else '❌'} indexes consistent with the mirror afterwards")
+    return finished and not errors and consistent
+
+
+if __name__ == "__main__":
+    driver = build_graph()
+    with tempfile.TemporaryDirectory() as tmp:
+        mirror = TopologyMirror(compact_threshold=50)
+        mirror.ensure_fresh(driver)
+        passed = test_mutations(driver, mirror)
+        passed = test_paths(driver, mirror) and passed
+        passed = test_snapshot(driver, mirror, os.path.join(tmp, "topology.bin")) and passed
+    passed = test_components() and passed
+    passed = test_hierarchy() and passed
+    passed = test_impact() and passed
+    passed = test_concurrency() and passed
+    print("=" * 70)
+    print("✅ ALL TESTS PASSED" if passed else "❌ SOME TESTS FAILED")
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Test script for graph versions and the response cache (graph_version.py, no database required)
+
+Tests that:
+1. The response cache evicts least recently used entries by count and by total size
+2. Bumping a project or the global scope changes that project's version key, other projects keep theirs
+3. Node scopes (and neighbour scopes) are resolved for uid-based bumps
+4. The version watermark accepts the server's own bumps (in any order) and flags anybody else's
+"""
+
+import os
+import sys
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from graph_version import (ResponseCache, GLOBAL_SCOPE, bump, bump_all, current, normalize_args, all_versions,
+                           VersionWatermark)
+
+
+class FakeGraph:
+    """In-memory GraphVersion nodes plus a few nodes with edges; serves graph_version's queries."""
+    def __init__(self, nodes, edges=()):
+        self.versions = {}
+        self.nodes = nodes  # uid -> project_id
+        self.edges = list(edges)
+
+    def _bump(self, scope):
+        v = self.versions.setdefault(scope, {"version": 0, "epoch": str(uuid.uuid4())})
+        v["version"] += 1
+
+    def execute_query(self, query, params=None, **kwargs):
+        params = params or {}
+        if "AS scopes" in query:
+            own, near = set(), set()
+            for uid in params["uids"]:
+                if uid not in self.nodes:
+                    continue
+                own.add(self.nodes[uid] or GLOBAL_SCOPE)
+                if params["with_neighbors"]:
+                    for a, b in self.edges:
+                        if uid in (a, b):
+                            near.add(self.nodes[b if a == uid else a] or GLOBAL_SCOPE)
+            return [{"scopes": sorted(own) + sorted(near)}], None, None
+        if "MATCH (v:GraphVersion)" in query and "SET" not in query:
+            return [{"scope": s, "epoch": v["epoch"], "version": v["version"]} for s, v in self.versions.items()], None, None
+        if "MATCH (v:GraphVersion)" in query:
+            self._bump(GLOBAL_SCOPE)
+            self.versions[GLOBAL_SCOPE]["version"] -= 1  # MERGE then the blanket bump: +1 overall
+            for scope in list(self.versions):
+                self._bump(scope)
+            return [], None, None
+        if "UNWIND $scopes" in query and "MERGE" in query:
+            for scope in params["scopes"]:
+                self._bump(scope)
+            return [{"scope": s, "epoch": self.versions[s]["epoch"], "version": self.versions[s]["version"]}
+                    for s in params["scopes"]], None, None
+        if "OPTIONAL MATCH (v:GraphVersion" in query:
+            return [{"scope": s, "epoch": self.versions.get(s, {}).get("epoch"),
+                     "version": self.versions.get(s, {}).get("version", 0)} for s in params["scopes"]], None, None
+        raise AssertionError(f"unexpected query: {query}")
+
+
+def check(label, ok):
+    print(f"  {'✅' if ok else '❌'} {label}")
+    return ok
+
+
+def test_eviction():
+    print("=" * 70)
+    print("TEST 1: LRU eviction")
+    print("=" * 70)
+
+    cache = ResponseCache(max_entries=2, max_chars=10)
+    cache.put("a", ["aaa"])
+    cache.put("b", ["bbb"])
+    cache.get("a")
+    cache.put("c", ["ccc"])
+    results = [check("least recently used evicted by count", cache.get("b") is None and cache.get("a") == ("aaa",))]
+    cache.put("d", ["dddddddd"])
+    results += [
+        check("evicted by total size", cache.chars <= 10 and cache.get("d") == ("dddddddd",) and len(cache.entries) == 1),
+        check("oversized answer not cached", (cache.put("e", ["e" * 11]), cache.get("e"))[1] is None),
+        check("hits and misses counted", cache.hits == 3 and cache.misses == 2),
+        check("argument order does not matter", normalize_args({"a": 1, "b": 2}) == normalize_args({"b": 2, "a": 1})),
+    ]
+    return all(results)
+
+
+def test_versions():
+    print("=" * 70)
+    print("TEST 2: Version keys")
+    print("=" * 70)
+
+    graph = FakeGraph({"REQ-1": "p1", "REQ-2": "p2", "DOM-Global": None}, edges=[("REQ-1", "DOM-Global")])
+    p1, p2 = current(graph, "p1"), current(graph, "p2")
+    bump(graph, ["p1"])
+    results = [check("project bump changes its key only", current(graph, "p1") != p1 and current(graph, "p2") == p2)]
+
+    p1, p2 = current(graph, "p1"), current(graph, "p2")
+    bump(graph, [None])
+    results.append(check("global bump changes every key", current(graph, "p1") != p1 and current(graph, "p2") != p2))
+
+    p1, p2 = current(graph, "p1"), current(graph, "p2")
+    bump(graph, uids=["REQ-2"])
+    results.append(check("uid bump resolves the node's project", current(graph, "p1") == p1 and current(graph, "p2") != p2))
+
+    before = dict((s, v["version"]) for s, v in graph.versions.items())
+    bump(graph, uids=["REQ-1"], with_neighbors=True)
+    results.append(check("neighbour scopes bumped", graph.versions["p1"]["version"] == before["p1"] + 1
+                         and graph.versions[GLOBAL_SCOPE]["version"] == before[GLOBAL_SCOPE] + 1
+                         and graph.versions["p2"]["version"] == before["p2"]))
+
+    p1, p2 = current(graph, "p1"), current(graph, "p2")
+    bump_all(graph)
+    results.append(check("bulk bump changes every key", current(graph, "p1") != p1 and current(graph, "p2") != p2))
+
+    graph.versions.clear()  # database wiped: versions restart, epochs differ
+    bump(graph, ["p1"])
+    results.append(check("new epoch after a wipe", current(graph, "p1")[1][1] != p1[1][1]))
+    return all(results)
+
+
+def test_watermark():
+    print("=" * 70)
+    print("TEST 3: Version watermark")
+    print("=" * 70)
+
+    graph = FakeGraph({"REQ-1": "p1"})
+    watermark = VersionWatermark()
+    unloaded = watermark.is_current(all_versions(graph))
+    bump(graph, ["p1"])
+    watermark.reset(all_versions(graph))
+    loaded = watermark.is_current(all_versions(graph))
+
+    # Two server writers bump concurrently; the results are recorded in reverse order
+    first, second = bump(graph, ["p1", None]), bump(graph, ["p1"])
+    watermark.produced(second)
+    watermark.produced(first)
+    own = watermark.is_current(all_versions(graph))
+
+    bump(graph, uids=["REQ-1"])  # another process (importer, GraphSync)
+    foreign = watermark.is_current(all_versions(graph))
+
+    watermark.reset(all_versions(graph))
+    graph.versions.clear()  # database wiped
+    wiped = watermark.is_current(all_versions(graph))
+    return all([
+        check("never loaded: not current", not unloaded),
+        check("current right after the load", loaded),
+        check("own bumps (new scope, out of order) keep it current", own),
+        check("another writer's bump: reload", not foreign),
+        check("wiped versions: reload", not wiped),
+    ])
+
+
+if __name__ == "__main__":
+    passed = test_eviction()
+    passed = test_versions() and passed
+    passed = test_watermark() and passed
+    print("=" * 70)
+    print("✅ ALL TESTS PASSED" if passed else "❌ SOME TESTS FAILED")
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test script for gitignore-aware discovery (ignore_rules.py)
+
+Tests that:
+1. Patterns compile with gitignore semantics (anchoring, dir-only, **, negation)
+2. CodebaseMapper.discover_files prunes ignored directories before descending
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ignore_rules import IgnoreRules
+
+
+def check(label, actual, expected):
+    ok = actual == expected
+    print(f"  {'✅' if ok else '❌'} {label}: {actual} (expected {expected})")
+    return ok
+
+
+def test_patterns():
+    print("=" * 70)
+    print("TEST 1: Pattern semantics")
+    print("=" * 70)
+
+    rules = IgnoreRules([
+        "# comment",
+        "*.log",
+        "!keep.log",
+        "/build",
+        "data/",
+        "docs/**/generated",
+        "**/cache",
+        "vendor/**",
+    ])
+    results = [
+        check("*.log at any depth", rules.is_ignored("a/b/run.log"), True),
+        check("negation re-includes", rules.is_ignored("a/keep.log"), False),
+        check("anchored /build at root", rules.is_ignored("build", is_dir=True), True),
+        check("anchored /build not nested", rules.is_ignored("src/build", is_dir=True), False),
+        check("dir-only matches dir", rules.is_ignored("x/data", is_dir=True), True),
+        check("dir-only skips file", rules.is_ignored("x/data", is_dir=False), False),
+        check("a/**/b zero dirs", rules.is_ignored("docs/generated", is_dir=True), True),
+        check("a/**/b many dirs", rules.is_ignored("docs/x/y/generated", is_dir=True), True),
+        check("**/cache", rules.is_ignored("deep/cache", is_dir=True), True),
+        check("vendor/** contents", rules.is_ignored("vendor/lib.py"), True),
+        check("parent dir excludes file", rules.is_path_ignored("x/data/file.py"), True),
+        check("plain file kept", rules.is_ignored("src/app.py"), False),
+    ]
+    return all(results)
+
+
+def test_discovery_pruning():
+    print("=" * 70)
+    print("TEST 2: Discovery prunes ignored directories")
+    print("=" * 70)
+
+    from codebase_mapper import CodebaseMapper
+
+    with tempfile.TemporaryDirectory() as root:
+        for rel in ["src/app.py", "src/gen/out.py", "dumps/big.py", "src/keep/ok.py", "notes.log"]:
+            path = os.path.join(root, rel)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write("x = 1\n")
+        with open(os.path.join(root, ".gitignore"), "w") as f:
+            f.write("/dumps/\n*.log\n")
+        with open(os.path.join(root, ".graphmcpignore"), "w") as f:
+            f.write("src/gen/\n")
+
+        mapper = CodebaseMapper(root, "test_ignore_rules")
+        visited = []
+        original_scandir = os.scandir
+
+        def tracking_scandir(path):
+            visited.append(os.path.relpath(path, root))
+            return original_scandir(path)
+
+        os.scandir = tracking_scandir
+        try:
+            found = sorted(rel for rel, _, _, _ in mapper.discover_files())
+        finally:
+            os.scandir = original_scandir
+
+        results = [
+            check("discovered files", found, [".gitignore", ".graphmcpignore",
+                                              os.path.join("src", "app.py"),
+                                              os.path.join("src", "keep", "ok.py")]),
+            check("dumps/ never scanned", "dumps" in visited, False),
+            check("src/gen/ never scanned", os.path.join("src", "gen") in visited, False),
+        ]
+    return all(results)
+
+
+if __name__ == "__main__":
+    passed = test_patterns()
+    passed = test_discovery_pruning() and passed
+    print("=" * 70)
+    print("✅ ALL TESTS PASSED" if passed else "❌ SOME TESTS FAILED")
+    sys.exit(0 if passed else 1)
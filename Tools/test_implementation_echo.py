@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test script for the Implementation Echo of link_nodes (server._propagate_implementation_links)
+
+Tests that:
+1. The batched export flush (GraphSync.sync_nodes) writes every node once, in order
+2. File -> Class -> Function: when the Function IMPLEMENTS a Requirement, every
+   DECOMPOSES ancestor gets IMPLEMENTS too (one query), each touched parent is
+   returned once (also when reachable by two paths), and a repeat is idempotent
+   (requires Neo4j, like test_find_orphans)
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from graph_sync import GraphSync
+
+PROJECT = "test_echo"
+FILE_UID, CLASS_UID, FUNC_UID, REQ_UID = "TEST_ECHO_FILE", "TEST_ECHO_CLASS", "TEST_ECHO_FUNC", "TEST_ECHO_REQ"
+
+SETUP_QUERY = """
+CREATE (f:File {uid: $file, title: 'echo.py', project_id: $project})
+CREATE (c:Class {uid: $cls, title: 'Echo', project_id: $project})
+CREATE (fn:Function {uid: $func, title: 'Echo.run', project_id: $project})
+CREATE (r:Requirement {uid: $req, title: 'Echo requirement', project_id: $project})
+CREATE (f)-[:DECOMPOSES]->(c)
+CREATE (c)-[:DECOMPOSES]->(fn)
+CREATE (f)-[:DECOMPOSES]->(fn)
+CREATE (fn)-[:IMPLEMENTS]->(r)
+"""
+IMPLEMENTERS_QUERY = """
+MATCH (n)-[rel:IMPLEMENTS]->({uid: $req})
+RETURN n.uid AS uid, count(rel) AS links
+"""
+CLEANUP_QUERY = "MATCH (n) WHERE n.uid IN $uids DETACH DELETE n"
+
+
+def check(label, ok):
+    print(f"  {'✅' if ok else '❌'} {label}")
+    return ok
+
+
+def test_export_flush():
+    print("=" * 70)
+    print("TEST 1: Batched export flush")
+    print("=" * 70)
+
+    exported = []
+    sync = GraphSync.__new__(GraphSync)  # no DB: sync_node only records
+    sync.sync_node = lambda uid: exported.append(uid) or True
+    written = sync.sync_nodes([FUNC_UID, REQ_UID, CLASS_UID, FILE_UID, CLASS_UID, None, REQ_UID])
+    return all([
+        check("every node exported once, in order", exported == [FUNC_UID, REQ_UID, CLASS_UID, FILE_UID]),
+        check("files written counted", written == 4),
+    ])
+
+
+def test_echo():
+    print("=" * 70)
+    print("TEST 2: Echo up File -> Class -> Function")
+    print("=" * 70)
+
+    from server import get_driver, _propagate_implementation_links
+
+    driver = get_driver()
+    uids = [FILE_UID, CLASS_UID, FUNC_UID, REQ_UID]
+    driver.execute_query(CLEANUP_QUERY, {"uids": uids}, database_="neo4j")
+    try:
+        driver.execute_query(SETUP_QUERY, {"file": FILE_UID, "cls": CLASS_UID, "func": FUNC_UID, "req": REQ_UID,
+                                           "project": PROJECT}, database_="neo4j")
+        echoed = _propagate_implementation_links(driver, FUNC_UID, REQ_UID)
+        repeated = _propagate_implementation_links(driver, FUNC_UID, REQ_UID)
+        records, _, _ = driver.execute_query(IMPLEMENTERS_QUERY, {"req": REQ_UID}, database_="neo4j")
+        links = {r["uid"]: r["links"] for r in records}
+        return all([
+            check(f"touched parents returned once ({echoed})", sorted(echoed) == sorted([CLASS_UID, FILE_UID])),
+            check("all ancestors IMPLEMENTS the requirement", links == {FUNC_UID: 1, CLASS_UID: 1, FILE_UID: 1}),
+            check("repeat is idempotent", sorted(repeated) == sorted(echoed)),
+        ])
+    finally:
+        driver.execute_query(CLEANUP_QUERY, {"uids": uids}, database_="neo4j")
+
+
+if __name__ == "__main__":
+    passed = test_export_flush()
+    passed = test_echo() and passed
+    print("=" * 70)
+    print("✅ ALL TESTS PASSED" if passed else "❌ SOME TESTS FAILED")
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Test script for background jobs (job_manager.py)
+
+Tests that:
+1. A job runs in the background with progress and a result; a second submit joins the active job
+2. Cancellation stops a job at its next progress report; failures are recorded
+3. Jobs interrupted by a restart resume from their last checkpoint
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from job_manager import JobManager
+
+
+def check(label, ok):
+    print(f"  {'✅' if ok else '❌'} {label}")
+    return ok
+
+
+def counting_runner(items, gate=None, fail_at=None, seen=None):
+    """Processes `items` one by one, checkpointing the position; `gate` pauses before each item."""
+    def run(ctx):
+        start = ctx.checkpoint.get("next", 0)
+        for i in range(start, len(items)):
+            if gate:
+                gate.wait()
+            if i == fail_at:
+                raise RuntimeError(f"item {i} is broken")
+            if seen is not None:
+                seen.append(items[i])
+            ctx.save_checkpoint(next=i + 1)
+            ctx.progress(i + 1, len(items), unit="items", last=items[i])
+        return {"processed": len(items) - start}
+    return run
+
+
+def test_run_and_join():
+    print("=" * 70)
+    print("TEST 1: Background run")
+    print("=" * 70)
+
+    manager = JobManager(tempfile.mkdtemp(), save_interval=0)
+    gate = threading.Event()
+    manager.register("sync", counting_runner(list("abcde"), gate=gate))
+    job = manager.submit("sync", "p1", "/tmp/p1")
+    again = manager.submit("sync", "p1", "/tmp/p1")
+    other = manager.submit("sync", "p2", "/tmp/p2")
+    gate.set()
+    done = manager.wait(job["id"], timeout=5)
+    manager.wait(other["id"], timeout=5)
+    return all([
+        check("returns immediately with a job id", job["id"].startswith("JOB-")),
+        check("same kind+project joins the active job", again["id"] == job["id"] and other["id"] != job["id"]),
+        check("finished with result", done["state"] == "done" and done["result"] == {"processed": 5}),
+        check("progress and partial results", done["progress"]["done"] == 5 and done["progress"]["total"] == 5
+              and done["partial"] == {"last": "e"}),
+        check("listed per project", [j["id"] for j in manager.list("p1")] == [job["id"]]),
+    ])
+
+
+def test_cancel_and_fail():
+    print("=" * 70)
+    print("TEST 2: Cancel and failure")
+    print("=" * 70)
+
+    manager = JobManager(tempfile.mkdtemp(), save_interval=0)
+    gate = threading.Event()
+    seen = []
+    manager.register("slow", counting_runner(list("abcdef"), gate=gate, seen=seen))
+    manager.register("broken", counting_runner(list("abc"), fail_at=1))
+    job = manager.submit("slow", "p1")
+    manager.cancel(job["id"])
+    gate.set()
+    cancelled = manager.wait(job["id"], timeout=5)
+    failed = manager.wait(manager.submit("broken", "p1")["id"], timeout=5)
+    return all([
+        check("cancelled at the first progress report", cancelled["state"] == "cancelled" and seen == ["a"]),
+        check("failure recorded with its error", failed["state"] == "failed" and "item 1" in failed["error"]
+              and failed["checkpoint"] == {"next": 1}),
+        check("unknown job", manager.cancel("JOB-missing") is None),
+    ])
+
+
+def test_resume():
+    print("=" * 70)
+    print("TEST 3: Resume after restart")
+    print("=" * 70)
+
+    jobs_dir = tempfile.mkdtemp()
+    items = list("abcdef")
+    manager = JobManager(jobs_dir, save_interval=0)
+    gate = threading.Event()
+    first_run = []
+
+    def interrupted(ctx):
+        # Simulated crash: the process dies after item 3 was checkpointed
+        for i in range(3):
+            first_run.append(items[i])
+            ctx.save_checkpoint(next=i + 1)
+            ctx.progress(i + 1, len(items))
+        gate.wait()
+        return {}
+
+    manager.register("sync", interrupted)
+    job = manager.submit("sync", "p1")
+    while manager.get(job["id"])["checkpoint"].get("next") != 3:
+        time.sleep(0.01)
+
+    # "Restart": a new manager loads the persisted job (still running on disk)
+    second_run = []
+    restarted = JobManager(jobs_dir, save_interval=0)
+    restarted.register("sync", counting_runner(items, seen=second_run))
+    resumed = restarted.resume()
+    done = restarted.wait(job["id"], timeout=5)
+    gate.set()
+    return all([
+        check("interrupted job resumed", resumed == [job["id"]] and done["resumes"] == 1),
+        check("continued from the checkpoint", first_run == list("abc") and second_run == list("def")),
+        check("finished after resume", done["state"] == "done" and done["result"] == {"processed": 3}),
+    ])
+
+
+if __name__ == "__main__":
+    passed = test_run_and_join()
+    passed = test_cancel_and_fail() and passed
+    passed = test_resume() and passed
+    print("=" * 70)
+    print("✅ ALL TESTS PASSED" if passed else "❌ SOME TESTS FAILED")
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Test script for the BM25 lexical index (lexical_index.py, no database required)
+
+Tests that:
+1. Identifiers are split (snake_case, camelCase, dashes) and Cyrillic is tokenized
+2. Exact identifiers and UIDs rank first; project scoping and incremental updates work
+3. Reciprocal rank fusion merges keyword and vector rankings
+4. Nodes written by another process become searchable once it bumps a graph version; own bumps do not reload
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from lexical_index import LexicalIndex, tokenize, rrf_fuse
+from graph_version import VersionWatermark
+
+
+class FakeDriver:
+    def __init__(self, records):
+        self.records = records
+
+    def execute_query(self, query, params=None, **kwargs):
+        return self.records, None, None
+
+
+def doc(uid, node_type, project_id=None, **fields):
+    record = {"uid": uid, "type": node_type, "project_id": project_id,
+              "title": None, "name": None, "description": None, "content": None, "path": None}
+    record.update(fields)
+    return record
+
+
+def check(label, actual, expected):
+    ok = actual == expected
+    print(f"  {'✅' if ok else '❌'} {label}: {actual} (expected {expected})")
+    return ok
+
+
+def test_tokenize():
+    print("=" * 70)
+    print("TEST 1: Tokenizer")
+    print("=" * 70)
+    return all([
+        check("snake_case", tokenize("get_driver"), ["get_driver", "get", "driver"]),
+        check("camelCase", tokenize("CodebaseMapper"), ["codebasemapper", "codebase", "mapper"]),
+        check("Cyrillic + ё", tokenize("Ёмкость графа"), ["емкость", "графа"]),
+    ])
+
+
+def test_search():
+    print("=" * 70)
+    print("TEST 2: BM25 ranking, scoping, incremental updates")
+    print("=" * 70)
+
+    index = LexicalIndex()
+    index.load(FakeDriver([
+        doc("FUNC-db_get_driver", "Function", "p1", name="get_driver", path="Tools/db_config.py"),
+        doc("REQ-Driver_Pool", "Requirement", "p1", title="Пул драйверов", description="driver connections are reused"),
+        doc("REQ-Auth", "Requirement", "p2", title="Авторизация пользователя", description="get a driver token"),
+        doc("SPEC-Core", "Spec", None, title="Core spec", content="graph physics"),
+    ]))
+
+    results = [
+        check("exact identifier first", index.search("get_driver", "p1")[0][0], "FUNC-db_get_driver"),
+        check("uid lookup", index.search("REQ-Driver_Pool")[0][0], "REQ-Driver_Pool"),
+        check("project scoping", {u for u, _ in index.search("driver", "p1")}, {"FUNC-db_get_driver", "REQ-Driver_Pool"}),
+        check("global nodes visible", index.search("physics", "p2")[0][0], "SPEC-Core"),
+        check("Cyrillic", index.search("авторизация")[0][0], "REQ-Auth"),
+        check("type filter", [u for u, _ in index.search("driver", types=["Requirement"])], ["REQ-Driver_Pool", "REQ-Auth"]),
+    ]
+    index.upsert("REQ-Cache", "Requirement", "p1", title="Кэш ответов", description="response cache")
+    index.remove("REQ-Driver_Pool")
+    results += [
+        check("upsert searchable", index.search("кэш")[0][0], "REQ-Cache"),
+        check("removed not found", index.search("пул"), []),
+    ]
+    return all(results)
+
+
+def test_fusion():
+    print("=" * 70)
+    print("TEST 3: Reciprocal rank fusion")
+    print("=" * 70)
+    fused = [u for u, _ in rrf_fuse([["A", "B", "C"], ["C", "A"]])]
+    return check("A and C (in both lists) lead", fused, ["A", "C", "B"])
+
+
+class VersionedDriver(FakeDriver):
+    """FakeDriver that also serves GraphVersion reads and counts index loads."""
+    def __init__(self, records):
+        super().__init__(records)
+        self.versions = {"p1": ("e1", 1)}
+        self.loads = 0
+
+    def execute_query(self, query, params=None, **kwargs):
+        if "GraphVersion" in query:
+            return [{"scope": s, "epoch": e, "version": v} for s, (e, v) in self.versions.items()], None, None
+        self.loads += 1
+        return self.records, None, None
+
+
+def test_external_writes():
+    print("=" * 70)
+    print("TEST 4: Writes from other processes")
+    print("=" * 70)
+
+    driver = VersionedDriver([doc("REQ-1", "Requirement", "p1", title="Login flow")])
+    index, versions = LexicalIndex(), VersionWatermark()
+    versions.ensure_current(index, driver)
+
+    # The server's own write: index updated in place, its bump recorded
+    index.upsert("REQ-2", "Requirement", "p1", title="Logout flow")
+    driver.records.append(doc("REQ-2", "Requirement", "p1", title="Logout flow"))
+    driver.versions["p1"] = ("e1", 2)
+    versions.produced([("p1", "e1", 2)])
+    versions.ensure_current(index, driver)
+    loads_after_own = driver.loads
+
+    # The importer (another process) adds a node and bumps
+    driver.records.append(doc("SPEC-9", "Spec", "p1", title="Password reset"))
+    driver.versions["p1"] = ("e1", 3)
+    found = [uid for uid, _ in versions.ensure_current(index, driver).search("password reset", project_id="p1")]
+    return all([
+        check("own bump: no reload", loads_after_own, 1),
+        check("imported node searchable after its bump", found, ["SPEC-9"]),
+    ])
+
+
+if __name__ == "__main__":
+    passed = test_tokenize()
+    passed = test_search() and passed
+    passed = test_fusion() and passed
+    passed = test_external_writes() and passed
+    print("=" * 70)
+    print("✅ ALL TESTS PASSED" if passed else "❌ SOME TESTS FAILED")
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Test script for passage chunking (passage_chunker.py, no model or database required)
+
+Tests that:
+1. Passages overlap, cover the whole body and are cut at whitespace
+2. Only changed bodies are re-embedded, in batches, and the best passage is found
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from passage_chunker import chunk_spans, build_rows, content_hash, top_passages
+
+
+def check(label, actual, expected):
+    ok = actual == expected
+    print(f"  {'✅' if ok else '❌'} {label}: {actual} (expected {expected})")
+    return ok
+
+
+BODY = " ".join(f"слово{i}" for i in range(400))  # ~3.5k chars
+
+
+def test_spans():
+    print("=" * 70)
+    print("TEST 1: Overlapping spans")
+    print("=" * 70)
+    spans = chunk_spans(BODY, size=600, overlap=150)
+    return all([
+        check("covers start and end", (spans[0][0], spans[-1][1]), (0, len(BODY))),
+        check("passages overlap", all(b[0] < a[1] for a, b in zip(spans, spans[1:])), True),
+        check("cut at whitespace", all(e == len(BODY) or BODY[e] == " " for _, e in spans), True),
+        check("max size", max(e - s for s, e in spans) <= 600, True),
+        check("short body = one passage", chunk_spans("short"), [(0, 5)]),
+    ])
+
+
+def test_rows():
+    print("=" * 70)
+    print("TEST 2: Batched embedding and passage ranking")
+    print("=" * 70)
+    calls = []
+
+    def encode(texts):
+        calls.append(len(texts))
+        return [[1.0, 0.0] if "слово399" in t else [0.0, 1.0] for t in texts]
+
+    nodes = [
+        {"uid": "REQ-Long", "content": BODY, "passage_hash": None},
+        {"uid": "REQ-Same", "content": "unchanged body", "passage_hash": content_hash("unchanged body")},
+    ]
+    rows = build_rows(nodes, encode, batch_size=4)
+    row = rows[0]
+    best = top_passages(BODY, row["starts"], row["ends"], row["vectors"], [1.0, 0.0], k=1)
+    return all([
+        check("unchanged body skipped", [r["uid"] for r in rows], ["REQ-Long"]),
+        check("batches of <= 4 texts", max(calls), 4),
+        check("flat vectors", len(row["vectors"]), 2 * len(row["starts"])),
+        check("best passage is the last one", best[0][2], len(BODY)),
+    ])
+
+
+if __name__ == "__main__":
+    passed = test_spans()
+    passed = test_rows() and passed
+    print("=" * 70)
+    print("✅ ALL TESTS PASSED" if passed else "❌ SOME TESTS FAILED")
+    sys.exit(0 if passed else 1)
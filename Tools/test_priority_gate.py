@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test script for interactive/bulk priority (priority_gate.py)
+
+Tests that:
+1. Bulk work pauses between batches while an interactive call runs, and resumes when it ends
+2. A pause never waits longer than max_wait (bulk work is slowed, not starved);
+   a per-item loop paced by pacer() pauses once per time slice, not once per item
+3. lower_priority() renices only the calling thread
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from priority_gate import PriorityGate, lower_priority, BULK_NICENESS
+
+
+def check(label, ok):
+    print(f"  {'✅' if ok else '❌'} {label}")
+    return ok
+
+
+def test_pause():
+    print("=" * 70)
+    print("TEST 1: Bulk pauses behind interactive calls")
+    print("=" * 70)
+
+    gate = PriorityGate(max_wait=5.0)
+    batches = []
+
+    def bulk():
+        for i in range(3):
+            gate.pause()
+            batches.append((i, time.monotonic()))
+
+    with gate.interactive():
+        worker = threading.Thread(target=bulk)
+        worker.start()
+        time.sleep(0.1)
+        during = len(batches)
+        released = time.monotonic()
+    worker.join(5)
+    return all([
+        check("no batch while the interactive call ran", during == 0),
+        check("all batches after it returned", len(batches) == 3 and batches[0][1] >= released),
+        check("pause counted", gate.pauses == 1 and gate.pause_seconds >= 0.1),
+        check("idle gate does not block", (gate.pause(), gate.pauses)[1] == 1),
+    ])
+
+
+def test_bounded_wait():
+    print("=" * 70)
+    print("TEST 2: Bounded wait")
+    print("=" * 70)
+
+    gate = PriorityGate(max_wait=0.05)
+    with gate.interactive():
+        started = time.monotonic()
+        gate.pause()
+        waited = time.monotonic() - started
+
+    pace = gate.pacer(slice_seconds=0.05)
+    items = 0
+    with gate.interactive():  # sustained interactive traffic for the whole loop
+        started = time.monotonic()
+        while time.monotonic() - started < 0.3:
+            pace()
+            items += 1
+            time.sleep(0.001)
+    return all([
+        check("pause gave up after max_wait", 0.04 <= waited < 1.0),
+        check(f"pacer pauses per slice, not per item ({gate.pauses - 1} pauses, {items} items)",
+              1 <= gate.pauses - 1 <= 4 and items > 20),
+    ])
+
+
+def test_lower_priority():
+    print("=" * 70)
+    print("TEST 3: Thread priority")
+    print("=" * 70)
+
+    if not sys.platform.startswith("linux"):
+        return check("skipped (per-thread nice is Linux only)", True)
+    seen = {}
+
+    def bulk():
+        lower_priority()
+        seen["bulk"] = os.getpriority(os.PRIO_PROCESS, threading.get_native_id())
+
+    before = os.getpriority(os.PRIO_PROCESS, threading.get_native_id())
+    worker = threading.Thread(target=bulk)
+    worker.start()
+    worker.join()
+    after = os.getpriority(os.PRIO_PROCESS, threading.get_native_id())
+    return all([
+        check("bulk thread reniced", seen["bulk"] >= min(19, BULK_NICENESS)),
+        check("calling thread untouched", after == before),
+    ])
+
+
+if __name__ == "__main__":
+    passed = test_pause()
+    passed = test_bounded_wait() and passed
+    passed = test_lower_priority() and passed
+    print("=" * 70)
+    print("✅ ALL TESTS PASSED" if passed else "❌ SOME TESTS FAILED")
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Test script for the precomputed kNN similarity index (similarity_index.py, no database required)
+
+Tests that:
+1. Incrementally maintained top-k lists match a brute-force scan after upserts/removals
+2. Changed lists are persisted in batched writes and respect project scoping
+3. search() by query vector matches a brute-force scan (project scoping, exclusions, threshold)
+"""
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from similarity_index import SimilarityIndex
+
+
+class FakeDriver:
+    """Serves the index's load query and records knn writes."""
+    def __init__(self, records):
+        self.records = records
+        self.writes = []
+
+    def execute_query(self, query, params=None, **kwargs):
+        if "UNWIND" in query:
+            self.writes.append(params["rows"])
+            return [], None, None
+        return self.records, None, None
+
+
+def random_vector(dim=8):
+    return [random.uniform(-1, 1) for _ in range(dim)]
+
+
+def brute_force(vectors, projects, uid, k):
+    project = projects[uid]
+    scored = [(sum(a * b for a, b in zip(vectors[u], vectors[uid])), u) for u in vectors
+              if u != uid and (project is None or projects[u] in (project, None))]
+    return [u for _, u in sorted(scored, reverse=True)[:k]]
+
+
+def test_incremental():
+    print("=" * 70)
+    print("TEST 1: Incremental top-k vs brute force")
+    print("=" * 70)
+
+    random.seed(3)
+    vectors = {f"REQ-{i}": random_vector() for i in range(40)}
+    projects = {u: random.choice(["p1", "p2", None]) for u in vectors}
+    driver = FakeDriver([{"uid": u, "project_id": projects[u], "embedding": v, "knn_uids": None, "knn_scores": None}
+                         for u, v in vectors.items()])
+    index = SimilarityIndex(k=5, batch_size=16)
+    index.load(driver)
+    while index.process_pending(driver):
+        pass
+
+    for step in range(60):
+        uid = random.choice(sorted(vectors))
+        if step % 5 == 4:
+            index.remove(uid)
+            del vectors[uid]
+        else:
+            vectors[uid] = random_vector()
+            index.upsert(uid, vectors[uid], projects[uid])
+        while index.process_pending(driver):
+            pass
+
+    ok = all([u for u, _ in index.neighbors(uid)] == brute_force(vectors, projects, uid, 5) for uid in vectors)
+    print(f"  {'✅' if ok else '❌'} {len(vectors)} lists match brute force")
+    return ok
+
+
+def test_persistence():
+    print("=" * 70)
+    print("TEST 2: Batched writes and project scoping")
+    print("=" * 70)
+
+    driver = FakeDriver([
+        {"uid": "A", "project_id": "p1", "embedding": [1.0, 0.0], "knn_uids": None, "knn_scores": None},
+        {"uid": "B", "project_id": "p2", "embedding": [0.9, 0.1], "knn_uids": None, "knn_scores": None},
+        {"uid": "G", "project_id": None, "embedding": [0.8, 0.2], "knn_uids": None, "knn_scores": None},
+    ])
+    index = SimilarityIndex(k=3)
+    index.load(driver)
+    index.process_pending(driver)
+
+    results = [
+        len(driver.writes) == 1 and len(driver.writes[0]) == 3,
+        [u for u, _ in index.neighbors("A")] == ["G"],           # p2 node is invisible to p1
+        [u for u, _ in index.neighbors("G")] == ["A", "B"],      # global node sees every project
+        [u for u, _ in index.neighbors("G", project_id="p2")] == ["B"],
+    ]
+    for i, ok in enumerate(results, 1):
+        print(f"  {'✅' if ok else '❌'} check {i}")
+    return all(results)
+
+
+def test_search():
+    print("=" * 70)
+    print("TEST 3: Query vector search")
+    print("=" * 70)
+
+    random.seed(5)
+    vectors = {f"N{i}": random_vector() for i in range(40)}
+    projects = {uid: random.choice(["p1", "p2", None]) for uid in vectors}
+    driver = FakeDriver([{"uid": u, "project_id": projects[u], "embedding": v, "knn_uids": None, "knn_scores": None}
+                         for u, v in vectors.items()])
+    index = SimilarityIndex(k=5)
+    unloaded = index.search(random_vector())
+    index.load(driver)
+
+    query = random_vector()
+    expected = sorted(((sum(a * b for a, b in zip(vectors[u], query)), u) for u in vectors
+                       if projects[u] in ("p1", None) and u != "N0"), reverse=True)
+    hits = index.search(query, project_id="p1", min_score=0.1, limit=5, exclude={"N0"})
+    results = [
+        unloaded is None,
+        [u for u, _ in hits] == [u for score, u in expected if score > 0.1][:5],
+        all(abs(score - dict((u, s) for s, u in expected)[u]) < 1e-4 for u, score in hits),
+    ]
+    for i, ok in enumerate(results, 1):
+        print(f"  {'✅' if ok else '❌'} check {i}")
+    return all(results)
+
+
+if __name__ == "__main__":
+    passed = test_incremental()
+    passed = test_persistence() and passed
+    passed = test_search() and passed
+    print("=" * 70)
+    print("✅ ALL TESTS PASSED" if passed else "❌ SOME TESTS FAILED")
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test script for single-flight deduplication (single_flight.py)
+
+Tests that:
+1. Concurrent identical calls share one computation; different keys do not
+2. An exception reaches every waiting caller and the key is released
+3. A cancelled leader does not cancel the computation its followers wait for
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from single_flight import SingleFlight
+
+
+def check(label, ok):
+    print(f"  {'✅' if ok else '❌'} {label}")
+    return ok
+
+
+class SlowTool:
+    def __init__(self, fail=False):
+        self.runs = 0
+        self.fail = fail
+
+    async def __call__(self, value):
+        self.runs += 1
+        await asyncio.sleep(0.05)
+        if self.fail:
+            raise RuntimeError("boom")
+        return [value]
+
+
+async def test_shared():
+    print("=" * 70)
+    print("TEST 1: Identical calls share one computation")
+    print("=" * 70)
+
+    flight, tool = SingleFlight(), SlowTool()
+    results = await asyncio.gather(*[flight.do(("illuminate_path", "q"), lambda: tool("q")) for _ in range(5)],
+                                   flight.do(("illuminate_path", "other"), lambda: tool("other")))
+    checks = [
+        check("one run per distinct key", tool.runs == 2),
+        check("every caller got the answer", results[:5] == [["q"]] * 5 and results[5] == ["other"]),
+        check("shared calls counted", flight.led == 2 and flight.shared == 4),
+        check("nothing left in flight", flight.in_flight() == 0),
+    ]
+    await flight.do(("illuminate_path", "q"), lambda: tool("q"))
+    checks.append(check("a later call computes again", tool.runs == 3))
+    return all(checks)
+
+
+async def test_exception():
+    print("=" * 70)
+    print("TEST 2: Exceptions are shared")
+    print("=" * 70)
+
+    flight, tool = SingleFlight(), SlowTool(fail=True)
+    results = await asyncio.gather(*[flight.do("k", lambda: tool("x")) for _ in range(3)], return_exceptions=True)
+    return all([
+        check("every caller got the error", all(isinstance(r, RuntimeError) for r in results) and tool.runs == 1),
+        check("key released", flight.in_flight() == 0),
+    ])
+
+
+async def test_cancelled_leader():
+    print("=" * 70)
+    print("TEST 3: Cancelled leader")
+    print("=" * 70)
+
+    flight, tool = SingleFlight(), SlowTool()
+    leader = asyncio.ensure_future(flight.do("k", lambda: tool("x")))
+    await asyncio.sleep(0)
+    follower = asyncio.ensure_future(flight.do("k", lambda: tool("x")))
+    await asyncio.sleep(0)
+    leader.cancel()
+    result = await follower
+    return all([
+        check("follower still answered", result == ["x"] and tool.runs == 1),
+        check("leader cancelled", leader.cancelled()),
+    ])
+
+
+async def main():
+    passed = await test_shared()
+    passed = await test_exception() and passed
+    passed = await test_cancelled_leader() and passed
+    return passed
+
+
+if __name__ == "__main__":
+    passed = asyncio.run(main())
+    print("=" * 70)
+    print("✅ ALL TESTS PASSED" if passed else "❌ SOME TESTS FAILED")
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Test script for the reader/writer tool scheduler (tool_scheduler.py)
+
+Tests that:
+1. Reads and writers on disjoint keys run in parallel; writers sharing a key are serialized
+2. A project writer waits for running writers, and later writers wait behind it
+3. Queue-depth metrics are counted per project
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from tool_scheduler import ToolScheduler
+
+
+def check(label, ok):
+    print(f"  {'✅' if ok else '❌'} {label}")
+    return ok
+
+
+class Recorder:
+    """Tracks how many calls overlap and the order they finish in."""
+    def __init__(self):
+        self.running = 0
+        self.peak = 0
+        self.log = []
+
+    async def work(self, name, seconds=0.02):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        self.log.append(f"start:{name}")
+        await asyncio.sleep(seconds)
+        self.log.append(f"end:{name}")
+        self.running -= 1
+
+
+async def read(scheduler, rec, name, project="p1"):
+    async with scheduler.reading(project):
+        await rec.work(name)
+
+
+async def write(scheduler, rec, name, keys, project="p1"):
+    async with scheduler.writing(project, keys):
+        await rec.work(name)
+
+
+async def test_parallel_and_serial():
+    print("=" * 70)
+    print("TEST 1: Parallel reads and disjoint writers, serialized conflicts")
+    print("=" * 70)
+
+    scheduler, rec = ToolScheduler(), Recorder()
+    await asyncio.gather(*[read(scheduler, rec, f"r{i}") for i in range(4)],
+                         write(scheduler, rec, "w1", ["REQ-A"]), write(scheduler, rec, "w2", ["REQ-B"]))
+    results = [check("reads and disjoint writers overlap", rec.peak == 6)]
+
+    rec = Recorder()
+    await asyncio.gather(write(scheduler, rec, "w1", ["REQ-A", "REQ-B"]), write(scheduler, rec, "w2", ["REQ-B"]),
+                         write(scheduler, rec, "other", ["REQ-A"], project="p2"))
+    p1_log = [e for e in rec.log if not e.endswith("other")]
+    results += [
+        check("shared key serialized in arrival order", p1_log == ["start:w1", "end:w1", "start:w2", "end:w2"]),
+        check("other project not blocked", rec.log.index("start:other") < rec.log.index("end:w1")),
+    ]
+    return all(results)
+
+
+async def test_project_writer():
+    print("=" * 70)
+    print("TEST 2: Project writer")
+    print("=" * 70)
+
+    scheduler, rec = ToolScheduler(), Recorder()
+
+    async def late_writer():
+        await asyncio.sleep(0.005)  # arrives while the project writer is waiting
+        await write(scheduler, rec, "late", ["REQ-C"])
+
+    await asyncio.gather(write(scheduler, rec, "uid", ["REQ-A"]), write(scheduler, rec, "project", None),
+                         late_writer(), read(scheduler, rec, "read"))
+    order = [e for e in rec.log if e != "start:read" and e != "end:read"]
+    return all([
+        check("project writer waits for the running writer", order.index("start:project") > order.index("end:uid")),
+        check("later writer waits behind the project writer", order.index("start:late") > order.index("end:project")),
+        check("reads not blocked", rec.log.index("start:read") < rec.log.index("end:uid")),
+    ])
+
+
+async def test_metrics():
+    print("=" * 70)
+    print("TEST 3: Metrics")
+    print("=" * 70)
+
+    scheduler, rec = ToolScheduler(), Recorder()
+    await asyncio.gather(*[write(scheduler, rec, f"w{i}", ["REQ-A"]) for i in range(3)], read(scheduler, rec, "r"))
+    metrics = scheduler.metrics()["p1"]
+    text = scheduler.prometheus()
+    return all([
+        check("queue depth peak recorded", metrics["writes_queued_max"] == 2 and metrics["writes_queued"] == 0),
+        check("totals counted", metrics["writes_total"] == 3 and metrics["reads_total"] == 1),
+        check("wait time accumulated", metrics["write_wait_seconds_total"] > 0),
+        check("prometheus text", 'graphmcp_tool_writes_queued_max{project="p1"} 2' in text),
+    ])
+
+
+async def main():
+    passed = await test_parallel_and_serial()
+    passed = await test_project_writer() and passed
+    passed = await test_metrics() and passed
+    return passed
+
+
+if __name__ == "__main__":
+    passed = asyncio.run(main())
+    print("=" * 70)
+    print("✅ ALL TESTS PASSED" if passed else "❌ SOME TESTS FAILED")
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,128 @@
+"""
+Per-project reader/writer scheduling of tool calls.
+
+Every SSE session shares one event loop and one graph. The scheduler decides
+which calls may overlap:
+
+- reads (read-only tools) never wait: any number run in parallel;
+- uid writers (create_concept, link_nodes, update_node, ...) lock the set of
+  keys they touch (node uids, plus e.g. the title of a node being created).
+  Writers with disjoint key sets run in parallel. Writers sharing a key run
+  one after another;
+- project writers (keys=None: switch_project, set_workflow, ...) hold the
+  whole project. They wait for running uid writers and block new ones; new
+  uid writers do not jump ahead of a waiting project writer.
+Lanes are per project, so different projects never wait on each other.
+
+Bulk tools (map_codebase, sync_graph, refresh_knowledge) are project writers
+only while they submit their job. The job itself runs in a JobManager thread
+outside the scheduler, concurrently with uid writers: its writes are
+idempotent MERGE batches followed by a version bump, and JobManager runs at
+most one job of a kind per project. Holding the lane for a multi-minute job
+would stall every interactive write of the project.
+
+Each lane keeps queue-depth metrics. `prometheus()` renders them for the
+/metrics endpoint.
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Iterable, Optional
+
+
+class ProjectLane:
+    def __init__(self):
+        self.cond = asyncio.Condition()
+        self.held = set()             # keys of running uid writers
+        self.exclusive = False        # a project writer is running
+        self.exclusive_waiting = 0
+        self.reads_running = 0
+        self.writes_running = 0
+        self.writes_queued = 0
+        self.max_queued = 0
+        self.reads_total = 0
+        self.writes_total = 0
+        self.wait_seconds = 0.0
+
+    def can_write(self, keys: Optional[frozenset]) -> bool:
+        if self.exclusive:
+            return False
+        if keys is None:
+            return not self.held
+        return not self.exclusive_waiting and self.held.isdisjoint(keys)
+
+
+class ToolScheduler:
+    def __init__(self):
+        self.lanes: Dict[str, ProjectLane] = {}
+
+    def lane(self, project_id: Optional[str]) -> ProjectLane:
+        key = project_id or "*"
+        if key not in self.lanes:
+            self.lanes[key] = ProjectLane()
+        return self.lanes[key]
+
+    @asynccontextmanager
+    async def reading(self, project_id: Optional[str]):
+        lane = self.lane(project_id)
+        lane.reads_running += 1
+        lane.reads_total += 1
+        try:
+            yield
+        finally:
+            lane.reads_running -= 1
+
+    @asynccontextmanager
+    async def writing(self, project_id: Optional[str], keys: Optional[Iterable[str]] = None):
+        """Holds `keys` (None = the whole project) for the duration of the block."""
+        lane = self.lane(project_id)
+        keys = None if keys is None else frozenset(k for k in keys if k)
+        started = time.monotonic()
+        async with lane.cond:
+            if not lane.can_write(keys):
+                lane.writes_queued += 1
+                lane.max_queued = max(lane.max_queued, lane.writes_queued)
+                if keys is None:
+                    lane.exclusive_waiting += 1
+                try:
+                    await lane.cond.wait_for(lambda: lane.can_write(keys))
+                finally:
+                    lane.writes_queued -= 1
+                    if keys is None:
+                        lane.exclusive_waiting -= 1
+                        lane.cond.notify_all()  # uid writers held back by this waiter may go now
+            if keys is None:
+                lane.exclusive = True
+            else:
+                lane.held |= keys
+            lane.writes_running += 1
+            lane.writes_total += 1
+            lane.wait_seconds += time.monotonic() - started
+        try:
+            yield
+        finally:
+            async with lane.cond:
+                if keys is None:
+                    lane.exclusive = False
+                else:
+                    lane.held -= keys
+                lane.writes_running -= 1
+                lane.cond.notify_all()
+
+    def metrics(self) -> Dict[str, Dict]:
+        return {project_id: {
+            "reads_running": lane.reads_running,
+            "writes_running": lane.writes_running,
+            "writes_queued": lane.writes_queued,
+            "writes_queued_max": lane.max_queued,
+            "reads_total": lane.reads_total,
+            "writes_total": lane.writes_total,
+            "write_wait_seconds_total": round(lane.wait_seconds, 6),
+        } for project_id, lane in self.lanes.items()}
+
+    def prometheus(self, prefix: str = "graphmcp_tool") -> str:
+        lines = []
+        for project_id, values in sorted(self.metrics().items()):
+            for name, value in values.items():
+                lines.append(f'{prefix}_{name}{{project="{project_id}"}} {value}')
+        return "\n".join(lines) + "\n"
@@ -9,7 +9,12 @@
  * Only this authorized adapter can communicate with the MCP server.
  * Direct bypass attempts without the token will be rejected (403).
  * 
- * Usage: MCP_AUTH_TOKEN=xxx node mcp_client_adapter.js
+ * Usage: MCP_AUTH_TOKEN=xxx [MCP_AGENT_ID=name] node mcp_client_adapter.js
+ *
+ * MCP_AGENT_ID names the agent of this session (its location, project and
+ * workflow persist across reconnects). Without it the session acts as the
+ * server's default agent; MCP_AGENT_ID=ephemeral asks for a throwaway agent
+ * that is dropped when the connection closes.
  */
 
 const EventSourceLib = require('eventsource');
@@ -19,6 +24,7 @@ const fetch = fetchLib.default || fetchLib;
 
 const SSE_URL = process.env.MCP_SSE_URL || 'http://localhost:8000/sse';
 const AUTH_TOKEN = process.env.MCP_AUTH_TOKEN;
+const AGENT_ID = process.env.MCP_AGENT_ID;
 
 // Validate token is provided
 if (!AUTH_TOKEN) {
@@ -37,11 +43,11 @@ function connect() {
     console.error(`[MCP Adapter] 🔒 Connecting to ${SSE_URL} with Iron Dome authentication...`);
 
     // EventSource with custom headers for authentication
-    eventSource = new EventSource(SSE_URL, {
-        headers: {
-            'X-MCP-Auth-Token': AUTH_TOKEN
-        }
-    });
+    const headers = { 'X-MCP-Auth-Token': AUTH_TOKEN };
+    if (AGENT_ID) {
+        headers['X-MCP-Agent-Id'] = AGENT_ID;  // Per-session agent identity
+    }
+    eventSource = new EventSource(SSE_URL, { headers });
 
     eventSource.onopen = () => {
         console.error('[MCP Adapter] ✅ Connected to SSE server (authenticated)');